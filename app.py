@@ -1,13 +1,40 @@
+import base64
+import io
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
 from uuid import uuid4
-from flask import Flask, request, render_template_string, send_file, redirect, url_for
-from engine import generate_pdf_report
+from flask import Flask, request, render_template_string, send_file, redirect, url_for, jsonify
+from engine import generate_pdf_bytes, _dbg, OUT_DIR
+from infra.disk_cache import DiskCache
+from infra.jobs import Job, JobQueue
 
 app = Flask(__name__)
 app.secret_key = "dev"  # для MVP
 
-# token -> (pdf_path, download_name)
-REPORTS: dict[str, tuple[str, str]] = {}
-MAX_REPORTS_IN_MEMORY = 50  # чтобы память не раздувалась на долгой работе сервера
+PERSIST_REPORTS_TO_DISK = False  # True — дополнительно сохранять html/pdf/исходник в outputs/
+
+# Состояние задач и готовые PDF лежат на диске, а не в памяти процесса: при нескольких
+# WSGI-воркерах (gunicorn -w N) /jobs/<id>/status и /download/<token> может обслужить
+# не тот процесс, что принял /generate. Запись атомарная (DiskCache), каталоги общие.
+# token -> {"name": download_name, "pdf": base64}
+# Отчёты по размеру не вытесняются (max_bytes=0) — только по TTL: иначе недокачанный
+# отчёт мог пропасть. Если диск не принял запись (read-only / tmpfs переполнен),
+# отчёт остаётся в памяти этого процесса (_LOCAL_REPORTS) и отдаётся отсюда.
+REPORT_STORE_DIR = OUT_DIR / "reports"
+REPORT_TTL_SEC = 24 * 3600
+# job id -> снимок Job.to_dict() + queue_position / token
+JOB_STATE_DIR = OUT_DIR / "jobs"
+JOB_STATE_MAX_BYTES = 20 * 1024 * 1024
+
+REPORTS = DiskCache(REPORT_STORE_DIR, max_bytes=0, ttl_sec=REPORT_TTL_SEC, log=_dbg)
+JOB_STATE = DiskCache(JOB_STATE_DIR, max_bytes=JOB_STATE_MAX_BYTES, ttl_sec=REPORT_TTL_SEC, log=_dbg)
+
+# Фоновая генерация: /generate сразу отдаёт job id, отчёт собирается в рабочих потоках
+# (потоки — свои в каждом воркере, лимит очереди тоже на процесс)
+JOB_WORKERS = 2
+JOB_MAX_QUEUE = 50
 
 FORM_HTML = """
 <!doctype html>
@@ -152,14 +179,152 @@ READY_HTML = """
 """
 
 
-def _trim_reports_cache() -> None:
-    # удаляем самые старые записи, если их слишком много
-    if len(REPORTS) <= MAX_REPORTS_IN_MEMORY:
-        return
-    # dict сохраняет порядок вставки (Python 3.7+)
-    to_drop = len(REPORTS) - MAX_REPORTS_IN_MEMORY
-    for k in list(REPORTS.keys())[:to_drop]:
-        REPORTS.pop(k, None)
+JOB_HTML = """
+<!doctype html>
+<html lang="ru">
+<head>
+  <meta charset="utf-8">
+  <title>Формирование отчёта</title>
+  <meta name="viewport" content="width=device-width, initial-scale=1">
+  <style>
+    body{font-family:Arial, sans-serif; max-width:900px; margin:24px auto; padding:0 12px;}
+    .card{background:#f7f7f9; padding:16px; border-radius:12px; margin-top:16px;}
+    .btn{margin-top:14px; padding:14px 16px; font-size:16px; cursor:pointer; width:100%;}
+    .hint{color:#666; font-size:14px; margin-top:8px; line-height:1.4;}
+    .bar{height:10px; background:#e0e7ff; border-radius:6px; overflow:hidden; margin-top:12px;}
+    .bar div{height:100%; background:#1e3a8a; width:0%; transition:width .4s;}
+    .err{background:#fff3f3; border:1px solid #ffb3b3; padding:10px; border-radius:8px; margin:12px 0; display:none;}
+    #done{display:none;}
+  </style>
+</head>
+<body>
+  <h2>Расшифровка анализов — PDF отчёт</h2>
+
+  <div class="card">
+    <div id="state">Задача поставлена в очередь…</div>
+    <div class="bar"><div id="bar"></div></div>
+    <div class="hint" id="details"></div>
+
+    <div id="err" class="err"></div>
+
+    <div id="done">
+      <form method="get" id="dl">
+        <button class="btn" type="submit">Скачать PDF</button>
+      </form>
+    </div>
+
+    <form method="get" action="/">
+      <button class="btn" type="submit">Сформировать новый отчёт</button>
+    </form>
+  </div>
+
+  <script>
+    const STAGES = {queued: "В очереди", started: "Запуск", ocr: "Распознавание документа",
+                    parse: "Разбор показателей", reocr: "Повторное распознавание страниц", llm: "Формирование пояснений",
+                    render: "Формирование PDF", done: "Отчёт готов"};
+    function poll(){
+      fetch("/jobs/{{ job_id }}/status").then(r => r.json()).then(j => {
+        document.getElementById("bar").style.width = j.progress + "%";
+        if (j.status === "queued") {
+          document.getElementById("state").textContent = "В очереди (перед вами: " + j.queue_position + ")";
+        } else {
+          document.getElementById("state").textContent = STAGES[j.stage] || j.stage;
+        }
+        document.getElementById("details").textContent =
+          "ожидание: " + j.wait_sec + " с, обработка: " + j.run_sec + " с";
+        if (j.status === "done") {
+          document.getElementById("dl").action = "/download/" + j.token;
+          document.getElementById("done").style.display = "block";
+          return;
+        }
+        if (j.status === "error" || j.status === "unknown") {
+          const e = document.getElementById("err");
+          e.textContent = "Ошибка: " + (j.error || "задача не найдена");
+          e.style.display = "block";
+          return;
+        }
+        setTimeout(poll, 1000);
+      }).catch(() => setTimeout(poll, 2000));
+    }
+    poll();
+  </script>
+</body>
+</html>
+"""
+
+
+_ID_RE = re.compile(r"[0-9a-f]{32}")  # uuid4().hex: id из URL становится именем файла
+
+
+_JOB_STATE_LOCK = threading.Lock()
+_LOCAL_REPORTS: Dict[str, Dict[str, Any]] = {}   # token -> {"name", "pdf", "at"}; диск не принял запись
+_LOCAL_REPORTS_LOCK = threading.Lock()
+
+
+def _job_state(job: Job) -> Dict[str, Any]:
+    data = JOBS.snapshot(job)
+    data["queue_position"] = JOBS.queue_position(job.id)
+    data["token"] = job.result if data["status"] == "done" else None
+    return data
+
+
+def _store_job_state(data: Dict[str, Any]) -> None:
+    """Пишет снимок, если на диске нет более нового (версия больше) — снимки приходят не по порядку."""
+    with _JOB_STATE_LOCK:
+        stored = JOB_STATE.get(data["id"])
+        if stored is not None and stored.get("version", 0) > data["version"]:
+            return
+        JOB_STATE.set(data["id"], data)
+
+
+def _save_job_state(job: Job) -> None:
+    """on_change очереди: снимок задачи для воркеров, у которых её нет в памяти."""
+    _store_job_state(_job_state(job))
+
+
+def _load_job_state(job_id: str) -> Optional[Dict[str, Any]]:
+    """Свежее состояние из своей очереди, иначе — последний снимок с диска."""
+    job = JOBS.get(job_id)
+    if job is not None:
+        return _job_state(job)
+    if not _ID_RE.fullmatch(job_id):
+        return None
+    return JOB_STATE.get(job_id)
+
+
+JOBS = JobQueue(workers=JOB_WORKERS, max_queue=JOB_MAX_QUEUE, log=_dbg, on_change=_save_job_state)
+
+
+def _generate_job(progress, **kwargs) -> str:
+    """Выполняется в рабочем потоке JobQueue; возвращает токен для /download."""
+    pdf_bytes, download_name = generate_pdf_bytes(
+        persist=PERSIST_REPORTS_TO_DISK,
+        progress=progress,
+        **kwargs,
+    )
+    token = uuid4().hex
+    entry = {"name": download_name, "pdf": base64.b64encode(pdf_bytes).decode("ascii")}
+    if not REPORTS.set(token, entry):
+        _dbg(f"reports: {token} kept in process memory, disk store unavailable")
+        _keep_local_report(token, entry)
+    REPORTS.prune_expired()
+    return token
+
+
+def _keep_local_report(token: str, entry: Dict[str, Any]) -> None:
+    now = time.time()
+    with _LOCAL_REPORTS_LOCK:
+        for t in [t for t, e in _LOCAL_REPORTS.items() if now - e["at"] > REPORT_TTL_SEC]:
+            del _LOCAL_REPORTS[t]
+        _LOCAL_REPORTS[token] = dict(entry, at=now)
+
+
+def _load_report(token: str) -> Optional[Dict[str, Any]]:
+    if not _ID_RE.fullmatch(token):
+        return None
+    with _LOCAL_REPORTS_LOCK:
+        entry = _LOCAL_REPORTS.get(token)
+    return entry if entry is not None else REPORTS.get(token)
 
 
 @app.get("/")
@@ -195,7 +360,8 @@ def generate():
             filename = up.filename
             mimetype = up.mimetype or ""
 
-        pdf_path, download_name = generate_pdf_report(
+        job = JOBS.submit(
+            _generate_job,
             sex=sex,
             age=age,
             raw_text=raw_text,
@@ -203,12 +369,7 @@ def generate():
             filename=filename,
             mimetype=mimetype,
         )
-
-        token = uuid4().hex
-        REPORTS[token] = (str(pdf_path), download_name)
-        _trim_reports_cache()
-
-        return render_template_string(READY_HTML, token=token)
+        return redirect(url_for("job_page", job_id=job.id))
 
     except Exception as e:
         return render_template_string(
@@ -220,16 +381,40 @@ def generate():
         )
 
 
+@app.get("/jobs/stats")
+def jobs_stats():
+    return jsonify(JOBS.stats())
+
+
+@app.get("/jobs/<job_id>")
+def job_page(job_id: str):
+    data = _load_job_state(job_id)
+    if data is None:
+        return redirect(url_for("index"))
+    if data["status"] == "done":
+        return render_template_string(READY_HTML, token=data["token"])
+    return render_template_string(JOB_HTML, job_id=job_id)
+
+
+@app.get("/jobs/<job_id>/status")
+def job_status(job_id: str):
+    data = _load_job_state(job_id)
+    if data is None:
+        return jsonify({"id": job_id, "status": "unknown", "progress": 0}), 404
+    data["queue_depth"] = JOBS.stats()["queue_depth"]
+    return jsonify(data)
+
+
 @app.get("/download/<token>")
 def download(token: str):
-    if token not in REPORTS:
+    entry = _load_report(token)
+    if entry is None:
         return redirect(url_for("index"))
 
-    pdf_path, download_name = REPORTS[token]
     return send_file(
-        pdf_path,
+        io.BytesIO(base64.b64decode(entry["pdf"])),
         as_attachment=True,
-        download_name=download_name,
+        download_name=entry["name"],
         mimetype="application/pdf",
     )
 
@@ -0,0 +1,117 @@
+"""
+Бенчмарк разбора OCR JSON в текст: прежний рекурсивный обход против
+итеративного engine._collect_text_annotations.
+
+Ответ генерируется: N страниц × блоки × строки × слова с рамками — как у Vision OCR
+для многостраничного скана. Меряется время (лучшее из --repeat) и пик памяти
+(tracemalloc) на полном ocr_result_to_plaintext-подобном пути.
+
+  python benchmarks/bench_ocr_walker.py --pages 100
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import engine
+
+
+def _legacy_collect(node: Any, out_texts: List[str]) -> None:
+    """Обход до итеративной версии: fullText + все lines[].text + рекурсия во все значения."""
+    if node is None:
+        return
+    if isinstance(node, dict):
+        ft = node.get("fullText")
+        if isinstance(ft, str) and ft.strip():
+            out_texts.append(ft.strip())
+        blocks = node.get("blocks")
+        if isinstance(blocks, list):
+            for b in blocks:
+                if isinstance(b, dict):
+                    lines = b.get("lines")
+                    if isinstance(lines, list):
+                        for ln in lines:
+                            if isinstance(ln, dict):
+                                t = ln.get("text")
+                                if isinstance(t, str) and t.strip():
+                                    out_texts.append(t.strip())
+        for v in node.values():
+            if isinstance(v, (dict, list)):
+                _legacy_collect(v, out_texts)
+    elif isinstance(node, list):
+        for it in node:
+            _legacy_collect(it, out_texts)
+
+
+def _box(x: int, y: int, w: int, h: int) -> Dict[str, Any]:
+    return {"vertices": [{"x": str(x), "y": str(y)}, {"x": str(x), "y": str(y + h)},
+                         {"x": str(x + w), "y": str(y + h)}, {"x": str(x + w), "y": str(y)}]}
+
+
+def make_response(pages: int, blocks: int = 4, lines: int = 12) -> Dict[str, Any]:
+    out = []
+    for p in range(pages):
+        page_blocks, full = [], []
+        for b in range(blocks):
+            page_lines = []
+            for n in range(lines):
+                text = f"Показатель {p}.{b}.{n} {4.5 + n / 10:.1f} ммоль/л 3.9 - 6.1"
+                words = [{"text": w, "boundingBox": _box(100 + 80 * i, 40 * n, 70, 20),
+                          "entityIndex": "-1", "textSegments": [{"startIndex": "0", "length": str(len(w))}]}
+                         for i, w in enumerate(text.split())]
+                page_lines.append({"boundingBox": _box(100, 40 * n, 800, 20), "text": text, "words": words})
+                full.append(text)
+            page_blocks.append({"boundingBox": _box(80, 0, 900, 40 * lines), "lines": page_lines})
+        out.append({"textAnnotation": {"width": "1240", "height": "1754", "blocks": page_blocks,
+                                       "entities": [], "tables": [], "fullText": "\n".join(full)},
+                    "page": str(p)})
+    return {"result": {"pages": out}}
+
+
+def _plaintext(collect: Callable[[Any, List[str]], None], ocr_json: Dict[str, Any]) -> str:
+    texts: List[str] = []
+    for page in ocr_json["result"]["pages"]:
+        page_texts: List[str] = []
+        collect(page, page_texts)
+        texts.append("\n".join(page_texts))
+    return engine._join_ocr_texts(texts)
+
+
+def measure(fn: Callable[[], str], repeat: int) -> Dict[str, float]:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    text = fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ms": best * 1000, "peak_kb": peak / 1024, "lines": len(text.splitlines())}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--pages", type=int, default=50)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    ocr_json = make_response(args.pages)
+    rows = [
+        ("recursive (legacy)", measure(lambda: _plaintext(_legacy_collect, ocr_json), args.repeat)),
+        ("iterative", measure(lambda: _plaintext(engine._collect_text_annotations, ocr_json), args.repeat)),
+    ]
+    print(f"pages={args.pages} repeat={args.repeat}")
+    print(f"{'walker':<20} {'best ms':>10} {'peak KiB':>10} {'lines':>8}")
+    for name, r in rows:
+        print(f"{name:<20} {r['ms']:>10.2f} {r['peak_kb']:>10.1f} {r['lines']:>8}")
+
+
+if __name__ == "__main__":
+    main()
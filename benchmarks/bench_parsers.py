@@ -0,0 +1,71 @@
+"""
+Бенчмарк текстовых парсеров: строк в секунду на фикстурах tests/fixtures/*.txt.
+
+Каждый парсер получает весь текст фикстуры (повторённый --scale раз — чтобы
+замер не тонул в накладных расходах), время — лучшее из --repeat прогонов.
+
+  python benchmarks/bench_parsers.py --scale 20 --repeat 5
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Tuple
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import engine
+from parsers.fallback_generic import fallback_parse_candidates
+from parsers.line_scorer import score_line
+from parsers.medsi_extractor import medsi_inline_to_candidates
+from parsers.universal_extractor import universal_extract
+
+FIXTURES = PROJECT_ROOT / "tests" / "fixtures"
+
+
+def _score_all(text: str) -> None:
+    for ln in text.splitlines():
+        score_line(ln)
+
+
+PARSERS: List[Tuple[str, Callable[[str], object]]] = [
+    ("score_line", _score_all),
+    ("universal_extract", universal_extract),
+    ("medsi_inline", medsi_inline_to_candidates),
+    ("helix_table", engine.helix_table_to_candidates),
+    ("fallback_generic", fallback_parse_candidates),
+    ("smart_to_candidates", engine._smart_to_candidates),
+    ("tsv_with_fallback", lambda t: engine.parse_with_fallback(engine._smart_to_candidates(t))),
+    ("items_with_fallback", lambda t: engine.parse_candidates_with_fallback(engine._smart_candidates(t))),
+]
+
+
+def best_seconds(fn: Callable[[str], object], text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--scale", type=int, default=20, help="сколько раз повторить текст фикстуры")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    for path in sorted(FIXTURES.glob("*.txt")):
+        text = "\n".join([path.read_text(encoding="utf-8")] * args.scale)
+        n_lines = len(text.splitlines())
+        print(f"{path.name}: {n_lines} lines (x{args.scale}), best of {args.repeat}")
+        print(f"  {'parser':<22} {'ms':>9} {'lines/s':>12}")
+        for name, fn in PARSERS:
+            sec = best_seconds(fn, text, args.repeat)
+            print(f"  {name:<22} {sec * 1000:>9.2f} {n_lines / sec:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
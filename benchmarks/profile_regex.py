@@ -0,0 +1,47 @@
+"""
+Профиль регулярных выражений парсеров на корпусе текстов (parsers/regex_profiler.py).
+
+Каждый файл проходит _smart_candidates + parse_candidates_with_fallback внутри одного
+профиля; в конце — таблицы шаблонов и вызывающих функций по суммарному времени.
+
+  python benchmarks/profile_regex.py                     # tests/fixtures/*.txt
+  python benchmarks/profile_regex.py corpus/*.txt --top 50 --json profile.json
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import engine
+from parsers.regex_profiler import profile_regex
+
+FIXTURES = PROJECT_ROOT / "tests" / "fixtures"
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("paths", nargs="*", type=Path, help="текстовые файлы (по умолчанию tests/fixtures/*.txt)")
+    ap.add_argument("--top", type=int, default=30)
+    ap.add_argument("--json", type=Path, default=None, help="сохранить профиль в JSON")
+    args = ap.parse_args()
+
+    paths = args.paths or sorted(FIXTURES.glob("*.txt"))
+    n_lines = 0
+    with profile_regex() as prof:
+        for path in paths:
+            text = path.read_text(encoding="utf-8")
+            n_lines += len(text.splitlines())
+            engine.parse_candidates_with_fallback(engine._smart_candidates(text))
+
+    print(f"{len(paths)} files, {n_lines} lines")
+    print(prof.report(args.top))
+    if args.json is not None:
+        args.json.write_text(json.dumps(prof.as_dict(args.top), ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,25 +5,50 @@
 # - извлечение показателей: двухстрочный + однострочный парсер
 # - корректное определение отклонений для блока "Итог по фактам"
 # - фильтр мусора (SGS/заказы/служебные строки)
-# - логи: outputs/ocr_debug.txt
+# - логи: outputs/ocr_debug.txt (logging, ротация, фоновая запись)
 
-import re
+import atexit
 import base64
+import hashlib
 import json
+import logging
+import threading
 import time
-from dataclasses import dataclass
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from functools import lru_cache
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional, Tuple, List, Set, Dict, Any
+from typing import Optional, Tuple, List, Set, Dict, Any, Callable, Collection
 from uuid import uuid4
 
 import requests
 from jinja2 import Environment, FileSystemLoader, select_autoescape
-from playwright.sync_api import sync_playwright
-
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import padding
 
+from infra.browser_pool import BrowserPool
+from infra.disk_cache import DiskCache
+from infra.http_client import HttpClient
+from infra.logging_setup import configure_logging
+from infra.token_cache import SharedTokenCache
+from ocr.pdf_pages import PdfPart, count_pdf_pages, split_pdf_pages
+from ocr.preprocess import PreprocessResult, PreprocessStats, max_side_for_dpi, preprocess_image
+from ocr.stream_reader import iter_json_objects
+from ocr.table_crop import CropResult, crop_table_region
+from ocr.layout import layout_to_candidates
+from ocr.table_model import tables_to_candidates
+from parsers import lexer
+from parsers import patterns as P
+from parsers.candidate import Candidate, candidates_to_tsv, dedup_candidates, parse_tsv
+from parsers.line_scorer import document_features, document_scope, line_features
+from parsers.patterns import parse_float
+from infra.request_context import (
+    RequestContext, current_context, request_context, set_default_workspace, use_context,
+)
+
 
 # ==========================
 # ПАПКИ / ФАЙЛЫ
@@ -34,17 +59,52 @@ OUT_DIR.mkdir(exist_ok=True)
 TEMPLATES_DIR = Path("templates")
 TEMPLATE_NAME = "report.html"
 
-RAW_RESPONSE_PATH = OUT_DIR / "yc_raw_response.json"
+OCR_DEBUG_PATH = OUT_DIR / "ocr_debug.txt"
+
+# Отладочные артефакты — у каждого запроса свои (infra/request_context.py):
+# в памяти или в папке запроса REQUEST_WORKSPACE_DIR/<id>/.
+# Вне request_context (CLI, тесты) пишутся прямо в OUT_DIR, как раньше.
+RAW_RESPONSE_ARTIFACT = "yc_raw_response.json"
+OCR_RAW_ARTIFACT = "ocr_raw.json"
+OCR_PLAIN_ARTIFACT = "ocr_plain.txt"
+OCR_CANDIDATES_ARTIFACT = "ocr_candidates.txt"
+OCR_HTTP_LAST_ARTIFACT = "ocr_http_last.txt"
+PDF_TEXT_EXTRACT_ARTIFACT = "pdf_text_extract.txt"
+OCR_PREPROCESS_ARTIFACT = "ocr_preprocess.json"
+OCR_TABLE_CROP_ARTIFACT = "ocr_table_crop.json"
+OCR_PAGE_SOURCES_ARTIFACT = "ocr_page_sources.json"
+REGEX_PROFILE_ARTIFACT = "regex_profile.txt"
 
-OCR_RAW_PATH = OUT_DIR / "ocr_raw.json"
-OCR_PLAIN_PATH = OUT_DIR / "ocr_plain.txt"
-OCR_CANDIDATES_PATH = OUT_DIR / "ocr_candidates.txt"
+REQUEST_WORKSPACE_DIR = OUT_DIR / "requests"
+REQUEST_WORKSPACE_MODE = "memory"   # "memory" — только в памяти; "disk" — папка на запрос
+REQUEST_WORKSPACE_KEEP = False      # False — папка запроса удаляется в фоне после ответа
 
-OCR_HTTP_LAST_PATH = OUT_DIR / "ocr_http_last.txt"
-OCR_POLL_LOG_PATH = OUT_DIR / "ocr_poll_log.txt"
-OCR_DEBUG_PATH = OUT_DIR / "ocr_debug.txt"
+set_default_workspace(OUT_DIR)
 
-PDF_TEXT_EXTRACT_PATH = OUT_DIR / "pdf_text_extract.txt"
+
+# ==========================
+# ЛОГИРОВАНИЕ
+# ==========================
+# DEBUG — подробный след парсинга (для разработки); в проде — "INFO":
+# отладочные записи тогда не форматируются и не пишутся.
+LOG_LEVEL = "DEBUG"
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
+LOG_BACKGROUND = True     # запись в файл в отдельном потоке
+# Профиль регулярных выражений парсеров на каждый отчёт (parsers/regex_profiler.py):
+# вызовы / время / доля совпадений по шаблонам и функциям → артефакт REGEX_PROFILE_ARTIFACT.
+# Замедляет разбор в разы — только для разработки.
+REGEX_PROFILE = False
+REGEX_PROFILE_TOP = 30
+
+_LOG = configure_logging(
+    OCR_DEBUG_PATH,
+    level=LOG_LEVEL,
+    max_bytes=LOG_MAX_BYTES,
+    backup_count=LOG_BACKUP_COUNT,
+    background=LOG_BACKGROUND,
+)
+_POLL_LOG = _LOG.getChild("poll")
 
 
 # ==========================
@@ -55,6 +115,14 @@ IAM_TOKEN_URL = "https://iam.api.cloud.yandex.net/iam/v1/tokens"
 IAM_JWT_AUD = "https://iam.api.cloud.yandex.net/iam/v1/tokens"
 IAM_JWT_ALG = "PS256"
 
+IAM_REFRESH_MARGIN_SEC = 120          # ближе к истечению токен не используем
+IAM_PROACTIVE_REFRESH_SEC = 30 * 60   # фоновое обновление, когда осталось меньше
+IAM_BACKGROUND_REFRESH = True
+IAM_BACKGROUND_RETRY_SEC = 30         # пауза после неудачного фонового обновления
+# Общий файл токена для нескольких воркеров на машине (gunicorn и т.п.):
+# обновляет один процесс, остальные читают файл без запроса к IAM. None — выключено.
+IAM_SHARED_CACHE_PATH: Optional[Path] = None
+
 
 # ==========================
 # UX / Пороги подсветки
@@ -89,14 +157,102 @@ SYSTEM_PROMPT = (
 # ==========================
 OCR_API_BASE = "https://ocr.api.cloud.yandex.net/ocr/v1"
 OCR_TIMEOUT_SEC = 180
+OCR_STREAM_CHUNK_BYTES = 64 * 1024   # getRecognition читается потоком такими кусками
 OCR_MODEL = "page"
 OCR_LANGS = ["*"]
 
 OCR_PDF_OPERATION_WAIT_SEC = 180   # чтобы не висеть бесконечно
 OCR_GET_RECOGNITION_WAIT_SEC = 180
+# Сканы PDF: "pages" — режем на страницы и распознаём параллельно sync-методом
+# (время ≈ самой медленной странице); "async" — весь документ одной операцией.
+OCR_PDF_MODE = "pages"
+OCR_PDF_PAGE_WORKERS = 4           # одновременных запросов OCR на процесс (квоты API)
+OCR_PDF_PAGES_PER_REQUEST = 1      # страниц в одном запросе recognizeText
+OCR_PDF_MAX_PAGES = 30             # больше — отдаём целиком в async
+# Страница PDF считается текстовой (OCR не нужен), если в её текстовом слое
+# >= MIN_SCORED_LINES строк-показателей или >= MIN_CHARS символов текста.
+PDF_TEXT_PAGE_MIN_SCORED_LINES = 3
+PDF_TEXT_PAGE_MIN_CHARS = 300
+# Если во всём текстовом слое меньше стольких кандидатов, «длинный текст без
+# показателей» не доверяем (битые CID-шрифты, печатная шапка над сканом таблицы):
+# такие страницы тоже уходят в OCR.
+PDF_DIRECT_MIN_CANDIDATES = 10
+# Не запускать / досрочно остановить OCR, если ожидаемые группы обнаруженной панели
+# (parsers.quality.PANEL_EXPECTED_GROUPS) уже уверенно найдены. Касается только страниц
+# со слабым текстовым слоем: страницы без текста (скан-приложение) распознаются всегда.
+OCR_SKIP_WHEN_PANEL_COMPLETE = True
+# Фото перед OCR: EXIF-поворот, уменьшение до ~TARGET_DPI для листа A4, серый,
+# автоконтраст, JPEG (ocr/preprocess.py; без Pillow — отправляется исходник).
+OCR_IMAGE_PREPROCESS = True
+OCR_IMAGE_TARGET_DPI = 300
+OCR_IMAGE_GRAYSCALE = True
+OCR_IMAGE_AUTOCONTRAST = True
+OCR_IMAGE_JPEG_QUALITY = 85
+OCR_IMAGE_PREPROCESS_MIN_KB = 200    # файлы меньше — как есть
+# Фото: в OCR уходит только область таблицы (линейки + плотность текста, ocr/table_crop.py).
+# Обрезка, экономящая меньше MIN_SAVING площади, не делается; если в обрезке
+# нашлось меньше MIN_LINES строк-показателей — повторный OCR всего изображения.
+OCR_TABLE_CROP = True
+OCR_TABLE_CROP_MIN_SAVING = 0.15
+OCR_TABLE_CROP_MIN_LINES = 3
+# Низкое качество разбора → повторный OCR только страниц, откуда пришли неуверенные
+# показатели: другой моделью и в исходном разрешении (без обрезки/уменьшения).
+# Результат принимается, только если качество стало лучше.
+OCR_REOCR_ENABLED = True
+OCR_REOCR_MODEL = "page-column-sort"
+OCR_REOCR_MAX_PAGES = 3
+# Модель "table": кандидаты строятся прямо из сетки ячеек (ocr/table_model.py),
+# без текстовых эвристик. Если из таблиц собрано меньше OCR_TABLE_MIN_ROWS строк —
+# текст того же ответа идёт в обычный разбор (_smart_to_candidates).
+OCR_TABLE_MODE = False
+OCR_TABLE_MODEL = "table"
+OCR_TABLE_MIN_ROWS = 3
+# Раскладка по рамкам слов (ocr/layout.py): строки и колонки восстанавливаются по
+# геометрии ответа любой модели, кандидаты — из этой сетки (тот же порог
+# OCR_TABLE_MIN_ROWS и откат на текст). В OCR_TABLE_MODE — только если таблиц нет.
+OCR_LAYOUT_MODE = False
 OPERATIONS_API_BASE = "https://operation.api.cloud.yandex.net/operations"
 
 
+# ==========================
+# HTTP (keep-alive пулы на хост: IAM / OCR / Operations / LLM)
+# ==========================
+HTTP_CONNECT_TIMEOUT_SEC = 5      # таймаут установки соединения; таймаут чтения — у каждого вызова свой
+HTTP_POOL_MAXSIZE = 10            # keep-alive соединений на хост (≈ число параллельных запросов)
+IAM_HTTP_TIMEOUT_SEC = 30
+OPERATIONS_HTTP_TIMEOUT_SEC = 30
+
+
+# ==========================
+# НАСТРОЙКИ PDF (пул Chromium)
+# ==========================
+PDF_POOL_SIZE = 2                  # сколько браузеров держим запущенными
+PDF_POOL_MAX_RENDERS = 200         # перезапуск браузера после N рендеров
+PDF_POOL_MAX_RSS_MB = 1024         # перезапуск при превышении памяти (нужен psutil; 0 — выкл.)
+PDF_RENDER_TIMEOUT_SEC = 60        # watchdog: дольше — страница считается зависшей
+PDF_POOL_ACQUIRE_TIMEOUT_SEC = 120 # сколько ждать свободный браузер
+
+
+# ==========================
+# НАСТРОЙКИ OCR-кэша
+# ==========================
+OCR_CACHE_ENABLED = True
+OCR_CACHE_DIR = OUT_DIR / "cache" / "ocr"
+OCR_CACHE_MAX_MB = 200
+OCR_CACHE_TTL_SEC = 7 * 24 * 3600
+
+
+# ==========================
+# НАСТРОЙКИ LLM-кэша
+# ==========================
+LLM_CACHE_ENABLED = True
+LLM_CACHE_DIR = OUT_DIR / "cache" / "llm"
+LLM_CACHE_MAX_MB = 50
+LLM_CACHE_TTL_SEC = 30 * 24 * 3600
+LLM_CACHE_VALUE_BUCKET_PCT = 10.0  # шаг корзины: на сколько % значение за границей референса (0 — точное значение)
+LLM_CACHE_AGE_BAND_YEARS = 10      # возрастная группа: 30–39, 40–49, ...
+
+
 # ==========================
 # Справочники (локальные)
 # ==========================
@@ -144,10 +300,9 @@ SPECIALIST_MAP = {
 # ============================================================
 # helpers
 # ============================================================
-def _dbg(msg: str) -> None:
-    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    prev = OCR_DEBUG_PATH.read_text(encoding="utf-8") if OCR_DEBUG_PATH.exists() else ""
-    OCR_DEBUG_PATH.write_text(prev + f"[{ts}] {msg}\n", encoding="utf-8")
+def _dbg(msg: str, *args: Any) -> None:
+    # %-аргументы форматируются только если DEBUG включён
+    _LOG.debug(msg, *args)
 
 
 def _safe_json_loads(text: str) -> Any:
@@ -161,29 +316,36 @@ def _resp_json_or_die(r: requests.Response, where: str) -> Any:
     try:
         return _safe_json_loads(r.text)
     except Exception:
-        OCR_HTTP_LAST_PATH.write_text(
+        current_context().put(
+            OCR_HTTP_LAST_ARTIFACT,
             f"[{where}] HTTP {r.status_code}\n\n{r.text[:200000]}",
-            encoding="utf-8",
         )
         raise
 
 
-def _log_poll(msg: str) -> None:
-    ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    prev = OCR_POLL_LOG_PATH.read_text(encoding="utf-8") if OCR_POLL_LOG_PATH.exists() else ""
-    OCR_POLL_LOG_PATH.write_text(prev + f"[{ts}] {msg}\n", encoding="utf-8")
+def _warn(msg: str, *args: Any) -> None:
+    _LOG.warning(msg, *args)
 
 
-def _dedup_lines_keep_order(lines: List[str]) -> List[str]:
-    seen = set()
-    out = []
-    for ln in lines:
-        k = re.sub(r"\s+", " ", ln.strip())
-        if not k or k in seen:
-            continue
-        seen.add(k)
-        out.append(ln)
-    return out
+def _debug_enabled() -> bool:
+    # для мест, где сами аргументы дорого считать (format_range, splitlines, stats)
+    return _LOG.isEnabledFor(logging.DEBUG)
+
+
+def _log_poll(msg: str, *args: Any) -> None:
+    _POLL_LOG.debug(msg, *args)
+
+
+_HTTP = HttpClient(
+    pool_maxsize=HTTP_POOL_MAXSIZE,
+    connect_timeout=HTTP_CONNECT_TIMEOUT_SEC,
+    log=_dbg,
+)
+
+
+def get_http_stats() -> Dict[str, Any]:
+    """Переиспользование соединений по хостам: requests / new_connections / reused."""
+    return _HTTP.stats()
 
 
 # ============================================================
@@ -203,11 +365,17 @@ def _normalize_private_key(pem: str) -> str:
     return pem.replace("\\n", "\n").strip() + "\n"
 
 
-def _sign_ps256(private_key_pem: str, message: bytes) -> bytes:
-    private_key = serialization.load_pem_private_key(
+@lru_cache(maxsize=4)
+def _load_private_key(private_key_pem: str) -> Any:
+    # разбор PEM заметно дороже самой подписи — держим распарсенный ключ в памяти
+    return serialization.load_pem_private_key(
         _normalize_private_key(private_key_pem).encode("utf-8"),
         password=None,
     )
+
+
+def _sign_ps256(private_key_pem: str, message: bytes) -> bytes:
+    private_key = _load_private_key(private_key_pem)
     signature = private_key.sign(
         message,
         padding.PSS(mgf=padding.MGF1(hashes.SHA256()), salt_length=32),
@@ -240,68 +408,206 @@ def _make_jwt_for_iam(sa_key: Dict[str, Any]) -> str:
     return f"{header_b64}.{payload_b64}.{sig_b64}"
 
 
+def _fetch_iam_token() -> Tuple[str, float]:
+    """JWT → IAM-токен. Возвращает (token, expires_at_ts). Сетевые ошибки — 3 попытки."""
+    sa_key = _load_sa_key()
+    jwt_token = _make_jwt_for_iam(sa_key)
+
+    # Повторные попытки при сетевых ошибках
+    last_err = None
+    for attempt in range(3):
+        try:
+            r = _HTTP.post(IAM_TOKEN_URL, json={"jwt": jwt_token}, timeout=IAM_HTTP_TIMEOUT_SEC)
+            if r.status_code != 200:
+                raise RuntimeError(f"IAM token error HTTP {r.status_code}: {r.text[:1200]}")
+
+            data = _resp_json_or_die(r, "iam/v1/tokens")
+            iam_token = data.get("iamToken")
+            expires_at = data.get("expiresAt")
+            if not iam_token or not expires_at:
+                raise RuntimeError(f"Неожиданный ответ IAM: {data}")
+
+            expires_at = expires_at.replace("Z", "+00:00")
+            dt = datetime.fromisoformat(expires_at)
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=timezone.utc)
+
+            return iam_token, dt.timestamp()
+
+        except requests.exceptions.ConnectionError as e:
+            last_err = f"Ошибка подключения к Yandex Cloud IAM API: {str(e)}. Проверьте интернет-соединение и доступность iam.api.cloud.yandex.net"
+            if attempt < 2:
+                time.sleep(1 + attempt)  # Задержка перед повторной попыткой
+                continue
+        except requests.exceptions.Timeout as e:
+            last_err = f"Таймаут при подключении к Yandex Cloud IAM API: {str(e)}"
+            if attempt < 2:
+                time.sleep(1 + attempt)
+                continue
+        except requests.exceptions.RequestException as e:
+            last_err = f"Ошибка сети при запросе IAM токена: {str(e)}"
+            if attempt < 2:
+                time.sleep(1 + attempt)
+                continue
+            raise RuntimeError(f"Не удалось получить IAM токен после 3 попыток. {last_err}")
+
+    raise RuntimeError(f"Не удалось получить IAM токен. {last_err}")
+
+
 class IamTokenProvider:
-    def __init__(self) -> None:
-        self._token: Optional[str] = None
-        self._expires_at_ts: float = 0.0
+    """
+    Кэш IAM-токена.
+
+    - get() без блокировки, пока токен годен (до истечения > refresh_margin_sec).
+    - single-flight: если токен протух, обновляет один поток, остальные ждут на
+      замке и получают уже новый токен (без повторного JWT/запроса).
+    - фоновый поток (background=True) обновляет токен заранее, когда до истечения
+      остаётся proactive_sec; запросы пользователей задержку IAM не видят.
+      Поток стартует после первого успешного получения токена; между попытками
+      не меньше retry_sec, даже если TTL токена короче proactive_sec.
+    - токен и срок хранятся одним неизменяемым кортежем (token, expires_at_ts)
+      в одном атрибуте: читатель без замка всегда видит согласованную пару.
+    """
+
+    def __init__(
+        self,
+        fetch: Optional[Callable[[], Tuple[str, float]]] = None,
+        refresh_margin_sec: float = IAM_REFRESH_MARGIN_SEC,
+        proactive_sec: float = IAM_PROACTIVE_REFRESH_SEC,
+        background: bool = IAM_BACKGROUND_REFRESH,
+        retry_sec: float = IAM_BACKGROUND_RETRY_SEC,
+    ) -> None:
+        self._fetch = fetch or _fetch_iam_token
+        self.refresh_margin_sec = float(refresh_margin_sec)
+        self.proactive_sec = max(float(proactive_sec), self.refresh_margin_sec)
+        self.background = background
+        self.retry_sec = float(retry_sec)
+
+        self._current: Optional[Tuple[str, float]] = None   # (token, expires_at_ts)
+        self._refresh_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._refreshes = 0
+        self._failures = 0
+        self._background_refreshes = 0
+
+    def _valid_token(self) -> Optional[str]:
+        # одно чтение атрибута — токен и срок из одной и той же пары
+        cur = self._current
+        if cur is not None and cur[0] and time.time() < cur[1] - self.refresh_margin_sec:
+            return cur[0]
+        return None
+
+    def _expires_at(self) -> float:
+        cur = self._current
+        return cur[1] if cur is not None else 0.0
 
     def get(self) -> str:
-        if self._token and time.time() < (self._expires_at_ts - 120):
-            return self._token
-
-        sa_key = _load_sa_key()
-        jwt_token = _make_jwt_for_iam(sa_key)
-
-        # Повторные попытки при сетевых ошибках
-        last_err = None
-        for attempt in range(3):
-            try:
-                r = requests.post(IAM_TOKEN_URL, json={"jwt": jwt_token}, timeout=30)
-                if r.status_code != 200:
-                    raise RuntimeError(f"IAM token error HTTP {r.status_code}: {r.text[:1200]}")
-
-                data = _resp_json_or_die(r, "iam/v1/tokens")
-                iam_token = data.get("iamToken")
-                expires_at = data.get("expiresAt")
-                if not iam_token or not expires_at:
-                    raise RuntimeError(f"Неожиданный ответ IAM: {data}")
-
-                expires_at = expires_at.replace("Z", "+00:00")
-                dt = datetime.fromisoformat(expires_at)
-                if dt.tzinfo is None:
-                    dt = dt.replace(tzinfo=timezone.utc)
-
-                self._expires_at_ts = dt.timestamp()
-                self._token = iam_token
-                return iam_token
-
-            except requests.exceptions.ConnectionError as e:
-                last_err = f"Ошибка подключения к Yandex Cloud IAM API: {str(e)}. Проверьте интернет-соединение и доступность iam.api.cloud.yandex.net"
-                if attempt < 2:
-                    time.sleep(1 + attempt)  # Задержка перед повторной попыткой
-                    continue
-            except requests.exceptions.Timeout as e:
-                last_err = f"Таймаут при подключении к Yandex Cloud IAM API: {str(e)}"
-                if attempt < 2:
-                    time.sleep(1 + attempt)
-                    continue
-            except requests.exceptions.RequestException as e:
-                last_err = f"Ошибка сети при запросе IAM токена: {str(e)}"
-                if attempt < 2:
-                    time.sleep(1 + attempt)
+        token = self._valid_token()
+        if token:
+            return token
+
+        with self._refresh_lock:
+            token = self._valid_token()
+            if token:
+                return token
+            token = self._refresh_locked()
+
+        self._ensure_background()
+        return token
+
+    def _refresh_locked(self, background: bool = False) -> str:
+        try:
+            token, exp = self._fetch()
+        except Exception:
+            self._failures += 1
+            raise
+        self._current = (token, float(exp))
+        self._refreshes += 1
+        if background:
+            self._background_refreshes += 1
+        _dbg("iam: token refreshed (background=%s), expires in %.0fs", background, exp - time.time())
+        return token
+
+    # ──────────────────────────────────────────
+    # Фоновое обновление
+    # ──────────────────────────────────────────
+    def _ensure_background(self) -> None:
+        if not self.background or self._stop.is_set():
+            return
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._refresh_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._background_loop, name="lab-ai-iam-refresh", daemon=True)
+                self._thread.start()
+
+    def _until_proactive(self) -> float:
+        return self._expires_at() - self.proactive_sec - time.time()
+
+    def _background_loop(self) -> None:
+        delay = 0.0
+        while not self._stop.is_set():
+            if delay <= 0:
+                delay = max(0.0, self._until_proactive())
+            if self._wakeup.wait(delay):
+                self._wakeup.clear()
+                delay = 0.0
+                continue
+            if self._stop.is_set():
+                break
+            with self._refresh_lock:
+                if self._until_proactive() > 0:
+                    delay = 0.0     # кто-то уже обновил
                     continue
-                raise RuntimeError(f"Не удалось получить IAM токен после 3 попыток. {last_err}")
+                try:
+                    self._refresh_locked(background=True)
+                    # TTL ≤ proactive_sec: новый токен сразу в окне обновления —
+                    # без паузы поток крутился бы в цикле запросов к IAM
+                    until = self._until_proactive()
+                    delay = until if until > 0 else self.retry_sec
+                except Exception as e:
+                    # старый токен ещё годен — повторим позже, запросы не ждут
+                    _warn("iam: background refresh failed: %s", e)
+                    delay = self.retry_sec
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "refreshes": self._refreshes,
+            "background_refreshes": self._background_refreshes,
+            "failures": self._failures,
+            "expires_in_sec": round(max(0.0, self._expires_at() - time.time()), 1) if self._current else None,
+            "background_thread": bool(self._thread and self._thread.is_alive()),
+        }
+
 
-        raise RuntimeError(f"Не удалось получить IAM токен. {last_err}")
+def _make_iam_fetch() -> Callable[[], Tuple[str, float]]:
+    if IAM_SHARED_CACHE_PATH is None:
+        return _fetch_iam_token
+    shared = SharedTokenCache(IAM_SHARED_CACHE_PATH)
+    # берём токен из файла, только если он ещё не дошёл до окна фонового обновления:
+    # иначе каждый процесс «обновлялся» бы чужим почти протухшим токеном
+    return lambda: shared.get_or_fetch(_fetch_iam_token, min_ttl_sec=IAM_PROACTIVE_REFRESH_SEC)
 
 
-_IAM = IamTokenProvider()
+_IAM = IamTokenProvider(fetch=_make_iam_fetch())
 
 
 def get_iam_token() -> str:
     return _IAM.get()
 
 
+def get_iam_stats() -> Dict[str, Any]:
+    return _IAM.stats()
+
+
 # ==========================
 # ПАРСИНГ
 # ==========================
@@ -344,8 +650,7 @@ def compute_item_confidence(it: Item) -> float:
     # Подозрительное значение → 0.0
     raw = it.raw_name or ""
     if any(ch in raw for ch in ['^', '*', '/']):
-        import re as _re
-        if not _re.search(r"\*10\^\d+", raw):
+        if not P.POW_IN_NAME.search(raw):
             return 0.0
 
     has_ref = it.ref is not None
@@ -368,7 +673,7 @@ def compute_item_confidence(it: Item) -> float:
 
     # value есть, но ни ref, ни биомаркер не определены
     name_clean = (it.raw_name or "").strip()
-    if len(name_clean) < 3 or not re.search(r"[A-Za-zА-Яа-я]{2,}", name_clean):
+    if len(name_clean) < 3 or not P.LETTERS2.search(name_clean):
         return 0.3
 
     return 0.5
@@ -447,20 +752,19 @@ RUS_NAME_MAP = {
 
 
 def clean_raw_name(s: str) -> str:
-    s = (s or "").strip()
-    s = re.sub(r"\s+", " ", s)
+    s = P.collapse_spaces(s)
     # убираем лишние пометки, но оставляем смысл
-    s = re.sub(r"\s*\(.*?\)\s*", " ", s)     # всё в скобках (WBC), (микроскопия) и т.п.
+    s = P.BRACKETS.sub(" ", s)               # всё в скобках (WBC), (микроскопия) и т.п.
     s = s.replace("%", "%")                  # оставим % в raw_name (для отображения), но нормализация ниже
-    s = re.sub(r"\s+", " ", s).strip()
+    s = P.collapse_spaces(s)
     return s
 
 
 def normalize_name(raw: str) -> str:
-    s = re.sub(r"\s+", " ", (raw or "").strip())
+    s = P.collapse_spaces(raw)
 
     # коды в скобках (если они были в исходном raw_name до clean_raw_name)
-    m = re.search(r"\(([A-Za-z]{2,6}%?)\)", s)
+    m = P.CODE_IN_BRACKETS.search(s)
     if m:
         code = m.group(1).upper()
         return ALIASES.get(code, code)
@@ -471,7 +775,7 @@ def normalize_name(raw: str) -> str:
             return v
 
     # попытка вытащить "NE%" из текста
-    m2 = re.search(r"\b([A-Za-z]{2,6}%?)\b", s)
+    m2 = P.CODE_WORD.search(s)
     if m2:
         code = m2.group(1).upper()
         if code in ALIASES:
@@ -480,15 +784,6 @@ def normalize_name(raw: str) -> str:
     return s.replace(" ", "_").replace("-", "_").upper()
 
 
-def parse_float(x: str) -> Optional[float]:
-    x = (x or "").strip().replace(",", ".")
-    x = re.sub(r"[^\d\.\-]", "", x)
-    try:
-        return float(x)
-    except Exception:
-        return None
-
-
 def parse_ref_range(text: str) -> Optional[Range]:
     """
     Парсит референсный диапазон из текста.
@@ -500,30 +795,30 @@ def parse_ref_range(text: str) -> Optional[Range]:
     t = t.replace("—", "-").replace("–", "-").replace(",", ".")
 
     # Канонизация «до X» → «<X» (до удаления пробелов!)
-    m_do = re.match(r"^[Дд]о\s*(\d+(?:\.\d+)?)$", t)
+    m_do = P.REF_UP_TO_EXACT.match(t)
     if m_do:
         t = f"<{m_do.group(1)}"
 
     # Удаляем пробелы, но оставляем дефис между числами
-    t = re.sub(r"\s+", "", t)
+    t = P.WS.sub("", t)
     
     # Проверяем на сравнения <=, >=, <, >
-    m = re.match(r"^(<=|<|≤)(-?\d+(?:\.\d+)?)$", t)
+    m = P.REF_LE_EXACT.match(t)
     if m:
         return Range(low=None, high=float(m.group(2)))
 
-    m = re.match(r"^(>=|>|≥)(-?\d+(?:\.\d+)?)$", t)
+    m = P.REF_GE_EXACT.match(t)
     if m:
         return Range(low=float(m.group(2)), high=None)
 
     # Проверяем диапазон вида "low-high"
-    m = re.match(r"^(-?\d+(?:\.\d+)?)-(-?\d+(?:\.\d+)?)$", t)
+    m = P.REF_RANGE_EXACT.match(t)
     if m:
         low_val = float(m.group(1))
         high_val = float(m.group(2))
         # Защита от перепутанных low/high
         if low_val > high_val:
-            _dbg(f"WARN: parse_ref_range low > high: {t}, меняем местами")
+            _warn("parse_ref_range low > high: %s, меняем местами", t)
             return Range(low=high_val, high=low_val)
         return Range(low=low_val, high=high_val)
 
@@ -575,238 +870,49 @@ def format_range(r: Optional[Range]) -> str:
 # ============================================================
 # Helix: сборщик кандидатов
 # ============================================================
-def _extract_ref_text(s: str) -> str:
-    t = (s or "").strip().replace("—", "-").replace("–", "-").replace(",", ".")
-    t = re.sub(r"\s+", " ", t)
-
-    m = re.search(r"(\d+(?:\.\d+)?)\s*-\s*(\d+(?:\.\d+)?)", t)
-    if m:
-        return f"{m.group(1)}-{m.group(2)}"
+# общие с parsers/universal_extractor.py — parsers/patterns.py, parsers/lexer.py
+_extract_ref_text = lexer.extract_ref_text
+_starts_like_value_line = P.starts_like_value_line
+_normalize_scientific_notation = P.normalize_scientific_notation
+_parse_value_unit_from_line = lexer.parse_value_unit
 
-    m = re.search(r"(<=|>=|<|>|≤|≥)\s*(\d+(?:\.\d+)?)", t)
-    if m:
-        op = m.group(1).replace("≤", "<=").replace("≥", ">=")
-        return f"{op}{m.group(2)}"
 
-    # Формат «до число» → «<число»
-    m = re.search(r"(?:^|\s)[Дд]о\s*(\d+(?:\.\d+)?)", t)
-    if m:
-        return f"<{m.group(1)}"
-
-    return ""
-
-
-def _starts_like_value_line(s: str) -> bool:
-    t = (s or "").strip()
-    return bool(re.match(r"^(?:[↑↓+]\s*)?\d", t))
-
-
-def _is_noise_line(low: str) -> bool:
-    """Делегирует проверку в is_noise() из line_scorer (единый источник правды)."""
-    from parsers.line_scorer import is_noise
-    return is_noise(low)
+def _is_noise_line(line: str) -> bool:
+    """Делегирует проверку в line_scorer (единый источник правды, признаки строки — из кэша документа)."""
+    return line_features(line).is_noise
 
 
 def _looks_like_name_line(s: str) -> bool:
-    t = (s or "").strip()
-    if not t:
-        return False
-    low = t.lower()
-    if _is_noise_line(low):
-        return False
-    if _starts_like_value_line(t):
-        return False
-    # должно быть хотя бы 2 буквы
-    if not re.search(r"[A-Za-zА-Яа-я]{2,}", t):
-        return False
-    return True
-
-
-def _normalize_scientific_notation(s: str) -> str:
-    """
-    Нормализует варианты записи степени:
-    10^9, 10~9, 10⁹, 109 → 10^9
-    """
-    # Unicode степени → обычные цифры с ^
-    s = s.replace("¹", "^1").replace("²", "^2").replace("³", "^3")
-    s = s.replace("⁴", "^4").replace("⁵", "^5").replace("⁶", "^6")
-    s = s.replace("⁷", "^7").replace("⁸", "^8").replace("⁹", "^9").replace("⁰", "^0")
-    # Варианты записи: 10~9, 10*9 → 10^9 (без -, чтобы не ломать рефы типа "10 - 40")
-    s = re.sub(r"10\s*[~*]\s*(\d+)", r"10^\1", s, flags=re.IGNORECASE)
-    # Если уже есть 10^N - оставляем как есть
-    return s
+    return line_features(s).looks_like_name
 
 
-def _parse_value_unit_from_line(s: str) -> Tuple[Optional[float], str]:
-    """
-    Парсит значение и единицу из строки.
-    Поддерживает форматы:
-    - "8.23 *10^9/л" -> (8.23, "*10^9/л")
-    - "199 *10^9 /л" -> (199.0, "*10^9/л")
-    - "28 мм/ч" -> (28.0, "мм/ч")
-    - "77.0 %" -> (77.0, "%")
-    """
-    t = re.sub(r"\s+", " ", (s or "").strip())
-    t = t.replace("↑", "").replace("↓", "").replace("+", "").strip()
-    
-    # Нормализуем научную нотацию
-    t = _normalize_scientific_notation(t)
-    
-    # Сначала пытаемся найти формат *10^N или 10^N (с пробелами или без)
-    # Варианты: "*10^9/л", "* 10^9 /л", "10^9/л"
-    pow_patterns = [
-        r"([-+]?\d+(?:[.,]\d+)?)\s*\*\s*10\s*\^\s*(\d+)(.*)$",  # 8.23 *10^9/л
-        r"([-+]?\d+(?:[.,]\d+)?)\s+10\s*\^\s*(\d+)(.*)$",       # 8.23 10^9/л
-    ]
-    
-    for pattern in pow_patterns:
-        pow_match = re.search(pattern, t, re.IGNORECASE)
-        if pow_match:
-            base = parse_float(pow_match.group(1))
-            if base is not None:
-                exp = pow_match.group(2)
-                rest = pow_match.group(3).strip() if len(pow_match.groups()) > 2 else ""
-                # Формируем единицу: *10^N + остаток (например, "/л")
-                unit = f"*10^{exp}"
-                if rest:
-                    # Если есть остаток (/л, /л и т.д.), добавляем его
-                    unit = f"{unit}{rest}".strip()
-                else:
-                    # Если остатка нет, проверяем, что было после 10^N
-                    after_match_end = pow_match.end()
-                    if after_match_end < len(t):
-                        after_part = t[after_match_end:].strip()
-                        if after_part and not re.match(r"^\d", after_part):
-                            # Это не число, скорее всего единица
-                            unit = f"{unit}{after_part}".strip()
-                return base, unit
-    
-    # Обычный формат: число + единица (без степени)
-    m = re.match(r"^([-+]?\d+(?:[.,]\d+)?)\s*(.*)$", t)
-    if not m:
-        return None, ""
-    val = parse_float(m.group(1))
-    rest = (m.group(2) or "").strip()
-    # Берём первую "часть" единицы (до пробела или до конца)
-    # Но сохраняем %, мм/ч, г/л целиком
-    if rest:
-        # Если есть / или %, берём до следующего пробела или до конца
-        unit_match = re.match(r"^([^/\s]+(?:[/%][^/\s]*)?)", rest)
-        if unit_match:
-            unit = unit_match.group(1).strip()
-        else:
-            unit = rest.split(" ")[0].strip()
-    else:
-        unit = ""
-    return val, unit
-
-
-def _try_parse_one_line_row(line: str) -> Optional[str]:
+def _try_parse_one_line_row(line: str) -> Optional[Candidate]:
     """
     Однострочный формат:
       "Скорость оседания 28 2-20 мм/ч"
       "Нейтрофилы: сегмент. (микроскопия) 73.0 % 47.0 - 72.0"
       "NE% 77.0 % 47.0 - 72.0"
-    Возвращает: name\tvalue\tref\tunit
     """
-    s = re.sub(r"\s+", " ", (line or "").strip())
+    s = P.collapse_spaces(line)
     if not s:
         return None
-    low = s.lower()
-    if _is_noise_line(low):
-        return None
-    if _starts_like_value_line(s):
+    feats = line_features(s)
+    if feats.is_noise or feats.starts_like_value:
         return None
 
-    # найдём референс (span) прямо в строке
-    range_match = re.search(r"(-?\d+(?:[.,]\d+)?)\s*[–—-]\s*(-?\d+(?:[.,]\d+)?)", s)
-    comp_match = re.search(r"(<=|>=|<|>|≤|≥)\s*(-?\d+(?:[.,]\d+)?)", s)
-
-    ref_span = None
-    ref_text = ""
-
-    if range_match:
-        a = range_match.group(1).replace(",", ".")
-        b = range_match.group(2).replace(",", ".")
-        ref_text = f"{a}-{b}"
-        ref_span = range_match.span()
-    elif comp_match:
-        op = comp_match.group(1).replace("≤", "<=").replace("≥", ">=")
-        x = comp_match.group(2).replace(",", ".")
-        ref_text = f"{op}{x}"
-        ref_span = comp_match.span()
-    else:
+    # «до N» здесь не референс (в отличие от universal_extractor)
+    row = lexer.split_row(s, up_to=False, tokens=feats.tokens)
+    if row is None:
         return None
+    return Candidate(*row)
 
-    left = s[:ref_span[0]].strip()
-    right = s[ref_span[1]:].strip()
-
-    # значение — последнее число в left (или число перед *10^N)
-    left_norm = left.replace(",", ".")
-    left_norm = _normalize_scientific_notation(left_norm)  # Нормализуем научную нотацию
-    
-    # Сначала проверяем формат *10^N или 10^N
-    pow_patterns = [
-        r"([-+]?\d+(?:[.,]\d+)?)\s*\*\s*10\s*\^\s*(\d+)",  # 8.23 *10^9
-        r"([-+]?\d+(?:[.,]\d+)?)\s+10\s*\^\s*(\d+)",       # 8.23 10^9
-    ]
-    
-    pow_match = None
-    for pattern in pow_patterns:
-        pow_match = re.search(pattern, left_norm, re.IGNORECASE)
-        if pow_match:
-            break
-    
-    if pow_match:
-        value_str = pow_match.group(1).replace(",", ".")
-        value = parse_float(value_str)
-        if value is None:
-            return None
-        exp = pow_match.group(2)
-        # Имя — всё до числа перед *10^
-        name_part = left_norm[:pow_match.start()].strip()
-        # Единица: *10^N + возможный остаток (например, "/л")
-        after_exp = left_norm[pow_match.end():].strip()
-        if after_exp:
-            # Если после 10^N есть текст (например, "/л"), добавляем его
-            unit = f"*10^{exp}{after_exp}".strip()
-        else:
-            # Или ищем единицу в right части
-            unit = f"*10^{exp}"
-            if right:
-                right_unit = right.split(" ")[0].strip()
-                if right_unit:
-                    unit = f"{unit}{right_unit}"
-    else:
-        # Обычный формат: берём последнее число
-        nums = re.findall(r"[-+]?\d+(?:\.\d+)?", left_norm)
-        if not nums:
-            return None
-        value_str = nums[-1]
-        value = parse_float(value_str)
-        if value is None:
-            return None
-        name_part = left_norm.rsplit(value_str, 1)[0].strip()
-        # unit: чаще всего после value в left (например "73.0 %") или в right
-        unit = ""
-        # Ищем единицу после числа в left
-        after_value = left_norm.split(value_str, 1)[1] if value_str in left_norm else ""
-        if after_value:
-            after_value = after_value.strip()
-            # Берём первую часть (до пробела или до конца), сохраняя / и %
-            unit_match = re.match(r"^([^/\s]+(?:[/%][^/\s]*)?)", after_value)
-            if unit_match:
-                unit = unit_match.group(1).strip()
-        if not unit and right:
-            unit = right.split(" ")[0].strip()
-    
-    if not name_part or not re.search(r"[A-Za-zА-Яа-я]", name_part):
-        return None
 
-    return f"{name_part}\t{value:g}\t{ref_text}\t{unit}".strip()
+def helix_table_to_candidates(plain_text: str) -> str:
+    """TSV-кандидаты helix (name\tvalue\tref\tunit); пайплайн берёт helix_candidates."""
+    return candidates_to_tsv(helix_candidates(plain_text))
 
 
-def helix_table_to_candidates(plain_text: str) -> str:
+def helix_candidates(plain_text: str) -> List[Candidate]:
     """
     ДВА прохода:
     - pass1 (двухстрочный): name_line -> value/ref_line (чтобы не терялась СОЭ и др.)
@@ -814,34 +920,40 @@ def helix_table_to_candidates(plain_text: str) -> str:
     
     Обрабатывает все страницы PDF - игнорирует маркеры страниц (--- PAGE N ---), если они есть.
     """
-    lines = [re.sub(r"\s+", " ", l.strip()) for l in (plain_text or "").splitlines()]
+    lines = [P.collapse_spaces(l) for l in (plain_text or "").splitlines()]
     # Убираем маркеры страниц (если они остались после ocr_result_to_plaintext)
-    lines = [l for l in lines if l and not re.match(r"^---\s*PAGE\s+\d+\s+---", l, re.IGNORECASE)]
+    lines = [l for l in lines if l and not P.PAGE_MARKER.match(l)]
     lines = [l for l in lines if l]
-    _dbg(f"helix_table_to_candidates: input_lines={len(lines)} (после удаления маркеров страниц)")
+    _dbg("helix_table_to_candidates: input_lines=%d (после удаления маркеров страниц)", len(lines))
+    with document_scope():
+        return _helix_passes(lines)
 
-    out: List[str] = []
+
+def _helix_passes(lines: List[str]) -> List[Candidate]:
+    # признаки строк считаются один раз на документ и общие для обоих проходов
+    feats = document_features(lines)
+    out: List[Candidate] = []
 
     # pass1: двухстрочный
     pending_name: Optional[str] = None
     i = 0
     while i < len(lines):
         l = lines[i]
-        low = l.lower()
+        f = feats[i]
 
-        if _is_noise_line(low):
+        if f.is_noise:
             i += 1
             continue
 
-        if _looks_like_name_line(l):
+        if f.looks_like_name:
             pending_name = l
             i += 1
             continue
 
-        if pending_name and _starts_like_value_line(l):
+        if pending_name and f.starts_like_value:
             # Объединяем текущую строку и следующую (если есть), чтобы поймать *10^N
             combined_line = l
-            if i + 1 < len(lines) and re.search(r"^\s*\d+\s", lines[i + 1]):
+            if i + 1 < len(lines) and P.LEADING_INT.search(lines[i + 1]):
                 # Следующая строка начинается с числа — возможно продолжение *10^N
                 combined_line = f"{l} {lines[i + 1]}"
             
@@ -863,15 +975,14 @@ def helix_table_to_candidates(plain_text: str) -> str:
                     adv = 2
 
             if ref:
-                candidate = f"{pending_name}\t{val:g}\t{ref}\t{unit}".strip()
-                out.append(candidate)
-                _dbg(f"candidate (2-line): {pending_name[:40]}... val={val} ref={ref} unit={unit}")
+                out.append(Candidate(pending_name, val, ref, unit))
+                _dbg("candidate (2-line): %.40s... val=%s ref=%s unit=%s", pending_name, val, ref, unit)
                 pending_name = None
                 i += adv
                 continue
             else:
                 # Референс не найден — сбрасываем pending_name
-                _dbg(f"WARN: no ref for {pending_name[:40]}... value_line={l[:50]}")
+                _warn("no ref for %.40s... value_line=%.50s", pending_name, l)
                 pending_name = None
                 i += 1
                 continue
@@ -882,190 +993,105 @@ def helix_table_to_candidates(plain_text: str) -> str:
         i += 1
 
     # pass2: однострочный
-    out2: List[str] = []
+    out2: List[Candidate] = []
     for l in lines:
         cand = _try_parse_one_line_row(l)
         if cand:
             out2.append(cand)
-            _dbg(f"candidate (1-line): {cand[:60]}...")
+            _dbg("candidate (1-line): %.60s...", cand.name)
 
-    merged = _dedup_lines_keep_order(out + out2)
-    _dbg(f"helix_table_to_candidates: output_lines={len(merged)} (2-line={len(out)}, 1-line={len(out2)})")
-    return "\n".join(merged).strip()
+    merged = dedup_candidates(out + out2)
+    _dbg("helix_table_to_candidates: output_lines=%d (2-line=%d, 1-line=%d)", len(merged), len(out), len(out2))
+    return merged
 
 
 def _smart_to_candidates(raw_text: str) -> str:
+    """TSV-кандидаты (отладка, строковый API); пайплайн берёт _smart_candidates."""
+    return candidates_to_tsv(_smart_candidates(raw_text))
+
+
+def _smart_candidates(raw_text: str) -> List[Candidate]:
     """
-    Авто-детект формата лаборатории и преобразование в TSV-кандидаты.
+    Авто-детект формата лаборатории и сбор кандидатов.
 
     Порядок:
       1. МЕДСИ — специальная обработка (склейки ref+value).
       2. Universal Extractor — для всех остальных.
       3. Fallback: старый helix (на случай регрессии).
-    """
-    from parsers.medsi_extractor import is_medsi_format, medsi_inline_to_candidates
-    from parsers.universal_extractor import universal_extract
 
-    # МЕДСИ — специальная обработка (склейки ref+value)
-    if is_medsi_format(raw_text):
-        _dbg("_smart_to_candidates: detected MEDSI format")
-        candidates = medsi_inline_to_candidates(raw_text)
+    Признаки строк (line_scorer.LineFeatures) считаются один раз и общие для всех попыток.
+    """
+    from parsers.medsi_extractor import is_medsi_format, medsi_candidates
+    from parsers.universal_extractor import universal_candidates
+
+    with document_scope():
+        # МЕДСИ — специальная обработка (склейки ref+value)
+        if is_medsi_format(raw_text):
+            _dbg("_smart_to_candidates: detected MEDSI format")
+            candidates = medsi_candidates(raw_text)
+            if candidates:
+                _dbg("_smart_to_candidates: MEDSI → %d candidates", len(candidates))
+                return candidates
+            _dbg("_smart_to_candidates: MEDSI extractor empty, falling back")
+
+        # Universal Extractor — для всех остальных
+        candidates = universal_candidates(raw_text)
         if candidates:
-            _dbg(f"_smart_to_candidates: MEDSI → {len(candidates.splitlines())} candidates")
+            _dbg("_smart_to_candidates: Universal → %d candidates", len(candidates))
             return candidates
-        _dbg("_smart_to_candidates: MEDSI extractor empty, falling back")
-
-    # Universal Extractor — для всех остальных
-    candidates = universal_extract(raw_text)
-    if candidates:
-        _dbg(f"_smart_to_candidates: Universal → {len(candidates.splitlines())} candidates")
-        return candidates
 
-    # Fallback: старый helix (на случай регрессии)
-    _dbg("_smart_to_candidates: Universal empty, falling back to helix")
-    return helix_table_to_candidates(raw_text)
+        # Fallback: старый helix (на случай регрессии)
+        _dbg("_smart_to_candidates: Universal empty, falling back to helix")
+        return helix_candidates(raw_text)
+
+
+def candidate_to_item(c: Candidate) -> Item:
+    """Кандидат → Item: нормализованное имя, референс, статус."""
+    raw_name = c.name
+    name = normalize_name(raw_name)
+    if name == raw_name.replace(" ", "_").replace("-", "_").upper():
+        # если нормализация не дала смысла — попробуем по cleaned
+        name = normalize_name(clean_raw_name(raw_name))
+
+    ref = parse_ref_range(c.ref) if c.ref else None
+    return Item(
+        raw_name=raw_name,
+        name=name,
+        value=c.value,
+        unit=c.unit,
+        ref_text=c.ref,
+        ref=ref,
+        ref_source="референс лаборатории" if ref else "нет",
+        status=status_by_range(c.value, ref),
+    )
 
 
-def parse_items_from_candidates(raw_text: str) -> List[Item]:
-    """
-    Поддерживаем:
-      1) name\tvalue\tref\tunit
-      2) name\tvalue\tref unit
-      3) name\tvalue unit\tref
-      4) name value *10^N\t... (исправление разбитых значений)
-    """
+def items_from_candidates(candidates: List[Candidate]) -> List[Item]:
+    """Baseline-сборщик Item из кандидатов экстракторов (без разбора строк)."""
     items: List[Item] = []
-
-    def _split_ref_and_unit(ref_text: str) -> tuple[str, str]:
-        t = (ref_text or "").strip()
-        if not t:
-            return "", ""
-        t_norm = t.replace("—", "-").replace("–", "-")
-        t_norm = re.sub(r"\s+", " ", t_norm).strip()
-        m = re.match(r"^(.+?)(?:\s+)([A-Za-zА-Яа-яµ/%\.\-]+)$", t_norm)
-        if not m:
-            return t, ""
-        left = m.group(1).strip()
-        unit = m.group(2).strip()
-
-        left_check = left.replace(",", ".").replace(" ", "")
-        left_check = left_check.replace("≤", "<=").replace("≥", ">=")
-
-        if re.match(r"^(-?\d+(\.\d+)?)-(-?\d+(\.\d+)?)$", left_check) or re.match(r"^(<=|>=|<|>)(-?\d+(\.\d+)?)$", left_check):
-            return left, unit
-
-        return t, ""
-
-    def _split_value_and_unit(val_text: str) -> tuple[str, str]:
-        t = re.sub(r"\s+", " ", (val_text or "").strip())
-        if not t:
-            return "", ""
-        m = re.match(r"^([-+]?\d+(?:[.,]\d+)?)(?:\s+)([A-Za-zА-Яа-яµ/%\.\-]+)$", t)
-        if not m:
-            return t, ""
-        return m.group(1), m.group(2)
-
-    def _fix_broken_scientific_notation(raw_name: str, raw_val: str) -> tuple[str, str]:
-        """
-        Исправляет случаи, когда значение разбито:
-        raw_name = "Лейкоциты (WBC) 8.23 *10^"
-        raw_val = "9"
-        Возвращает: ("Лейкоциты (WBC)", "8.23")
-        """
-        # Проверяем, есть ли в raw_name паттерн "*10^"
-        pow_match = re.search(r"([-+]?\d+(?:[.,]\d+)?)\s*\*\s*10\s*\^", raw_name, re.IGNORECASE)
-        if pow_match:
-            # raw_val может быть степенью (цифра) или уже корректным значением
-            raw_val_stripped = raw_val.strip()
-            # Извлекаем число перед *10^
-            base_str = pow_match.group(1).replace(",", ".")
-            base_val = parse_float(base_str)
-            if base_val is not None:
-                # Удаляем из raw_name всё от числа до конца
-                name_clean = raw_name[:pow_match.start()].strip()
-                # Если raw_val - это цифра (степень), игнорируем её, берём base_str
-                # Если raw_val - это уже значение, оставляем его
-                if raw_val_stripped.isdigit() and len(raw_val_stripped) <= 2:
-                    # Скорее всего это степень, игнорируем
-                    return name_clean, base_str
-                else:
-                    # Возможно, это уже значение
-                    val_check = parse_float(raw_val_stripped)
-                    if val_check is not None:
-                        return name_clean, raw_val_stripped
-                    return name_clean, base_str
-        return raw_name, raw_val
-
-    for line in (raw_text or "").splitlines():
-        if not line.strip():
-            continue
-
-        parts = [p.strip() for p in line.split("\t")]
-        if len(parts) < 3:
-            continue
-
-        raw_name = parts[0].strip()
-        raw_val = parts[1].strip()
-        ref_text = parts[2].strip()
-        unit = parts[3].strip() if len(parts) >= 4 else ""
-
-        # Исправление разбитых значений с *10^
-        raw_name, raw_val = _fix_broken_scientific_notation(raw_name, raw_val)
-
-        # если unit прилип к value
-        if not unit:
-            raw_val2, unit2 = _split_value_and_unit(raw_val)
-            if unit2:
-                raw_val = raw_val2
-                unit = unit2
-
-        # если unit прилип к ref
-        if not unit:
-            ref2, unit2 = _split_ref_and_unit(ref_text)
-            if unit2:
-                ref_text = ref2
-                unit = unit2
-        
-        # Очистка единицы от повторяющихся референсов (например, "*10^9/л 0.02 - 0.50" -> "*10^9/л")
-        if unit:
-            # Удаляем из единицы паттерны, похожие на референсы (числа с дефисом или диапазоны)
-            unit_cleaned = re.sub(r"\s+\d+\.?\d*\s*[-–—]\s*\d+\.?\d*", "", unit).strip()
-            # Если единица стала пустой или слишком короткой, оставляем оригинал
-            if unit_cleaned and len(unit_cleaned) >= 2:
-                unit = unit_cleaned
-
-        raw_name_cleaned = clean_raw_name(raw_name)
-        name = normalize_name(raw_name)
-        if name == raw_name.replace(" ", "_").replace("-", "_").upper():
-            # если нормализация не дала смысла — попробуем по cleaned
-            name = normalize_name(raw_name_cleaned)
-
-        value = parse_float(raw_val)
-        ref = parse_ref_range(ref_text) if ref_text else None
-        status = status_by_range(value, ref)
-        ref_source = "референс лаборатории" if ref else "нет"
+    for c in candidates:
+        it = candidate_to_item(c)
+        value, ref, status = it.value, it.ref, it.status
 
         # Логирование проблемных случаев
         if value is not None and ref is not None:
             if status == "ВЫШЕ" and value <= ref.high if ref.high else False:
-                _dbg(f"WARN: {name} value={value} ref={format_range(ref)} status={status} (возможно ошибка)")
+                _warn("%s value=%s ref=%s status=%s (возможно ошибка)", it.name, value, format_range(ref), status)
             if status == "НИЖЕ" and value >= ref.low if ref.low else False:
-                _dbg(f"WARN: {name} value={value} ref={format_range(ref)} status={status} (возможно ошибка)")
-
-        items.append(Item(
-            raw_name=raw_name,
-            name=name,
-            value=value,
-            unit=unit,
-            ref_text=ref_text,
-            ref=ref,
-            ref_source=ref_source,
-            status=status,
-        ))
+                _warn("%s value=%s ref=%s status=%s (возможно ошибка)", it.name, value, format_range(ref), status)
 
+        items.append(it)
     return items
 
 
+def parse_items_from_candidates(raw_text: str) -> List[Item]:
+    """
+    TSV-кандидаты → Item (вставленный текст, таблицы OCR). Форматы и починка
+    разбитых *10^N / прилипших единиц — parsers.candidate.parse_tsv.
+    """
+    return items_from_candidates(parse_tsv(raw_text))
+
+
 def parse_with_fallback(raw_text: str) -> List[Item]:
     """
     Архитектура "baseline-first + safe-fallback":
@@ -1084,15 +1110,29 @@ def parse_with_fallback(raw_text: str) -> List[Item]:
 
     ВАЖНО: baseline-логика НЕ изменяется. Fallback — отдельный модуль.
     """
-    from parsers.quality import evaluate_parse_quality
     from parsers.fallback_generic import fallback_parse_candidates
 
-    # --- ШАГ 1: baseline ---
     baseline_items = parse_items_from_candidates(raw_text) if "\t" in raw_text else []
+    return _baseline_or_fallback(baseline_items, lambda: fallback_parse_candidates(raw_text))
+
+
+def parse_candidates_with_fallback(candidates: List[Candidate]) -> List[Item]:
+    """parse_with_fallback для кандидатов экстракторов — без TSV между ними."""
+    from parsers.fallback_generic import fallback_items_from_candidates
+
+    return _baseline_or_fallback(
+        items_from_candidates(candidates), lambda: fallback_items_from_candidates(candidates),
+    )
+
+
+def _baseline_or_fallback(baseline_items: List[Item], run_fallback: Callable[[], List[Item]]) -> List[Item]:
+    from parsers.quality import evaluate_parse_quality
+
+    # --- ШАГ 1: baseline ---
     if not baseline_items:
         # Baseline ничего не дал — пробуем fallback
         _dbg("parse_with_fallback: baseline returned 0 items, trying fallback")
-        fallback_items = fallback_parse_candidates(raw_text)
+        fallback_items = run_fallback()
         if fallback_items:
             _dbg(f"parse_with_fallback: fallback returned {len(fallback_items)} items")
             return fallback_items
@@ -1118,7 +1158,7 @@ def parse_with_fallback(raw_text: str) -> List[Item]:
 
     # --- ШАГ 3: fallback ---
     _dbg("parse_with_fallback: baseline insufficient, running fallback")
-    fallback_items = fallback_parse_candidates(raw_text)
+    fallback_items = run_fallback()
 
     if not fallback_items:
         _dbg("parse_with_fallback: fallback returned 0 items, using baseline")
@@ -1227,7 +1267,7 @@ def apply_sanity_filter(items: List[Item]) -> tuple[List[Item], int]:
     outlier_count = 0
     for it in items:
         if it.value is not None and is_sanity_outlier(it.name, it.value):
-            _dbg(f"sanity_outlier: {it.name}={it.value} → отброшен")
+            _dbg("sanity_outlier: %s=%s → отброшен", it.name, it.value)
             outlier_count += 1
         else:
             kept.append(it)
@@ -1265,7 +1305,8 @@ def suggest_specialists(high_low: List[Item]) -> List[str]:
 # ==========================
 # LLM call (ретраи)
 # ==========================
-def call_yandexgpt(iam_token: str, user_text: str) -> str:
+def call_yandexgpt(iam_token: str, user_text: str, ctx: Optional[RequestContext] = None) -> str:
+    ctx = ctx or current_context()
     payload = {
         "modelUri": MODEL_URI,
         "completionOptions": {"stream": False, "temperature": TEMPERATURE, "maxTokens": str(MAX_TOKENS)},
@@ -1282,8 +1323,8 @@ def call_yandexgpt(iam_token: str, user_text: str) -> str:
 
     last_err = None
     for delay in (1, 2, 4):
-        r = requests.post(API_URL_LLM, headers=headers, json=payload, timeout=TIMEOUT_SEC)
-        RAW_RESPONSE_PATH.write_text(r.text, encoding="utf-8")
+        r = _HTTP.post(API_URL_LLM, headers=headers, json=payload, timeout=TIMEOUT_SEC)
+        ctx.put(RAW_RESPONSE_ARTIFACT, r.text)
 
         if r.status_code == 200:
             data = _resp_json_or_die(r, "foundationModels/v1/completion")
@@ -1294,26 +1335,138 @@ def call_yandexgpt(iam_token: str, user_text: str) -> str:
             time.sleep(delay)
             continue
 
-        raise RuntimeError(f"LLM HTTP {r.status_code}. См. {RAW_RESPONSE_PATH}\n{r.text[:1200]}")
+        raise RuntimeError(f"LLM HTTP {r.status_code}. См. {ctx.location(RAW_RESPONSE_ARTIFACT)}\n{r.text[:1200]}")
 
     raise RuntimeError(f"LLM временно недоступен после ретраев. Последняя ошибка: {last_err}")
 
 
+# ==========================
+# LLM-кэш (по сигнатуре отклонений)
+# ==========================
+_LLM_CACHE = DiskCache(
+    LLM_CACHE_DIR,
+    max_bytes=LLM_CACHE_MAX_MB * 1024 * 1024,
+    ttl_sec=LLM_CACHE_TTL_SEC,
+    log=_dbg,
+)
+
+
+def _value_bucket(it: Item) -> Optional[int]:
+    """
+    Корзина значения: насколько % значение вышло за границу референса, с шагом
+    LLM_CACHE_VALUE_BUCKET_PCT (0 — до 10%, 1 — 10–20%, ...).
+    None — границу посчитать нельзя (или шаг 0): в сигнатуре и промпте точное значение.
+    """
+    v = it.value
+    r = it.ref
+    step = LLM_CACHE_VALUE_BUCKET_PCT
+    pct: Optional[float] = None
+    if v is not None and r is not None:
+        if it.status == "ВЫШЕ" and r.high:
+            pct = (v - r.high) / abs(r.high) * 100.0
+        elif it.status == "НИЖЕ" and r.low:
+            pct = (r.low - v) / abs(r.low) * 100.0
+    if pct is None or step <= 0:
+        return None
+    return int(max(pct, 0.0) // step)
+
+
+def _llm_deviations(high_low: List[Item]) -> List[Tuple[str, str, str]]:
+    """(код, статус, корзина) отклонений в каноническом порядке — общие для сигнатуры и промпта."""
+    out = []
+    for it in high_low:
+        if it.value is None or it.ref is None:
+            continue
+        bucket = _value_bucket(it)
+        out.append((it.name, it.status, f"d{bucket}" if bucket is not None else f"v{it.value:g}"))
+    return sorted(out)
+
+
+def _age_band(age: int) -> Tuple[int, int]:
+    band = max(1, LLM_CACHE_AGE_BAND_YEARS)
+    low = int(age) // band * band
+    return low, low + band - 1
+
+
+def llm_cache_signature(sex: str, age: int, high_low: List[Item], model_uri: str = MODEL_URI) -> Dict[str, Any]:
+    """
+    Каноническая сигнатура промпта build_llm_prompt: пол, возрастная группа,
+    отсортированные (код, статус, корзина значения), модель и версия системного промпта.
+    Промпт строится из тех же полей, поэтому у одинаковых сигнатур он совпадает дословно:
+    ответ из кэша — ровно тот, что модель дала бы на этот отчёт, и точных значений,
+    возраста и названий из бланка в нём нет.
+    """
+    return {
+        "sex": sex,
+        "age_band": _age_band(age)[0],
+        "items": [list(d) for d in _llm_deviations(high_low)],
+        "model": model_uri,
+        "system_prompt": hashlib.sha256(SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:16],
+        "temperature": TEMPERATURE,
+        "max_tokens": MAX_TOKENS,
+    }
+
+
+def llm_cache_key(sex: str, age: int, high_low: List[Item], model_uri: str = MODEL_URI) -> str:
+    sig = llm_cache_signature(sex, age, high_low, model_uri)
+    return hashlib.sha256(json.dumps(sig, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def call_yandexgpt_cached(sex: str, age: int, high_low: List[Item], user_text: str) -> str:
+    """
+    call_yandexgpt с кэшем по сигнатуре отклонений; user_text — build_llm_prompt(sex, age, high_low, ...).
+    При попадании не запрашиваем ни IAM-токен, ни LLM.
+    """
+    if not LLM_CACHE_ENABLED:
+        return call_yandexgpt(get_iam_token(), user_text)
+
+    key = llm_cache_key(sex, age, high_low)
+    hit = _LLM_CACHE.get(key)
+    if hit is not None and hit.get("text"):
+        _dbg("llm-cache HIT key=%.12s", key)
+        return hit["text"]
+
+    answer = call_yandexgpt(get_iam_token(), user_text)
+    if answer and answer.strip():
+        _LLM_CACHE.set(key, {"text": answer, "signature": llm_cache_signature(sex, age, high_low)})
+    _dbg("llm-cache MISS key=%.12s", key)
+    return answer
+
+
+def get_llm_cache_stats() -> Dict[str, Any]:
+    """Счётчики LLM-кэша: hits / misses / evictions / entries / bytes."""
+    return _LLM_CACHE.stats()
+
+
+def _deviation_text(status: str, bucket: str) -> str:
+    if bucket.startswith("v"):
+        return f"значение {bucket[1:]}"
+    step = LLM_CACHE_VALUE_BUCKET_PCT
+    n = int(bucket[1:])
+    side = "выше верхней" if status == "ВЫШЕ" else "ниже нижней"
+    return f"{side} границы нормы на {n * step:g}–{(n + 1) * step:g}%"
+
+
 def build_llm_prompt(sex: str, age: int, high_low: List[Item], dict_expl: str, specialist_list: List[str]) -> str:
-    if not high_low:
+    """
+    Промпт к LLM только из сигнатуры отклонений (llm_cache_signature): код показателя,
+    статус, насколько вышел за норму (корзина), возрастная группа. Точные значения,
+    возраст и названия из бланка в промпт не идут — они есть в таблице отчёта,
+    а ответ можно переиспользовать между отчётами с той же сигнатурой.
+    """
+    deviations_list = _llm_deviations(high_low)
+    if not deviations_list:
         deviations = "Отклонений по распознанным референсам нет."
     else:
         deviations = "\n".join(
-            [
-                f"- {it.raw_name}: {it.status} | значение {it.value:g} {it.unit or ''} | норма {it.ref_text or format_range(it.ref)}"
-                for it in high_low
-                if it.value is not None and it.ref is not None
-            ]
+            f"- {name}: {status} | {_deviation_text(status, bucket)}"
+            for name, status, bucket in deviations_list
         )
 
     specialist_hint = ", ".join(specialist_list) if specialist_list else "—"
+    age_low, age_high = _age_band(age)
 
-    return f"""Пациент: пол {sex}, возраст {age}.
+    return f"""Пациент: пол {sex}, возраст {age_low}–{age_high} лет.
 
 ФАКТЫ (СТРОГО по отклонениям):
 {deviations}
@@ -1445,7 +1598,7 @@ def build_template_context(sex: str, age: int, items: List[Item], high_low: List
         "rows": rows,
         "explain_lines": explain_lines,
         "human_text": human_text,
-        "raw_path": str(RAW_RESPONSE_PATH),
+        "raw_path": current_context().location(RAW_RESPONSE_ARTIFACT),
         "missing_warnings": missing_warnings or [],
     }
 
@@ -1466,7 +1619,42 @@ def render_html_report(context: dict) -> str:
 # ==========================
 # PDF: HTML -> PDF
 # ==========================
-def render_pdf_from_html(html_path: Path, pdf_path: Path, created_at: str) -> None:
+_PDF_POOL: Optional[BrowserPool] = None
+_PDF_POOL_LOCK = threading.Lock()
+
+
+def _get_pdf_pool() -> BrowserPool:
+    """Общий на процесс пул Chromium (создаётся лениво при первом рендере)."""
+    global _PDF_POOL
+    with _PDF_POOL_LOCK:
+        if _PDF_POOL is None:
+            _PDF_POOL = BrowserPool(
+                size=PDF_POOL_SIZE,
+                max_renders=PDF_POOL_MAX_RENDERS,
+                max_rss_mb=PDF_POOL_MAX_RSS_MB,
+                render_timeout_sec=PDF_RENDER_TIMEOUT_SEC,
+                acquire_timeout_sec=PDF_POOL_ACQUIRE_TIMEOUT_SEC,
+                log=_dbg,
+            )
+            atexit.register(_PDF_POOL.shutdown, False)
+        return _PDF_POOL
+
+
+def get_pdf_pool_stats() -> Dict[str, Any]:
+    """Метрики пула Chromium (ожидание в очереди, время рендера, перезапуски)."""
+    return _get_pdf_pool().stats()
+
+
+def _pdf_pool_summary() -> str:
+    st = _get_pdf_pool().stats()
+    return (
+        f"wait_ms={st['wait_ms_last']:.0f} (avg={st['wait_ms_avg']}, max={st['wait_ms_max']:.0f}) "
+        f"render_ms_avg={st['render_ms_avg']} queue={st['queue_depth']} launches={st['launches']}"
+    )
+
+
+def _pdf_options(created_at: str) -> Dict[str, Any]:
+    """Параметры page.pdf(): A4, колонтитулы с датой и номерами страниц."""
     header_template = """
     <div style="font-size:9px; width:100%; padding:0 12mm; color:#666;">
       <div style="display:flex; justify-content:space-between; align-items:center; width:100%;">
@@ -1485,20 +1673,31 @@ def render_pdf_from_html(html_path: Path, pdf_path: Path, created_at: str) -> No
     </div>
     """
 
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
-        page = browser.new_page()
-        page.goto(html_path.resolve().as_uri(), wait_until="load")
-        page.pdf(
-            path=str(pdf_path),
-            format="A4",
-            print_background=True,
-            display_header_footer=True,
-            header_template=header_template,
-            footer_template=footer_template,
-            margin={"top": "18mm", "right": "12mm", "bottom": "18mm", "left": "12mm"},
-        )
-        browser.close()
+    return dict(
+        format="A4",
+        print_background=True,
+        display_header_footer=True,
+        header_template=header_template,
+        footer_template=footer_template,
+        margin={"top": "18mm", "right": "12mm", "bottom": "18mm", "left": "12mm"},
+    )
+
+
+def render_pdf_bytes(html: str, created_at: str) -> bytes:
+    """
+    HTML-строка → PDF в памяти (без записи html/pdf на диск).
+    Шаблон отчёта самодостаточен (inline CSS), поэтому set_content достаточно.
+    """
+    pdf_options = _pdf_options(created_at)
+
+    def _render(page: Any) -> bytes:
+        page.set_content(html, wait_until="load")
+        return page.pdf(**pdf_options)
+
+    pdf_bytes = _get_pdf_pool().run(_render)
+    if _debug_enabled():
+        _dbg("render_pdf_bytes: %d bytes pool=%s", len(pdf_bytes), _pdf_pool_summary())
+    return pdf_bytes
 
 
 # ==========================
@@ -1523,11 +1722,11 @@ def _b64(data: bytes) -> str:
     return base64.b64encode(data).decode("utf-8")
 
 
-def ocr_image_sync(iam_token: str, file_bytes: bytes, mime_type: str) -> Dict[str, Any]:
-    payload = {"mimeType": mime_type, "languageCodes": OCR_LANGS, "model": OCR_MODEL, "content": _b64(file_bytes)}
+def ocr_image_sync(iam_token: str, file_bytes: bytes, mime_type: str, model: Optional[str] = None) -> Dict[str, Any]:
+    payload = {"mimeType": mime_type, "languageCodes": OCR_LANGS, "model": model or OCR_MODEL, "content": _b64(file_bytes)}
     url = f"{OCR_API_BASE}/recognizeText"
-    r = requests.post(url, headers=_ocr_headers(iam_token), data=json.dumps(payload), timeout=OCR_TIMEOUT_SEC)
-    _dbg(f"OCR image sync HTTP {r.status_code} mime={mime_type}")
+    r = _HTTP.post(url, headers=_ocr_headers(iam_token), data=json.dumps(payload), timeout=OCR_TIMEOUT_SEC)
+    _dbg(f"OCR image sync HTTP {r.status_code} mime={mime_type} model={model or OCR_MODEL}")
     if r.status_code != 200:
         raise RuntimeError(f"OCR image error HTTP {r.status_code}: {r.text[:1200]}")
     return _resp_json_or_die(r, "ocr/recognizeText")
@@ -1536,7 +1735,7 @@ def ocr_image_sync(iam_token: str, file_bytes: bytes, mime_type: str) -> Dict[st
 def ocr_pdf_async_start(iam_token: str, pdf_bytes: bytes) -> str:
     payload = {"mimeType": "application/pdf", "languageCodes": OCR_LANGS, "model": OCR_MODEL, "content": _b64(pdf_bytes)}
     url = f"{OCR_API_BASE}/recognizeTextAsync"
-    r = requests.post(url, headers=_ocr_headers(iam_token), data=json.dumps(payload), timeout=OCR_TIMEOUT_SEC)
+    r = _HTTP.post(url, headers=_ocr_headers(iam_token), data=json.dumps(payload), timeout=OCR_TIMEOUT_SEC)
     _dbg(f"OCR pdf async start HTTP {r.status_code}")
     if r.status_code != 200:
         raise RuntimeError(f"OCR PDF start error HTTP {r.status_code}: {r.text[:1200]}")
@@ -1549,7 +1748,7 @@ def ocr_pdf_async_start(iam_token: str, pdf_bytes: bytes) -> str:
 
 def operations_get(iam_token: str, operation_id: str) -> Dict[str, Any]:
     url = f"{OPERATIONS_API_BASE}/{operation_id}"
-    r = requests.get(url, headers=_op_headers(iam_token), timeout=30)
+    r = _HTTP.get(url, headers=_op_headers(iam_token), timeout=OPERATIONS_HTTP_TIMEOUT_SEC)
     if r.status_code != 200:
         raise RuntimeError(f"Operation.Get error HTTP {r.status_code}: {r.text[:1200]}")
     return _resp_json_or_die(r, "operation/get")
@@ -1561,53 +1760,104 @@ def _is_not_ready_404(text: str) -> bool:
 
 
 def ocr_pdf_get_recognition(iam_token: str, operation_id: str) -> Dict[str, Any]:
+    """
+    Весь результат одним dict. Ответ — поток объектов (по одному на страницу),
+    поэтому при нескольких объектах они собираются в {"result": {"pages": [...]}}.
+    Для больших сканов — ocr_pdf_stream_recognition.
+    """
     url = f"{OCR_API_BASE}/getRecognition"
-    r = requests.get(url, headers=_ocr_headers(iam_token), params={"operationId": operation_id}, timeout=OCR_TIMEOUT_SEC)
+    r = _HTTP.get(url, headers=_ocr_headers(iam_token), params={"operationId": operation_id}, timeout=OCR_TIMEOUT_SEC)
     _dbg(f"OCR getRecognition HTTP {r.status_code}")
     if r.status_code == 404 and _is_not_ready_404(r.text):
         return {"_not_ready": True, "_raw": r.text}
     if r.status_code != 200:
         raise RuntimeError(f"OCR getRecognition error HTTP {r.status_code}: {r.text[:1200]}")
-    return _resp_json_or_die(r, "ocr/getRecognition")
-
-
-def _collect_text_annotations(node: Any, out_texts: List[str]) -> None:
-    if node is None:
-        return
+    objs = list(iter_json_objects([r.text]))
+    if len(objs) == 1:
+        return objs[0]
+    return {"result": {"pages": [o.get("result", o) if isinstance(o, dict) else o for o in objs]}}
 
-    if isinstance(node, dict):
-        ft = node.get("fullText")
-        if isinstance(ft, str) and ft.strip():
-            out_texts.append(ft.strip())
 
-        blocks = node.get("blocks")
-        if isinstance(blocks, list):
-            for b in blocks:
-                if isinstance(b, dict):
-                    lines = b.get("lines")
-                    if isinstance(lines, list):
-                        for ln in lines:
-                            if isinstance(ln, dict):
-                                t = ln.get("text")
-                                if isinstance(t, str) and t.strip():
-                                    out_texts.append(t.strip())
+def _page_index(obj: Any, default: int) -> int:
+    result = obj.get("result") if isinstance(obj, dict) else None
+    try:
+        return int(result.get("page")) if isinstance(result, dict) and result.get("page") is not None else default
+    except (TypeError, ValueError):
+        return default
 
-        for v in node.values():
-            if isinstance(v, (dict, list)):
-                _collect_text_annotations(v, out_texts)
 
-    elif isinstance(node, list):
-        for it in node:
-            _collect_text_annotations(it, out_texts)
+def ocr_pdf_stream_recognition(iam_token: str, operation_id: str) -> Optional[List[str]]:
+    """
+    getRecognition потоком: каждая страница разбирается, как только пришёл её объект,
+    JSON страницы сразу отбрасывается (в памяти — текст + одна страница JSON).
+    Возвращает тексты страниц по порядку; None — результат ещё не готов.
+    """
+    url = f"{OCR_API_BASE}/getRecognition"
+    r = _HTTP.get(
+        url, headers=_ocr_headers(iam_token), params={"operationId": operation_id},
+        timeout=OCR_TIMEOUT_SEC, stream=True,
+    )
+    with r:
+        _dbg(f"OCR getRecognition (stream) HTTP {r.status_code}")
+        if r.status_code == 404 and _is_not_ready_404(r.text):
+            return None
+        if r.status_code != 200:
+            raise RuntimeError(f"OCR getRecognition error HTTP {r.status_code}: {r.text[:1200]}")
+
+        pages: List[Tuple[int, str]] = []
+        raw_objs: Optional[List[str]] = [] if _debug_enabled() else None
+        for n, obj in enumerate(iter_json_objects(r.iter_content(chunk_size=OCR_STREAM_CHUNK_BYTES))):
+            if raw_objs is not None:
+                raw_objs.append(json.dumps(obj, ensure_ascii=False))
+            page_text = _join_ocr_texts(_ocr_page_texts(obj))
+            pages.append((_page_index(obj, n), page_text))
+            _dbg("OCR stream: page %d parsed, len=%d", pages[-1][0], len(page_text))
+
+    if raw_objs is not None:
+        current_context().put(OCR_RAW_ARTIFACT, "\n".join(raw_objs))
+    pages.sort(key=lambda p: p[0])
+    return [t for _, t in pages]
+
+
+def _annotation_texts(node: Dict[str, Any]) -> List[str]:
+    """Текст одной textAnnotation: fullText, а без него — строки блоков (lines[].text)."""
+    ft = node.get("fullText")
+    if isinstance(ft, str) and ft.strip():
+        return [ft.strip()]
+    out: List[str] = []
+    for b in node.get("blocks") or []:
+        for ln in (b.get("lines") or []) if isinstance(b, dict) else []:
+            t = ln.get("text") if isinstance(ln, dict) else None
+            if isinstance(t, str) and t.strip():
+                out.append(t.strip())
+    return out
 
 
-def ocr_result_to_plaintext(ocr_json: Dict[str, Any]) -> str:
+def _collect_text_annotations(node: Any, out_texts: List[str]) -> None:
     """
-    Извлекает текст из OCR результата, объединяя все страницы.
-    Возвращает единый текст без маркеров страниц для упрощения парсинга.
+    Тексты всех textAnnotation ответа по порядку, каждый — ровно один раз.
+    Итеративный обход (стек, без рекурсии): узел с fullText/blocks — это текст
+    страницы, внутрь него (слова, рамки, таблицы) не спускаемся.
     """
+    stack: List[Any] = [node]
+    while stack:
+        cur = stack.pop()
+        if isinstance(cur, dict):
+            if "fullText" in cur or "blocks" in cur:
+                out_texts.extend(_annotation_texts(cur))
+                continue
+            children = [v for v in cur.values() if isinstance(v, (dict, list))]
+        elif isinstance(cur, list):
+            children = [v for v in cur if isinstance(v, (dict, list))]
+        else:
+            continue
+        children.reverse()          # стек: первый ребёнок — следующим
+        stack.extend(children)
+
+
+def _ocr_page_texts(ocr_json: Dict[str, Any]) -> List[str]:
+    """Текст OCR-ответа по страницам (для ответа без списка страниц — один/несколько блоков)."""
     texts: List[str] = []
-    page_texts_list: List[str] = []  # Для логирования
 
     result = ocr_json.get("result")
     if isinstance(result, dict):
@@ -1624,19 +1874,20 @@ def ocr_result_to_plaintext(ocr_json: Dict[str, Any]) -> str:
                 _collect_text_annotations(page, page_texts)
                 page_text = "\n".join([t for t in page_texts if t]).strip()
                 if page_text:
-                    page_texts_list.append(page_text)
                     texts.append(page_text)
                     # Логируем первые 200 символов каждой страницы для отладки
-                    _dbg(f"  PAGE {idx}: len={len(page_text)}, preview={page_text[:200]}...")
+                    _dbg("  PAGE %d: len=%d, preview=%.200s...", idx, len(page_text), page_text)
         else:
             _collect_text_annotations(result, texts)
-
-    if not texts:
+    else:
         _collect_text_annotations(ocr_json, texts)
+    return texts
 
-    # Объединяем все страницы в единый текст (без маркеров страниц)
+
+def _join_ocr_texts(texts: List[str]) -> str:
+    """Склейка страниц в единый текст (без маркеров страниц) + удаление повторов подряд."""
     full_text = "\n".join(texts).strip()
-    
+
     # уберём дубли (построчно)
     lines = full_text.splitlines()
     cleaned_lines: List[str] = []
@@ -1646,163 +1897,797 @@ def ocr_result_to_plaintext(ocr_json: Dict[str, Any]) -> str:
         if line_stripped and line_stripped != prev:
             cleaned_lines.append(line)
             prev = line_stripped
-    
-    result_text = "\n".join(cleaned_lines).strip()
-    _dbg(f"ocr_result_to_plaintext: pages={len(page_texts_list)}, total_lines={len(result_text.splitlines())}, total_len={len(result_text)}")
+
+    return "\n".join(cleaned_lines).strip()
+
+
+def ocr_result_to_plaintext(ocr_json: Dict[str, Any]) -> str:
+    """
+    Извлекает текст из OCR результата, объединяя все страницы.
+    Возвращает единый текст без маркеров страниц для упрощения парсинга.
+    """
+    texts = _ocr_page_texts(ocr_json)
+    result_text = _join_ocr_texts(texts)
+    if _debug_enabled():
+        _dbg("ocr_result_to_plaintext: blocks=%d, total_lines=%d, total_len=%d",
+             len(texts), len(result_text.splitlines()), len(result_text))
     return result_text
 
 
 # ==========================
 # PDF direct text (быстрый путь)
 # ==========================
-def try_extract_text_from_pdf_bytes(pdf_bytes: bytes) -> str:
+def try_extract_pdf_page_texts(pdf_bytes: bytes) -> List[str]:
     """
-    Извлекает текст из PDF через pypdf, объединяя все страницы.
-    Не обязательно: если pypdf нет — просто вернёт "".
+    Текстовый слой PDF через pypdf — по странице на элемент (пустая строка — у страницы
+    нет текста). Если pypdf нет или PDF не читается — [].
     """
     try:
         from pypdf import PdfReader  # type: ignore
         import io
         reader = PdfReader(io.BytesIO(pdf_bytes))
-        parts: List[str] = []
-        page_lengths: List[int] = []
+        pages: List[str] = []
         for i, page in enumerate(reader.pages, start=1):
             t = (page.extract_text() or "").strip()
+            pages.append(t)
             if t:
-                parts.append(t)
-                page_lengths.append(len(t))
                 # Логируем первые 200 символов каждой страницы для отладки
-                _dbg(f"pypdf PAGE {i}: len={len(t)}, preview={t[:200]}...")
-        # Объединяем без маркеров страниц (для упрощения парсинга)
-        text = "\n".join(parts).strip()
-        if text:
+                _dbg("pypdf PAGE %d: len=%d, preview=%.200s...", i, len(t), t)
+        if any(pages):
             # Для отладки сохраняем с маркерами страниц
-            debug_text = "\n\n".join([f"--- PAGE {i+1} ---\n{p}" for i, p in enumerate(parts)])
-            PDF_TEXT_EXTRACT_PATH.write_text(debug_text, encoding="utf-8")
-            _dbg(f"pypdf extracted pages={len(reader.pages)} text_len={len(text)}, page_lengths={page_lengths}")
-        return text
+            debug_text = "\n\n".join([f"--- PAGE {i+1} ---\n{p}" for i, p in enumerate(pages)])
+            current_context().put(PDF_TEXT_EXTRACT_ARTIFACT, debug_text)
+            _dbg(f"pypdf extracted pages={len(pages)} page_lengths={[len(p) for p in pages]}")
+        return pages
     except Exception as e:
-        _dbg(f"pypdf extract failed: {e}")
+        _warn("pypdf extract failed: %s", e)
+        return []
+
+
+def try_extract_text_from_pdf_bytes(pdf_bytes: bytes) -> str:
+    """
+    Извлекает текст из PDF через pypdf, объединяя все страницы.
+    Не обязательно: если pypdf нет — просто вернёт "".
+    """
+    # Объединяем без маркеров страниц (для упрощения парсинга)
+    return "\n".join(t for t in try_extract_pdf_page_texts(pdf_bytes) if t).strip()
+
+
+def page_needs_ocr(page_text: str) -> bool:
+    """
+    Нужен ли OCR странице, судя по её текстовому слою.
+    Не нужен: есть >= PDF_TEXT_PAGE_MIN_SCORED_LINES строк-показателей (score_line >= 0.4)
+    или длинный текст без показателей (титул, комментарии — OCR ничего не добавит).
+    Нужен: текста нет или почти нет — страница, скорее всего, картинка.
+    Длинному тексту без показателей верим, только если в документе хватает кандидатов
+    (PDF_DIRECT_MIN_CANDIDATES, см. extract_candidates_from_upload).
+    """
+    text = (page_text or "").strip()
+    if not text:
+        return True
+    if count_scored_lines(text, PDF_TEXT_PAGE_MIN_SCORED_LINES) >= PDF_TEXT_PAGE_MIN_SCORED_LINES:
+        return False
+    return len(text) < PDF_TEXT_PAGE_MIN_CHARS
+
+
+def count_scored_lines(text: str, limit: Optional[int] = None) -> int:
+    """Сколько строк похожи на показатель (score_line >= 0.4); limit — хватит считать."""
+    from parsers.line_scorer import score_line
+
+    scored = 0
+    for ln in (text or "").splitlines():
+        if score_line(ln) >= 0.4:
+            scored += 1
+            if limit is not None and scored >= limit:
+                break
+    return scored
+
+
+# ==========================
+# OCR-кэш (по SHA-256 загруженного файла)
+# ==========================
+_OCR_CACHE = DiskCache(
+    OCR_CACHE_DIR,
+    max_bytes=OCR_CACHE_MAX_MB * 1024 * 1024,
+    ttl_sec=OCR_CACHE_TTL_SEC,
+    log=_dbg,
+)
+
+
+def _ocr_cache_key(digest: str, kind: str) -> str:
+    """Ключ: хэш файла + вид обработки + модель/языки OCR (смена модели → промах)."""
+    meta = json.dumps({"kind": kind, "model": OCR_MODEL, "langs": OCR_LANGS}, sort_keys=True)
+    return hashlib.sha256(f"{digest}|{meta}".encode("utf-8")).hexdigest()
+
+
+def _cached_payload(
+    digest: str,
+    kind: str,
+    compute: Callable[[], Optional[Dict[str, Any]]],
+    cacheable: Optional[Callable[[], bool]] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Возвращает запись из OCR-кэша ({"text": ..., доп. поля}) или вычисляет её через compute().
+    Пустые / неудачные результаты (None, пустой text) не кэшируются;
+    cacheable() → False — тоже (например, OCR остановлен досрочно и результат неполный).
+    """
+    if not OCR_CACHE_ENABLED:
+        return compute()
+
+    key = _ocr_cache_key(digest, kind)
+    hit = _OCR_CACHE.get(key)
+    if hit is not None:
+        _dbg("ocr-cache HIT kind=%s sha256=%.12s", kind, digest)
+        return hit
+
+    payload = compute()
+    text = payload.get("text") if payload else None
+    if text and (cacheable is None or cacheable()):
+        _OCR_CACHE.set(key, payload)
+    _dbg(f"ocr-cache MISS kind={kind} sha256={digest[:12]} stored={bool(text)}")
+    return payload
+
+
+def _cached_text(
+    digest: str,
+    kind: str,
+    compute: Callable[[], Optional[str]],
+    cacheable: Optional[Callable[[], bool]] = None,
+) -> Optional[str]:
+    """То же для одного текста (см. _cached_payload)."""
+    def _compute() -> Optional[Dict[str, Any]]:
+        text = compute()
+        return None if text is None else {"text": text}
+
+    payload = _cached_payload(digest, kind, _compute, cacheable)
+    return None if payload is None else payload.get("text")
+
+
+def get_ocr_cache_stats() -> Dict[str, Any]:
+    """Счётчики OCR-кэша: hits / misses / evictions / entries / bytes."""
+    return _OCR_CACHE.stats()
+
+
+def _ocr_pdf_async_plain(file_bytes: bytes) -> Optional[str]:
+    """
+    Async OCR всего PDF: старт операции → ожидание done → getRecognition → plain text.
+    None — операция не завершилась за OCR_PDF_OPERATION_WAIT_SEC.
+    """
+    iam = get_iam_token()
+    op_id = ocr_pdf_async_start(iam, file_bytes)
+    _dbg(f"OCR op_id={op_id}")
+
+    # ждём done, но не бесконечно
+    deadline = time.time() + OCR_PDF_OPERATION_WAIT_SEC
+    sleep_s = 1.0
+    done = False
+    while time.time() < deadline:
+        op = operations_get(iam, op_id)
+        if op.get("done"):
+            done = True
+            if op.get("error"):
+                current_context().put(OCR_RAW_ARTIFACT, json.dumps(op, ensure_ascii=False, indent=2))
+                raise RuntimeError(f"OCR PDF operation error: {op['error']}")
+            break
+        time.sleep(sleep_s)
+        sleep_s = min(3.0, sleep_s * 1.25)
+
+    if not done:
+        _dbg("OCR operation wait timeout (done=false). Using pypdf fallback if any.")
+        return None
+
+    recog_deadline = time.time() + OCR_GET_RECOGNITION_WAIT_SEC
+    while time.time() < recog_deadline:
+        page_texts = ocr_pdf_stream_recognition(iam, op_id)
+        if page_texts is None:
+            time.sleep(2.0)
+            continue
+
+        plain = _join_ocr_texts(page_texts)
+        _dbg("OCR async: pages=%d, total_len=%d", len(page_texts), len(plain))
+        return plain
+
+    return ""
+
+
+_PREPROCESS_STATS = PreprocessStats()
+
+
+def _preprocess_signature() -> str:
+    """Часть ключа OCR-кэша: другие настройки подготовки фото → другой результат OCR."""
+    if not OCR_IMAGE_PREPROCESS:
         return ""
+    return (f":pre={OCR_IMAGE_TARGET_DPI},{int(OCR_IMAGE_GRAYSCALE)},"
+            f"{int(OCR_IMAGE_AUTOCONTRAST)},{OCR_IMAGE_JPEG_QUALITY}")
+
+
+def _preprocess_for_ocr(file_bytes: bytes, mime: str) -> PreprocessResult:
+    if not OCR_IMAGE_PREPROCESS:
+        return PreprocessResult(content=file_bytes, mime=mime, bytes_in=len(file_bytes),
+                                bytes_out=len(file_bytes), skipped="disabled")
+    return preprocess_image(
+        file_bytes, mime,
+        max_side=max_side_for_dpi(OCR_IMAGE_TARGET_DPI),
+        grayscale=OCR_IMAGE_GRAYSCALE,
+        autocontrast=OCR_IMAGE_AUTOCONTRAST,
+        jpeg_quality=OCR_IMAGE_JPEG_QUALITY,
+        min_bytes=OCR_IMAGE_PREPROCESS_MIN_KB * 1024,
+    )
+
+
+def _crop_for_ocr(content: bytes, mime: str) -> CropResult:
+    if not OCR_TABLE_CROP:
+        return CropResult(content=content, mime=mime, bytes_in=len(content),
+                          bytes_out=len(content), skipped="disabled")
+    return crop_table_region(content, mime, min_saving=OCR_TABLE_CROP_MIN_SAVING,
+                             jpeg_quality=OCR_IMAGE_JPEG_QUALITY)
+
+
+def get_preprocess_stats() -> Dict[str, Any]:
+    """Подготовка фото: images / processed / bytes_in / bytes_out / saved_pct / preprocess_ms / ocr_ms."""
+    return _PREPROCESS_STATS.stats()
+
+
+def _ocr_for_candidates(iam_token: str, content: bytes, mime: str) -> Dict[str, Any]:
+    """recognizeText основной моделью, в OCR_TABLE_MODE — моделью таблиц."""
+    if OCR_TABLE_MODE:
+        return ocr_image_sync(iam_token, content, mime, model=OCR_TABLE_MODEL)
+    return ocr_image_sync(iam_token, content, mime)
+
+
+def _grid_candidates(ocr: Dict[str, Any]) -> str:
+    """Кандидаты без текстовых эвристик: из таблиц модели "table" или из раскладки слов."""
+    found = tables_to_candidates(ocr) if OCR_TABLE_MODE else ""
+    if not found and OCR_LAYOUT_MODE:
+        found = layout_to_candidates(ocr)
+    return found
+
+
+def _grid_kind_suffix() -> str:
+    return (f":{OCR_TABLE_MODEL}" if OCR_TABLE_MODE else "") + (":layout" if OCR_LAYOUT_MODE else "")
+
+
+def _table_or_text_candidates(table_candidates: str, plain: str) -> List[Candidate]:
+    """
+    Кандидаты из сетки (таблицы / раскладка; TSV — так они лежат в кэше OCR), если
+    их достаточно, иначе — текстовые эвристики.
+    """
+    rows = parse_tsv(table_candidates)
+    if len(rows) >= OCR_TABLE_MIN_ROWS:
+        _dbg("grid: %d rows from cells, text heuristics skipped", len(rows))
+        return rows
+    if OCR_TABLE_MODE or OCR_LAYOUT_MODE:
+        _dbg("grid: only %d rows from cells, falling back to text", len(rows))
+    return _smart_candidates(plain or "")
+
+
+def panel_completeness(candidates: List[Candidate]) -> Dict[str, Any]:
+    """
+    Полнота уже разобранного текста относительно ожидаемых групп панели
+    (parsers.quality.evaluate_completeness). complete=True — OCR ничего не добавит.
+    """
+    from parsers.quality import evaluate_completeness
+
+    if not candidates:
+        return {"complete": False, "panels": [], "missing": {}, "confident_count": 0}
+    items = parse_candidates_with_fallback(candidates)
+    assign_confidence(items)
+    return evaluate_completeness(items, detect_panel({it.name for it in items}))
+
+
+_OCR_PAGE_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_OCR_PAGE_EXECUTOR_LOCK = threading.Lock()
+
+
+def _get_ocr_page_executor() -> ThreadPoolExecutor:
+    # общий на процесс: OCR_PDF_PAGE_WORKERS ограничивает нагрузку на API от всех запросов вместе
+    global _OCR_PAGE_EXECUTOR
+    with _OCR_PAGE_EXECUTOR_LOCK:
+        if _OCR_PAGE_EXECUTOR is None:
+            _OCR_PAGE_EXECUTOR = ThreadPoolExecutor(
+                max_workers=OCR_PDF_PAGE_WORKERS, thread_name_prefix="lab-ai-ocr-page",
+            )
+            atexit.register(_OCR_PAGE_EXECUTOR.shutdown, wait=False)
+        return _OCR_PAGE_EXECUTOR
+
+
+def ocr_pdf_pages(
+    file_bytes: bytes,
+    page_numbers: Optional[List[int]] = None,
+    stop_when: Optional[Callable[[Dict[int, str]], bool]] = None,
+    tables_out: Optional[Dict[int, str]] = None,
+    keep_pages: Collection[int] = (),
+) -> Tuple[Dict[int, str], List[int]]:
+    """
+    Параллельный OCR страниц PDF через sync recognizeText.
+    page_numbers — какие страницы (с 0); None — все.
+    stop_when(тексты, готовые на данный момент) → True — остальные страницы не нужны:
+    ещё не начатые запросы отменяются, уже идущие не ждём. Части со страницами из
+    keep_pages не отменяются: их дожидаемся и после остановки.
+    tables_out — в OCR_TABLE_MODE / OCR_LAYOUT_MODE сюда кладутся кандидаты из сетки по страницам
+    (только собранных частей: запросы, которые ещё идут после остановки, сюда не пишут).
+    Возвращает ({номер первой страницы части: текст}, [первые страницы упавших частей]).
+    Упавшая страница пропускается с предупреждением (результат неполный — вызывающий
+    не должен его кэшировать); если не распознано ни одной — ошибка первой из них.
+    """
+    parts = split_pdf_pages(file_bytes, OCR_PDF_PAGES_PER_REQUEST, page_numbers)
+    if not parts:
+        return {}, []
+    iam = get_iam_token()
+    executor = _get_ocr_page_executor()
+
+    grid_mode = tables_out is not None and (OCR_TABLE_MODE or OCR_LAYOUT_MODE)
+
+    def _one(part: PdfPart) -> Tuple[str, Optional[str]]:
+        # общие словари не трогаем: после досрочной остановки задача ещё может идти
+        ocr = _ocr_for_candidates(iam, part.content, "application/pdf")
+        grid = _grid_candidates(ocr) if grid_mode else None
+        return _join_ocr_texts(_ocr_page_texts(ocr)), grid
+
+    started = time.time()
+    # у каждой задачи своя копия контекста: id запроса в логе и артефакты — как у вызывающего
+    futures = {
+        executor.submit(contextvars.copy_context().run, _one, part): part
+        for part in parts
+    }
+    texts: Dict[int, str] = {}
+    failed: List[int] = []
+    first_err: Optional[BaseException] = None
+    stopped = False
+
+    def _collect(fut: "Future[Tuple[str, Optional[str]]]") -> bool:
+        nonlocal first_err
+        part = futures[fut]
+        try:
+            text, grid = fut.result()
+        except Exception as e:
+            _warn("OCR page %d failed: %s", part.first_page, e)
+            failed.append(part.first_page)
+            first_err = first_err or e
+            return False
+        texts[part.first_page] = text
+        if grid is not None and tables_out is not None:
+            tables_out[part.first_page] = grid
+        return True
+
+    def _kept(part: PdfPart) -> bool:
+        return any(p in keep_pages for p in range(part.first_page, part.first_page + part.pages))
+
+    pending = set(futures)
+    for fut in as_completed(futures):
+        pending.discard(fut)
+        if not _collect(fut):
+            continue
+        if stop_when is not None and len(texts) < len(parts) and stop_when(texts):
+            cancelled = sum(1 for f in pending if not _kept(futures[f]) and f.cancel())
+            _dbg("OCR pages: stop early after %d/%d parts, cancelled=%d", len(texts), len(parts), cancelled)
+            stopped = True
+            break
+    if stopped:
+        for fut in as_completed([f for f in pending if _kept(futures[f])]):
+            _collect(fut)
+    if not texts and first_err is not None:
+        raise first_err
+    _dbg("OCR pages: parts=%d ok=%d failed=%s stopped=%s in %.2fs (workers=%d)",
+         len(parts), len(texts), sorted(failed), stopped, time.time() - started, OCR_PDF_PAGE_WORKERS)
+    return texts, sorted(failed)
+
+
+def _ocr_pdf_plain(
+    file_bytes: bytes,
+    page_numbers: Optional[List[int]] = None,
+    stop_when: Optional[Callable[[Dict[int, str]], bool]] = None,
+    pages_out: Optional[Dict[int, str]] = None,
+    tables_out: Optional[Dict[int, str]] = None,
+    failed_out: Optional[List[int]] = None,
+    keep_pages: Collection[int] = (),
+) -> Optional[str]:
+    """
+    OCR скана PDF по OCR_PDF_MODE; page_numbers — только эти страницы (с 0), None — все.
+    stop_when — досрочная остановка постраничного OCR, keep_pages — страницы, которые она
+    не отменяет (см. ocr_pdf_pages).
+    pages_out — сюда кладутся тексты по страницам (только в режиме "pages"),
+    tables_out — кандидаты из сетки по страницам (OCR_TABLE_MODE / OCR_LAYOUT_MODE, режим "pages"),
+    failed_out — первые страницы частей, которые не распознались (режим "pages").
+    В режиме "async" документ всегда распознаётся целиком.
+    None — async-операция не успела (см. _ocr_pdf_async_plain).
+    """
+    if OCR_PDF_MODE == "pages":
+        try:
+            page_count = count_pdf_pages(file_bytes)
+        except ValueError as e:
+            _warn("OCR pages: cannot split PDF (%s), using async", e)
+        else:
+            wanted = page_count if page_numbers is None else len(page_numbers)
+            if 0 < wanted <= OCR_PDF_MAX_PAGES:
+                texts, failed = ocr_pdf_pages(
+                    file_bytes, page_numbers, stop_when=stop_when, tables_out=tables_out, keep_pages=keep_pages,
+                )
+                if pages_out is not None:
+                    pages_out.update(texts)
+                if failed_out is not None:
+                    failed_out.extend(failed)
+                return _join_ocr_texts([texts[p] for p in sorted(texts)])
+            _dbg("OCR pages: %d pages > OCR_PDF_MAX_PAGES, using async", wanted)
+    return _ocr_pdf_async_plain(file_bytes)
+
+
+# ==========================
+# Повторный OCR слабых страниц
+# ==========================
+PageSource = Tuple[int, str, str]     # (страница с 0, "pypdf" | "ocr", текст)
+
+
+@dataclass
+class PageSources:
+    """Откуда взят текст каждой страницы загрузки — вход _reocr_candidates."""
+    kind: str                 # "pdf" | "image"
+    mime: str
+    pages: List[PageSource]   # по возрастанию номера страницы
+
+
+def _record_page_sources(ctx: RequestContext, doc_kind: str, mime: str, pages: List[PageSource]) -> PageSources:
+    """Источники страниц для повторного OCR; копия — в артефакт (только для отладки)."""
+    sources = PageSources(kind=doc_kind, mime=mime, pages=sorted(pages))
+    ctx.put(OCR_PAGE_SOURCES_ARTIFACT, json.dumps({
+        "kind": sources.kind,
+        "mime": sources.mime,
+        "pages": [{"page": p, "source": src, "text": t} for p, src, t in sources.pages],
+    }, ensure_ascii=False, indent=2))
+    return sources
+
+
+def _page_candidates(pages: List[PageSource]) -> List[Candidate]:
+    """Кандидаты как в extract_text_from_upload: текстовый слой и OCR отдельно, затем слияние."""
+    found: List[Candidate] = []
+    for source in ("pypdf", "ocr"):
+        texts = [t for _p, src, t in pages if src == source and t]
+        if texts:
+            joined = "\n".join(texts) if source == "pypdf" else _join_ocr_texts(texts)
+            found.extend(_smart_candidates(joined))
+    return dedup_candidates(found)
+
+
+def _pages_with_items(pages: List[Tuple[int, str]], items: List[Item]) -> List[int]:
+    """Страницы (номер, текст), в тексте которых встречается raw_name одного из items."""
+    found: List[int] = []
+    for page, page_text in pages:
+        text = " ".join(page_text.lower().split())
+        for it in items:
+            raw = " ".join((it.raw_name or "").lower().split())
+            if raw and raw in text:
+                found.append(page)
+                break
+    return found
+
+
+def reocr_weak_pages(
+    file_bytes: bytes, sources: Optional[PageSources], items: List[Item], quality: Dict[str, Any],
+) -> Optional[str]:
+    """Пересобранные кандидаты _reocr_candidates в TSV или None — перераспознавать нечего."""
+    found = _reocr_candidates(file_bytes, sources, items, quality)
+    return candidates_to_tsv(found) if found else None
+
+
+def _reocr_candidates(
+    file_bytes: bytes, sources: Optional[PageSources], items: List[Item], quality: Dict[str, Any],
+) -> Optional[List[Candidate]]:
+    """
+    Повторный OCR страниц, откуда пришли неуверенные показатели (weak_items), моделью
+    OCR_REOCR_MODEL в исходном разрешении. Если таких нет, а покрытие низкое — страниц,
+    где строк-показателей меньше PDF_TEXT_PAGE_MIN_SCORED_LINES. Не больше OCR_REOCR_MAX_PAGES.
+    Страница заменяется, только если строк-показателей в ней не меньше, чем было.
+    sources — источники страниц из extract_candidates_from_upload для этого же файла.
+    Возвращает пересобранных кандидатов или None — перераспознавать нечего.
+    """
+    from parsers.quality import weak_items
+
+    if sources is None:
+        return None
+    ocr_pages = [(p, t) for p, src, t in sources.pages if src == "ocr"]
+    if not ocr_pages:
+        return None
+
+    targets = _pages_with_items(ocr_pages, weak_items(items))
+    if not targets and quality.get("coverage_score", 1.0) < 0.6:
+        targets = [p for p, t in ocr_pages
+                   if count_scored_lines(t, PDF_TEXT_PAGE_MIN_SCORED_LINES) < PDF_TEXT_PAGE_MIN_SCORED_LINES]
+    targets = targets[:OCR_REOCR_MAX_PAGES]
+    if not targets:
+        return None
+
+    digest = hashlib.sha256(file_bytes).hexdigest()
+    step = max(1, OCR_PDF_PAGES_PER_REQUEST)
+
+    def _one(page: int) -> str:
+        def _ocr() -> str:
+            if sources.kind == "pdf":
+                part = split_pdf_pages(file_bytes, step, page_numbers=range(page, page + step))[0]
+                content, mime = part.content, "application/pdf"
+            else:
+                content, mime = file_bytes, sources.mime
+            return ocr_result_to_plaintext(ocr_image_sync(get_iam_token(), content, mime, model=OCR_REOCR_MODEL))
+        return _cached_text(digest, f"reocr-{sources.kind}:{OCR_REOCR_MODEL}:{page}", _ocr) or ""
+
+    started = time.time()
+    executor = _get_ocr_page_executor()
+    futures = {page: executor.submit(contextvars.copy_context().run, _one, page) for page in targets}
+    replaced: Dict[int, str] = {}
+    for page, old_text in ocr_pages:
+        fut = futures.get(page)
+        if fut is None:
+            continue
+        try:
+            text = fut.result()
+        except Exception as ex:
+            _warn("re-OCR page %d failed: %s", page, ex)
+            continue
+        if text and count_scored_lines(text) >= count_scored_lines(old_text):
+            replaced[page] = text
+    _dbg("re-OCR: targets=%s replaced=%s model=%s in %.2fs", targets, sorted(replaced), OCR_REOCR_MODEL, time.time() - started)
+    if not replaced:
+        return None
+    return _page_candidates([
+        (p, src, replaced.get(p, t) if src == "ocr" else t) for p, src, t in sources.pages
+    ]) or None
 
 
 # ==========================
 # EXTRACT: Upload -> candidates/plain
 # ==========================
-def extract_text_from_upload(file_bytes: bytes, filename: str, mimetype: str) -> str:
-    iam = get_iam_token()
+def extract_text_from_upload(
+    file_bytes: bytes,
+    filename: str,
+    mimetype: str,
+    ctx: Optional[RequestContext] = None,
+) -> str:
+    """
+    Файл → кандидаты (TSV) или plain-текст.
+    ctx — куда класть отладочные артефакты; по умолчанию текущий контекст запроса.
+    """
+    found, text, _sources = extract_candidates_from_upload(file_bytes, filename, mimetype, ctx)
+    return candidates_to_tsv(found) if found else text
+
+
+def extract_candidates_from_upload(
+    file_bytes: bytes,
+    filename: str,
+    mimetype: str,
+    ctx: Optional[RequestContext] = None,
+) -> Tuple[List[Candidate], str, PageSources]:
+    """
+    Файл → (кандидаты, текст, источники страниц). Текст — то, что разбирать, если
+    кандидатов нет: OCR или текстовый слой PDF. Источники страниц — для повторного
+    OCR слабых страниц (_reocr_candidates). Кандидаты в TSV — артефакт OCR_CANDIDATES_ARTIFACT.
+    """
+    if ctx is not None and ctx is not current_context():
+        with use_context(ctx):
+            return extract_candidates_from_upload(file_bytes, filename, mimetype)
+    ctx = current_context()
     name = (filename or "").lower()
+    digest = hashlib.sha256(file_bytes).hexdigest()
 
     # ---------- PDF ----------
     if mimetype == "application/pdf" or name.endswith(".pdf"):
         _dbg("PDF upload detected")
 
-        direct_text = try_extract_text_from_pdf_bytes(file_bytes)
-        direct_candidates = _smart_to_candidates(direct_text) if direct_text else ""
-        _dbg(f"pypdf candidates_lines={len(direct_candidates.splitlines()) if direct_candidates else 0}")
-
-        # Если pypdf дал уже достаточно строк — берём его (быстро)
-        if direct_candidates and len(direct_candidates.splitlines()) >= 10:
-            OCR_CANDIDATES_PATH.write_text(direct_candidates, encoding="utf-8")
-            return direct_candidates.strip()
+        # текстовый слой по страницам; в кэше страницы разделены \f
+        page_texts = (_cached_text(
+            digest, "pypdf-pages", lambda: "\f".join(try_extract_pdf_page_texts(file_bytes)),
+        ) or "").split("\f")
+        direct_text = "\n".join(t for t in page_texts if t).strip()
+        direct_candidates = _smart_candidates(direct_text) if direct_text else []
+        _dbg("pypdf candidates_lines=%d", len(direct_candidates))
+
+        # Маршрутизация по страницам: OCR только для страниц без годного текстового слоя
+        if direct_text:
+            ocr_pages: Optional[List[int]] = [i for i, t in enumerate(page_texts) if page_needs_ocr(t)]
+            if len(direct_candidates) < PDF_DIRECT_MIN_CANDIDATES:
+                # текстовому слою почти нечего предложить — как и раньше, не верим страницам,
+                # которые прошли только по длине текста, без строк-показателей
+                ocr_pages = [
+                    i for i, t in enumerate(page_texts)
+                    if i in ocr_pages
+                    or count_scored_lines(t, PDF_TEXT_PAGE_MIN_SCORED_LINES) < PDF_TEXT_PAGE_MIN_SCORED_LINES
+                ]
+        else:
+            ocr_pages = None    # текстового слоя нет / pypdf недоступен — весь документ
+        # Страницы без текстового слоя (скан-приложение с другими анализами) читает только OCR:
+        # полнота панели их не пропускает и не отменяет. Пропуск и досрочная остановка —
+        # только для страниц со слабым текстовым слоем, которые pypdf уже прочитал.
+        blank_pages = [] if ocr_pages is None else [i for i in ocr_pages if not page_texts[i].strip()]
+        _dbg("pdf routing: pages=%d ocr_pages=%s blank=%s", len(page_texts), ocr_pages, blank_pages)
+
+        # Ожидаемые группы панели уже уверенно найдены в текстовом слое — OCR не нужен
+        if ocr_pages and OCR_SKIP_WHEN_PANEL_COMPLETE:
+            completeness = panel_completeness(direct_candidates)
+            _dbg("pdf completeness after pypdf: %s", completeness)
+            if completeness["complete"]:
+                ocr_pages = blank_pages
+
+        text_layer_pages = [
+            (i, "pypdf", t) for i, t in enumerate(page_texts)
+            if t and (ocr_pages is None or i not in ocr_pages)
+        ]
+        if ocr_pages == []:
+            sources = _record_page_sources(ctx, "pdf", "application/pdf", text_layer_pages)
+            ctx.put(OCR_CANDIDATES_ARTIFACT, candidates_to_tsv(direct_candidates))
+            return direct_candidates, direct_text, sources
+
+        # ...и то же по мере готовности страниц OCR: панель собрана — остальные страницы отменяем
+        stopped_early = False
+        failed_pages: List[int] = []     # упавшие страницы: результат неполный, в кэш не кладём
+
+        def _stop_when(texts: Dict[int, str]) -> bool:
+            nonlocal stopped_early
+            ocr_part = _smart_candidates(_join_ocr_texts([texts[p] for p in sorted(texts)]))
+            stopped_early = panel_completeness(direct_candidates + ocr_part)["complete"]
+            return stopped_early
+
+        # без текстового слоя неизвестно, какие страницы несут ту же панель — распознаём все
+        can_stop = OCR_SKIP_WHEN_PANEL_COMPLETE and ocr_pages is not None and len(blank_pages) < len(ocr_pages)
+
+        def _ocr() -> Optional[Dict[str, Any]]:
+            pages: Dict[int, str] = {}
+            tables: Dict[int, str] = {}
+            text = _ocr_pdf_plain(
+                file_bytes, ocr_pages, _stop_when if can_stop else None,
+                pages_out=pages, tables_out=tables, failed_out=failed_pages, keep_pages=blank_pages,
+            )
+            if text is None:
+                return None
+            # тексты по страницам — для повторного OCR слабых страниц (reocr_weak_pages)
+            return {
+                "text": text,
+                "pages": {str(p): t for p, t in pages.items()},
+                "table": "\n".join(tables[p] for p in sorted(tables) if tables[p]),
+            }
 
-        # OCR async
         ocr_plain = ""
-        ocr_candidates = ""
+        ocr_candidates: List[Candidate] = []
+        sources = PageSources(kind="pdf", mime="application/pdf", pages=text_layer_pages)
         try:
-            op_id = ocr_pdf_async_start(iam, file_bytes)
-            _dbg(f"OCR op_id={op_id}")
-
-            # ждём done, но не бесконечно
-            deadline = time.time() + OCR_PDF_OPERATION_WAIT_SEC
-            sleep_s = 1.0
-            done = False
-            while time.time() < deadline:
-                op = operations_get(iam, op_id)
-                if op.get("done"):
-                    done = True
-                    if op.get("error"):
-                        OCR_RAW_PATH.write_text(json.dumps(op, ensure_ascii=False, indent=2), encoding="utf-8")
-                        raise RuntimeError(f"OCR PDF operation error: {op['error']}")
-                    break
-                time.sleep(sleep_s)
-                sleep_s = min(3.0, sleep_s * 1.25)
-
-            if not done:
-                _dbg("OCR operation wait timeout (done=false). Using pypdf fallback if any.")
+            kind = f"pdf-{OCR_PDF_MODE}" if ocr_pages is None else f"pdf-{OCR_PDF_MODE}:{','.join(map(str, ocr_pages))}"
+            kind += _grid_kind_suffix()
+            payload = _cached_payload(digest, kind, _ocr, cacheable=lambda: not stopped_early and not failed_pages)
+            ocr_result = None if payload is None else payload.get("text")
+            sources = _record_page_sources(ctx, "pdf", "application/pdf", text_layer_pages + [
+                (int(p), "ocr", t) for p, t in (payload or {}).get("pages", {}).items()
+            ])
+            if ocr_result is None:
                 if direct_candidates:
-                    OCR_CANDIDATES_PATH.write_text(direct_candidates, encoding="utf-8")
-                    return direct_candidates.strip()
-                return direct_text.strip() if direct_text.strip() else ""
-
-            recog_deadline = time.time() + OCR_GET_RECOGNITION_WAIT_SEC
-            while time.time() < recog_deadline:
-                res = ocr_pdf_get_recognition(iam, op_id)
-                if res.get("_not_ready"):
-                    time.sleep(2.0)
-                    continue
+                    ctx.put(OCR_CANDIDATES_ARTIFACT, candidates_to_tsv(direct_candidates))
+                return direct_candidates, direct_text, sources
 
-                OCR_RAW_PATH.write_text(json.dumps(res, ensure_ascii=False, indent=2), encoding="utf-8")
-                ocr_plain = ocr_result_to_plaintext(res)
-                OCR_PLAIN_PATH.write_text(ocr_plain or "", encoding="utf-8")
-
-                ocr_candidates = _smart_to_candidates(ocr_plain or "")
-                _dbg(f"OCR plain_len={len(ocr_plain)} candidates_lines={len(ocr_candidates.splitlines()) if ocr_candidates else 0}")
-                break
+            ocr_plain = ocr_result
+            ctx.put(OCR_PLAIN_ARTIFACT, ocr_plain or "")
+            ocr_candidates = _table_or_text_candidates((payload or {}).get("table", ""), ocr_plain)
+            _dbg("OCR plain_len=%d candidates_lines=%d", len(ocr_plain), len(ocr_candidates))
 
         except Exception as e:
-            _dbg(f"OCR failed: {e}")
+            _warn("OCR failed: %s", e)
             ocr_plain = ""
-            ocr_candidates = ""
-
-        merged_lines: List[str] = []
-        for block in (direct_candidates, ocr_candidates):
-            if block:
-                merged_lines.extend([ln.strip() for ln in block.splitlines() if ln.strip()])
-        merged = _dedup_lines_keep_order(merged_lines)
-
-        OCR_CANDIDATES_PATH.write_text("\n".join(merged), encoding="utf-8")
-
-        if merged:
-            return "\n".join(merged).strip()
-        if ocr_plain.strip():
-            return ocr_plain.strip()
-        if direct_text.strip():
-            return direct_text.strip()
-        return ""
+            ocr_candidates = []
+
+        merged = dedup_candidates(direct_candidates + ocr_candidates)
+        ctx.put(OCR_CANDIDATES_ARTIFACT, candidates_to_tsv(merged))
+        return merged, ocr_plain.strip() or direct_text, sources
 
     # ---------- Images ----------
     if mimetype in ("image/jpeg", "image/jpg") or name.endswith((".jpg", ".jpeg")):
-        ocr = ocr_image_sync(iam, file_bytes, "image/jpeg")
+        image_mime = "image/jpeg"
     elif mimetype == "image/png" or name.endswith(".png"):
-        ocr = ocr_image_sync(iam, file_bytes, "image/png")
+        image_mime = "image/png"
     elif mimetype == "image/webp" or name.endswith(".webp"):
-        ocr = ocr_image_sync(iam, file_bytes, "image/webp")
+        image_mime = "image/webp"
     else:
         raise RuntimeError(f"Неподдерживаемый тип: {mimetype} / {filename}")
 
-    OCR_RAW_PATH.write_text(json.dumps(ocr, ensure_ascii=False, indent=2), encoding="utf-8")
-    plain = ocr_result_to_plaintext(ocr)
-    OCR_PLAIN_PATH.write_text(plain or "", encoding="utf-8")
-
-    candidates = _smart_to_candidates(plain or "")
-    OCR_CANDIDATES_PATH.write_text(candidates or "", encoding="utf-8")
+    def _ocr_image() -> Dict[str, Any]:
+        prep = _preprocess_for_ocr(file_bytes, image_mime)
+        crop = _crop_for_ocr(prep.content, prep.mime)
+        started = time.perf_counter()
+        ocr = _ocr_for_candidates(get_iam_token(), crop.content, crop.mime)
+        plain = ocr_result_to_plaintext(ocr)
+        if crop.box is not None:
+            found = count_scored_lines(plain, OCR_TABLE_CROP_MIN_LINES)
+            ctx.put(OCR_TABLE_CROP_ARTIFACT, json.dumps(
+                {**asdict(crop), "content": None, "scored_lines": found}, ensure_ascii=False, indent=2))
+            _dbg("table crop: box=%s area=%.2f %d → %d bytes, scored_lines=%d",
+                 crop.box, crop.area_ratio, crop.bytes_in, crop.bytes_out, found)
+            if found < OCR_TABLE_CROP_MIN_LINES:
+                # обрезали не то — распознаём изображение целиком
+                _warn("table crop: only %d scored lines, OCR full image", found)
+                ocr = _ocr_for_candidates(get_iam_token(), prep.content, prep.mime)
+                plain = ocr_result_to_plaintext(ocr)
+        ocr_ms = (time.perf_counter() - started) * 1000
+        _PREPROCESS_STATS.record(prep, ocr_ms)
+        ctx.put(OCR_PREPROCESS_ARTIFACT, json.dumps({**prep.as_dict(), "ocr_ms": round(ocr_ms, 1)}, ensure_ascii=False, indent=2))
+        _dbg("image preprocess: %d → %d bytes (%s) in %.0f ms, OCR %.0f ms",
+             prep.bytes_in, prep.bytes_out, ",".join(prep.applied) or prep.skipped, prep.elapsed_ms, ocr_ms)
+        ctx.put(OCR_RAW_ARTIFACT, json.dumps(ocr, ensure_ascii=False, indent=2))
+        return {"text": plain, "table": _grid_candidates(ocr)}
+
+    kind = f"image:{image_mime}{_preprocess_signature()}" + (f":crop={OCR_TABLE_CROP_MIN_SAVING}" if OCR_TABLE_CROP else "")
+    kind += _grid_kind_suffix()
+    payload = _cached_payload(digest, kind, _ocr_image) or {}
+    plain = payload.get("text") or ""
+    ctx.put(OCR_PLAIN_ARTIFACT, plain or "")
+    sources = _record_page_sources(ctx, "image", image_mime, [(0, "ocr", plain)] if plain else [])
+
+    candidates = _table_or_text_candidates(payload.get("table", ""), plain)
+    ctx.put(OCR_CANDIDATES_ARTIFACT, candidates_to_tsv(candidates))
 
     # если кандидаты пустые — вернём хотя бы plain, чтобы не было "пусто"
-    return candidates.strip() if candidates.strip() else (plain or "").strip()
+    return candidates, (plain or "").strip(), sources
 
 
 # ==========================
 # PUBLIC: PDF отчёт
 # ==========================
-def generate_pdf_report(
+ProgressFn = Callable[[str, int], None]
+
+
+def _report_progress(progress: Optional[ProgressFn], stage: str, percent: int) -> None:
+    if progress is None:
+        return
+    try:
+        progress(stage, percent)
+    except Exception as e:
+        _warn("progress callback failed: %s", e)
+
+
+def _score_items(items: List[Item]) -> Tuple[List[Item], Dict[str, Any]]:
+    """confidence → дедупликация → sanity-фильтр → метрики качества."""
+    from parsers.quality import evaluate_parse_quality
+
+    assign_confidence(items)
+    items, dedup_dropped = deduplicate_items(items)
+    _dbg(f"deduplicate_items: dropped {dedup_dropped} duplicates, {len(items)} items remain")
+
+    # === SANITY FILTER (Этап 4.2) ===
+    items, outlier_count = apply_sanity_filter(items)
+    _dbg(f"apply_sanity_filter: отброшено {outlier_count} outliers, {len(items)} items remain")
+
+    quality = evaluate_parse_quality(items, dedup_dropped_count=dedup_dropped, sanity_outlier_count=outlier_count)
+    _dbg(f"quality: {quality}")
+    return items, quality
+
+
+def _is_low_quality(quality: Dict[str, Any]) -> bool:
+    return (
+        quality["coverage_score"] < 0.6
+        or quality["suspicious_count"] > 0
+        or quality.get("ref_coverage_ratio", 1.0) < 0.5
+        or quality.get("duplicate_name_count", 0) > 2
+    )
+
+
+def _quality_rank(quality: Dict[str, Any]) -> tuple:
+    """Чем больше, тем лучше: надёжные значения без подозрительных, затем покрытие референсами."""
+    return (
+        quality["valid_value_count"] - quality["suspicious_count"],
+        quality.get("ref_coverage_ratio", 0.0),
+    )
+
+
+def _build_report_html(
     sex: str,
     age: int,
     raw_text: str = "",
     file_bytes: Optional[bytes] = None,
     filename: str = "",
     mimetype: str = "",
-) -> tuple[Path, str]:
+    save_upload: bool = True,
+    progress: Optional[ProgressFn] = None,
+) -> tuple[str, str, str]:
+    """
+    Весь пайплайн до HTML: текст/файл → показатели → LLM → отрендеренный шаблон.
+    Возвращает (html, created_at, base_name), base_name — "report_<ts>_<uid>".
+    progress(stage, percent) — необязательный колбэк для фоновых задач.
+    Артефакты пишутся в текущий контекст запроса (см. _report_context).
+    """
+    ctx = current_context()
     raw_text = (raw_text or "").strip()
 
     # Создаём timestamp и uid в начале, чтобы использовать их и для исходного файла, и для отчёта
@@ -1812,7 +2697,7 @@ def generate_pdf_report(
 
     # Временно сохраняем исходный загруженный файл для тестирования
     original_file_path: Optional[Path] = None
-    if file_bytes:
+    if file_bytes and save_upload:
         # Определяем расширение файла
         if mimetype == "application/pdf" or (filename and filename.lower().endswith(".pdf")):
             original_file_path = OUT_DIR / f"original_{safe_ts}_{uid}.pdf"
@@ -1830,85 +2715,80 @@ def generate_pdf_report(
         original_file_path.write_bytes(file_bytes)
         _dbg(f"Сохранил исходный файл: {original_file_path.name} (размер: {len(file_bytes)} байт)")
 
+    candidates: List[Candidate] = []
+    page_sources: Optional[PageSources] = None
     if not raw_text:
         if not file_bytes:
             raise ValueError("Нужно либо вставить текст анализов, либо загрузить файл (PDF/фото).")
-        raw_text = (extract_text_from_upload(file_bytes, filename=filename, mimetype=mimetype) or "").strip()
+        _report_progress(progress, "ocr", 10)
+        candidates, raw_text, page_sources = extract_candidates_from_upload(
+            file_bytes, filename=filename, mimetype=mimetype, ctx=ctx,
+        )
+        raw_text = (raw_text or "").strip()
 
-    if not raw_text:
-        raise ValueError("Не удалось получить текст из файла. См. outputs/ocr_debug.txt")
+    if not candidates and not raw_text:
+        raise ValueError(f"Не удалось получить текст из файла. См. {OCR_DEBUG_PATH} (запрос {ctx.request_id})")
 
-    # если это plain-текст — пытаемся собрать кандидатов
-    if "\t" not in raw_text:
-        candidates = _smart_to_candidates(raw_text)
-        if candidates:
-            raw_text = candidates
+    # если это plain-текст — пытаемся собрать кандидатов (TSV, вставленный руками, разбирается как есть)
+    if not candidates and "\t" not in raw_text:
+        candidates = _smart_candidates(raw_text)
 
     # === BASELINE-FIRST + FALLBACK ===
-    items = parse_with_fallback(raw_text)
+    _report_progress(progress, "parse", 40)
+    items = parse_candidates_with_fallback(candidates) if candidates else parse_with_fallback(raw_text)
     if not items:
         raise ValueError(
             "Не удалось собрать показатели.\n"
             "Проверьте:\n"
-            "• outputs/ocr_plain.txt\n"
-            "• outputs/ocr_candidates.txt\n"
-            "• outputs/ocr_debug.txt\n"
+            f"• {ctx.location(OCR_PLAIN_ARTIFACT)}\n"
+            f"• {ctx.location(OCR_CANDIDATES_ARTIFACT)}\n"
+            f"• {OCR_DEBUG_PATH} (запрос {ctx.request_id})\n"
         )
 
-    _dbg(f"parse_with_fallback: итого {len(items)} items")
-    for it in items[:5]:  # Логируем первые 5 для отладки
-        _dbg(f"  item: {it.name} value={it.value} ref={format_range(it.ref)} status={it.status}")
+    _dbg("parse_with_fallback: итого %d items", len(items))
+    if _debug_enabled():
+        for it in items[:5]:  # Логируем первые 5 для отладки
+            _dbg("  item: %s value=%s ref=%s status=%s", it.name, it.value, format_range(it.ref), it.status)
 
     # === UNIVERSAL MODE: confidence + quality ===
-    from parsers.quality import evaluate_parse_quality
+    from parsers.quality import PANEL_THRESHOLD, missing_expected_groups
 
-    assign_confidence(items)
-    items, dedup_dropped = deduplicate_items(items)
-    _dbg(f"deduplicate_items: dropped {dedup_dropped} duplicates, {len(items)} items remain")
-
-    # === SANITY FILTER (Этап 4.2) ===
-    items, outlier_count = apply_sanity_filter(items)
-    _dbg(f"apply_sanity_filter: отброшено {outlier_count} outliers, {len(items)} items remain")
+    items, quality = _score_items(items)
+    low_quality = _is_low_quality(quality)
 
-    quality = evaluate_parse_quality(items, dedup_dropped_count=dedup_dropped, sanity_outlier_count=outlier_count)
-    _dbg(f"quality: {quality}")
-
-    low_quality = (
-        quality["coverage_score"] < 0.6
-        or quality["suspicious_count"] > 0
-        or quality.get("ref_coverage_ratio", 1.0) < 0.5
-        or quality.get("duplicate_name_count", 0) > 2
-    )
+    # === ПОВТОРНЫЙ OCR слабых страниц (вместо одного только дисклеймера) ===
+    if low_quality and file_bytes and page_sources is not None and OCR_REOCR_ENABLED:
+        _report_progress(progress, "reocr", 45)
+        try:
+            recovered = _reocr_candidates(file_bytes, page_sources, items, quality)
+        except Exception as e:
+            _warn("re-OCR failed: %s", e)
+            recovered = None
+        new_items = parse_candidates_with_fallback(recovered) if recovered else []
+        if new_items:
+            new_items, new_quality = _score_items(new_items)
+            _dbg(f"re-OCR quality: {new_quality}")
+            if _quality_rank(new_quality) > _quality_rank(quality):
+                items, quality = new_items, new_quality
+                low_quality = _is_low_quality(quality)
+                ctx.put(OCR_CANDIDATES_ARTIFACT, candidates_to_tsv(recovered))
 
     # Определяем тип панели анализов по наличию маркеров
     parsed_names_before = {it.name for it in items}
     panel_scores = detect_panel(parsed_names_before)
     _dbg(f"panel detection: {panel_scores}")
     
-    # Порог для определения панели (минимальное количество маркеров)
-    PANEL_THRESHOLD = 3
-    
     # Проверка полноты парсинга (условно, только для обнаруженных панелей)
     missing_warnings: List[str] = []
-    
-    # Проверяем CBC только если обнаружена панель ОАК
-    if panel_scores["cbc"] >= PANEL_THRESHOLD:
-        cbc_expected_groups = {
-            "основные_показатели": {"WBC", "RBC", "HGB", "HCT", "PLT"},
-            "лейкоформула_проценты": {"NE%", "LY%", "MO%", "EO%", "BA%"},
-        }
-        
-        for group_name, expected_names in cbc_expected_groups.items():
-            missing = expected_names - parsed_names_before
-            if missing:
-                missing_str = ", ".join(sorted(missing))
-                missing_warnings.append(f"Не найдены показатели группы '{group_name}': {missing_str}")
-                _dbg(f"WARN: missing {group_name}: {missing}")
-    
+    for group_name, missing in missing_expected_groups(parsed_names_before, panel_scores).items():
+        missing_str = ", ".join(sorted(missing))
+        missing_warnings.append(f"Не найдены показатели группы '{group_name}': {missing_str}")
+        _warn("missing %s: %s", group_name, missing)
+
     # Если ни одна панель не обнаружена - показываем нейтральное предупреждение
     if max(panel_scores.values()) < PANEL_THRESHOLD and len(parsed_names_before) < 5:
         missing_warnings.append("Распознано мало показателей, возможно неполный разбор.")
-        _dbg(f"WARN: low panel scores, total items: {len(parsed_names_before)}")
+        _warn("low panel scores, total items: %d", len(parsed_names_before))
 
     # НЕ удаляем проценты - они важны для анализа лейкоформулы
     # Функция drop_percent_if_absolute теперь возвращает все items без изменений
@@ -1923,10 +2803,11 @@ def generate_pdf_report(
         and it.ref is not None
         and it.status in ("ВЫШЕ", "НИЖЕ")
     ]
-    _dbg(f"high_low deviations (confidence>=0.7): {len(high_low)} items")
-    for it in high_low:
-        _dbg(f"  deviation: {it.name} value={it.value} ref={format_range(it.ref)} "
-             f"status={it.status} confidence={it.confidence}")
+    _dbg("high_low deviations (confidence>=0.7): %d items", len(high_low))
+    if _debug_enabled():
+        for it in high_low:
+            _dbg("  deviation: %s value=%s ref=%s status=%s confidence=%s",
+                 it.name, it.value, format_range(it.ref), it.status, it.confidence)
 
     # === ПОВЕДЕНИЕ ДЛЯ НЕИЗВЕСТНЫХ БЛАНКОВ ===
     # Если valid_value_count < 5 — не вызываем LLM
@@ -1943,12 +2824,12 @@ def generate_pdf_report(
         specialists = suggest_specialists(high_low)
         llm_prompt = build_llm_prompt(sex, age, high_low, dict_expl, specialists)
 
+        _report_progress(progress, "llm", 55)
         try:
-            token = get_iam_token()
-            answer = call_yandexgpt(token, llm_prompt)
-            answer = re.sub(r"\n{3,}", "\n\n", answer).strip()
+            answer = call_yandexgpt_cached(sex, age, high_low, llm_prompt)
+            answer = P.BLANK_LINES.sub("\n\n", answer).strip()
         except Exception as e:
-            _dbg(f"LLM failed: {e}")
+            _warn("LLM failed: %s", e)
             answer = build_fallback_text(sex, age, items, high_low)
 
     # === UNIVERSAL DISCLAIMER при низком качестве ===
@@ -1963,14 +2844,106 @@ def generate_pdf_report(
 
     context = build_template_context(sex, age, items, high_low, answer, missing_warnings)
     # Используем созданный ранее created_at для контекста (если нужно обновить, можно использовать context["created_at"])
-    download_name = f"report_{safe_ts}_{uid}.pdf"
+    rendered_html = render_html_report(context)
+    _report_progress(progress, "render", 80)
+    return rendered_html, created_at, f"report_{safe_ts}_{uid}"
+
+
+@contextmanager
+def _report_context(ctx: Optional[RequestContext]):
+    """
+    Контекст запроса для генерации отчёта.
+    Переданный ctx просто активируется (его жизненным циклом управляет вызывающий).
+    Иначе создаётся новый: REQUEST_WORKSPACE_MODE="disk" → папка
+    REQUEST_WORKSPACE_DIR/<id>/ (сохраняется только при REQUEST_WORKSPACE_KEEP),
+    иначе — только память. Сохранение самого отчёта (persist) на это не влияет.
+    Признаки строк (line_scorer.document_scope) кэшируются на весь запрос.
+    """
+    if ctx is not None:
+        with use_context(ctx), _regex_profile_scope(ctx), document_scope():
+            yield ctx
+        return
+    with request_context(
+        root=REQUEST_WORKSPACE_DIR if REQUEST_WORKSPACE_MODE == "disk" else None,
+        keep=REQUEST_WORKSPACE_KEEP,
+    ) as new_ctx, _regex_profile_scope(new_ctx), document_scope():
+        yield new_ctx
+
+
+@contextmanager
+def _regex_profile_scope(ctx: RequestContext):
+    """REGEX_PROFILE: профиль шаблонов парсеров за запрос → артефакт (и при ошибке тоже)."""
+    if not REGEX_PROFILE:
+        yield
+        return
+    from parsers.regex_profiler import profile_regex
 
-    html_path = OUT_DIR / f"report_{safe_ts}_{uid}.html"
+    with profile_regex() as prof:
+        try:
+            yield
+        finally:
+            ctx.put(REGEX_PROFILE_ARTIFACT, prof.report(REGEX_PROFILE_TOP))
+            _LOG.info("regex profile: %d patterns, %.1f ms in regex",
+                      len(prof.by_pattern()), prof.total_ms())
+
+
+def generate_pdf_bytes(
+    sex: str,
+    age: int,
+    raw_text: str = "",
+    file_bytes: Optional[bytes] = None,
+    filename: str = "",
+    mimetype: str = "",
+    persist: bool = False,
+    progress: Optional[ProgressFn] = None,
+    ctx: Optional[RequestContext] = None,
+) -> tuple[bytes, str]:
+    """
+    Как generate_pdf_report, но PDF возвращается байтами: HTML передаётся в
+    Chromium через set_content, файлы отчёта (html/pdf/исходник) на диск не пишутся.
+    Общий лог (OCR_DEBUG_PATH), кэши OCR/LLM и артефакты запроса при
+    REQUEST_WORKSPACE_MODE="disk" по-прежнему живут в outputs/.
+    persist=True — дополнительно сохранить html/pdf и исходный файл на диск.
+    """
+    with _report_context(ctx):
+        rendered_html, created_at, base_name = _build_report_html(
+            sex, age, raw_text, file_bytes, filename, mimetype, save_upload=persist, progress=progress,
+        )
+    pdf_bytes = render_pdf_bytes(rendered_html, created_at)
+    download_name = f"{base_name}.pdf"
+
+    if persist:
+        (OUT_DIR / f"{base_name}.html").write_text(rendered_html, encoding="utf-8")
+        (OUT_DIR / download_name).write_bytes(pdf_bytes)
+
+    return pdf_bytes, download_name
+
+
+def generate_pdf_report(
+    sex: str,
+    age: int,
+    raw_text: str = "",
+    file_bytes: Optional[bytes] = None,
+    filename: str = "",
+    mimetype: str = "",
+    progress: Optional[ProgressFn] = None,
+    ctx: Optional[RequestContext] = None,
+) -> tuple[Path, str]:
+    """
+    Отчёт с сохранением на диск: outputs/report_*.html + outputs/report_*.pdf.
+    Отладочные артефакты — как у generate_pdf_bytes: по REQUEST_WORKSPACE_MODE /
+    REQUEST_WORKSPACE_KEEP (по умолчанию только в памяти).
+    """
+    with _report_context(ctx):
+        rendered_html, created_at, base_name = _build_report_html(
+            sex, age, raw_text, file_bytes, filename, mimetype, progress=progress,
+        )
+    download_name = f"{base_name}.pdf"
+
+    html_path = OUT_DIR / f"{base_name}.html"
     pdf_path = OUT_DIR / download_name
 
-    rendered_html = render_html_report(context)
     html_path.write_text(rendered_html, encoding="utf-8")
-
-    render_pdf_from_html(html_path, pdf_path, created_at)
+    pdf_path.write_bytes(render_pdf_bytes(rendered_html, created_at))
 
     return pdf_path, download_name
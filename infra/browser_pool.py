@@ -0,0 +1,355 @@
+"""
+Пул долгоживущих процессов Chromium для рендеринга PDF.
+
+BrowserPool(size=..., ...) — N рабочих потоков, каждый владеет своим
+sync_playwright() и своим браузером (sync-API Playwright привязан к потоку,
+поэтому браузер нельзя передавать между потоками — передаём задачи).
+
+Возможности:
+  - submit(fn) / run(fn)  — выполнить fn(page) на свободном браузере;
+                            каждая задача получает свежий context + page
+  - health-check          — перед задачей проверяем browser.is_connected(),
+                            упавший браузер перезапускается
+  - recycle               — браузер перезапускается после max_renders задач
+                            или при превышении max_rss_mb (нужен psutil)
+  - watchdog              — задача дольше render_timeout_sec считается зависшей:
+                            процессы Chromium слота убиваются, слот перезапускает браузер
+  - stats()               — ожидание в очереди (wait_ms), время рендера, перезапуски
+
+psutil — опциональная зависимость: без него не работают recycle по памяти
+и принудительное убийство зависшего Chromium (остаются таймауты Playwright).
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+from uuid import uuid4
+
+
+# Маркер в командной строке Chromium: по нему watchdog находит процессы слота
+# (главный процесс браузера; дочерние — через его дерево процессов)
+_SLOT_FLAG = "--lab-ai-pool-slot="
+
+
+@dataclass
+class _Task:
+    fn: Callable[[Any], Any]
+    future: Future
+    submitted_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class _Slot:
+    index: int
+    tag: str
+    thread: Optional[threading.Thread] = None
+    busy_since: Optional[float] = None
+    renders: int = 0
+    launches: int = 0
+    killed: bool = False
+
+
+def _slot_processes(tag: str) -> List[Any]:
+    """
+    Процессы Chromium, запущенные слотом. Без psutil — [].
+    Маркер в cmdline есть только у главного процесса браузера: Chromium не передаёт
+    незнакомые ключи renderer / GPU / utility — их находим как его потомков.
+    """
+    try:
+        import psutil  # type: ignore
+    except ImportError:
+        return []
+    marker = f"{_SLOT_FLAG}{tag}"
+    found: Dict[int, Any] = {}
+    for proc in psutil.process_iter(["cmdline"]):
+        try:
+            cmdline = proc.info.get("cmdline") or []
+        except Exception:
+            continue
+        if marker not in cmdline:
+            continue
+        found.setdefault(proc.pid, proc)
+        try:
+            children = proc.children(recursive=True)
+        except Exception:
+            continue
+        for child in children:
+            found.setdefault(child.pid, child)
+    return list(found.values())
+
+
+def _slot_rss_mb(tag: str) -> float:
+    total = 0
+    for proc in _slot_processes(tag):
+        try:
+            total += proc.memory_info().rss
+        except Exception:
+            continue
+    return total / (1024 * 1024)
+
+
+class BrowserPool:
+    def __init__(
+        self,
+        size: int = 2,
+        max_renders: int = 200,
+        max_rss_mb: float = 0.0,
+        render_timeout_sec: float = 60.0,
+        acquire_timeout_sec: float = 120.0,
+        launch_args: Optional[List[str]] = None,
+        log: Optional[Callable[[str], None]] = None,
+        playwright_factory: Optional[Callable[[], Any]] = None,
+    ) -> None:
+        self.size = max(1, int(size))
+        self.max_renders = max(1, int(max_renders))
+        self.max_rss_mb = float(max_rss_mb or 0.0)
+        self.render_timeout_sec = float(render_timeout_sec)
+        self.acquire_timeout_sec = float(acquire_timeout_sec)
+        self.launch_args = list(launch_args or [])
+        self._log = log or (lambda _msg: None)
+        self._playwright_factory = playwright_factory
+
+        self._tasks: "queue.Queue[Optional[_Task]]" = queue.Queue()
+        self._slots: List[_Slot] = []
+        self._lock = threading.Lock()
+        self._started = False
+        self._closed = False
+        self._watchdog: Optional[threading.Thread] = None
+
+        # метрики
+        self._stats: Dict[str, float] = {
+            "tasks": 0,
+            "errors": 0,
+            "launches": 0,
+            "recycles": 0,
+            "watchdog_kills": 0,
+            "wait_ms_total": 0.0,
+            "wait_ms_max": 0.0,
+            "wait_ms_last": 0.0,
+            "render_ms_total": 0.0,
+            "render_ms_max": 0.0,
+        }
+
+    # ──────────────────────────────────────────
+    # Публичный API
+    # ──────────────────────────────────────────
+    def submit(self, fn: Callable[[Any], Any]) -> Future:
+        """Ставит fn(page) в очередь пула. Возвращает Future с результатом fn."""
+        if self._closed:
+            raise RuntimeError("BrowserPool закрыт")
+        self._ensure_started()
+        task = _Task(fn=fn, future=Future())
+        self._tasks.put(task)
+        return task.future
+
+    def run(self, fn: Callable[[Any], Any]) -> Any:
+        """Синхронно выполняет fn(page) на браузере из пула (с общим таймаутом)."""
+        fut = self.submit(fn)
+        try:
+            return fut.result(timeout=self.acquire_timeout_sec + self.render_timeout_sec)
+        except FutureTimeoutError:
+            fut.cancel()
+            raise RuntimeError(
+                f"PDF-рендер не завершился за {self.acquire_timeout_sec + self.render_timeout_sec:.0f} с "
+                f"(очередь пула: {self._tasks.qsize()})"
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            s = dict(self._stats)
+            slots = [
+                {
+                    "index": sl.index,
+                    "alive": bool(sl.thread and sl.thread.is_alive()),
+                    "busy": sl.busy_since is not None,
+                    "renders": sl.renders,
+                    "launches": sl.launches,
+                }
+                for sl in self._slots
+            ]
+        n = s["tasks"] or 1
+        s["wait_ms_avg"] = round(s["wait_ms_total"] / n, 1)
+        s["render_ms_avg"] = round(s["render_ms_total"] / n, 1)
+        s["queue_depth"] = self._tasks.qsize()
+        s["size"] = self.size
+        s["slots"] = slots
+        return s
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            slots = list(self._slots)
+        for _ in slots:
+            self._tasks.put(None)
+        if wait:
+            for sl in slots:
+                if sl.thread is not None:
+                    sl.thread.join(timeout=10)
+
+    # ──────────────────────────────────────────
+    # Внутреннее
+    # ──────────────────────────────────────────
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            for i in range(self.size):
+                slot = _Slot(index=i, tag=uuid4().hex[:12])
+                self._slots.append(slot)
+                self._start_slot_thread(slot)
+            self._watchdog = threading.Thread(target=self._watchdog_loop, name="pdf-pool-watchdog", daemon=True)
+            self._watchdog.start()
+
+    def _start_slot_thread(self, slot: _Slot) -> None:
+        slot.thread = threading.Thread(target=self._worker, args=(slot,), name=f"pdf-pool-{slot.index}", daemon=True)
+        slot.thread.start()
+
+    def _bump(self, key: str, value: float = 1) -> None:
+        with self._lock:
+            self._stats[key] += value
+
+    def _launch(self, p: Any, slot: _Slot) -> Any:
+        args = self.launch_args + [f"{_SLOT_FLAG}{slot.tag}"]
+        browser = p.chromium.launch(args=args)
+        slot.launches += 1
+        slot.renders = 0
+        slot.killed = False
+        self._bump("launches")
+        self._log(f"pdf-pool[{slot.index}]: browser launched (launch #{slot.launches})")
+        return browser
+
+    def _needs_recycle(self, slot: _Slot) -> Optional[str]:
+        if slot.killed:
+            return "watchdog"
+        if slot.renders >= self.max_renders:
+            return f"renders={slot.renders}"
+        if self.max_rss_mb > 0:
+            rss = _slot_rss_mb(slot.tag)
+            if rss > self.max_rss_mb:
+                return f"rss={rss:.0f}MB"
+        return None
+
+    @staticmethod
+    def _close_quietly(browser: Any) -> None:
+        try:
+            browser.close()
+        except Exception:
+            pass
+
+    def _worker(self, slot: _Slot) -> None:
+        factory = self._playwright_factory
+        if factory is None:
+            from playwright.sync_api import sync_playwright
+            factory = sync_playwright
+
+        try:
+            with factory() as p:
+                self._serve(slot, p)
+        except BaseException as e:
+            # Playwright не стартовал — не держим задачи до таймаута, отдаём ошибку
+            self._log(f"pdf-pool[{slot.index}]: playwright failed: {e}")
+            while True:
+                task = self._tasks.get()
+                if task is None:
+                    break
+                if task.future.set_running_or_notify_cancel():
+                    self._bump("errors")
+                    task.future.set_exception(e)
+
+    def _serve(self, slot: _Slot, p: Any) -> None:
+        browser = None
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                break
+            if not task.future.set_running_or_notify_cancel():
+                continue  # вызывающий уже не ждёт
+
+            wait_ms = (time.monotonic() - task.submitted_at) * 1000.0
+            with self._lock:
+                self._stats["wait_ms_total"] += wait_ms
+                self._stats["wait_ms_last"] = wait_ms
+                self._stats["wait_ms_max"] = max(self._stats["wait_ms_max"], wait_ms)
+
+            context = None
+            result: Any = None
+            error: Optional[BaseException] = None
+            t0 = time.monotonic()
+            try:
+                # health-check
+                if browser is None or not browser.is_connected():
+                    if browser is not None:
+                        self._log(f"pdf-pool[{slot.index}]: browser disconnected, relaunch")
+                        self._close_quietly(browser)
+                    browser = self._launch(p, slot)
+
+                slot.busy_since = time.monotonic()
+                context = browser.new_context()
+                page = context.new_page()
+                page.set_default_timeout(self.render_timeout_sec * 1000.0)
+                result = task.fn(page)
+            except BaseException as e:
+                error = e
+            finally:
+                slot.busy_since = None
+                if context is not None:
+                    try:
+                        context.close()
+                    except Exception:
+                        pass
+
+            # метрики обновляем до того, как вызывающий получит результат
+            render_ms = (time.monotonic() - t0) * 1000.0
+            slot.renders += 1
+            with self._lock:
+                self._stats["tasks"] += 1
+                if error is not None:
+                    self._stats["errors"] += 1
+                self._stats["render_ms_total"] += render_ms
+                self._stats["render_ms_max"] = max(self._stats["render_ms_max"], render_ms)
+            self._log(f"pdf-pool[{slot.index}]: task done wait_ms={wait_ms:.0f} render_ms={render_ms:.0f}")
+
+            if error is not None:
+                task.future.set_exception(error)
+            else:
+                task.future.set_result(result)
+
+            reason = self._needs_recycle(slot)
+            if reason and browser is not None:
+                self._log(f"pdf-pool[{slot.index}]: recycle browser ({reason})")
+                self._close_quietly(browser)
+                browser = None
+                self._bump("recycles")
+
+        if browser is not None:
+            self._close_quietly(browser)
+
+    def _watchdog_loop(self) -> None:
+        interval = max(0.5, min(5.0, self.render_timeout_sec / 4))
+        while not self._closed:
+            time.sleep(interval)
+            now = time.monotonic()
+            for slot in list(self._slots):
+                since = slot.busy_since
+                if since is None or slot.killed:
+                    continue
+                if now - since <= self.render_timeout_sec:
+                    continue
+                slot.killed = True
+                procs = _slot_processes(slot.tag)
+                for proc in procs:
+                    try:
+                        proc.kill()
+                    except Exception:
+                        pass
+                self._bump("watchdog_kills")
+                self._log(
+                    f"pdf-pool[{slot.index}]: watchdog — render hung {now - since:.0f}s, "
+                    f"killed {len(procs)} chromium processes"
+                )
@@ -0,0 +1,178 @@
+"""
+Персистентный кэш на диске: JSON-значения по строковому ключу, LRU + TTL.
+
+DiskCache(directory, max_bytes=..., ttl_sec=...)
+  get(key) → значение | None   — None: нет записи или истёк TTL
+  set(key, value) → bool       — value должен сериализоваться в JSON; False — запись не легла
+                                 (слишком большая или ошибка диска)
+  prune_expired() → int        — удалить записи с истёкшим TTL (сколько удалено)
+  stats() → dict               — hits / misses / evictions / entries / bytes
+
+Хранение: <directory>/<key[:2]>/<key>.json, запись атомарная (tmp + os.replace),
+поэтому кэш можно делить между процессами на одной машине.
+LRU: время последнего доступа = mtime файла (обновляется при попадании); max_bytes=0 —
+без вытеснения по размеру.
+TTL: считается от момента записи (created_at внутри файла).
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class DiskCache:
+    def __init__(
+        self,
+        directory: Path,
+        max_bytes: int = 200 * 1024 * 1024,
+        ttl_sec: float = 7 * 24 * 3600,
+        log: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = int(max_bytes)
+        self.ttl_sec = float(ttl_sec)
+        self._log = log or (lambda _msg: None)
+        self._lock = threading.Lock()
+        self._index: Optional[Dict[str, Tuple[int, float]]] = None  # key -> (size, atime)
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    # ──────────────────────────────────────────
+    # Публичный API
+    # ──────────────────────────────────────────
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            raw = path.read_text(encoding="utf-8")
+            entry = json.loads(raw)
+        except (OSError, ValueError):
+            with self._lock:
+                self._misses += 1
+            return None
+
+        if self.ttl_sec > 0 and time.time() - float(entry.get("created_at", 0)) > self.ttl_sec:
+            self._remove(key)
+            with self._lock:
+                self._misses += 1
+            return None
+
+        now = time.time()
+        try:
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+        with self._lock:
+            self._hits += 1
+            if self._index is not None:
+                self._index[key] = (len(raw.encode("utf-8")), now)
+        return entry.get("value")
+
+    def set(self, key: str, value: Any) -> bool:
+        path = self._path(key)
+        data = json.dumps({"created_at": time.time(), "value": value}, ensure_ascii=False)
+        size = len(data.encode("utf-8"))
+        if self.max_bytes and size > self.max_bytes:
+            self._log(f"cache: entry {key[:12]} too large ({size} bytes), skip")
+            return False
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_text(data, encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError as e:
+            self._log(f"cache: write failed for {key[:12]}: {e}")
+            return False
+        with self._lock:
+            index = self._ensure_index()
+            index[key] = (size, time.time())
+        self._evict_if_needed()
+        return True
+
+    def prune_expired(self) -> int:
+        # по mtime (≥ created_at): файлы не читаются; запись, которую недавно читали,
+        # добьёт get() по created_at
+        if self.ttl_sec <= 0:
+            return 0
+        now = time.time()
+        with self._lock:
+            self._index = self._scan()
+            expired = [k for k, (_size, atime) in self._index.items() if now - atime > self.ttl_sec]
+        for key in expired:
+            self._remove(key)
+        return len(expired)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            index = self._ensure_index()
+            total = self._hits + self._misses
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / total, 3) if total else 0.0,
+                "evictions": self._evictions,
+                "entries": len(index),
+                "bytes": sum(size for size, _ in index.values()),
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            keys = list(self._ensure_index().keys())
+        for key in keys:
+            self._remove(key)
+
+    # ──────────────────────────────────────────
+    # Внутреннее
+    # ──────────────────────────────────────────
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _scan(self) -> Dict[str, Tuple[int, float]]:
+        index: Dict[str, Tuple[int, float]] = {}
+        if not self.directory.exists():
+            return index
+        for p in self.directory.glob("*/*.json"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            index[p.stem] = (st.st_size, st.st_mtime)
+        return index
+
+    def _ensure_index(self) -> Dict[str, Tuple[int, float]]:
+        # под self._lock
+        if self._index is None:
+            self._index = self._scan()
+        return self._index
+
+    def _remove(self, key: str) -> None:
+        try:
+            self._path(key).unlink()
+        except OSError:
+            pass
+        with self._lock:
+            if self._index is not None:
+                self._index.pop(key, None)
+
+    def _evict_if_needed(self) -> None:
+        if not self.max_bytes:
+            return
+        with self._lock:
+            total = sum(size for size, _ in self._ensure_index().values())
+            if total <= self.max_bytes:
+                return
+            # пересканируем: другие процессы могли добавить/удалить записи
+            self._index = self._scan()
+            victims = sorted(self._index.items(), key=lambda kv: kv[1][1])
+            total = sum(size for size, _ in self._index.values())
+        for key, (size, _atime) in victims:
+            if total <= self.max_bytes:
+                break
+            self._remove(key)
+            total -= size
+            with self._lock:
+                self._evictions += 1
+        self._log(f"cache: evicted down to {total} bytes in {self.directory}")
@@ -0,0 +1,124 @@
+"""
+HTTP-клиент с пулом keep-alive соединений на каждый хост.
+
+HttpClient(pool_maxsize=..., connect_timeout=...)
+  get(url, timeout=..., **kw) / post(url, timeout=..., **kw) → requests.Response
+      — timeout здесь это таймаут чтения; в requests уходит (connect_timeout, timeout)
+  stats() → dict   — по хостам: requests / new_connections / reused / reuse_ratio
+  close()
+
+requests.post/get без сессии открывают новое TCP+TLS соединение на каждый вызов.
+Для опроса operations это рукопожатие TLS на каждой итерации. Здесь на хост
+заводится отдельная requests.Session с HTTPAdapter(pool_maxsize=N): соединения
+переиспользуются, и хосты не вытесняют друг друга из общего пула.
+
+Метрики берутся из пулов urllib3 (num_connections / num_requests), поэтому
+учитывают реальные переподключения (например, когда сервер закрыл keep-alive).
+"""
+
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class HttpClient:
+    def __init__(
+        self,
+        pool_maxsize: int = 10,
+        connect_timeout: float = 5.0,
+        default_read_timeout: float = 30.0,
+        log: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        self.pool_maxsize = int(pool_maxsize)
+        self.connect_timeout = float(connect_timeout)
+        self.default_read_timeout = float(default_read_timeout)
+        self._log = log or (lambda _msg: None)
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, requests.Session] = {}
+
+    # ──────────────────────────────────────────
+    # Публичный API
+    # ──────────────────────────────────────────
+    def request(self, method: str, url: str, timeout: Optional[float] = None, **kwargs: Any) -> requests.Response:
+        read_timeout = self.default_read_timeout if timeout is None else float(timeout)
+        return self.session(url).request(
+            method, url, timeout=(self.connect_timeout, read_timeout), **kwargs,
+        )
+
+    def get(self, url: str, timeout: Optional[float] = None, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, timeout=timeout, **kwargs)
+
+    def post(self, url: str, timeout: Optional[float] = None, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, timeout=timeout, **kwargs)
+
+    def session(self, url: str) -> requests.Session:
+        host = _host_key(url)
+        s = self._sessions.get(host)
+        if s is not None:
+            return s
+        with self._lock:
+            s = self._sessions.get(host)
+            if s is None:
+                s = requests.Session()
+                # pool_connections=1: сессия обслуживает один хост
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                self._sessions[host] = s
+                self._log(f"http: new session for {host} (pool_maxsize={self.pool_maxsize})")
+        return s
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            sessions = dict(self._sessions)
+        hosts: Dict[str, Dict[str, Any]] = {}
+        total_req = total_conn = 0
+        for host, s in sessions.items():
+            req, conn = _pool_counters(s)
+            total_req += req
+            total_conn += conn
+            hosts[host] = _counters_dict(req, conn)
+        out = _counters_dict(total_req, total_conn)
+        out["hosts"] = hosts
+        return out
+
+    def close(self) -> None:
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        for s in sessions:
+            s.close()
+
+
+def _host_key(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _pool_counters(session: requests.Session) -> Tuple[int, int]:
+    requests_total = connections_total = 0
+    for adapter in set(session.adapters.values()):
+        poolmanager = getattr(adapter, "poolmanager", None)
+        if poolmanager is None:
+            continue
+        pools = poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            requests_total += getattr(pool, "num_requests", 0)
+            connections_total += getattr(pool, "num_connections", 0)
+    return requests_total, connections_total
+
+
+def _counters_dict(req: int, conn: int) -> Dict[str, Any]:
+    reused = max(0, req - conn)
+    return {
+        "requests": req,
+        "new_connections": conn,
+        "reused": reused,
+        "reuse_ratio": round(reused / req, 3) if req else 0.0,
+    }
@@ -0,0 +1,242 @@
+"""
+Фоновая очередь задач для генерации отчётов.
+
+JobQueue(workers=N) — пул рабочих потоков + ограниченная очередь.
+  submit(fn, *args, **kwargs) → Job   — fn вызывается в рабочем потоке
+                                        с доп. аргументом progress(stage, percent)
+  get(job_id) → Job | None            — текущее состояние задачи
+  queue_position(job_id) → int        — сколько задач впереди (0 — следующая / уже в работе)
+  stats() → dict                      — глубина очереди, время ожидания, счётчики
+  snapshot(job) → dict                — Job.to_dict(), снятый под замком очереди
+
+Статусы Job: queued → running → done | error.
+on_change(job) вызывается после каждого изменения задачи (постановка, старт, стадия,
+завершение) — через него веб-слой копирует состояние в общее хранилище, чтобы статус
+видели и другие WSGI-воркеры. Обработчики разных потоков могут сработать не по порядку
+(снимок «queued» из потока запроса — после «done» из рабочего), поэтому каждое изменение
+увеличивает Job.version: из двух снимков новее тот, у кого версия больше.
+Потоки (а не процессы): задачам нужен общий с веб-слоем процесс
+(пул Chromium), а вся тяжёлая работа — это сеть и Chromium, которые отпускают GIL.
+"""
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from infra.logging_setup import request_scope
+
+
+class QueueFullError(RuntimeError):
+    """Очередь переполнена — новая задача не принята."""
+
+
+@dataclass
+class Job:
+    id: str
+    status: str = "queued"          # queued | running | done | error
+    stage: str = "queued"
+    progress: int = 0               # 0..100
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: str = ""
+    result: Any = None
+    stages: List[Tuple[str, float]] = field(default_factory=list)  # (stage, секунды от старта)
+    version: int = 0                # растёт при каждом изменении (под замком очереди)
+
+    @property
+    def wait_sec(self) -> float:
+        end = self.started_at if self.started_at is not None else time.time()
+        return max(0.0, end - self.submitted_at)
+
+    @property
+    def run_sec(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        end = self.finished_at if self.finished_at is not None else time.time()
+        return max(0.0, end - self.started_at)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "wait_sec": round(self.wait_sec, 2),
+            "run_sec": round(self.run_sec, 2),
+            "error": self.error,
+            "stages": [{"stage": s, "at_sec": round(t, 2)} for s, t in self.stages],
+            "version": self.version,
+        }
+
+
+class JobQueue:
+    def __init__(
+        self,
+        workers: int = 2,
+        max_queue: int = 100,
+        keep_finished: int = 200,
+        log: Optional[Callable[[str], None]] = None,
+        on_change: Optional[Callable[[Job], None]] = None,
+    ) -> None:
+        self.workers = max(1, int(workers))
+        self.max_queue = max(1, int(max_queue))
+        self.keep_finished = max(1, int(keep_finished))
+        self._log = log or (lambda _msg: None)
+        self._on_change = on_change
+
+        self._queue: "queue.Queue[Optional[Tuple[Job, Callable, tuple, dict]]]" = queue.Queue(maxsize=self.max_queue)
+        self._jobs: Dict[str, Job] = {}
+        self._pending: List[str] = []          # id задач в очереди, по порядку
+        self._lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+        self._started = False
+
+        self._done = 0
+        self._failed = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._run_total = 0.0
+
+    # ──────────────────────────────────────────
+    # Публичный API
+    # ──────────────────────────────────────────
+    def submit(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Job:
+        self._ensure_started()
+        job = Job(id=uuid4().hex)
+        with self._lock:
+            try:
+                self._queue.put_nowait((job, fn, args, kwargs))
+            except queue.Full:
+                raise QueueFullError(
+                    f"Сервер перегружен: в очереди {self.max_queue} задач. Попробуйте чуть позже."
+                )
+            self._jobs[job.id] = job
+            self._pending.append(job.id)
+            job.version += 1
+        self._log(f"jobs: submitted {job.id} queue_depth={self._queue.qsize()}")
+        self._notify(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def queue_position(self, job_id: str) -> int:
+        with self._lock:
+            try:
+                return self._pending.index(job_id)
+            except ValueError:
+                return 0
+
+    def snapshot(self, job: Job) -> Dict[str, Any]:
+        with self._lock:
+            return job.to_dict()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            running = sum(1 for j in self._jobs.values() if j.status == "running")
+            finished = self._done + self._failed
+            started = finished + running
+            return {
+                "workers": self.workers,
+                "queue_depth": len(self._pending),
+                "max_queue": self.max_queue,
+                "running": running,
+                "done": self._done,
+                "failed": self._failed,
+                "wait_sec_avg": round(self._wait_total / started, 2) if started else 0.0,
+                "wait_sec_max": round(self._wait_max, 2),
+                "run_sec_avg": round(self._run_total / finished, 2) if finished else 0.0,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        for _ in self._threads:
+            self._queue.put(None)
+        if wait:
+            for t in self._threads:
+                t.join(timeout=10)
+
+    # ──────────────────────────────────────────
+    # Внутреннее
+    # ──────────────────────────────────────────
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            for i in range(self.workers):
+                t = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def _notify(self, job: Job) -> None:
+        # вне self._lock: обработчик может звать get()/queue_position()
+        if self._on_change is None:
+            return
+        try:
+            self._on_change(job)
+        except Exception as e:
+            self._log(f"jobs: on_change failed for {job.id}: {e}")
+
+    def _trim_finished(self) -> None:
+        # под self._lock; dict сохраняет порядок вставки — удаляем самые старые завершённые
+        finished = [jid for jid, j in self._jobs.items() if j.status in ("done", "error")]
+        for jid in finished[: max(0, len(finished) - self.keep_finished)]:
+            self._jobs.pop(jid, None)
+
+    def _worker(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            job, fn, args, kwargs = item
+
+            with self._lock:
+                if job.id in self._pending:
+                    self._pending.remove(job.id)
+                job.status = "running"
+                job.stage = "started"
+                job.started_at = time.time()
+                wait = job.wait_sec
+                self._wait_total += wait
+                self._wait_max = max(self._wait_max, wait)
+                job.version += 1
+            self._notify(job)
+
+            def progress(stage: str, percent: int, _job: Job = job) -> None:
+                with self._lock:
+                    _job.stage = stage
+                    _job.progress = max(_job.progress, min(100, int(percent)))
+                    _job.stages.append((stage, time.time() - (_job.started_at or _job.submitted_at)))
+                    _job.version += 1
+                self._notify(_job)
+
+            # id задачи — correlation id для всех записей лога внутри неё
+            with request_scope(job.id):
+                try:
+                    result = fn(*args, progress=progress, **kwargs)
+                    with self._lock:
+                        job.result = result
+                        job.status = "done"
+                        job.stage = "done"
+                        job.progress = 100
+                        self._done += 1
+                except Exception as e:
+                    with self._lock:
+                        job.error = str(e)
+                        job.status = "error"
+                        self._failed += 1
+                finally:
+                    with self._lock:
+                        job.finished_at = time.time()
+                        job.version += 1
+                        self._run_total += job.run_sec
+                        self._trim_finished()
+                self._notify(job)
+                self._log(
+                    f"jobs: {job.id} {job.status} wait={job.wait_sec:.2f}s run={job.run_sec:.2f}s"
+                )
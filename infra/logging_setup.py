@@ -0,0 +1,133 @@
+"""
+Логирование: stdlib logging с ротацией файлов, фоновой записью и id запроса.
+
+configure_logging(path, level=..., max_bytes=..., backup_count=..., background=True)
+  — настраивает логгер "lab_ai" (идемпотентно, повторный вызов перенастраивает)
+request_scope(request_id)   — контекст-менеджер: все записи внутри помечаются id
+set_request_id / get_request_id — то же без контекст-менеджера
+
+Почему не запись «прочитать файл + дописать строку»: это O(размер файла) на каждое
+сообщение, а парсеры логируют по строке-кандидату. RotatingFileHandler держит файл
+открытым и только дописывает; при background=True запись в файл уходит
+в отдельный поток (QueueHandler → QueueListener), вызывающий поток лишь кладёт
+запись в очередь.
+
+Форматирование ленивое: logger.debug("x=%s", x) не собирает строку, если уровень
+DEBUG выключен. Поэтому в горячих местах — %-аргументы, а не f-строки.
+
+id запроса хранится в contextvars: у каждого потока/задачи свой, параллельные
+запросы не перемешиваются. Без id в записи стоит "-".
+"""
+
+import atexit
+import contextvars
+import logging
+import logging.handlers
+import queue
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+LOGGER_NAME = "lab_ai"
+LOG_FORMAT = "[%(asctime)s] %(levelname)s [%(request_id)s] %(message)s"
+LOG_DATEFMT = "%Y-%m-%d %H:%M:%S"
+
+_request_id: contextvars.ContextVar[str] = contextvars.ContextVar("lab_ai_request_id", default="-")
+
+_lock = threading.Lock()
+# logger_name -> (listener | None, [handlers]) — то, что configure_logging повесил сам
+_installed: Dict[str, Tuple[Optional[logging.handlers.QueueListener], List[logging.Handler]]] = {}
+_atexit_registered = False
+
+
+class RequestIdFilter(logging.Filter):
+    """Добавляет record.request_id из контекста текущего потока."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get()
+        return True
+
+
+def get_request_id() -> str:
+    return _request_id.get()
+
+
+def set_request_id(request_id: Optional[str]) -> contextvars.Token:
+    return _request_id.set(request_id or "-")
+
+
+@contextmanager
+def request_scope(request_id: Optional[str]) -> Iterator[str]:
+    token = set_request_id(request_id)
+    try:
+        yield _request_id.get()
+    finally:
+        _request_id.reset(token)
+
+
+def configure_logging(
+    path: Path,
+    level: Union[int, str] = logging.DEBUG,
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 3,
+    background: bool = True,
+    logger_name: str = LOGGER_NAME,
+) -> logging.Logger:
+    global _atexit_registered
+
+    logger = logging.getLogger(logger_name)
+    with _lock:
+        _shutdown_locked(logger_name)
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True,
+        )
+        file_handler.setFormatter(logging.Formatter(LOG_FORMAT, LOG_DATEFMT))
+
+        # request_id проставляется в потоке вызывающего: в потоке-писателе контекст другой
+        id_filter = RequestIdFilter()
+        if background:
+            q: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+            front = logging.handlers.QueueHandler(q)
+            front.addFilter(id_filter)
+            listener = logging.handlers.QueueListener(q, file_handler, respect_handler_level=True)
+            listener.start()
+            _installed[logger_name] = (listener, [front, file_handler])
+        else:
+            front = file_handler
+            front.addFilter(id_filter)
+            _installed[logger_name] = (None, [file_handler])
+
+        logger.addHandler(front)
+        logger.setLevel(level)
+        logger.propagate = False
+
+        if not _atexit_registered:
+            atexit.register(_shutdown_all)
+            _atexit_registered = True
+    return logger
+
+
+def shutdown_logging(logger_name: str = LOGGER_NAME) -> None:
+    """Дописывает очередь и закрывает файлы."""
+    with _lock:
+        _shutdown_locked(logger_name)
+
+
+def _shutdown_all() -> None:
+    with _lock:
+        for name in list(_installed):
+            _shutdown_locked(name)
+
+
+def _shutdown_locked(logger_name: str) -> None:
+    listener, handlers = _installed.pop(logger_name, (None, []))
+    if listener is not None:
+        listener.stop()         # дожидается записи всего, что уже в очереди
+    logger = logging.getLogger(logger_name)
+    for h in handlers:
+        logger.removeHandler(h)
+        h.close()
@@ -0,0 +1,167 @@
+"""
+Контекст запроса: свой набор отладочных артефактов (ocr_raw.json, ocr_plain.txt, ...)
+на каждый запрос вместо общих файлов в outputs/.
+
+RequestContext(request_id, workspace=None)
+  put(name, data)       — сохранить артефакт (str | bytes)
+  get(name) → data|None — прочитать из памяти
+  location(name) → str  — где артефакт лежит (путь или "memory://<id>/<name>")
+
+workspace=None — артефакты только в памяти (веб: параллельные запросы не пишут
+на диск вовсе). workspace=Path — дополнительно пишутся в эту папку; папка
+принадлежит запросу, поэтому параллельные запросы друг другу не мешают.
+
+request_context(root=..., keep=...) — контекст-менеджер: создаёт контекст,
+делает его текущим (contextvars) и проставляет id запроса в лог. На выходе
+временная папка (keep=False) удаляется в фоновом потоке — вызывающий не ждёт rmtree.
+
+use_context(ctx) — сделать текущим уже созданный контекст (очистка — на вызывающем).
+
+current_context() — активный контекст; вне request_context возвращается
+контекст по умолчанию, пишущий в общую папку (старое поведение для CLI/отладки).
+"""
+
+import contextvars
+import queue
+import shutil
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Union
+from uuid import uuid4
+
+from infra.logging_setup import get_request_id, request_scope
+
+Artifact = Union[str, bytes]
+
+
+class RequestContext:
+    def __init__(self, request_id: Optional[str] = None, workspace: Optional[Path] = None) -> None:
+        self.request_id = request_id or uuid4().hex[:12]
+        self.workspace = Path(workspace) if workspace is not None else None
+        self._artifacts: Dict[str, Artifact] = {}
+        self._lock = threading.Lock()
+
+    def put(self, name: str, data: Artifact) -> None:
+        with self._lock:
+            self._artifacts[name] = data
+        if self.workspace is None:
+            return
+        path = self.workspace / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(data, bytes):
+            path.write_bytes(data)
+        else:
+            path.write_text(data, encoding="utf-8")
+
+    def get(self, name: str) -> Optional[Artifact]:
+        with self._lock:
+            return self._artifacts.get(name)
+
+    def names(self) -> list:
+        with self._lock:
+            return sorted(self._artifacts)
+
+    def location(self, name: str) -> str:
+        if self.workspace is None:
+            return f"memory://{self.request_id}/{name}"
+        return str(self.workspace / name)
+
+
+# ──────────────────────────────────────────
+# Текущий контекст
+# ──────────────────────────────────────────
+_current: contextvars.ContextVar[Optional[RequestContext]] = contextvars.ContextVar(
+    "lab_ai_request_context", default=None,
+)
+_default_context: Optional[RequestContext] = None
+
+
+def set_default_workspace(workspace: Optional[Path]) -> None:
+    """Куда пишет контекст по умолчанию (вне request_context)."""
+    global _default_context
+    _default_context = RequestContext(request_id="-", workspace=workspace)
+
+
+def current_context() -> RequestContext:
+    ctx = _current.get()
+    if ctx is not None:
+        return ctx
+    if _default_context is None:
+        set_default_workspace(None)
+    return _default_context  # type: ignore[return-value]
+
+
+@contextmanager
+def request_context(
+    root: Optional[Path] = None,
+    keep: bool = False,
+    request_id: Optional[str] = None,
+) -> Iterator[RequestContext]:
+    """
+    root=None — артефакты только в памяти; иначе — папка root/<request_id>.
+    keep=False — папка удаляется (асинхронно) по выходу из блока.
+    Без request_id берётся id из лога (например, id фоновой задачи), иначе новый.
+    """
+    inherited = get_request_id()
+    rid = request_id or (inherited if inherited != "-" else uuid4().hex[:12])
+    workspace = Path(root) / rid if root is not None else None
+    ctx = RequestContext(request_id=rid, workspace=workspace)
+    try:
+        with use_context(ctx):
+            yield ctx
+    finally:
+        if workspace is not None and not keep:
+            schedule_cleanup(workspace)
+
+
+@contextmanager
+def use_context(ctx: RequestContext) -> Iterator[RequestContext]:
+    """Сделать уже созданный контекст текущим (без очистки на выходе)."""
+    token = _current.set(ctx)
+    try:
+        with request_scope(ctx.request_id):
+            yield ctx
+    finally:
+        _current.reset(token)
+
+
+# ──────────────────────────────────────────
+# Асинхронная очистка
+# ──────────────────────────────────────────
+_cleanup_queue: "queue.SimpleQueue[Union[Path, threading.Event]]" = queue.SimpleQueue()
+_cleanup_thread: Optional[threading.Thread] = None
+_cleanup_lock = threading.Lock()
+
+
+def schedule_cleanup(path: Path) -> None:
+    """Удалить папку в фоновом потоке (ошибки удаления игнорируются)."""
+    _ensure_cleanup_thread()
+    _cleanup_queue.put(Path(path))
+
+
+def wait_for_cleanup(timeout: float = 5.0) -> bool:
+    """Дождаться, пока уже поставленные удаления выполнятся (тесты, завершение процесса)."""
+    _ensure_cleanup_thread()
+    done = threading.Event()
+    _cleanup_queue.put(done)
+    return done.wait(timeout)
+
+
+def _ensure_cleanup_thread() -> None:
+    global _cleanup_thread
+    with _cleanup_lock:
+        if _cleanup_thread is None or not _cleanup_thread.is_alive():
+            _cleanup_thread = threading.Thread(
+                target=_cleanup_loop, name="lab-ai-workspace-cleanup", daemon=True,
+            )
+            _cleanup_thread.start()
+
+
+def _cleanup_loop() -> None:
+    while True:
+        item = _cleanup_queue.get()
+        if isinstance(item, threading.Event):
+            item.set()
+            continue
+        shutil.rmtree(item, ignore_errors=True)
@@ -0,0 +1,139 @@
+"""
+Общий для процессов кэш токена (несколько WSGI-воркеров на одной машине).
+
+SharedTokenCache(path)
+  read() → (token, expires_at_ts) | None
+  write(token, expires_at_ts)             — атомарно (tmp + os.replace), права 0600
+  lock()                                  — межпроцессная блокировка (fcntl / msvcrt)
+  get_or_fetch(fetch, min_ttl_sec) → (token, expires_at_ts)
+      — токен из файла, если он проживёт ещё min_ttl_sec; иначе под блокировкой
+        обновляет ровно один процесс, остальные после блокировки читают его результат.
+
+Файл содержит секрет: создаётся с правами 0600, папка — 0700.
+Повреждённый/нечитаемый файл считается промахом.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+try:
+    import fcntl  # type: ignore
+except ImportError:  # Windows
+    fcntl = None  # type: ignore
+
+try:
+    import msvcrt  # type: ignore
+except ImportError:
+    msvcrt = None  # type: ignore
+
+TokenFetch = Callable[[], Tuple[str, float]]
+
+
+class SharedTokenCache:
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self._thread_lock = threading.Lock()   # flock не различает потоки одного процесса
+        self._hits = 0
+        self._fetches = 0
+
+    # ──────────────────────────────────────────
+    # Публичный API
+    # ──────────────────────────────────────────
+    def read(self) -> Optional[Tuple[str, float]]:
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            token = data["token"]
+            expires_at = float(data["expires_at"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+        if not token:
+            return None
+        return token, expires_at
+
+    def write(self, token: str, expires_at: float) -> None:
+        self._ensure_dir()
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        fd = os.open(str(tmp), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"token": token, "expires_at": expires_at, "pid": os.getpid()}, f)
+            os.replace(tmp, self.path)
+        except OSError:
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+            raise
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        self._ensure_dir()
+        with self._thread_lock:
+            fd = os.open(str(self.lock_path), os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                _lock_fd(fd)
+                try:
+                    yield
+                finally:
+                    _unlock_fd(fd)
+            finally:
+                os.close(fd)
+
+    def get_or_fetch(self, fetch: TokenFetch, min_ttl_sec: float = 0.0) -> Tuple[str, float]:
+        cached = self._fresh(min_ttl_sec)
+        if cached is not None:
+            return cached
+        with self.lock():
+            # пока ждали блокировку, другой процесс мог уже обновить
+            cached = self._fresh(min_ttl_sec)
+            if cached is not None:
+                return cached
+            token, expires_at = fetch()
+            self._fetches += 1
+            self.write(token, expires_at)
+            return token, expires_at
+
+    def stats(self) -> Dict[str, Any]:
+        return {"hits": self._hits, "fetches": self._fetches, "path": str(self.path)}
+
+    # ──────────────────────────────────────────
+    # Внутреннее
+    # ──────────────────────────────────────────
+    def _fresh(self, min_ttl_sec: float) -> Optional[Tuple[str, float]]:
+        cached = self.read()
+        if cached is not None and cached[1] - min_ttl_sec > time.time():
+            self._hits += 1
+            return cached
+        return None
+
+    def _ensure_dir(self) -> None:
+        if not self.path.parent.exists():
+            self.path.parent.mkdir(parents=True, exist_ok=True, mode=0o700)
+
+
+def _lock_fd(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    elif msvcrt is not None:
+        # LK_LOCK сам повторяет попытки ~10 с; ждём дольше, пока держатель обновляет токен
+        os.lseek(fd, 0, os.SEEK_SET)
+        while True:
+            try:
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+
+
+def _unlock_fd(fd: int) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    elif msvcrt is not None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,206 @@
+"""
+Строки и колонки страницы по рамкам слов Vision OCR (boundingBox).
+
+ocr_result_to_plaintext склеивает fullText / lines[].text — геометрия теряется:
+колонки соседних строк перемешиваются, значение уезжает от названия, и это потом
+чинят эвристики (окна по соседним строкам, сплиттер МЕДСИ). Здесь раскладка
+восстанавливается одним геометрическим проходом:
+
+layout_to_candidates(ocr_json) → str   TSV: name\\tvalue\\tref\\tunit
+  page_words(annotation)  — слова страницы с рамками (координаты приходят строками)
+  group_rows(words)       — строки: слова, отсортированные по центру y, за один
+                            проход попадают в открытую строку с наибольшим
+                            перекрытием по y (перекос страницы не рвёт строку)
+  split_cells(row)        — ячейки: слова строки по x, разрыв шире
+                            CELL_GAP × высоты слова — граница ячейки
+  layout_grid(rows)       — колонки: левые края ячеек, отсортированные по x,
+                            кластеризуются за один проход (допуск COLUMN_TOLERANCE
+                            × высоты строки); ячейка — в колонку своего левого края
+  роли колонок и разбор строк — как у модели таблиц (ocr.table_model.grid_to_candidates),
+  шапка ищется по всей странице: строки до неё (данные пациента) пропускаются.
+
+Ответ без рамок (только fullText) → "", вызывающий остаётся на текстовых эвристиках.
+"""
+
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from statistics import median
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+_PROJECT_ROOT = str(Path(__file__).resolve().parent.parent)
+if _PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, _PROJECT_ROOT)
+
+from ocr.table_model import grid_to_candidates
+
+ROW_OVERLAP = 0.5           # перекрытие по y (доля меньшей высоты), чтобы слово попало в строку
+CELL_GAP = 1.5              # разрыв между словами (в высотах слова) — граница ячейки
+COLUMN_TOLERANCE = 2.0      # шаг между левыми краями ячеек одной колонки (в высотах строки)
+MIN_CELLS = 2               # строки из одной ячейки (абзацы, заголовки) в сетку не идут
+
+
+@dataclass
+class Word:
+    text: str
+    x0: int
+    y0: int
+    x1: int
+    y1: int
+
+    @property
+    def height(self) -> int:
+        return max(1, self.y1 - self.y0)
+
+    @property
+    def cy(self) -> float:
+        return (self.y0 + self.y1) / 2.0
+
+
+@dataclass
+class Cell:
+    text: str
+    x0: int
+    x1: int
+    height: int
+
+
+def _int(x: Any, default: int = 0) -> int:
+    try:
+        return int(x)
+    except (TypeError, ValueError):
+        return default
+
+
+def _box(node: Dict[str, Any]) -> Optional[Tuple[int, int, int, int]]:
+    vertices = (node.get("boundingBox") or {}).get("vertices") or []
+    xs = [_int(v.get("x")) for v in vertices if isinstance(v, dict)]
+    ys = [_int(v.get("y")) for v in vertices if isinstance(v, dict)]
+    if not xs:
+        return None
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def iter_annotations(ocr_json: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """textAnnotation каждой страницы (один объект или {"result": {"pages": [...]}})."""
+    result = (ocr_json or {}).get("result") or {}
+    pages = result.get("pages") if isinstance(result.get("pages"), list) else [ocr_json]
+    for page in pages:
+        ta = ((page or {}).get("result") or page or {}).get("textAnnotation")
+        if isinstance(ta, dict):
+            yield ta
+
+
+def page_words(annotation: Dict[str, Any]) -> List[Word]:
+    """Слова с рамками; строка без words, но с рамкой — одним словом."""
+    words: List[Word] = []
+    for block in annotation.get("blocks") or []:
+        for line in (block or {}).get("lines") or []:
+            parts = (line or {}).get("words") or [line]
+            for part in parts:
+                text = " ".join(((part or {}).get("text") or "").split())
+                box = _box(part or {})
+                if text and box:
+                    words.append(Word(text, *box))
+    return words
+
+
+def group_rows(words: List[Word], min_overlap: float = ROW_OVERLAP) -> List[List[Word]]:
+    """Один проход по словам в порядке центра y; строки — сверху вниз, слова в них — слева направо."""
+    rows: List[List[Word]] = []
+    bands: List[List[float]] = []       # [сумма y0, сумма y1] слов строки — средняя полоса
+    active: List[int] = []              # строки, которые ещё может продолжить следующее слово
+    for w in sorted(words, key=lambda w: (w.cy, w.x0)):
+        best, best_overlap = -1, 0.0
+        still_active: List[int] = []
+        for i in active:
+            n = len(rows[i])
+            top, bottom = bands[i][0] / n, bands[i][1] / n
+            if bottom <= w.y0:
+                continue                # слово уже ниже строки — дальше она не растёт
+            still_active.append(i)
+            overlap = (min(bottom, w.y1) - max(top, w.y0)) / min(w.height, max(1.0, bottom - top))
+            if overlap >= min_overlap and overlap > best_overlap:
+                best, best_overlap = i, overlap
+        active = still_active
+        if best < 0:
+            rows.append([])
+            bands.append([0.0, 0.0])
+            best = len(rows) - 1
+            active.append(best)
+        rows[best].append(w)
+        bands[best][0] += w.y0
+        bands[best][1] += w.y1
+    return [sorted(row, key=lambda w: w.x0) for row in rows]
+
+
+def split_cells(row: List[Word], gap: float = CELL_GAP) -> List[Cell]:
+    """Слова строки (по x) → ячейки по широким разрывам."""
+    if not row:
+        return []
+    limit = gap * median(w.height for w in row)
+    cells: List[Cell] = []
+    current = [row[0]]
+    for prev, w in zip(row, row[1:]):
+        if w.x0 - prev.x1 > limit:
+            cells.append(_cell(current))
+            current = []
+        current.append(w)
+    cells.append(_cell(current))
+    return cells
+
+
+def _cell(words: List[Word]) -> Cell:
+    return Cell(
+        text=" ".join(w.text for w in words),
+        x0=words[0].x0, x1=max(w.x1 for w in words),
+        height=round(median(w.height for w in words)),
+    )
+
+
+def _column_starts(rows: List[List[Cell]], tolerance: float) -> List[Tuple[int, int]]:
+    """Диапазоны левых краёв колонок: один проход по отсортированным x0."""
+    starts = sorted(c.x0 for row in rows for c in row)
+    if not starts:
+        return []
+    step = tolerance * median(c.height for row in rows for c in row)
+    columns = [(starts[0], starts[0])]
+    for x in starts[1:]:
+        lo, hi = columns[-1]
+        if x - hi <= step:
+            columns[-1] = (lo, x)
+        else:
+            columns.append((x, x))
+    return columns
+
+
+def _column_of(x: int, columns: List[Tuple[int, int]]) -> int:
+    return min(range(len(columns)), key=lambda k: 0 if columns[k][0] <= x <= columns[k][1]
+               else min(abs(x - columns[k][0]), abs(x - columns[k][1])))
+
+
+def layout_grid(
+    rows: List[List[Word]],
+    gap: float = CELL_GAP,
+    tolerance: float = COLUMN_TOLERANCE,
+    min_cells: int = MIN_CELLS,
+) -> List[List[str]]:
+    """Строки слов → сетка строк × колонок (ячейки одной колонки в строке склеиваются)."""
+    cell_rows = [cells for cells in (split_cells(r, gap) for r in rows) if len(cells) >= min_cells]
+    columns = _column_starts(cell_rows, tolerance)
+    grid: List[List[str]] = []
+    for cells in cell_rows:
+        out = ["" for _ in columns]
+        for c in cells:
+            k = _column_of(c.x0, columns)
+            out[k] = f"{out[k]} {c.text}".strip()
+        grid.append(out)
+    return grid
+
+
+def layout_to_candidates(ocr_json: Dict[str, Any]) -> str:
+    lines: List[str] = []
+    for annotation in iter_annotations(ocr_json):
+        grid = layout_grid(group_rows(page_words(annotation)))
+        lines.extend(grid_to_candidates(grid, header_rows=len(grid)))
+    return "\n".join(lines)
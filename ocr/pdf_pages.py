@@ -0,0 +1,71 @@
+"""
+Разбиение PDF на страницы (группы страниц) для параллельного OCR.
+
+split_pdf_pages(pdf_bytes, pages_per_part=1, page_numbers=None) → List[PdfPart]
+  PdfPart.first_page — номер первой страницы части (с 0), pages — сколько страниц,
+  content — самостоятельный PDF из этих страниц.
+count_pdf_pages(pdf_bytes) → int
+
+Нужен pypdf; без него (или на битом PDF) бросается ValueError — вызывающий
+откатывается на OCR документа целиком.
+"""
+
+import io
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+
+@dataclass
+class PdfPart:
+    first_page: int
+    pages: int
+    content: bytes
+
+
+def _reader(pdf_bytes: bytes):
+    try:
+        from pypdf import PdfReader  # type: ignore
+    except ImportError as e:
+        raise ValueError("pypdf не установлен — разбиение PDF на страницы недоступно") from e
+    try:
+        return PdfReader(io.BytesIO(pdf_bytes))
+    except Exception as e:
+        raise ValueError(f"не удалось открыть PDF: {e}") from e
+
+
+def count_pdf_pages(pdf_bytes: bytes) -> int:
+    return len(_reader(pdf_bytes).pages)
+
+
+def split_pdf_pages(
+    pdf_bytes: bytes,
+    pages_per_part: int = 1,
+    page_numbers: Optional[Iterable[int]] = None,
+) -> List[PdfPart]:
+    """
+    page_numbers — только эти страницы (с 0); соседние номера группируются
+    по pages_per_part, разрывы начинают новую часть.
+    """
+    from pypdf import PdfWriter  # type: ignore
+
+    reader = _reader(pdf_bytes)
+    total = len(reader.pages)
+    wanted = sorted(set(range(total) if page_numbers is None else (p for p in page_numbers if 0 <= p < total)))
+    step = max(1, int(pages_per_part))
+
+    groups: List[List[int]] = []
+    for p in wanted:
+        if groups and len(groups[-1]) < step and groups[-1][-1] == p - 1:
+            groups[-1].append(p)
+        else:
+            groups.append([p])
+
+    parts: List[PdfPart] = []
+    for group in groups:
+        writer = PdfWriter()
+        for p in group:
+            writer.add_page(reader.pages[p])
+        buf = io.BytesIO()
+        writer.write(buf)
+        parts.append(PdfPart(first_page=group[0], pages=len(group), content=buf.getvalue()))
+    return parts
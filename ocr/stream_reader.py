@@ -0,0 +1,105 @@
+"""
+Потоковый разбор последовательности JSON-объектов (ответ getRecognition).
+
+Async OCR отдаёт результат как поток объектов — по одному на страницу:
+    {"result": {"textAnnotation": {...}, "page": "0"}}
+    {"result": {"textAnnotation": {...}, "page": "1"}}
+json.loads / raw_decode по всему телу видят только первый объект, а чтение
+тела целиком держит в памяти весь многостраничный скан.
+
+iter_json_objects(chunks) → Iterator[объект]
+  chunks — байты/строки в порядке поступления (например, Response.iter_content()).
+  Объект отдаётся, как только закрылась его последняя скобка; разобранный
+  кусок буфера отбрасывается, так что в памяти — примерно одна страница.
+
+Границы объекта ищутся счётчиком вложенности {}/[] с учётом строк и escape-
+последовательностей; сам разбор — json.loads на готовом куске.
+"""
+
+import codecs
+import json
+import re
+from typing import Any, Iterable, Iterator, Union
+
+# внутри строки важны только кавычка и обратный слэш; вне строки — скобки и кавычка
+_STRUCT_RE = re.compile(r'[{}\[\]"]')
+_IN_STRING_RE = re.compile(r'["\\]')
+_NON_SPACE_RE = re.compile(r"\S")
+
+
+class JsonStreamError(ValueError):
+    """Поток оборвался посреди объекта или содержит не-JSON."""
+
+
+def iter_json_objects(chunks: Iterable[Union[bytes, str]]) -> Iterator[Any]:
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    buf = ""
+    start = -1          # начало текущего объекта в buf (-1 — между объектами)
+    pos = 0             # до куда buf уже просканирован
+    depth = 0
+    in_string = False
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        buf += decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+
+        while True:
+            if start < 0:
+                # пропускаем пробелы/переводы строк между объектами
+                m = _NON_SPACE_RE.search(buf, pos)
+                if m is None:
+                    buf, pos = "", 0
+                    break
+                if m.group() not in "{[":
+                    raise JsonStreamError(f"ожидался объект JSON, получено {buf[m.start():m.start() + 40]!r}")
+                start = m.start()
+                pos = start
+
+            end = None
+            while True:
+                if in_string:
+                    m = _IN_STRING_RE.search(buf, pos)
+                    if m is None:
+                        pos = len(buf)
+                        break
+                    if m.group() == "\\":
+                        if m.end() >= len(buf):
+                            pos = m.start()     # escape на границе чанка — ждём продолжения
+                            break
+                        pos = m.end() + 1
+                        continue
+                    in_string = False
+                    pos = m.end()
+                    continue
+
+                m = _STRUCT_RE.search(buf, pos)
+                if m is None:
+                    pos = len(buf)
+                    break
+                ch = m.group()
+                pos = m.end()
+                if ch == '"':
+                    in_string = True
+                elif ch in "{[":
+                    depth += 1
+                else:
+                    depth -= 1
+                    if depth == 0:
+                        end = pos
+                        break
+
+            if end is None:
+                break   # объект не закончился — нужен следующий чанк
+
+            try:
+                obj = json.loads(buf[start:end])
+            except ValueError as e:
+                raise JsonStreamError(f"некорректный JSON-объект в потоке: {e}") from e
+            buf = buf[end:]
+            pos, start = 0, -1
+            yield obj
+
+    buf += decoder.decode(b"", final=True)
+    if start >= 0 or buf.strip():
+        raise JsonStreamError("поток оборвался посреди JSON-объекта")
@@ -0,0 +1,184 @@
+"""
+Поиск области таблицы результатов на фото/скане бланка: в OCR уходит только она.
+
+Шапка, логотипы, данные пациента и подвал бланка всё равно выбрасываются
+парсером (line_scorer.is_noise / is_header_service_line), а распознавать их —
+лишние байты и время OCR.
+
+find_table_region(img) → TableRegion | None
+  1. серое изображение уменьшается до analysis_width, бинаризуется (чернила = 255)
+  2. профиль строк: доля чернил в каждой строке пикселей (resize до ширины 1, BOX)
+  3. горизонтальные линейки — тонкие (<= rule_max_thickness_frac высоты) полосы строк
+     с непрерывным (разрывы до rule_max_break px) отрезком чернил >= rule_min_frac
+     ширины; строка текста так не выглядит — в ней пробелы между словами.
+     Меньше min_rules линеек → таблицы не нашли (None)
+  4. область между первой и последней линейкой расширяется по плотности текста
+     вверх/вниз, пока пробел между строками текста <= max_gap_frac высоты
+     (последняя строка таблицы часто без нижней линейки)
+  5. слева/справа обрезаются пустые поля
+
+crop_table_region(data, mime) → CropResult
+  Консервативно: если таблица не найдена, слишком низкая или обрезка экономит
+  меньше min_saving площади — возвращаются исходные байты (box=None).
+
+Только Pillow (без numpy); без него — исходные байты, skipped="pillow-missing".
+"""
+
+import io
+import re
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+Box = Tuple[int, int, int, int]     # left, top, right, bottom (right/bottom — не включительно)
+
+
+@dataclass
+class TableRegion:
+    box: Box
+    rules: int              # сколько горизонтальных линеек нашли
+    area_ratio: float       # площадь области / площадь изображения
+
+
+@dataclass
+class CropResult:
+    content: bytes
+    mime: str
+    bytes_in: int
+    bytes_out: int
+    box: Optional[Box] = None
+    area_ratio: float = 1.0
+    elapsed_ms: float = 0.0
+    skipped: str = ""
+
+
+def _runs(flags: List[bool]) -> List[Tuple[int, int]]:
+    """Отрезки подряд идущих True: [(начало, конец включительно)]."""
+    runs: List[Tuple[int, int]] = []
+    start = -1
+    for i, f in enumerate(flags):
+        if f and start < 0:
+            start = i
+        elif not f and start >= 0:
+            runs.append((start, i - 1))
+            start = -1
+    if start >= 0:
+        runs.append((start, len(flags) - 1))
+    return runs
+
+
+def _longest_ink_run(row: bytes, max_break: int) -> int:
+    """Самый длинный отрезок чернил (255) в строке пикселей; разрывы до max_break склеиваются."""
+    return max(len(part) for part in re.split(b"\x00{%d,}" % (max_break + 1), row))
+
+
+def _extend(text_rows: List[bool], edge: int, step: int, max_gap: int) -> int:
+    """От edge идём шагом step, пока пробелы между строками текста не длиннее max_gap."""
+    last = edge
+    y = edge + step
+    while 0 <= y < len(text_rows) and abs(y - last) <= max_gap + 1:
+        if text_rows[y]:
+            last = y
+        y += step
+    return last
+
+
+def find_table_region(
+    img,
+    analysis_width: int = 1000,
+    ink_threshold: int = 128,
+    rule_min_frac: float = 0.5,
+    rule_max_break: int = 3,
+    rule_max_thickness_frac: float = 0.006,
+    min_rules: int = 2,
+    text_row_frac: float = 0.01,
+    max_gap_frac: float = 0.025,
+    margin_frac: float = 0.01,
+    min_height_frac: float = 0.15,
+) -> Optional[TableRegion]:
+    from PIL import Image  # type: ignore
+
+    gray = img.convert("L")
+    scale = 1.0
+    if gray.width > analysis_width:
+        scale = gray.width / float(analysis_width)
+        gray = gray.resize((analysis_width, max(1, round(gray.height / scale))), Image.BOX)
+    w, h = gray.size
+    ink = gray.point([255 if v < ink_threshold else 0 for v in range(256)])
+
+    rows = [v / 255.0 for v in ink.resize((1, h), Image.BOX).tobytes()]
+    min_run = rule_min_frac * w
+    is_rule = [
+        r >= rule_min_frac and _longest_ink_run(ink.crop((0, y, w, y + 1)).tobytes(), rule_max_break) >= min_run
+        for y, r in enumerate(rows)
+    ]
+    max_thickness = max(1, round(rule_max_thickness_frac * h))
+    rules = [(a, b) for a, b in _runs(is_rule) if b - a + 1 <= max_thickness]
+    if len(rules) < min_rules:
+        return None
+
+    text_rows = [r >= text_row_frac for r in rows]
+    max_gap = max(1, round(max_gap_frac * h))
+    top = _extend(text_rows, rules[0][0], -1, max_gap)
+    bottom = _extend(text_rows, rules[-1][1], +1, max_gap)
+    if bottom - top + 1 < min_height_frac * h:
+        return None
+
+    band = ink.crop((0, top, w, bottom + 1)).resize((w, 1), Image.BOX)
+    cols = [i for i, v in enumerate(band.tobytes()) if v > 0]
+    left, right = (cols[0], cols[-1]) if cols else (0, w - 1)
+
+    margin = round(margin_frac * max(w, h))
+    left, top = max(0, left - margin), max(0, top - margin)
+    right, bottom = min(w, right + 1 + margin), min(h, bottom + 1 + margin)
+
+    full_w, full_h = img.size
+    box = (
+        max(0, int(left * scale)), max(0, int(top * scale)),
+        min(full_w, int(round(right * scale))), min(full_h, int(round(bottom * scale))),
+    )
+    area = (box[2] - box[0]) * (box[3] - box[1]) / float(full_w * full_h)
+    return TableRegion(box=box, rules=len(rules), area_ratio=round(area, 3))
+
+
+def crop_table_region(
+    data: bytes,
+    mime: str,
+    min_saving: float = 0.15,
+    jpeg_quality: int = 85,
+) -> CropResult:
+    started = time.perf_counter()
+
+    def unchanged(reason: str, area: float = 1.0) -> CropResult:
+        return CropResult(
+            content=data, mime=mime, bytes_in=len(data), bytes_out=len(data), area_ratio=area,
+            elapsed_ms=(time.perf_counter() - started) * 1000, skipped=reason,
+        )
+
+    try:
+        from PIL import Image  # type: ignore
+    except ImportError:
+        return unchanged("pillow-missing")
+    try:
+        img = Image.open(io.BytesIO(data))
+        img.load()
+    except Exception as e:
+        return unchanged(f"decode-failed: {e}")
+
+    region = find_table_region(img)
+    if region is None:
+        return unchanged("no-table")
+    if region.area_ratio > 1.0 - min_saving:
+        return unchanged("small-saving", region.area_ratio)
+
+    cropped = img.crop(region.box)
+    if cropped.mode not in ("RGB", "L"):
+        cropped = cropped.convert("RGB")
+    buf = io.BytesIO()
+    cropped.save(buf, format="JPEG", quality=int(jpeg_quality), optimize=True)
+    out = buf.getvalue()
+    return CropResult(
+        content=out, mime="image/jpeg", bytes_in=len(data), bytes_out=len(out),
+        box=region.box, area_ratio=region.area_ratio,
+        elapsed_ms=(time.perf_counter() - started) * 1000,
+    )
@@ -0,0 +1,177 @@
+"""
+Кандидаты (TSV) прямо из сетки ячеек модели Vision OCR "table".
+
+Модель "page" отдаёт свободный текст, и строки таблицы потом восстанавливаются
+эвристиками (helix_table_to_candidates, universal_extract, fallback-парсер).
+Модель "table" возвращает textAnnotation.tables[].cells[] с rowIndex/columnIndex —
+строки и колонки уже известны, остаётся понять, какая колонка что значит.
+
+tables_to_candidates(ocr_json) → str   TSV: name\\tvalue\\tref\\tunit
+  iter_tables(ocr_json)  — таблицы ответа (один объект или {"result": {"pages": [...]}})
+  table_grid(table)      — сетка строк × колонок (объединённые ячейки — в первую)
+  detect_columns(grid)   — роли колонок по шапке («Исследование / Результат / Ед. /
+                           Референс...»), без шапки — по содержимому колонок
+  grid_to_candidates(grid)
+
+Таблица без уверенно найденных колонок имени и значения пропускается — вызывающий
+откатывается на текстовые эвристики. Числа приходят строками (int64 в JSON) — int().
+"""
+
+import re
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+_PROJECT_ROOT = str(Path(__file__).resolve().parent.parent)
+if _PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, _PROJECT_ROOT)
+
+from parsers.lexer import extract_ref_text, parse_value_unit
+from parsers.line_scorer import is_header_service_line, is_noise
+from parsers.patterns import normalize_scientific_notation
+from parsers.unit_dictionary import is_valid_unit, normalize_unit
+
+HEADER_ROWS_MAX = 3         # шапку ищем в первых строках
+MIN_SHARE = 0.5             # доля строк, чтобы колонка без шапки получила роль
+
+# порядок важен: «Референсные значения» — это ref, а не value
+_HEADER_PATTERNS = {
+    "name": re.compile(r"исследован|показател|наименован|тест|анализ|параметр", re.IGNORECASE),
+    "ref": re.compile(r"референс|норм|интервал|диапазон", re.IGNORECASE),
+    "unit": re.compile(r"^\s*ед\b|единиц", re.IGNORECASE),
+    "value": re.compile(r"результат|значени", re.IGNORECASE),
+}
+_LETTERS_RE = re.compile(r"[A-Za-zА-Яа-яЁё]")
+_NUMBER_CELL_RE = re.compile(r"^\s*[↑↓+<>]?\s*-?\d+(?:[.,]\d+)?(?:\s*[*x×х]?\s*10\s*[\^*]\s*\d+)?\s*[↑↓HLhl*]?\s*$")
+
+
+@dataclass
+class TableColumns:
+    name: int
+    value: int
+    unit: Optional[int] = None
+    ref: Optional[int] = None
+
+
+def _int(x: Any, default: int = 0) -> int:
+    try:
+        return int(x)
+    except (TypeError, ValueError):
+        return default
+
+
+def iter_tables(ocr_json: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    result = (ocr_json or {}).get("result") or {}
+    pages = result.get("pages") if isinstance(result.get("pages"), list) else [ocr_json]
+    for page in pages:
+        ta = ((page or {}).get("result") or page or {}).get("textAnnotation") or {}
+        for table in ta.get("tables") or []:
+            yield table
+
+
+def table_grid(table: Dict[str, Any]) -> List[List[str]]:
+    cells = table.get("cells") or []
+    rows = _int(table.get("rowCount")) or 1 + max((_int(c.get("rowIndex")) for c in cells), default=-1)
+    cols = _int(table.get("columnCount")) or 1 + max((_int(c.get("columnIndex")) for c in cells), default=-1)
+    grid = [["" for _ in range(cols)] for _ in range(rows)]
+    for c in cells:
+        r, k = _int(c.get("rowIndex")), _int(c.get("columnIndex"))
+        if 0 <= r < rows and 0 <= k < cols:
+            grid[r][k] = " ".join((c.get("text") or "").split())
+    return grid
+
+
+def _columns_from_header(grid: List[List[str]], header_rows: int) -> Optional[Tuple[TableColumns, int]]:
+    for r, row in enumerate(grid[:header_rows]):
+        roles: Dict[str, int] = {}
+        for k, cell in enumerate(row):
+            for role, pattern in _HEADER_PATTERNS.items():
+                if role not in roles and cell and pattern.search(cell):
+                    roles[role] = k
+                    break
+        if "name" in roles and "value" in roles:
+            return TableColumns(roles["name"], roles["value"], roles.get("unit"), roles.get("ref")), r + 1
+    return None
+
+
+def _share(grid: List[List[str]], col: int, test) -> float:
+    filled = [row[col] for row in grid if row[col]]
+    if not filled:
+        return 0.0
+    return sum(1 for cell in filled if test(cell)) / len(filled)
+
+
+def _is_number(cell: str) -> bool:
+    return bool(_NUMBER_CELL_RE.match(normalize_scientific_notation(cell)))
+
+
+def _is_ref(cell: str) -> bool:
+    return bool(extract_ref_text(cell)) and not _is_number(cell)
+
+
+def _is_unit(cell: str) -> bool:
+    return is_valid_unit(normalize_scientific_notation(cell).strip(".,;:()"))
+
+
+def _columns_from_content(grid: List[List[str]]) -> Optional[TableColumns]:
+    cols = len(grid[0]) if grid else 0
+    if cols < 2:
+        return None
+    numeric = [_share(grid, k, _is_number) for k in range(cols)]
+    value = max(range(cols), key=lambda k: numeric[k])
+    if numeric[value] < MIN_SHARE:
+        return None
+    letters = [_share(grid, k, lambda c: bool(_LETTERS_RE.search(c)) and not _is_unit(c)) for k in range(cols)]
+    name_cols = [k for k in range(cols) if k != value and letters[k] >= MIN_SHARE]
+    if not name_cols:
+        return None
+
+    def best(test) -> Optional[int]:
+        shares = {k: _share(grid, k, test) for k in range(cols) if k not in (value, name_cols[0])}
+        k = max(shares, key=shares.get) if shares else None
+        return k if k is not None and shares[k] >= MIN_SHARE else None
+
+    ref = best(_is_ref)
+    unit = best(_is_unit)
+    return TableColumns(name_cols[0], value, unit if unit != ref else None, ref)
+
+
+def detect_columns(
+    grid: List[List[str]], header_rows: int = HEADER_ROWS_MAX,
+) -> Optional[Tuple[TableColumns, int]]:
+    """(роли колонок, сколько строк до конца шапки пропустить) или None."""
+    if not grid:
+        return None
+    found = _columns_from_header(grid, header_rows)
+    if found:
+        return found
+    cols = _columns_from_content(grid)
+    return (cols, 0) if cols else None
+
+
+def grid_to_candidates(grid: List[List[str]], header_rows: int = HEADER_ROWS_MAX) -> List[str]:
+    found = detect_columns(grid, header_rows)
+    if not found:
+        return []
+    cols, skip = found
+    out: List[str] = []
+    for row in grid[skip:]:
+        name = row[cols.name]
+        if not name or not _LETTERS_RE.search(name) or is_noise(name) or is_header_service_line(name):
+            continue
+        value, value_unit = parse_value_unit(row[cols.value])
+        if value is None:
+            continue        # качественный результат / пустая ячейка
+        ref = extract_ref_text(row[cols.ref]) if cols.ref is not None else ""
+        unit = normalize_scientific_notation(row[cols.unit]).strip() if cols.unit is not None else ""
+        unit = normalize_unit(unit or value_unit) if (unit or value_unit) else ""
+        out.append(f"{name}\t{value:g}\t{ref}\t{unit}".strip())
+    return out
+
+
+def tables_to_candidates(ocr_json: Dict[str, Any]) -> str:
+    lines: List[str] = []
+    for table in iter_tables(ocr_json):
+        lines.extend(grid_to_candidates(table_grid(table)))
+    return "\n".join(lines)
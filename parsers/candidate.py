@@ -0,0 +1,193 @@
+"""
+Кандидат в показатель — запись, которую экстракторы (helix, universal, МЕДСИ,
+таблицы / раскладка OCR) передают сборщику Item (engine.items_from_candidates).
+
+Раньше кандидаты ходили TSV-строками "name\\tvalue\\tref\\tunit": экстрактор
+форматировал значение через {value:g} (теряя знаки после 6-й значащей цифры),
+сборщик резал строку обратно, заново разбирал число и чинил прилипшие единицы.
+Теперь между ними Candidate, а TSV нужен только для отладочных артефактов и
+строковых API (universal_extract, helix_table_to_candidates, ...).
+
+    Candidate(name, value, ref, unit)   — value: float | None, ref — текст референса
+    candidates_to_tsv(cands)            — TSV для артефактов / строковых API
+    parse_tsv(text)                     — TSV (вставленный текст, таблицы OCR, кэш) → кандидаты,
+                                          с починкой разбитых *10^N и прилипших единиц
+    dedup_candidates(cands)             — без повторов, порядок сохраняется
+"""
+
+from typing import Iterable, List, Optional, Tuple
+
+from parsers import patterns as P
+
+
+class Candidate:
+    """Показатель, как его нашёл экстрактор: имя, значение, референс, единица."""
+
+    __slots__ = ("name", "value", "ref", "unit")
+
+    def __init__(self, name: str, value: Optional[float], ref: str = "", unit: str = "") -> None:
+        self.name = name
+        self.value = value
+        self.ref = ref
+        self.unit = unit
+
+    def key(self) -> Tuple[str, Optional[float], str, str]:
+        return P.collapse_spaces(self.name), self.value, P.collapse_spaces(self.ref), P.collapse_spaces(self.unit)
+
+    def to_tsv(self) -> str:
+        return f"{self.name}\t{format_value(self.value)}\t{self.ref}\t{self.unit}".strip()
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Candidate):
+            return NotImplemented
+        return (self.name, self.value, self.ref, self.unit) == (other.name, other.value, other.ref, other.unit)
+
+    def __repr__(self) -> str:
+        return f"Candidate({self.name!r}, {self.value!r}, {self.ref!r}, {self.unit!r})"
+
+
+def format_value(value: Optional[float]) -> str:
+    """Кратчайшая запись без потерь: 145.0 → "145", 8.23 → "8.23", 1234567.8 → "1234567.8"."""
+    if value is None:
+        return ""
+    s = repr(value)
+    return s[:-2] if s.endswith(".0") else s
+
+
+def candidates_to_tsv(cands: Iterable[Candidate]) -> str:
+    return "\n".join(c.to_tsv() for c in cands).strip()
+
+
+def dedup_candidates(cands: Iterable[Candidate]) -> List[Candidate]:
+    """Повторы (с точностью до пробелов) убираются, первый сохраняется."""
+    seen = set()
+    out: List[Candidate] = []
+    for c in cands:
+        k = c.key()
+        if not k[0] or k in seen:
+            continue
+        seen.add(k)
+        out.append(c)
+    return out
+
+
+# ──────────────────────────────────────────────
+# TSV → кандидаты (починка того, что склеилось в тексте)
+# ──────────────────────────────────────────────
+def _split_ref_and_unit(ref_text: str) -> Tuple[str, str]:
+    t = (ref_text or "").strip()
+    if not t:
+        return "", ""
+    t_norm = t.replace("—", "-").replace("–", "-")
+    t_norm = P.collapse_spaces(t_norm)
+    m = P.TRAILING_UNIT.match(t_norm)
+    if not m:
+        return t, ""
+    left = m.group(1).strip()
+    unit = m.group(2).strip()
+
+    left_check = left.replace(",", ".").replace(" ", "")
+    left_check = left_check.replace("≤", "<=").replace("≥", ">=")
+
+    if P.REF_RANGE_EXACT.match(left_check) or P.REF_COMPARE_EXACT.match(left_check):
+        return left, unit
+
+    return t, ""
+
+
+def _split_value_and_unit(val_text: str) -> Tuple[str, str]:
+    t = P.collapse_spaces(val_text)
+    if not t:
+        return "", ""
+    m = P.VALUE_WORD.match(t)
+    if not m:
+        return t, ""
+    return m.group(1), m.group(2)
+
+
+def _fix_broken_scientific_notation(raw_name: str, raw_val: str) -> Tuple[str, str]:
+    """
+    Исправляет случаи, когда значение разбито:
+    raw_name = "Лейкоциты (WBC) 8.23 *10^"
+    raw_val = "9"
+    Возвращает: ("Лейкоциты (WBC)", "8.23")
+    """
+    # Проверяем, есть ли в raw_name паттерн "*10^"
+    pow_match = P.POW_BEFORE.search(raw_name)
+    if pow_match:
+        # raw_val может быть степенью (цифра) или уже корректным значением
+        raw_val_stripped = raw_val.strip()
+        # Извлекаем число перед *10^
+        base_str = pow_match.group(1).replace(",", ".")
+        base_val = P.parse_float(base_str)
+        if base_val is not None:
+            # Удаляем из raw_name всё от числа до конца
+            name_clean = raw_name[:pow_match.start()].strip()
+            # Если raw_val - это цифра (степень), игнорируем её, берём base_str
+            # Если raw_val - это уже значение, оставляем его
+            if raw_val_stripped.isdigit() and len(raw_val_stripped) <= 2:
+                # Скорее всего это степень, игнорируем
+                return name_clean, base_str
+            else:
+                # Возможно, это уже значение
+                val_check = P.parse_float(raw_val_stripped)
+                if val_check is not None:
+                    return name_clean, raw_val_stripped
+                return name_clean, base_str
+    return raw_name, raw_val
+
+
+def parse_tsv_line(line: str) -> Optional[Candidate]:
+    """
+    Поддерживаем:
+      1) name\\tvalue\\tref\\tunit
+      2) name\\tvalue\\tref unit
+      3) name\\tvalue unit\\tref
+      4) name value *10^N\\t... (исправление разбитых значений)
+    """
+    parts = [p.strip() for p in line.split("\t")]
+    if len(parts) < 3:
+        return None
+
+    raw_name = parts[0]
+    raw_val = parts[1]
+    ref_text = parts[2]
+    unit = parts[3] if len(parts) >= 4 else ""
+
+    # Исправление разбитых значений с *10^
+    raw_name, raw_val = _fix_broken_scientific_notation(raw_name, raw_val)
+
+    # если unit прилип к value
+    if not unit:
+        raw_val2, unit2 = _split_value_and_unit(raw_val)
+        if unit2:
+            raw_val = raw_val2
+            unit = unit2
+
+    # если unit прилип к ref
+    if not unit:
+        ref2, unit2 = _split_ref_and_unit(ref_text)
+        if unit2:
+            ref_text = ref2
+            unit = unit2
+
+    # Очистка единицы от повторяющихся референсов (например, "*10^9/л 0.02 - 0.50" -> "*10^9/л")
+    if unit:
+        # Удаляем из единицы паттерны, похожие на референсы (числа с дефисом или диапазоны)
+        unit_cleaned = P.UNIT_REF_TAIL.sub("", unit).strip()
+        # Если единица стала пустой или слишком короткой, оставляем оригинал
+        if unit_cleaned and len(unit_cleaned) >= 2:
+            unit = unit_cleaned
+
+    return Candidate(raw_name, P.parse_float(raw_val), ref_text, unit)
+
+
+def parse_tsv(text: str) -> List[Candidate]:
+    out: List[Candidate] = []
+    for line in (text or "").splitlines():
+        if not line.strip():
+            continue
+        cand = parse_tsv_line(line)
+        if cand is not None:
+            out.append(cand)
+    return out
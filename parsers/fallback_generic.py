@@ -7,7 +7,6 @@ Fallback-парсер: универсальный split_value_unit_ref(rest).
   - Fallback НЕ изменяет baseline-логику и работает только когда baseline провалился.
 """
 
-import re
 import sys
 from pathlib import Path
 from typing import Optional, List, Tuple
@@ -17,10 +16,15 @@ _PROJECT_ROOT = str(Path(__file__).resolve().parent.parent)
 if _PROJECT_ROOT not in sys.path:
     sys.path.insert(0, _PROJECT_ROOT)
 
-from engine import (
-    Item, Range, parse_float, parse_ref_range, status_by_range,
-    normalize_name, clean_raw_name, _dbg,
-)
+from parsers import patterns as P
+from parsers.lexer import COMPARATOR, NUMBER, RANGE, Token, tokenize
+from parsers.line_scorer import line_features
+from parsers.candidate import Candidate
+from engine import Item, candidate_to_item, parse_float
+
+
+def _is_fallback_ref(tok: Token) -> bool:
+    return tok.kind == RANGE or (tok.kind == COMPARATOR and tok.text[:1] in "<>")
 
 
 def split_value_unit_ref(rest: str) -> Tuple[Optional[float], str, str]:
@@ -33,75 +37,53 @@ def split_value_unit_ref(rest: str) -> Tuple[Optional[float], str, str]:
 
     Возвращает (value, unit, ref_text) или (None, "", "") если не удалось разобрать.
     """
-    rest = re.sub(r"\s+", " ", (rest or "").strip())
+    rest = P.collapse_spaces(rest)
     if not rest:
         return None, "", ""
 
-    # Нормализуем дефисы
-    rest = rest.replace("–", "-").replace("—", "-")
-
-    # Ищем референсный диапазон в конце строки
-    # Формат: числоA - числоB  или  числоA-числоB  (в конце строки)
-    ref_pattern = r"(\d+(?:\.\d+)?)\s*-\s*(\d+(?:\.\d+)?)\s*$"
-    ref_match = re.search(ref_pattern, rest)
-
-    if not ref_match:
-        # Попробуем формат <=N или >=N
-        comp_pattern = r"(<=|>=|<|>)\s*(\d+(?:\.\d+)?)\s*$"
-        comp_match = re.search(comp_pattern, rest)
-        if comp_match:
-            ref_text = f"{comp_match.group(1)}{comp_match.group(2)}"
-            before = rest[:comp_match.start()].strip()
-        else:
-            return None, "", ""
-    else:
-        ref_text = f"{ref_match.group(1)}-{ref_match.group(2)}"
-        before = rest[:ref_match.start()].strip()
-
-    # Теперь из `before` извлекаем value и unit
-    # before может быть: "8.23 *10^9/л" или "28 мм/ч" или "120 г/л"
-    if not before:
-        return None, "", ref_text
-
-    # Сначала ищем число в начале
-    val_match = re.match(r"^([-+]?\d+(?:[.,]\d+)?)\s*(.*)", before)
-    if not val_match:
-        return None, "", ref_text
+    # Референс — последний токен строки: числоA - числоB, <=N, >=N, <N, >N.
+    # "до N", "≤N", "≥N" здесь референсом не считаются: fallback по ним строк не заводит
+    # (в line_scorer.has_ref_pattern они остаются признаком строки с референсом).
+    tokens = tokenize(rest)
+    if not tokens or not _is_fallback_ref(tokens[-1]):
+        return None, "", ""
+    ref = tokens[-1]
 
-    value = parse_float(val_match.group(1))
-    unit = val_match.group(2).strip()
+    # Значение — число в начале, единица — всё между ним и референсом
+    # (before может быть: "8.23 *10^9/л", "28 мм/ч", "120 г/л")
+    if len(tokens) == 1 or tokens[0].kind != NUMBER:
+        return None, "", ref.norm
+    value = tokens[0]
+    unit = rest[value.end:ref.start].strip()
 
-    return value, unit, ref_text
+    return value.value, unit, ref.norm
 
 
-def fallback_parse_line(line: str) -> Optional[Tuple[str, float, str, str, str]]:
+def fallback_parse_line(line: str) -> Optional[Tuple[str, float, str, str]]:
     """
     Пытается распарсить одну строку текста OCR.
 
     Возвращает (name, value, unit, ref_text) или None.
     Фильтр: строка должна содержать референсный диапазон.
     """
-    s = re.sub(r"\s+", " ", (line or "").strip())
+    s = P.collapse_spaces(line)
     if not s:
         return None
 
-    # Строка должна содержать хотя бы один диапазон (число-число)
-    if not re.search(r"\d+(?:\.\d+)?\s*-\s*\d+(?:\.\d+)?", s):
-        # Или формат <=/>= (более редкий)
-        if not re.search(r"(<=|>=|<|>)\s*\d+", s):
-            # Или формат «до число»
-            if not re.search(r"[Дд]о\s*\d+", s):
-                return None
+    # Строка должна содержать референс: число-число, <=/>= или «до число»
+    # (признаки строки — из кэша документа, если экстракторы её уже разбирали)
+    if not line_features(s).has_ref:
+        return None
 
     # Ищем первое число в строке — это начало данных (после имени)
-    num_match = re.search(r"(?<![A-Za-zА-Яа-я\-])([-+]?\d+(?:[.,]\d+)?)\s", s)
+    num_match = P.FIRST_NUMBER.search(s)
     if not num_match:
         return None
 
     name_part = s[:num_match.start()].strip()
     rest_part = s[num_match.start():].strip()
 
-    if not name_part or not re.search(r"[A-Za-zА-Яа-я]{2,}", name_part):
+    if not name_part or not P.LETTERS2.search(name_part):
         return None
 
     value, unit, ref_text = split_value_unit_ref(rest_part)
@@ -123,35 +105,12 @@ def fallback_parse_candidates(raw_text: str) -> List[Item]:
         if not line:
             continue
 
-        # Если есть табуляции — пробуем стандартный формат (name\tvalue\tref\tunit)
+        # Если есть табуляции — пробуем стандартный формат (name\tvalue\tref\tunit), без починок baseline
         if "\t" in line:
             parts = [p.strip() for p in line.split("\t")]
             if len(parts) >= 3:
-                raw_name = parts[0]
-                raw_val = parts[1]
-                ref_text = parts[2]
                 unit = parts[3] if len(parts) >= 4 else ""
-
-                raw_name_cleaned = clean_raw_name(raw_name)
-                name = normalize_name(raw_name)
-                if name == raw_name.replace(" ", "_").replace("-", "_").upper():
-                    name = normalize_name(raw_name_cleaned)
-
-                value = parse_float(raw_val)
-                ref = parse_ref_range(ref_text) if ref_text else None
-                status = status_by_range(value, ref)
-                ref_source = "референс лаборатории" if ref else "нет"
-
-                items.append(Item(
-                    raw_name=raw_name,
-                    name=name,
-                    value=value,
-                    unit=unit,
-                    ref_text=ref_text,
-                    ref=ref,
-                    ref_source=ref_source,
-                    status=status,
-                ))
+                items.append(candidate_to_item(Candidate(parts[0], parse_float(parts[1]), parts[2], unit)))
                 continue
 
         # Без табуляций — пробуем универсальный парсинг
@@ -160,29 +119,11 @@ def fallback_parse_candidates(raw_text: str) -> List[Item]:
             continue
 
         raw_name, value, unit, ref_text = result
-
-        raw_name_cleaned = clean_raw_name(raw_name)
-        name = normalize_name(raw_name)
-        if name == raw_name.replace(" ", "_").replace("-", "_").upper():
-            name = normalize_name(raw_name_cleaned)
-
-        ref = parse_ref_range(ref_text) if ref_text else None
-        status = status_by_range(value, ref)
-        ref_source = "референс лаборатории" if ref else "нет"
-
-        items.append(Item(
-            raw_name=raw_name,
-            name=name,
-            value=value,
-            unit=unit,
-            ref_text=ref_text,
-            ref=ref,
-            ref_source=ref_source,
-            status=status,
-        ))
+        items.append(candidate_to_item(Candidate(raw_name, value, ref_text, unit)))
 
     return items
 
 
-
-
+def fallback_items_from_candidates(candidates: List[Candidate]) -> List[Item]:
+    """Fallback для кандидатов экстракторов: Item как есть, без дедупликации baseline."""
+    return [candidate_to_item(c) for c in candidates]
@@ -9,7 +9,7 @@ detect_lab_format(raw_text) → 'medsi' | 'helix' | 'generic'
   - generic: всё остальное
 """
 
-import re
+from parsers import patterns as P
 
 
 def detect_lab_format(raw_text: str) -> str:
@@ -35,7 +35,7 @@ def detect_lab_format(raw_text: str) -> str:
 
     # Табуляции Helix: "Исследование\tРезультат" / "Тест\tРезультат"
     for line in lines[:20]:
-        if re.search(r"(Исследование|Тест)\s*\t\s*Результат", line):
+        if P.HELIX_HEADER.search(line):
             return "helix"
 
     # Helix-двухстрочный: строка-имя (буквы) → строка-значение (число)
@@ -45,10 +45,10 @@ def detect_lab_format(raw_text: str) -> str:
         val_line = lines[i + 1].strip()
         if (
             name_line
-            and re.search(r"[A-Za-zА-Яа-я]{3,}", name_line)
-            and not re.match(r"^\d", name_line)
+            and P.LETTERS3.search(name_line)
+            and not P.DIGIT_START.match(name_line)
             and val_line
-            and re.match(r"^[↑↓+]?\s*\d", val_line)
+            and P.FLAGGED_NUMBER_START.match(val_line)
         ):
             helix_pair_count += 1
     if helix_pair_count >= 5:
@@ -0,0 +1,207 @@
+"""
+Лексер строк лабораторных результатов: строка → типизированные токены за один проход.
+
+Раньше каждый этап заново разбирал сырую строку своими регулярками: пробелы,
+тире и запятые, числа, диапазоны, *10^N, единицы, стрелки. Теперь строка
+сканируется один раз шаблоном patterns.TOKEN, а разборщики работают с токенами:
+
+    NUMBER      "145", "77,0", "+5"         value
+    RANGE       "130 - 160", "3,9–6,1"      value — нижняя, high — верхняя граница
+    COMPARATOR  "<= 5", "≥1", "до 20"       value — порог
+    POWER       "*10^9/л", "10*12", "х10⁹"  value — показатель степени
+    UNIT        "г/л", "%", "мм/ч"          слово, которое unit_dictionary считает единицей
+    CODE        "(WBC)", "NE%", "P-LCR"     код показателя
+    WORD        остальные слова, даты и время
+    FLAG        "↑", "↓", "!"
+
+norm — каноническая запись: "3.9-6.1", "<=5", "до 20" → "<20", "*10^9/л", код без
+скобок; для NUMBER/UNIT/WORD/FLAG — текст токена (в NUMBER запятая → точка).
+Пробелы и знаки препинания между токенами пропускаются; start/end — позиции
+в исходной строке, так что имя показателя — это s[:token.start].
+
+Разборщики поверх токенов:
+    tokenize(s)              — список токенов
+    ref_token(tokens)        — референс: первый диапазон, иначе первое сравнение
+    has_ref / has_unit       — есть ли в строке референс / единица (line_scorer)
+    extract_ref_text(s)      — референс строкой: "a-b", "<=x", "до x" → "<x"
+    parse_value_unit(s)      — (значение, единица) из строки-значения
+    split_row(s)             — однострочный ряд «имя значение [ед.] референс [ед.]»
+"""
+
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from parsers import patterns as P
+from parsers.unit_dictionary import is_valid_unit
+
+NUMBER = "NUMBER"
+RANGE = "RANGE"
+COMPARATOR = "COMPARATOR"
+POWER = "POWER"
+UNIT = "UNIT"
+CODE = "CODE"
+WORD = "WORD"
+FLAG = "FLAG"
+
+_OPS = {"≤": "<=", "≥": ">="}
+_SUPERSCRIPT_DIGITS = str.maketrans("⁰¹²³⁴⁵⁶⁷⁸⁹", "0123456789")
+
+
+class Token(NamedTuple):
+    kind: str
+    text: str                       # как в строке
+    start: int
+    end: int
+    norm: str                       # каноническая запись (см. модуль)
+    value: Optional[float] = None
+    high: Optional[float] = None
+
+
+@lru_cache(maxsize=4096)
+def _word_kind(text: str) -> str:
+    clean = text.strip(".,;:()")
+    return UNIT if clean and is_valid_unit(clean) else WORD
+
+
+def tokenize(s: str) -> List[Token]:
+    """Токены строки слева направо (один проход patterns.TOKEN)."""
+    out: List[Token] = []
+    for m in P.TOKEN.finditer(s or ""):
+        group = m.lastgroup
+        text = m.group()
+        start, end = m.span()
+        if group == "word":                     # ветки — по убыванию частоты
+            out.append(Token(_word_kind(text), text, start, end, text))
+        elif group == "number":
+            norm = text.replace(",", ".")
+            out.append(Token(NUMBER, text, start, end, norm, float(norm)))
+        elif group == "range":
+            lo = m.group("lo").replace(",", ".")
+            hi = m.group("hi").replace(",", ".")
+            out.append(Token(RANGE, text, start, end, f"{lo}-{hi}", float(lo), float(hi)))
+        elif group == "cmp":
+            if m.group("upto") is not None:
+                op, bound = "<", m.group("upto").replace(",", ".")
+            else:
+                op = _OPS.get(m.group("op"), m.group("op"))
+                bound = m.group("bound").replace(",", ".")
+            out.append(Token(COMPARATOR, text, start, end, f"{op}{bound}", float(bound)))
+        elif group == "power":
+            exp = m.group("exp") or m.group("sup").translate(_SUPERSCRIPT_DIGITS)
+            per = P.WS.sub("", m.group("per") or "")
+            out.append(Token(POWER, text, start, end, f"*10^{exp}{per}", float(exp)))
+        elif group == "code":
+            out.append(Token(CODE, text, start, end, m.group("inner") or text))
+        elif group == "flag":
+            out.append(Token(FLAG, text, start, end, text))
+        else:                                   # date: для разборщиков — просто слово
+            out.append(Token(WORD, text, start, end, text))
+    return out
+
+
+def _is_up_to(tok: Token) -> bool:
+    return tok.text[:1] in "Дд"
+
+
+def ref_token(tokens: Sequence[Token], up_to: bool = True) -> Optional[Token]:
+    """Референс строки: первый диапазон, иначе первое <,<=,>,>=; «до N» — последним (если up_to)."""
+    for tok in tokens:
+        if tok.kind == RANGE:
+            return tok
+    fallback = None
+    for tok in tokens:
+        if tok.kind == COMPARATOR:
+            if not _is_up_to(tok):
+                return tok
+            if up_to and fallback is None:
+                fallback = tok
+    return fallback
+
+
+def has_ref(tokens: Sequence[Token]) -> bool:
+    return any(tok.kind in (RANGE, COMPARATOR) for tok in tokens)
+
+
+def has_unit(tokens: Sequence[Token]) -> bool:
+    return any(
+        tok.kind == UNIT or (tok.kind == POWER and is_valid_unit(tok.norm)) for tok in tokens
+    )
+
+
+def extract_ref_text(s: str) -> str:
+    """Извлекает референсный диапазон из строки."""
+    tok = ref_token(tokenize(s))
+    return tok.norm if tok is not None else ""
+
+
+def _unit_text(tok: Token) -> str:
+    """Единица из токена: UNIT, *10^N или код, который есть в словаре единиц; слова ("норма", "x") — нет."""
+    if tok.kind == POWER:
+        return tok.norm
+    if tok.kind == UNIT or (tok.kind == CODE and is_valid_unit(tok.norm)):
+        return tok.text
+    return ""
+
+
+def _unit_after(tokens: Sequence[Token], i: int) -> str:
+    """Единица сразу после значения tokens[i] (флаги ↑↓ пропускаются)."""
+    for tok in tokens[i + 1:]:
+        if tok.kind != FLAG:
+            return _unit_text(tok)
+    return ""
+
+
+def parse_value_unit(s: str) -> Tuple[Optional[float], str]:
+    """
+    Значение и единица из строки-значения:
+      "8.23 *10^9/л" → (8.23, "*10^9/л"),  "28 мм/ч 2 - 20" → (28.0, "мм/ч"),  "77.0 %" → (77.0, "%")
+    Строка должна начинаться с числа (возможно, после ↑↓); иначе (None, "").
+    """
+    tokens = tokenize(s)
+    i = 0
+    while i < len(tokens) and tokens[i].kind == FLAG:
+        i += 1
+    if i == len(tokens) or tokens[i].kind != NUMBER:
+        return None, ""
+    return tokens[i].value, _unit_after(tokens, i)
+
+
+def split_row(
+    s: str, up_to: bool = True, tokens: Optional[Sequence[Token]] = None
+) -> Optional[Tuple[str, float, str, str]]:
+    """
+    Однострочный ряд → (имя, значение, референс, единица) или None:
+      "Скорость оседания 28 2-20 мм/ч"              → ("Скорость оседания", 28.0, "2-20", "мм/ч")
+      "Лейкоциты 8.23 *10^9/л 4.00 - 10.00"         → ("Лейкоциты", 8.23, "4.00-10.00", "*10^9/л")
+      "NE% 77.0 % 47.0 - 72.0"                      → ("NE%", 77.0, "47.0-72.0", "%")
+    Значение — число перед *10^N, иначе последнее число до референса; единица —
+    сразу после значения, иначе первое слово после референса.
+    tokens — уже готовые токены s (line_scorer.LineFeatures), чтобы не сканировать строку повторно.
+    """
+    if tokens is None:
+        tokens = tokenize(s)
+    ref = ref_token(tokens, up_to)
+    if ref is None:
+        return None
+    ref_i = tokens.index(ref)
+    left, right = tokens[:ref_i], tokens[ref_i + 1:]
+
+    value_i = next(
+        (k for k in range(len(left) - 1) if left[k].kind == NUMBER and left[k + 1].kind == POWER),
+        None,
+    )
+    if value_i is None:
+        value_i = next((k for k in range(len(left) - 1, -1, -1) if left[k].kind == NUMBER), None)
+        if value_i is None:
+            return None
+    unit = _unit_after(left, value_i)
+    right_unit = _unit_text(right[0]) if right else ""
+    if not unit:
+        unit = right_unit
+    elif left[value_i + 1].kind == POWER and "/" not in unit:
+        unit += right_unit                      # "6.5 *10^9 4-9 /л"
+
+    name = s[:left[value_i].start].strip()
+    if not name or not P.LETTER.search(name):
+        return None
+    return name, left[value_i].value, ref.norm, unit
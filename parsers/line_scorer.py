@@ -10,11 +10,22 @@ score_line(line) → float 0..1
     has_known_unit(line)    — содержит ли известную единицу измерения
     has_known_biomarker(line) — содержит ли известный биомаркер
     is_noise(line)          — является ли служебной / мусорной строкой
+
+Признаки строки (LineFeatures) считаются один раз: внутри document_scope() все
+проходы экстракторов (helix pass1/pass2, universal Pass 1 и окна Pass 2) и
+вложенные проверки (is_noise → is_header_service_line → has_known_biomarker)
+делят один объект на различную строку документа:
+    with document_scope():
+        feats = document_features(lines)    # пакетом на весь документ
+        if feats[i].looks_like_name: ...
 """
 
-import re
-from typing import Set
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
+from parsers import patterns as P
+from parsers.lexer import Token, has_ref, has_unit, tokenize
 from parsers.unit_dictionary import is_valid_unit
 
 # ──────────────────────────────────────────────
@@ -116,50 +127,38 @@ _NOISE_PREFIXES = (
 # ──────────────────────────────────────────────
 def has_numeric_value(line: str) -> bool:
     """Содержит ли строка числовое значение (целое или дробное)."""
-    return bool(re.search(r"(?<![A-Za-z])\d+(?:[.,]\d+)?", line))
+    return bool(P.HAS_NUMBER.search(line))
 
 
 def has_ref_pattern(line: str) -> bool:
-    """Содержит ли строка паттерн референса: число-число, <=N, >=N, до N."""
-    s = (line or "").replace("–", "-").replace("—", "-")
-    if re.search(r"\d+(?:[.,]\d+)?\s*-\s*\d+(?:[.,]\d+)?", s):
-        return True
-    if re.search(r"(<=|>=|<|>|≤|≥)\s*\d+(?:[.,]\d+)?", s):
-        return True
-    if re.search(r"(?:^|\s)[Дд]о\s*\d+(?:[.,]\d+)?", s):
-        return True
-    return False
+    """
+    Содержит ли строка паттерн референса: число-число, <=N, >=N, до N.
+    Для оценки строки "до N", ≤N, ≥N — тоже референс (как и раньше); строки fallback
+    (fallback_generic.split_value_unit_ref) заводит только по диапазону или <, >.
+    """
+    return line_features(line).has_ref
 
 
 def has_known_unit(line: str) -> bool:
-    """Содержит ли строка известную единицу измерения."""
-    s = (line or "").strip()
-    if not s:
-        return False
-    # Ищем слова и фрагменты, которые могут быть единицей
-    tokens = re.split(r"\s+", s)
-    for t in tokens:
-        t_clean = t.strip(".,;:()")
-        if t_clean and is_valid_unit(t_clean):
-            return True
-    # Специальная проверка: *10^N/л, 10*N/л
-    if re.search(r"10[\^*]\d+/л", s):
-        return True
-    return False
+    """Содержит ли строка известную единицу измерения (в т.ч. *10^N/л)."""
+    return line_features(line).has_unit
 
 
 def has_known_biomarker(line: str) -> bool:
     """Содержит ли строка известный биомаркер (код или русское название)."""
-    s = (line or "").strip()
+    return line_features(line).has_biomarker
+
+
+def _biomarker(s: str) -> bool:
     if not s:
         return False
     # Коды (латиница, в скобках или отдельно)
-    codes_in_line = re.findall(r"\b([A-Za-z][A-Za-z0-9\-]{1,8}(?:%|#)?)\b", s)
+    codes_in_line = P.BIOMARKER_CODE.findall(s)
     for code in codes_in_line:
         if code.upper() in _BIOMARKER_CODES:
             return True
     # Код в скобках: (WBC), (NEU%)
-    bracket_codes = re.findall(r"\(([A-Za-zА-Яа-я\-#%0-9]+)\)", s)
+    bracket_codes = P.BRACKET_CODE.findall(s)
     for code in bracket_codes:
         if code.upper().rstrip("#%") in _BIOMARKER_CODES:
             return True
@@ -188,66 +187,70 @@ def is_header_service_line(line: str) -> bool:
       - QR / штрихкод (длинная цифровая строка > 12 цифр)
       - ФИО пациента / врача (Иванов И.И.)
     """
-    s = (line or "").strip()
+    return line_features(line).is_header_service
+
+
+def _header_service(f: "LineFeatures") -> bool:
+    s = f.text
     if not s:
         return False  # пустые строки обрабатывает is_noise()
 
-    low = s.lower()
+    low = f.low
 
     # --- Телефон ---
-    if re.search(r"(\+7|8[\s\-]?\(?\d)[\d\s()\-]{7,}", s):
+    if P.PHONE.search(s):
         # Не фильтруем, если строка содержит биомаркер
-        if not has_known_biomarker(s):
+        if not f.has_biomarker:
             return True
 
     # --- Email ---
-    if re.search(r"[a-zA-Z0-9_.+\-]+@[a-zA-Z0-9\-]+\.[a-zA-Z]{2,}", s):
+    if P.EMAIL.search(s):
         return True
 
     # --- URL / сайт ---
-    if re.search(r"(https?://|www\.)", low):
+    if P.URL.search(low):
         return True
 
     # --- ИНН ---
-    if re.search(r"инн\s*\d{10,12}", low):
+    if P.INN.search(low):
         return True
 
     # --- ОГРН ---
-    if re.search(r"огрн\s*\d{13,15}", low):
+    if P.OGRN.search(low):
         return True
 
     # --- КПП ---
-    if re.search(r"кпп\s*\d{9}", low):
+    if P.KPP.search(low):
         return True
 
     # --- Адрес ---
-    if re.match(r"^(г\.|ул\.|пр\.|д\.|корп\.|стр\.|пом\.)", low):
+    if P.ADDRESS_PREFIX.match(low):
         return True
     if "адрес:" in low:
         return True
 
     # --- Номер заказа / направления (№ с 5+ цифрами) ---
-    if re.match(r"^№\s*\d{5,}", s):
+    if P.ORDER_NUMBER.match(s):
         return True
 
     # --- Дата/время БЕЗ биомаркера ---
     # Сначала проверяем строгие форматы «чистой даты» (вся строка — дата/время)
-    if re.match(r"^\d{4}-\d{2}-\d{2}(\s+\d{2}:\d{2}(:\d{2})?)?$", s):
+    if P.ISO_DATE_LINE.match(s):
         return True
-    if re.match(r"^\d{2}\.\d{2}\.\d{4}(\s+\d{2}:\d{2}(:\d{2})?)?$", s):
+    if P.RU_DATE_LINE.match(s):
         return True
     # Общая проверка: строка содержит дату, но не содержит биомаркер / единицу / реф
-    has_date = bool(re.search(r"\d{2}\.\d{2}\.\d{4}", s)) or bool(re.search(r"\d{4}-\d{2}-\d{2}", s))
-    if has_date and not has_known_biomarker(s):
-        if not has_known_unit(s) and not has_ref_pattern(s):
+    has_date = bool(P.ANY_DATE.search(s))
+    if has_date and not f.has_biomarker:
+        if not f.has_unit and not f.has_ref:
             return True
 
     # --- QR / штрихкод: только цифры, длина > 12 ---
-    if re.match(r"^\d{13,}$", s):
+    if P.BARCODE.match(s):
         return True
 
     # --- ФИО-формат: Иванов И.И. ---
-    if re.match(r"^[А-ЯЁ][а-яё]+\s+[А-ЯЁ]\.[А-ЯЁ]\.$", s):
+    if P.SHORT_FIO.match(s):
         return True
 
     return False
@@ -255,10 +258,14 @@ def is_header_service_line(line: str) -> bool:
 
 def is_noise(line: str) -> bool:
     """Является ли строка служебной / мусорной."""
-    s = (line or "").strip()
+    return line_features(line).is_noise
+
+
+def _noise(f: "LineFeatures") -> bool:
+    s = f.text
     if not s:
         return True
-    low = s.lower()
+    low = f.low
     # Слишком короткая строка без цифр
     if len(s) < 3:
         return True
@@ -267,13 +274,13 @@ def is_noise(line: str) -> bool:
         if low.startswith(prefix):
             return True
     # Только цифры (номера страниц, заказов и т.д.) без буквенного контекста
-    if re.match(r"^\d+$", s):
+    if P.DIGITS_ONLY.match(s):
         return True
     # Маркер страницы
-    if re.match(r"^---\s*PAGE\s+\d+\s*---$", s, re.IGNORECASE):
+    if P.PAGE_MARKER.fullmatch(s):
         return True
     # Расширенная проверка шапочных / служебных строк
-    if is_header_service_line(s):
+    if f.is_header_service:
         return True
     return False
 
@@ -287,14 +294,14 @@ def is_unit_only_line(line: str) -> bool:
     if not s or len(s) > 20:
         return False
     # Содержит числа (кроме *10^N) — не чистый unit
-    if has_numeric_value(s) and not re.match(r"^\*?10[\^*]\d+", s):
+    if has_numeric_value(s) and not P.POW_UNIT_PREFIX.match(s):
         return False
     # Проверяем через unit_dictionary
     s_clean = s.strip(".,;:()")
     if s_clean and is_valid_unit(s_clean):
         return True
     # Проверяем шаблоны: *10^N/л
-    if re.match(r"^\*?10\s*[\^*]\s*\d+/[а-яa-z]+$", s, re.IGNORECASE):
+    if P.POW_UNIT_LINE.match(s):
         return True
     return False
 
@@ -314,19 +321,23 @@ def score_line(line: str) -> float:
 
     Порог отсечения для кандидата в universal_extractor: >= 0.4
     """
-    s = (line or "").strip()
+    return line_features(line).score
+
+
+def _score(f: "LineFeatures") -> float:
+    s = f.text
     if not s:
         return 0.0
 
-    if is_noise(s):
+    if f.is_noise:
         return 0.0
 
     score = 0.0
 
     _has_num = has_numeric_value(s)
-    _has_ref = has_ref_pattern(s)
-    _has_unit = has_known_unit(s)
-    _has_bio = has_known_biomarker(s)
+    _has_ref = f.has_ref
+    _has_unit = f.has_unit
+    _has_bio = f.has_biomarker
 
     if _has_num:
         score += 0.2
@@ -342,9 +353,147 @@ def score_line(line: str) -> float:
 
     # Если строка начинается с числа (без имени) — вероятно, это value-line,
     # а не самодостаточный кандидат → снижаем
-    if re.match(r"^\s*[↑↓+]?\s*\d", s) and not _has_bio:
+    if P.FLAGGED_NUMBER_START.match(s) and not _has_bio:
         score = max(0.0, score - 0.1)
 
     return min(1.0, round(score, 2))
 
 
+# ──────────────────────────────────────────────
+# Признаки строки: один расчёт на строку за документ
+# ──────────────────────────────────────────────
+_UNSET = object()
+
+
+class LineFeatures:
+    """
+    Признаки одной строки (text — без пробелов по краям). Каждый считается при
+    первом обращении и запоминается; вложенные проверки (is_noise → шапка →
+    биомаркер, score → шум/референс/единица/биомаркер) берут уже готовые.
+    """
+
+    __slots__ = (
+        "text", "_low", "_tokens", "_has_ref", "_has_unit", "_biomarker",
+        "_header_service", "_noise", "_score", "_value_start", "_name",
+    )
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self._low = self._tokens = self._has_ref = self._has_unit = self._biomarker = _UNSET
+        self._header_service = self._noise = self._score = self._value_start = self._name = _UNSET
+
+    @property
+    def low(self) -> str:
+        if self._low is _UNSET:
+            self._low = self.text.lower()
+        return self._low
+
+    @property
+    def tokens(self) -> Tuple[Token, ...]:
+        if self._tokens is _UNSET:
+            self._tokens = tuple(tokenize(self.text))
+        return self._tokens
+
+    @property
+    def has_ref(self) -> bool:
+        if self._has_ref is _UNSET:
+            self._has_ref = has_ref(self.tokens)
+        return self._has_ref
+
+    @property
+    def has_unit(self) -> bool:
+        if self._has_unit is _UNSET:
+            self._has_unit = has_unit(self.tokens)
+        return self._has_unit
+
+    @property
+    def has_biomarker(self) -> bool:
+        if self._biomarker is _UNSET:
+            self._biomarker = _biomarker(self.text)
+        return self._biomarker
+
+    @property
+    def is_header_service(self) -> bool:
+        if self._header_service is _UNSET:
+            self._header_service = _header_service(self)
+        return self._header_service
+
+    @property
+    def is_noise(self) -> bool:
+        if self._noise is _UNSET:
+            self._noise = _noise(self)
+        return self._noise
+
+    @property
+    def score(self) -> float:
+        if self._score is _UNSET:
+            self._score = _score(self)
+        return self._score
+
+    @property
+    def starts_like_value(self) -> bool:
+        """Строка-значение: "145", "↑ 28 мм/ч"."""
+        if self._value_start is _UNSET:
+            self._value_start = bool(P.VALUE_START.match(self.text))
+        return self._value_start
+
+    @property
+    def looks_like_name(self) -> bool:
+        """Строка-имя показателя: не шум, не значение, есть хотя бы 2 буквы подряд."""
+        if self._name is _UNSET:
+            self._name = (
+                bool(self.text) and not self.is_noise and not self.starts_like_value
+                and bool(P.LETTERS2.search(self.text))
+            )
+        return self._name
+
+
+_DOCUMENT: contextvars.ContextVar[Optional[Dict[str, LineFeatures]]] = contextvars.ContextVar(
+    "line_features", default=None
+)
+
+
+@contextmanager
+def document_scope() -> Iterator[Dict[str, LineFeatures]]:
+    """
+    Кэш признаков строк на документ / запрос. Все проходы экстракторов внутри
+    блока (и потоки, скопировавшие контекст) делят один LineFeatures на строку.
+    Вложенный вызов использует внешний кэш.
+    """
+    cache = _DOCUMENT.get()
+    if cache is not None:
+        yield cache
+        return
+    cache = {}
+    token = _DOCUMENT.set(cache)
+    try:
+        yield cache
+    finally:
+        _DOCUMENT.reset(token)
+
+
+def line_features(line: str) -> LineFeatures:
+    """Признаки строки: из кэша документа (document_scope) или новый объект."""
+    text = (line or "").strip()
+    cache = _DOCUMENT.get()
+    if cache is None:
+        return LineFeatures(text)
+    feats = cache.get(text)
+    if feats is None:
+        feats = cache[text] = LineFeatures(text)
+    return feats
+
+
+def document_features(lines: Iterable[str]) -> List[LineFeatures]:
+    """Признаки всех строк документа (по порядку): одна запись на различную строку."""
+    cache = _DOCUMENT.get()
+    if cache is None:
+        cache = {}
+    out: List[LineFeatures] = []
+    for line in lines:
+        text = (line or "").strip()
+        feats = cache.get(text)
+        if feats is None:
+            feats = cache[text] = LineFeatures(text)
+        out.append(feats)
+    return out
@@ -14,7 +14,7 @@ Extractor кандидатов для лабораторных бланков М
 Этот модуль:
   - детектирует формат МЕДСИ
   - корректно разделяет ref и value
-  - формирует TSV-кандидаты (name\tvalue\tref\tunit)
+  - формирует кандидатов (parsers/candidate.py; medsi_inline_to_candidates — они же в TSV)
 
 ВАЖНО: helix_table_to_candidates и baseline-парсер НЕ затрагиваются.
 """
@@ -22,6 +22,9 @@ Extractor кандидатов для лабораторных бланков М
 import re
 from typing import Optional, Tuple, List
 
+from parsers import patterns as P
+from parsers.candidate import Candidate, candidates_to_tsv
+
 
 # ──────────────────────────────────────────────
 # Маппинг МЕДСИ-кодов → стандартные коды проекта
@@ -65,6 +68,8 @@ _MEDSI_UNITS = [
     "%",
 ]
 _UNITS_RE = "|".join(re.escape(u) for u in _MEDSI_UNITS)
+# единица, окружённая пробелами (чтобы не ловить % внутри кода), — в порядке _MEDSI_UNITS
+_UNIT_PATTERNS = [(u, re.compile(r"\s(" + re.escape(u) + r")\s")) for u in _MEDSI_UNITS]
 
 
 # ──────────────────────────────────────────────
@@ -86,8 +91,7 @@ def is_medsi_format(raw_text: str) -> bool:
         return False
 
     lines = raw_text.splitlines()
-    code_re = re.compile(r"^\s*\([A-Za-zА-Яа-я\-#%0-9]+\)\s")
-    code_count = sum(1 for l in lines if code_re.match(l))
+    code_count = sum(1 for l in lines if P.CODE_PREFIX_SPACE.match(l))
 
     has_10_9 = "10*9" in raw_text
     has_10_12 = "10*12" in raw_text
@@ -129,7 +133,7 @@ def _split_ref_and_value(ref_val: str) -> Tuple[Optional[str], Optional[str]]:
     # Нормализуем дефисы
     s = s.replace("–", "-").replace("—", "-")
 
-    m = re.match(r"^(\d+(?:\.\d+)?)\s*-\s*(.*)", s)
+    m = P.RANGE_LOW.match(s)
     if not m:
         return None, None
 
@@ -148,15 +152,14 @@ def _split_ref_and_value(ref_val: str) -> Tuple[Optional[str], Optional[str]]:
 
     if dp > 0:
         # Дробные числа: ref_high имеет ровно dp десятичных знаков
-        pat = re.compile(r"^(\d+\.\d{" + str(dp) + r"})(.*)")
-        m2 = pat.match(after_dash)
+        m2 = P.decimal_places(dp).match(after_dash)
         if m2:
             ref_high_str = m2.group(1)
             remainder = m2.group(2)
     else:
         # Целые числа
         # a) Проверяем, есть ли естественный разделитель (↑↓ или пробел после цифр)
-        flag_m = re.match(r"^(\d+)\s*([↑↓!])(.*)", after_dash)
+        flag_m = P.REF_FLAG_SPLIT.match(after_dash)
         if flag_m:
             ref_high_str = flag_m.group(1)
             remainder = flag_m.group(2) + flag_m.group(3)
@@ -169,7 +172,7 @@ def _split_ref_and_value(ref_val: str) -> Tuple[Optional[str], Optional[str]]:
                     continue
                 cand = after_dash[:nd]
                 rest = after_dash[nd:]
-                if not re.match(r"^\d+$", cand):
+                if not P.DIGITS_ONLY.match(cand):
                     continue
                 try:
                     if float(cand) >= ref_low:
@@ -183,11 +186,11 @@ def _split_ref_and_value(ref_val: str) -> Tuple[Optional[str], Optional[str]]:
         return s, None
 
     # Убираем флаги и пробелы из remainder → value
-    remainder = re.sub(r"^[\s↑↓!]+", "", remainder)
+    remainder = P.LEADING_FLAGS.sub("", remainder)
 
     value_str: Optional[str] = None
     if remainder:
-        val_m = re.match(r"^(\d+(?:[.,]\d+)?)", remainder)
+        val_m = P.LEADING_NUMBER.match(remainder)
         if val_m:
             value_str = val_m.group(1).replace(",", ".")
 
@@ -251,11 +254,11 @@ def _join_medsi_continuations(lines: List[str]) -> List[str]:
             continue
 
         # Строка-кандидат: начинается с (CODE) или с 'СОЭ'
-        starts_with_code = bool(re.match(r"^\([A-Za-zА-Яа-я\-#%0-9]+\)", line))
-        starts_with_soe = bool(re.match(r"^СОЭ\s", line, re.IGNORECASE))
+        starts_with_code = bool(P.CODE_PREFIX.match(line))
+        starts_with_soe = bool(P.SOE_START.match(line))
 
         # Также: строки без (CODE) но с единицей и ref
-        has_ref = bool(re.search(r"\d+(?:\.\d+)?\s*-\s*\d", line))
+        has_ref = bool(P.HAS_RANGE_START.search(line))
 
         if (starts_with_code or starts_with_soe) and not has_ref:
             # Неполная строка — склеиваем с последующими
@@ -268,7 +271,7 @@ def _join_medsi_continuations(lines: List[str]) -> List[str]:
                     continue
                 combined = combined + " " + next_l
                 j += 1
-                if re.search(r"\d+(?:\.\d+)?\s*-\s*\d", combined):
+                if P.HAS_RANGE_START.search(combined):
                     break
             result.append(combined)
             i = j
@@ -282,11 +285,11 @@ def _join_medsi_continuations(lines: List[str]) -> List[str]:
 # ──────────────────────────────────────────────
 # ПАРСЕР ОДНОЙ INLINE-СТРОКИ
 # ──────────────────────────────────────────────
-def _try_parse_inline(line: str) -> Optional[str]:
+def _try_parse_inline(line: str) -> Optional[Candidate]:
     """
     Парсит одну inline-строку pypdf МЕДСИ:
       "(WBC) Лейкоциты 10*9/л 4.50-11.004.78"
-    Возвращает TSV-кандидат: "name\\tvalue\\tref\\tunit"
+    Возвращает кандидата ("Лейкоциты (WBC)", 4.78, "4.50-11.00", "10*9/л")
     """
     line = line.strip()
     if not line or _is_noise(line):
@@ -294,9 +297,7 @@ def _try_parse_inline(line: str) -> Optional[str]:
 
     # Ищем единицу измерения с пробелом перед ней (чтобы не ловить % внутри кода)
     unit_match = None
-    for u in _MEDSI_UNITS:
-        # Ищем ' unit ' или ' unit' в конце → единица окружена пробелами
-        pattern = re.compile(r"\s(" + re.escape(u) + r")\s")
+    for u, pattern in _UNIT_PATTERNS:
         m = pattern.search(line)
         if m:
             unit_match = (m.start(1), m.end(1), u)
@@ -313,7 +314,7 @@ def _try_parse_inline(line: str) -> Optional[str]:
         return None
 
     # Проверяем наличие ref-диапазона
-    if not re.search(r"\d+(?:\.\d+)?\s*-\s*\d", after_unit):
+    if not P.HAS_RANGE_START.search(after_unit):
         return None
 
     ref_text, value_str = _split_ref_and_value(after_unit)
@@ -323,7 +324,7 @@ def _try_parse_inline(line: str) -> Optional[str]:
     # Очищаем имя: извлекаем код, маппим МЕДСИ→стандарт
     clean_name = _clean_medsi_name(name_part)
 
-    return f"{clean_name}\t{value_str}\t{ref_text}\t{unit}"
+    return Candidate(clean_name, P.parse_float(value_str), ref_text, unit)
 
 
 def _clean_medsi_name(raw_name: str) -> str:
@@ -333,7 +334,7 @@ def _clean_medsi_name(raw_name: str) -> str:
       '(WBC) Лейкоциты'    →  'Лейкоциты (WBC)'
       'СОЭ'                →  'СОЭ'
     """
-    m = re.match(r"^\(([A-Za-zА-Яа-я\-#%0-9]+)\)\s*(.*)", raw_name)
+    m = P.CODE_AND_NAME.match(raw_name)
     if m:
         raw_code = m.group(1)
         russian = m.group(2).strip()
@@ -348,7 +349,7 @@ def _clean_medsi_name(raw_name: str) -> str:
 # ──────────────────────────────────────────────
 # ПАРСЕР OCR MULTILINE (вторичный)
 # ──────────────────────────────────────────────
-def _parse_medsi_ocr_multiline(raw_text: str) -> List[str]:
+def _parse_medsi_ocr_multiline(raw_text: str) -> List[Candidate]:
     """
     Парсит OCR-формат МЕДСИ, где столбцы на отдельных строках:
       (WBC) Лейкоциты
@@ -357,16 +358,16 @@ def _parse_medsi_ocr_multiline(raw_text: str) -> List[str]:
       4.50-11.00
     """
     lines = [l.strip() for l in (raw_text or "").splitlines() if l.strip()]
-    lines = [l for l in lines if not re.match(r"^---\s*PAGE\s+\d+\s*---", l)]
+    lines = [l for l in lines if not P.PAGE_MARKER.match(l)]
 
-    candidates: List[str] = []
+    candidates: List[Candidate] = []
     i = 0
 
     while i < len(lines):
         line = lines[i]
 
-        is_name = bool(re.match(r"^\([A-Za-zА-Яа-я\-#%0-9]+\)", line))
-        is_soe = bool(re.match(r"^соэ$", line, re.IGNORECASE))
+        is_name = bool(P.CODE_PREFIX.match(line))
+        is_soe = bool(P.SOE_ONLY.match(line))
 
         if not (is_name or is_soe):
             i += 1
@@ -387,12 +388,12 @@ def _parse_medsi_ocr_multiline(raw_text: str) -> List[str]:
                 continue
 
             # Это новое имя? Прекращаем сбор
-            if re.match(r"^\([A-Za-zА-Яа-я\-#%0-9]+\)", nl):
+            if P.CODE_PREFIX.match(nl):
                 break
 
             # Значение? (число, возможно с "...")
             val_clean = nl.rstrip(".").replace(",", ".")
-            if value_str is None and re.match(r"^-?\d+(?:\.\d+)?$", val_clean):
+            if value_str is None and P.PLAIN_NUMBER.match(val_clean):
                 value_str = val_clean
                 j += 1
                 continue
@@ -409,14 +410,14 @@ def _parse_medsi_ocr_multiline(raw_text: str) -> List[str]:
                     continue
 
             # Референс? (число-число)
-            ref_m = re.match(r"^(\d+(?:\.\d+)?\s*-\s*\d+(?:\.\d+)?)", nl)
+            ref_m = P.RANGE_START.match(nl)
             if ref_m:
                 ref_text = ref_m.group(1).replace(" ", "")
                 j += 1
                 break
 
             # Продолжение имени (кириллические слова без цифр)
-            if re.match(r"^[а-яА-Я]", nl) and not re.search(r"\d", nl):
+            if P.CYRILLIC_START.match(nl) and not P.HAS_DIGIT.search(nl):
                 name = name + " " + nl
                 j += 1
                 continue
@@ -425,7 +426,7 @@ def _parse_medsi_ocr_multiline(raw_text: str) -> List[str]:
 
         if value_str and ref_text:
             clean_name = _clean_medsi_name(name)
-            candidates.append(f"{clean_name}\t{value_str}\t{ref_text}\t{unit or ''}")
+            candidates.append(Candidate(clean_name, P.parse_float(value_str), ref_text, unit or ""))
 
         i = j if j > i else i + 1
 
@@ -436,26 +437,28 @@ def _parse_medsi_ocr_multiline(raw_text: str) -> List[str]:
 # ГЛАВНАЯ ФУНКЦИЯ
 # ──────────────────────────────────────────────
 def medsi_inline_to_candidates(raw_text: str) -> str:
+    """Кандидаты МЕДСИ в TSV (name\\tvalue\\tref\\tunit), совместимом с parse_items_from_candidates."""
+    return candidates_to_tsv(medsi_candidates(raw_text))
+
+
+def medsi_candidates(raw_text: str) -> List[Candidate]:
     """
-    Извлекает TSV-кандидаты из текста МЕДСИ (любого формата).
+    Извлекает кандидатов из текста МЕДСИ (любого формата).
 
     Два прохода:
       1. Inline (pypdf): строки вида  '(CODE) Name UNIT REF+VALUE'
       2. Multiline (OCR): столбцы на отдельных строках
-
-    Возвращает TSV (name\\tvalue\\tref\\tunit), совместимый
-    с parse_items_from_candidates.
     """
     if not raw_text:
-        return ""
+        return []
 
     # Убираем маркеры страниц (если есть)
-    text = re.sub(r"---\s*PAGE\s+\d+\s*---", "", raw_text)
+    text = P.PAGE_MARKER.sub("", raw_text)
     lines_raw = [l for l in text.splitlines() if l.strip()]
 
     # ─── Pass 1: Inline (pypdf) ───
     joined = _join_medsi_continuations(lines_raw)
-    inline_cands: List[str] = []
+    inline_cands: List[Candidate] = []
     for line in joined:
         cand = _try_parse_inline(line)
         if cand:
@@ -463,7 +466,7 @@ def medsi_inline_to_candidates(raw_text: str) -> str:
 
     # Если inline дал >= 10 кандидатов — хватает
     if len(inline_cands) >= 10:
-        return "\n".join(inline_cands)
+        return inline_cands
 
     # ─── Pass 2: OCR multiline ───
     ocr_cands = _parse_medsi_ocr_multiline(raw_text)
@@ -471,14 +474,14 @@ def medsi_inline_to_candidates(raw_text: str) -> str:
     # Объединяем, дедуплицируем по имени (первый столбец)
     all_cands = inline_cands + ocr_cands
     seen: set = set()
-    result: List[str] = []
+    result: List[Candidate] = []
     for c in all_cands:
-        key = c.split("\t")[0].strip().lower()
+        key = c.name.strip().lower()
         if key not in seen:
             seen.add(key)
             result.append(c)
 
-    return "\n".join(result)
+    return result
 
 
 
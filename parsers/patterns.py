@@ -0,0 +1,187 @@
+"""
+Предкомпилированные регулярные выражения и общие помощники всех парсеров.
+
+Экстракторы (engine, universal_extractor, medsi_extractor, line_scorer,
+fallback_generic, lab_detector, quality, ocr.table_model) вызываются на каждую
+строку текста — шаблоны здесь компилируются один раз при импорте, а не ищутся
+в кэше re на каждый вызов re.search(строка, ...).
+
+Использование:
+    from parsers import patterns as P
+    if P.VALUE_START.match(line): ...
+
+Общие помощники (раньше были копиями в engine и universal_extractor):
+    collapse_spaces(s)               — пробелы подряд → один, обрезка краёв
+    normalize_scientific_notation(s) — 10*9, 10~9, 10⁹ → 10^9 (дефисы не трогает)
+    parse_float(x)                   — "6,1" / "↑145" → float | None
+    starts_like_value_line(s)        — строка начинается с числа (возможно, с ↑↓+)
+
+Референс, значение + единица и однострочные ряды разбираются по токенам — parsers/lexer.py.
+"""
+
+import re
+from functools import lru_cache
+from typing import Optional, Pattern
+
+_I = re.IGNORECASE
+
+# ──────────────────────────────────────────────
+# Пробелы, маркеры страниц
+# ──────────────────────────────────────────────
+WS = re.compile(r"\s+")
+BLANK_LINES = re.compile(r"\n{3,}")
+PAGE_MARKER = re.compile(r"---\s*PAGE\s+\d+\s*---", _I)   # match — в начале строки, sub — везде
+
+# ──────────────────────────────────────────────
+# Числа
+# ──────────────────────────────────────────────
+NON_NUMERIC = re.compile(r"[^\d\.\-]")
+HAS_NUMBER = re.compile(r"(?<![A-Za-z])\d+(?:[.,]\d+)?")
+HAS_DIGIT = re.compile(r"\d")
+DIGIT_START = re.compile(r"^\d")
+DIGITS_ONLY = re.compile(r"^\d+$")
+PLAIN_NUMBER = re.compile(r"^-?\d+(?:\.\d+)?$")
+LEADING_NUMBER = re.compile(r"^(\d+(?:[.,]\d+)?)")
+LEADING_INT = re.compile(r"^\s*\d+\s")
+FIRST_NUMBER = re.compile(r"(?<![A-Za-zА-Яа-я\-])([-+]?\d+(?:[.,]\d+)?)\s")   # первое число после имени
+VALUE_START = re.compile(r"^(?:[↑↓+]\s*)?\d")               # строка-значение: "145", "↑ 28"
+FLAGGED_NUMBER_START = re.compile(r"^\s*[↑↓+]?\s*\d")
+VALUE_WORD = re.compile(r"^([-+]?\d+(?:[.,]\d+)?)(?:\s+)([A-Za-zА-Яа-яµ/%\.\-]+)$")
+
+# ──────────────────────────────────────────────
+# Буквы
+# ──────────────────────────────────────────────
+LETTER = re.compile(r"[A-Za-zА-Яа-я]")
+LETTERS2 = re.compile(r"[A-Za-zА-Яа-я]{2,}")
+LETTERS3 = re.compile(r"[A-Za-zА-Яа-я]{3,}")
+CYRILLIC_START = re.compile(r"^[а-яА-Я]")
+
+# ──────────────────────────────────────────────
+# Степени 10: *10^9, 10*12, 10⁹
+# ──────────────────────────────────────────────
+SCI_NOTATION = re.compile(r"10\s*[~*]\s*(\d+)", _I)            # только ~ и *: "10 - 40" — это референс
+POW_BEFORE = re.compile(r"([-+]?\d+(?:[.,]\d+)?)\s*\*\s*10\s*\^", _I)  # "8.23 *10^" без степени
+POW_IN_NAME = re.compile(r"\*10\^\d+")
+POW_UNIT_PREFIX = re.compile(r"^\*?10[\^*]\d+")
+POW_UNIT_LINE = re.compile(r"^\*?10\s*[\^*]\s*\d+/[а-яa-z]+$", _I)   # строка — только *10^N/л
+POW_STAR_UNIT = re.compile(r"10\s*\*\s*(\d+)")
+POW_TIMES_UNIT = re.compile(r"[×хx]\s*10\s*\^\s*(\d+)", _I)
+
+# ──────────────────────────────────────────────
+# Единицы
+# ──────────────────────────────────────────────
+TRAILING_UNIT = re.compile(r"^(.+?)(?:\s+)([A-Za-zА-Яа-яµ/%\.\-]+)$")
+UNIT_REF_TAIL = re.compile(r"\s+\d+\.?\d*\s*[-–—]\s*\d+\.?\d*")
+
+# ──────────────────────────────────────────────
+# Референсы
+# ──────────────────────────────────────────────
+HAS_RANGE_START = re.compile(r"\d+(?:\.\d+)?\s*-\s*\d")
+RANGE_START = re.compile(r"^(\d+(?:\.\d+)?\s*-\s*\d+(?:\.\d+)?)")
+RANGE_LOW = re.compile(r"^(\d+(?:\.\d+)?)\s*-\s*(.*)")          # "4.50-11.004.78" → 4.50 + остаток
+# parse_ref_range: строка уже без пробелов
+REF_UP_TO_EXACT = re.compile(r"^[Дд]о\s*(\d+(?:\.\d+)?)$")
+REF_LE_EXACT = re.compile(r"^(<=|<|≤)(-?\d+(?:\.\d+)?)$")
+REF_GE_EXACT = re.compile(r"^(>=|>|≥)(-?\d+(?:\.\d+)?)$")
+REF_RANGE_EXACT = re.compile(r"^(-?\d+(?:\.\d+)?)-(-?\d+(?:\.\d+)?)$")
+REF_COMPARE_EXACT = re.compile(r"^(<=|>=|<|>)(-?\d+(\.\d+)?)$")
+REF_GLUED = re.compile(r"^\d{1,5}(\.\d+)?-\d{1,5}(\.\d+)?$")   # quality: нормальный ref без склейки
+
+# ──────────────────────────────────────────────
+# Коды и имена показателей
+# ──────────────────────────────────────────────
+CODE_IN_BRACKETS = re.compile(r"\(([A-Za-z]{2,6}%?)\)")
+CODE_WORD = re.compile(r"\b([A-Za-z]{2,6}%?)\b")
+BIOMARKER_CODE = re.compile(r"\b([A-Za-z][A-Za-z0-9\-]{1,8}(?:%|#)?)\b")
+BRACKET_CODE = re.compile(r"\(([A-Za-zА-Яа-я\-#%0-9]+)\)")
+BRACKETS = re.compile(r"\s*\(.*?\)\s*")
+CODE_PREFIX = re.compile(r"^\([A-Za-zА-Яа-я\-#%0-9]+\)")       # МЕДСИ: "(WBC) Лейкоциты"
+CODE_PREFIX_SPACE = re.compile(r"^\s*\([A-Za-zА-Яа-я\-#%0-9]+\)\s")
+CODE_AND_NAME = re.compile(r"^\(([A-Za-zА-Яа-я\-#%0-9]+)\)\s*(.*)")
+SOE_START = re.compile(r"^СОЭ\s", _I)
+SOE_ONLY = re.compile(r"^соэ$", _I)
+REF_FLAG_SPLIT = re.compile(r"^(\d+)\s*([↑↓!])(.*)")
+LEADING_FLAGS = re.compile(r"^[\s↑↓!]+")
+HELIX_HEADER = re.compile(r"(Исследование|Тест)\s*\t\s*Результат")
+
+# ──────────────────────────────────────────────
+# Служебные строки шапки (line_scorer.is_header_service_line)
+# ──────────────────────────────────────────────
+PHONE = re.compile(r"(\+7|8[\s\-]?\(?\d)[\d\s()\-]{7,}")
+EMAIL = re.compile(r"[a-zA-Z0-9_.+\-]+@[a-zA-Z0-9\-]+\.[a-zA-Z]{2,}")
+URL = re.compile(r"(https?://|www\.)")
+INN = re.compile(r"инн\s*\d{10,12}")
+OGRN = re.compile(r"огрн\s*\d{13,15}")
+KPP = re.compile(r"кпп\s*\d{9}")
+ADDRESS_PREFIX = re.compile(r"^(г\.|ул\.|пр\.|д\.|корп\.|стр\.|пом\.)")
+ORDER_NUMBER = re.compile(r"^№\s*\d{5,}")
+ISO_DATE_LINE = re.compile(r"^\d{4}-\d{2}-\d{2}(\s+\d{2}:\d{2}(:\d{2})?)?$")
+RU_DATE_LINE = re.compile(r"^\d{2}\.\d{2}\.\d{4}(\s+\d{2}:\d{2}(:\d{2})?)?$")
+ANY_DATE = re.compile(r"\d{2}\.\d{2}\.\d{4}|\d{4}-\d{2}-\d{2}")
+BARCODE = re.compile(r"^\d{13,}$")
+SHORT_FIO = re.compile(r"^[А-ЯЁ][а-яё]+\s+[А-ЯЁ]\.[А-ЯЁ]\.$")
+
+
+# ──────────────────────────────────────────────
+# Лексер строк (parsers/lexer.py): одна альтернация — один проход по строке.
+# Порядок важен: дата раньше чисел, степень раньше диапазона, код раньше слова.
+# ──────────────────────────────────────────────
+TOKEN = re.compile(
+    r"""
+    (?=\S)                 # пробелы отсекаются до перебора альтернатив (~35% времени)
+    (?:
+      (?P<date>(?:\d{1,2}\.\d{1,2}\.\d{2,4}|\d{4}-\d{2}-\d{2}|\d{1,2}:\d{2}(?::\d{2})?)(?!\d))
+    | (?P<power>(?:(?<![^\W\d_])[*×хx]\s*)?(?<![\d.,])10\s*
+          (?:[\^*~]\s*(?P<exp>\d+)|(?P<sup>[⁰¹²³⁴⁵⁶⁷⁸⁹]+))
+          (?P<per>\s*/\s*[^\W\d_]+)?)
+    | (?P<range>(?P<lo>-?\d+(?:[.,]\d+)?)\s*[-–—]\s*(?P<hi>-?\d+(?:[.,]\d+)?))
+    | (?P<cmp>(?P<op><=|>=|≤|≥|<|>)\s*(?P<bound>-?\d+(?:[.,]\d+)?)
+          |(?<![^\W\d_])[Дд]о\s*(?P<upto>\d+(?:[.,]\d+)?))
+    | (?P<code>\((?P<inner>[A-ZА-ЯЁ][A-Za-zА-ЯЁ0-9\-]{0,9}[#%]?)\)
+          |(?<![\w\-])[A-Z][A-Z0-9\-]*[A-Z0-9][#%]?(?![\w\-/]))   # "ME/мл" — единица, не код
+    | (?P<flag>[↑↓!])
+    | (?P<number>(?:(?<![\w.,])[-+])?\d+(?:[.,]\d+)?)
+    | (?P<word>(?:[^\W\d_]|[/%µ])(?:[^\W\d_]|[/%µ.'’\-]|\d+(?=[^\W\d_]))*)   # HbA1c — одно слово
+    )
+    """,
+    re.VERBOSE,
+)
+
+
+@lru_cache(maxsize=None)
+def decimal_places(dp: int) -> Pattern[str]:
+    """Число ровно с dp знаками после точки в начале строки + остаток (МЕДСИ: ref_high)."""
+    return re.compile(r"^(\d+\.\d{" + str(dp) + r"})(.*)")
+
+
+# ──────────────────────────────────────────────
+# Общие помощники
+# ──────────────────────────────────────────────
+_SUPERSCRIPTS = str.maketrans({
+    "¹": "^1", "²": "^2", "³": "^3", "⁴": "^4", "⁵": "^5",
+    "⁶": "^6", "⁷": "^7", "⁸": "^8", "⁹": "^9", "⁰": "^0",
+})
+
+
+def collapse_spaces(s: Optional[str]) -> str:
+    return WS.sub(" ", (s or "").strip())
+
+
+def normalize_scientific_notation(s: str) -> str:
+    """Нормализует варианты записи степени: 10*9, 10~9, 10⁹ → 10^9."""
+    s = s.translate(_SUPERSCRIPTS)
+    # Только ~ и * (без -), чтобы не ловить референсные диапазоны типа "10 - 40"
+    return SCI_NOTATION.sub(r"10^\1", s)
+
+
+def parse_float(x: str) -> Optional[float]:
+    x = (x or "").strip().replace(",", ".")
+    x = NON_NUMERIC.sub("", x)
+    try:
+        return float(x)
+    except Exception:
+        return None
+
+
+def starts_like_value_line(s: str) -> bool:
+    return bool(VALUE_START.match((s or "").strip()))
@@ -12,12 +12,19 @@ evaluate_parse_quality(items) -> dict с метриками:
   - unit_coverage_ratio: valid_unit_count / valid_value_count (доля с unit)
   - duplicate_name_count: кол-во дублей по имени
   - avg_confidence:       средний confidence (если поле задано)
+
+Полнота панели:
+  missing_expected_groups(names, panel_scores) → {группа: недостающие коды}
+  evaluate_completeness(items, panel_scores) → dict, "complete" — все ожидаемые
+      группы обнаруженных панелей уверенно найдены (дальнейший OCR ничего не добавит)
+  weak_items(items) → неуверенные показатели (кандидаты на повторный OCR их страниц)
 """
 
-import re
-from typing import List, Set, TYPE_CHECKING
+from typing import Dict, List, Set, TYPE_CHECKING
 from collections import Counter
 
+from parsers import patterns as P
+
 if TYPE_CHECKING:
     from engine import Item
 
@@ -36,6 +43,19 @@ CBC_THRESHOLD = 8        # сколько CBC-кодов нужно, чтобы
 CBC_EXPECTED_MIN = 15     # ожидаемый минимум для CBC
 GENERIC_EXPECTED_MIN = 8  # ожидаемый минимум для любого набора
 
+# Панель считается обнаруженной, если найдено >= PANEL_THRESHOLD её маркеров (см. engine.detect_panel)
+PANEL_THRESHOLD = 3
+
+# Ожидаемые группы показателей обнаруженной панели
+PANEL_EXPECTED_GROUPS: Dict[str, Dict[str, Set[str]]] = {
+    "cbc": {
+        "основные_показатели": {"WBC", "RBC", "HGB", "HCT", "PLT"},
+        "лейкоформула_проценты": {"NE%", "LY%", "MO%", "EO%", "BA%"},
+    },
+}
+
+COMPLETENESS_MIN_CONFIDENCE = 0.7  # «уверенно найден» — как отбор high_low в engine
+
 
 def _detect_expected_minimum(items: List["Item"]) -> int:
     """
@@ -56,7 +76,7 @@ def _is_suspicious_item(it: "Item") -> bool:
     # Проверка raw_name на мусор
     raw = it.raw_name or ""
     if any(ch in raw for ch in ['^', '*', '/']):
-        if not re.search(r"\*10\^\d+", raw):
+        if not P.POW_IN_NAME.search(raw):
             return True
 
     ref_str = it.ref_text or ""
@@ -65,10 +85,7 @@ def _is_suspicious_item(it: "Item") -> bool:
     # ref+value склейка: "150-400213"
     if ref_str and val_str:
         combined = ref_str.replace("-", "").replace(".", "")
-        if len(combined) > 10 and not re.match(
-            r"^\d{1,5}(\.\d+)?-\d{1,5}(\.\d+)?$",
-            ref_str.replace(" ", ""),
-        ):
+        if len(combined) > 10 and not P.REF_GLUED.match(ref_str.replace(" ", "")):
             return True
 
     # ref_text с кучей частей (>3 частей через пробел — мусор)
@@ -174,3 +191,54 @@ def evaluate_parse_quality(
         "duplicate_dropped_count": dedup_dropped_count if dedup_dropped_count is not None else 0,
         "sanity_outlier_count": sanity_outlier_count if sanity_outlier_count is not None else 0,
     }
+
+
+def missing_expected_groups(parsed_names: Set[str], panel_scores: Dict[str, int]) -> Dict[str, Set[str]]:
+    """Для обнаруженных панелей: группа → коды, которых нет в parsed_names."""
+    missing: Dict[str, Set[str]] = {}
+    for panel, groups in PANEL_EXPECTED_GROUPS.items():
+        if panel_scores.get(panel, 0) < PANEL_THRESHOLD:
+            continue
+        for group_name, expected_names in groups.items():
+            lacking = expected_names - parsed_names
+            if lacking:
+                missing[group_name] = lacking
+    return missing
+
+
+def weak_items(items: List["Item"], min_confidence: float = COMPLETENESS_MIN_CONFIDENCE) -> List["Item"]:
+    """Неуверенные показатели: нет value, suspicious или confidence < min_confidence."""
+    return [
+        it for it in items
+        if it.value is None
+        or _is_suspicious_item(it)
+        or getattr(it, "confidence", 0.0) < min_confidence
+    ]
+
+
+def evaluate_completeness(
+    items: List["Item"],
+    panel_scores: Dict[str, int],
+    min_confidence: float = COMPLETENESS_MIN_CONFIDENCE,
+) -> dict:
+    """
+    Полон ли разбор относительно ожидаемых групп обнаруженных панелей.
+
+    Учитываются только уверенные показатели: value есть, не suspicious,
+    confidence >= min_confidence. complete=True, если обнаружена хотя бы одна
+    панель с ожидаемыми группами и все её группы найдены целиком.
+    Панели без описанных групп (биохимия и т.п.) полноту не подтверждают.
+    """
+    weak = {id(it) for it in weak_items(items, min_confidence)}
+    confident = {it.name for it in items if id(it) not in weak}
+    panels = [
+        p for p in PANEL_EXPECTED_GROUPS
+        if panel_scores.get(p, 0) >= PANEL_THRESHOLD
+    ]
+    missing = missing_expected_groups(confident, panel_scores)
+    return {
+        "complete": bool(panels) and not missing,
+        "panels": panels,
+        "missing": {k: sorted(v) for k, v in missing.items()},
+        "confident_count": len(confident),
+    }
@@ -0,0 +1,304 @@
+"""
+Профилировщик регулярных выражений парсеров (включается по требованию).
+
+Шаблоны парсеров живут в модулях (parsers.patterns, medsi_extractor._UNIT_PATTERNS,
+ocr.table_model) и вызываются через атрибут модуля — на время профилирования
+они подменяются прокси, которые считают для каждой пары (шаблон, вызывающая
+функция): вызовы, совпадения, суммарное и максимальное время, вход самого
+медленного вызова (видно катастрофический backtracking).
+
+    with profile_regex() as prof:
+        engine._smart_to_candidates(text)
+    print(prof.report())
+
+Профиль — свой у каждого запроса (ContextVar): параллельные запросы не смешиваются,
+потоки OCR страниц видят профиль вызывающего через copy_context. Прокси стоят,
+пока активен хотя бы один профиль; без профиля шаблоны — исходные re.Pattern.
+Вызывающая функция — первая за пределами parsers.patterns; если шаблон вызван
+из общего помощника, он указывается после стрелки: "engine.clean_raw_name → collapse_spaces".
+"""
+
+import contextvars
+import importlib
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# модуль → глобальные имена с шаблонами (re.Pattern, tuple/list/dict из них)
+PROFILED_MODULES = {
+    "parsers.patterns": None,                       # None — все шаблоны модуля
+    "parsers.medsi_extractor": ("_UNIT_PATTERNS",),
+    "ocr.table_model": ("_HEADER_PATTERNS", "_LETTERS_RE", "_NUMBER_CELL_RE"),
+}
+_FACTORIES = {"parsers.patterns": ("decimal_places",)}   # функции, возвращающие шаблон
+_HELPERS_MODULE = "parsers.patterns"
+INPUT_PREVIEW = 120
+# кадры включений (до Python 3.12) приписываем объемлющей функции
+_INLINE_FRAMES = frozenset({"<listcomp>", "<genexpr>", "<dictcomp>", "<setcomp>"})
+
+_ACTIVE: contextvars.ContextVar[Optional["RegexProfile"]] = contextvars.ContextVar("regex_profile", default=None)
+
+
+@dataclass
+class PatternStats:
+    calls: int = 0
+    hits: int = 0
+    total_ns: int = 0
+    max_ns: int = 0
+    slowest_input: str = ""
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.calls if self.calls else 0.0
+
+
+class RegexProfile:
+    """Счётчики по (шаблон, вызывающая функция); потокобезопасно."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.stats: Dict[Tuple[str, str], PatternStats] = {}
+
+    def record(self, name: str, caller: str, elapsed_ns: int, hit: bool, text: Any) -> None:
+        with self._lock:
+            st = self.stats.get((name, caller))
+            if st is None:
+                st = self.stats[(name, caller)] = PatternStats()
+            st.calls += 1
+            st.hits += hit
+            st.total_ns += elapsed_ns
+            if elapsed_ns > st.max_ns:
+                st.max_ns = elapsed_ns
+                st.slowest_input = str(text)[:INPUT_PREVIEW]
+
+    def _grouped(self, index: int) -> Dict[str, PatternStats]:
+        out: Dict[str, PatternStats] = {}
+        for key, st in self.stats.items():
+            agg = out.setdefault(key[index], PatternStats())
+            agg.calls += st.calls
+            agg.hits += st.hits
+            agg.total_ns += st.total_ns
+            if st.max_ns > agg.max_ns:
+                agg.max_ns, agg.slowest_input = st.max_ns, st.slowest_input
+        return out
+
+    def by_pattern(self) -> Dict[str, PatternStats]:
+        return self._grouped(0)
+
+    def by_caller(self) -> Dict[str, PatternStats]:
+        return self._grouped(1)
+
+    def total_ms(self) -> float:
+        return sum(st.total_ns for st in self.stats.values()) / 1e6
+
+    def as_dict(self, top: int = 50) -> Dict[str, Any]:
+        ranked = sorted(self.stats.items(), key=lambda kv: kv[1].total_ns, reverse=True)[:top]
+        return {
+            "total_ms": round(self.total_ms(), 3),
+            "calls": sum(st.calls for st in self.stats.values()),
+            "top": [
+                {"pattern": name, "caller": caller, "calls": st.calls, "hit_rate": round(st.hit_rate, 3),
+                 "total_ms": round(st.total_ns / 1e6, 3), "max_us": round(st.max_ns / 1e3, 1),
+                 "slowest_input": st.slowest_input}
+                for (name, caller), st in ranked
+            ],
+        }
+
+    def report(self, top: int = 30) -> str:
+        """Три таблицы по убыванию суммарного времени: пара шаблон×функция, шаблоны, функции."""
+        lines = [f"regex: {sum(st.calls for st in self.stats.values())} calls, {self.total_ms():.2f} ms"]
+
+        def table(title: str, rows: List[Tuple[str, PatternStats]]) -> None:
+            lines.append("")
+            lines.append(f"{title} (top {min(top, len(rows))} of {len(rows)})")
+            lines.append(f"  {'total ms':>9} {'calls':>8} {'hit %':>6} {'mean us':>8} {'max us':>8}  name")
+            for label, st in sorted(rows, key=lambda r: r[1].total_ns, reverse=True)[:top]:
+                lines.append(
+                    f"  {st.total_ns / 1e6:>9.3f} {st.calls:>8} {100 * st.hit_rate:>6.1f} "
+                    f"{st.total_ns / st.calls / 1e3:>8.2f} {st.max_ns / 1e3:>8.1f}  {label}"
+                )
+
+        table("pattern × caller", [(f"{name} @ {caller}", st) for (name, caller), st in self.stats.items()])
+        table("pattern", list(self.by_pattern().items()))
+        table("caller", list(self.by_caller().items()))
+        slowest = sorted(self.by_pattern().items(), key=lambda kv: kv[1].max_ns, reverse=True)[:5]
+        if slowest:
+            lines.append("")
+            lines.append("slowest single calls")
+            for name, st in slowest:
+                lines.append(f"  {st.max_ns / 1e3:>9.1f} us  {name}: {st.slowest_input!r}")
+        return "\n".join(lines)
+
+
+def _caller() -> str:
+    # 0 — _caller, 1 — _PatternProxy._run, 2 — метод прокси, 3 — код, вызвавший шаблон
+    frame = sys._getframe(3)
+    helper = ""
+    while frame is not None and frame.f_globals.get("__name__") == _HELPERS_MODULE:
+        helper = helper or frame.f_code.co_name
+        frame = frame.f_back
+    while frame is not None and frame.f_back is not None and frame.f_code.co_name in _INLINE_FRAMES:
+        frame = frame.f_back
+    if frame is None:
+        return helper or "?"
+    where = f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_name}"
+    return f"{where} → {helper}" if helper else where
+
+
+def _hit(method: str, args: tuple, kwargs: dict, result: Any) -> bool:
+    if method == "sub":
+        return result != (args[1] if len(args) > 1 else kwargs.get("string"))
+    if method == "subn":
+        return result[1] > 0
+    if method == "split":
+        return len(result) > 1
+    return bool(result)
+
+
+class _PatternProxy:
+    """re.Pattern с замером: search/match/... пишут в активный профиль."""
+
+    __slots__ = ("_name", "_pattern")
+
+    def __init__(self, name: str, pattern: "re.Pattern[str]") -> None:
+        self._name = name
+        self._pattern = pattern
+
+    def _run(self, method: str, args: tuple, kwargs: dict) -> Any:
+        fn = getattr(self._pattern, method)
+        prof = _ACTIVE.get()
+        if prof is None:
+            return fn(*args, **kwargs)
+        started = time.perf_counter_ns()
+        result = fn(*args, **kwargs)
+        if method == "finditer":
+            result = list(result)
+        elapsed = time.perf_counter_ns() - started
+        text = args[1] if method in ("sub", "subn") and len(args) > 1 else (args[0] if args else "")
+        prof.record(self._name, _caller(), elapsed, _hit(method, args, kwargs, result), text)
+        return iter(result) if method == "finditer" else result
+
+    def search(self, *args: Any, **kwargs: Any) -> Any:
+        return self._run("search", args, kwargs)
+
+    def match(self, *args: Any, **kwargs: Any) -> Any:
+        return self._run("match", args, kwargs)
+
+    def fullmatch(self, *args: Any, **kwargs: Any) -> Any:
+        return self._run("fullmatch", args, kwargs)
+
+    def findall(self, *args: Any, **kwargs: Any) -> Any:
+        return self._run("findall", args, kwargs)
+
+    def finditer(self, *args: Any, **kwargs: Any) -> Any:
+        return self._run("finditer", args, kwargs)
+
+    def sub(self, *args: Any, **kwargs: Any) -> Any:
+        return self._run("sub", args, kwargs)
+
+    def subn(self, *args: Any, **kwargs: Any) -> Any:
+        return self._run("subn", args, kwargs)
+
+    def split(self, *args: Any, **kwargs: Any) -> Any:
+        return self._run("split", args, kwargs)
+
+    def __getattr__(self, item: str) -> Any:
+        return getattr(self._pattern, item)      # pattern, flags, groups, groupindex
+
+    def __repr__(self) -> str:
+        return f"<profiled {self._name}: {self._pattern!r}>"
+
+
+def _is_keyed_pair(value: Any) -> bool:
+    return isinstance(value, tuple) and len(value) == 2 and isinstance(value[0], str)
+
+
+def _wrap(name: str, value: Any) -> Any:
+    if isinstance(value, re.Pattern):
+        return _PatternProxy(name, value)
+    if _is_keyed_pair(value):
+        # пара (ключ, шаблон), как в _UNIT_PATTERNS: подписываем ключом, а не индексом
+        wrapped_pattern = _wrap(name, value[1])
+        return value if wrapped_pattern is value[1] else (value[0], wrapped_pattern)
+    if isinstance(value, (tuple, list)):
+        wrapped = [
+            _wrap(f"{name}[{v[0] if _is_keyed_pair(v) else i}]", v) for i, v in enumerate(value)
+        ]
+        changed = any(w is not v for w, v in zip(wrapped, value))
+        return type(value)(wrapped) if changed else value
+    if isinstance(value, dict) and any(isinstance(v, re.Pattern) for v in value.values()):
+        return {k: _wrap(f"{name}[{k}]", v) for k, v in value.items()}
+    return value
+
+
+def _wrap_factory(name: str, factory: Any) -> Any:
+    proxies: Dict[Any, _PatternProxy] = {}
+    lock = threading.Lock()
+
+    def wrapped(*args: Any) -> _PatternProxy:
+        with lock:
+            proxy = proxies.get(args)
+            if proxy is None:
+                label = f"{name}({', '.join(map(repr, args))})"
+                proxy = proxies[args] = _PatternProxy(label, factory(*args))
+            return proxy
+
+    return wrapped
+
+
+_INSTALL_LOCK = threading.Lock()
+_installed = 0
+_originals: List[Tuple[Any, str, Any]] = []     # (модуль, имя, исходное значение)
+
+
+def install() -> None:
+    """Подменить шаблоны прокси (со счётчиком вложенности; снимает uninstall)."""
+    global _installed
+    with _INSTALL_LOCK:
+        _installed += 1
+        if _installed > 1:
+            return
+        for mod_name, names in PROFILED_MODULES.items():
+            mod = importlib.import_module(mod_name)
+            short = mod_name.rsplit(".", 1)[-1]
+            for attr in names if names is not None else list(vars(mod)):
+                value = getattr(mod, attr, None)
+                label = attr if mod_name == _HELPERS_MODULE else f"{short}.{attr}"
+                wrapped = _wrap(label, value)
+                if wrapped is not value:
+                    _originals.append((mod, attr, value))
+                    setattr(mod, attr, wrapped)
+            for attr in _FACTORIES.get(mod_name, ()):
+                value = getattr(mod, attr)
+                _originals.append((mod, attr, value))
+                setattr(mod, attr, _wrap_factory(attr, value))
+
+
+def uninstall() -> None:
+    global _installed
+    with _INSTALL_LOCK:
+        if _installed == 0:
+            return
+        _installed -= 1
+        if _installed:
+            return
+        while _originals:
+            mod, attr, value = _originals.pop()
+            setattr(mod, attr, value)
+
+
+@contextmanager
+def profile_regex(profile: Optional[RegexProfile] = None) -> Iterator[RegexProfile]:
+    """Профилировать шаблоны парсеров в этом блоке (и в потоках, скопировавших контекст)."""
+    prof = profile if profile is not None else RegexProfile()
+    install()
+    token = _ACTIVE.set(prof)
+    try:
+        yield prof
+    finally:
+        _ACTIVE.reset(token)
+        uninstall()
@@ -0,0 +1,23 @@
+"""
+Общие фикстуры тестов.
+
+memory_context — тест идёт в своём контексте запроса в памяти: артефакты OCR
+(ocr_*.txt / .json) не попадают в outputs/ репозитория. Модули, которые гоняют OCR,
+подключают её для всех тестов:  pytestmark = pytest.mark.usefixtures("memory_context").
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from infra.request_context import request_context
+
+
+@pytest.fixture
+def memory_context():
+    with request_context() as ctx:
+        yield ctx
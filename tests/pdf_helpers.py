@@ -0,0 +1,27 @@
+"""
+Помощники тестов постраничного OCR: PDF из пустых страниц разной ширины.
+
+    make_pdf(n)          — n страниц, ширина страницы i — 100 + i
+    page_id(part_bytes)  — номер страницы по ширине первой страницы части:
+                           так фейковый OCR понимает, какую страницу ему прислали
+"""
+
+import io
+
+
+def make_pdf(n_pages: int) -> bytes:
+    import pypdf
+
+    writer = pypdf.PdfWriter()
+    for i in range(n_pages):
+        writer.add_blank_page(width=100 + i, height=200)
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
+
+
+def page_id(part_bytes: bytes) -> int:
+    import pypdf
+
+    reader = pypdf.PdfReader(io.BytesIO(part_bytes))
+    return int(float(reader.pages[0].mediabox.width)) - 100
@@ -0,0 +1,114 @@
+"""
+Тесты общего состояния задач и отчётов веб-слоя (app.py: JOB_STATE / REPORTS).
+
+Проверяем:
+  - статус и PDF доступны процессу, в очереди которого задачи нет (другой WSGI-воркер)
+  - запоздавший снимок «queued» не затирает на диске «done» (версии снимков)
+  - диск не принял отчёт → отчёт отдаётся из памяти процесса; по размеру отчёты не вытесняются
+  - неизвестный / некорректный id → 404 и редирект, без обращения к чужим путям
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import app as webapp
+from infra.disk_cache import DiskCache
+from infra.jobs import JobQueue
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    monkeypatch.setattr(webapp, "REPORTS", DiskCache(tmp_path / "reports"))
+    monkeypatch.setattr(webapp, "JOB_STATE", DiskCache(tmp_path / "jobs"))
+    monkeypatch.setattr(webapp, "_LOCAL_REPORTS", {})
+    jobs = JobQueue(workers=1, on_change=webapp._save_job_state)
+    monkeypatch.setattr(webapp, "JOBS", jobs)
+    monkeypatch.setattr(webapp, "generate_pdf_bytes",
+                        lambda persist, progress, **kw: (b"%PDF-fake", "report_test.pdf"))
+    yield webapp.app.test_client()
+    jobs.shutdown()
+
+
+def _submit(client):
+    resp = client.post("/generate", data={"sex": "м", "age": "40", "raw_text": "Гемоглобин 145"})
+    assert resp.status_code == 302
+    job_id = resp.headers["Location"].rstrip("/").rsplit("/", 1)[-1]
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        data = client.get(f"/jobs/{job_id}/status").get_json()
+        if data["status"] == "done":
+            return job_id, data
+        time.sleep(0.01)
+    raise AssertionError("задача не завершилась")
+
+
+class TestSharedState:
+
+    def test_other_worker_sees_job_and_report(self, client, monkeypatch):
+        job_id, data = _submit(client)
+        token = data["token"]
+
+        # «другой воркер»: своя пустая очередь, общий диск
+        other = JobQueue(workers=1)   # потоки не стартуют: submit не вызывается
+        monkeypatch.setattr(webapp, "JOBS", other)
+        assert other.get(job_id) is None
+
+        status = client.get(f"/jobs/{job_id}/status").get_json()
+        assert status["status"] == "done"
+        assert status["token"] == token
+        assert status["progress"] == 100
+
+        page = client.get(f"/jobs/{job_id}")
+        assert page.status_code == 200
+        assert token in page.get_data(as_text=True)
+
+        pdf = client.get(f"/download/{token}")
+        assert pdf.status_code == 200
+        assert pdf.data == b"%PDF-fake"
+        assert "report_test.pdf" in pdf.headers["Content-Disposition"]
+
+    def test_late_queued_snapshot_ignored(self, client, monkeypatch):
+        # поток запроса снял «queued», но записал его уже после «done» рабочего потока
+        done_saved = threading.Event()
+
+        def on_change(job):
+            data = webapp._job_state(job)
+            if data["status"] == "queued":
+                assert done_saved.wait(5)
+            webapp._store_job_state(data)
+            if data["status"] == "done":
+                done_saved.set()
+
+        jobs = JobQueue(workers=1, on_change=on_change)
+        monkeypatch.setattr(webapp, "JOBS", jobs)
+        try:
+            job = jobs.submit(webapp._generate_job, sex="м", age=40, raw_text="Гемоглобин 145")
+            stored = webapp.JOB_STATE.get(job.id)
+            assert stored["status"] == "done"
+            assert stored["token"] == job.result
+        finally:
+            jobs.shutdown()
+
+    def test_report_kept_when_disk_write_fails(self, client, monkeypatch, tmp_path):
+        (tmp_path / "readonly").write_text("")
+        monkeypatch.setattr(webapp, "REPORTS", DiskCache(tmp_path / "readonly" / "reports", max_bytes=0))
+        _job_id, data = _submit(client)
+        pdf = client.get(f"/download/{data['token']}")
+        assert pdf.status_code == 200
+        assert pdf.data == b"%PDF-fake"
+
+    def test_reports_not_evicted_by_size(self):
+        assert webapp.REPORTS.max_bytes == 0
+
+    def test_unknown_ids(self, client):
+        assert client.get("/jobs/" + "0" * 32 + "/status").status_code == 404
+        assert client.get("/jobs/..%2e/status").status_code == 404
+        assert client.get("/download/" + "0" * 32).status_code == 302
+        assert client.get("/download/..").status_code in (302, 404)
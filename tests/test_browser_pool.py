@@ -0,0 +1,273 @@
+"""
+Тесты пула Chromium (infra/browser_pool.py).
+
+Playwright подменяется фейковыми объектами через playwright_factory,
+поэтому тесты не требуют установленного Chromium.
+
+Проверяем:
+  - браузер переиспользуется между задачами (нет запуска на каждый рендер)
+  - recycle после max_renders
+  - health-check: отвалившийся браузер перезапускается
+  - ошибки задачи пробрасываются вызывающему
+  - метрики ожидания в очереди
+  - recycle по памяти и watchdog учитывают дочерние процессы Chromium (renderer, GPU),
+    у которых нет маркера слота в cmdline (psutil подменяется фейком)
+"""
+
+import sys
+import threading
+import types
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from infra import browser_pool
+from infra.browser_pool import BrowserPool
+
+
+class _FakePage:
+    def set_default_timeout(self, _ms):
+        pass
+
+    def pdf(self):
+        return b"%PDF-fake"
+
+
+class _FakeContext:
+    def new_page(self):
+        return _FakePage()
+
+    def close(self):
+        pass
+
+
+class _FakeBrowser:
+    def __init__(self):
+        self.connected = True
+        self.closed = False
+
+    def is_connected(self):
+        return self.connected and not self.closed
+
+    def new_context(self):
+        return _FakeContext()
+
+    def close(self):
+        self.closed = True
+
+
+class _FakeChromium:
+    def __init__(self, psutil=None):
+        self.launched = []
+        self._lock = threading.Lock()
+        self._psutil = psutil
+
+    def launch(self, args=None):
+        b = _FakeBrowser()
+        with self._lock:
+            self.launched.append(b)
+        if self._psutil is not None:
+            self._psutil.spawn_browser(args or [])
+        return b
+
+
+class _FakePlaywright:
+    def __init__(self, psutil=None):
+        self.chromium = _FakeChromium(psutil)
+
+
+class _FakeProcess:
+    def __init__(self, pid, cmdline, rss_mb, children=()):
+        self.pid = pid
+        self.info = {"cmdline": cmdline}
+        self.rss = int(rss_mb * 1024 * 1024)
+        self._children = list(children)
+        self.killed = False
+        self.on_kill = None
+
+    def children(self, recursive=False):
+        out = []
+        for child in self._children:
+            out.append(child)
+            if recursive:
+                out.extend(child.children(recursive=True))
+        return out
+
+    def memory_info(self):
+        return types.SimpleNamespace(rss=self.rss)
+
+    def kill(self):
+        self.killed = True
+        if self.on_kill is not None:
+            self.on_kill()
+
+
+class _FakePsutil:
+    """Как Chromium: маркер слота — только у главного процесса, renderer/GPU — его потомки."""
+
+    def __init__(self, browser_mb=30, renderer_mb=90):
+        self.browser_mb = browser_mb
+        self.renderer_mb = renderer_mb
+        self.procs = []
+        self._pid = 100
+
+    def _next_pid(self):
+        self._pid += 1
+        return self._pid
+
+    def spawn_browser(self, args):
+        renderer = _FakeProcess(self._next_pid(), ["chrome", "--type=renderer"], self.renderer_mb)
+        gpu = _FakeProcess(self._next_pid(), ["chrome", "--type=gpu-process"], 0, children=[renderer])
+        browser = _FakeProcess(self._next_pid(), ["chrome"] + list(args), self.browser_mb, children=[gpu])
+        self.procs.extend([browser, gpu, renderer])
+
+    def process_iter(self, attrs=None):
+        return list(self.procs)
+
+
+@pytest.fixture
+def fake_psutil(monkeypatch):
+    fake = _FakePsutil()
+    monkeypatch.setitem(sys.modules, "psutil", fake)
+    return fake
+
+
+def _make_pool(fake, **kw):
+    @contextmanager
+    def factory():
+        yield fake
+
+    kw.setdefault("size", 1)
+    return BrowserPool(playwright_factory=factory, **kw)
+
+
+class TestBrowserPool:
+
+    def test_browser_reused_between_renders(self):
+        fake = _FakePlaywright()
+        pool = _make_pool(fake, max_renders=100)
+        try:
+            for _ in range(5):
+                assert pool.run(lambda page: page.pdf()) == b"%PDF-fake"
+            assert len(fake.chromium.launched) == 1
+            assert pool.stats()["tasks"] == 5
+        finally:
+            pool.shutdown()
+
+    def test_recycle_after_max_renders(self):
+        fake = _FakePlaywright()
+        pool = _make_pool(fake, max_renders=2)
+        try:
+            for _ in range(5):
+                pool.run(lambda page: page.pdf())
+            # 2 + 2 + 1 рендера → 3 запуска
+            assert len(fake.chromium.launched) == 3
+            assert pool.stats()["recycles"] == 2
+        finally:
+            pool.shutdown()
+
+    def test_disconnected_browser_relaunched(self):
+        fake = _FakePlaywright()
+        pool = _make_pool(fake, max_renders=100)
+        try:
+            pool.run(lambda page: None)
+            fake.chromium.launched[0].connected = False
+            pool.run(lambda page: None)
+            assert len(fake.chromium.launched) == 2
+        finally:
+            pool.shutdown()
+
+    def test_task_error_propagates(self):
+        fake = _FakePlaywright()
+        pool = _make_pool(fake)
+
+        def _boom(page):
+            raise ValueError("render failed")
+
+        try:
+            with pytest.raises(ValueError):
+                pool.run(_boom)
+            # пул продолжает работать после ошибки
+            assert pool.run(lambda page: 42) == 42
+            assert pool.stats()["errors"] == 1
+        finally:
+            pool.shutdown()
+
+    def test_playwright_start_failure_fails_fast(self):
+        @contextmanager
+        def broken_factory():
+            raise RuntimeError("no playwright")
+            yield  # pragma: no cover
+
+        pool = BrowserPool(size=1, playwright_factory=broken_factory, acquire_timeout_sec=5)
+        try:
+            with pytest.raises(RuntimeError, match="no playwright"):
+                pool.run(lambda page: None)
+        finally:
+            pool.shutdown()
+
+    def test_wait_stats_reported(self):
+        fake = _FakePlaywright()
+        pool = _make_pool(fake, size=2)
+        try:
+            futures = [pool.submit(lambda page: page.pdf()) for _ in range(6)]
+            for f in futures:
+                f.result(timeout=5)
+            st = pool.stats()
+            assert st["tasks"] == 6
+            assert st["wait_ms_max"] >= 0
+            assert st["wait_ms_avg"] >= 0
+            assert st["queue_depth"] == 0
+            assert len(st["slots"]) == 2
+        finally:
+            pool.shutdown()
+
+
+class TestChromiumProcesses:
+
+    def test_slot_processes_include_children(self, fake_psutil):
+        fake_psutil.spawn_browser(["--lab-ai-pool-slot=abc"])
+        fake_psutil.spawn_browser(["--lab-ai-pool-slot=other"])
+        procs = browser_pool._slot_processes("abc")
+        assert sorted(p.info["cmdline"][1] for p in procs) == [
+            "--lab-ai-pool-slot=abc", "--type=gpu-process", "--type=renderer"]
+        assert browser_pool._slot_rss_mb("abc") == pytest.approx(120)
+
+    def test_rss_recycle_counts_renderer(self, fake_psutil):
+        # главный процесс 30 МБ < порога, вместе с renderer 120 МБ > порога
+        fake = _FakePlaywright(fake_psutil)
+        pool = _make_pool(fake, max_renders=100, max_rss_mb=100)
+        try:
+            pool.run(lambda page: None)
+            pool.run(lambda page: None)
+            assert len(fake.chromium.launched) == 2     # после первого рендера — recycle
+            assert pool.stats()["recycles"] >= 1
+        finally:
+            pool.shutdown()
+
+    def test_watchdog_kills_whole_tree(self, fake_psutil):
+        fake = _FakePlaywright(fake_psutil)
+        pool = _make_pool(fake, max_renders=100, render_timeout_sec=0.2)
+        renderer_killed = threading.Event()
+
+        def hang(page):
+            renderer = fake_psutil.procs[-1]
+            renderer.on_kill = renderer_killed.set
+            if not renderer_killed.wait(5):      # зависший renderer держит страницу
+                raise AssertionError("watchdog не убил renderer")
+            raise RuntimeError("Target closed")
+
+        try:
+            with pytest.raises(RuntimeError, match="Target closed"):
+                pool.run(hang)
+            first = fake_psutil.procs[:3]
+            assert all(p.killed for p in first)
+            pool.run(lambda page: None)
+            assert len(fake.chromium.launched) == 2      # после убийства — новый браузер
+            assert pool.stats()["watchdog_kills"] == 1
+        finally:
+            pool.shutdown()
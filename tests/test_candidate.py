@@ -0,0 +1,98 @@
+"""
+Тесты кандидатов в показатели (parsers/candidate.py) и сборки Item из них.
+
+Проверяем:
+  - экстракторы отдают Candidate, строковые API — те же кандидаты в TSV
+  - значение не округляется (раньше {value:g} оставлял 6 значащих цифр)
+  - parse_tsv чинит разбитые *10^N и прилипшие единицы
+  - Item из кандидатов = Item из их TSV; дедупликация с сохранением порядка
+"""
+
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import engine
+from parsers.candidate import Candidate, candidates_to_tsv, dedup_candidates, format_value, parse_tsv
+from parsers.medsi_extractor import medsi_candidates, medsi_inline_to_candidates
+from parsers.universal_extractor import universal_candidates, universal_extract
+
+TEXT = "\n".join([
+    "Гемоглобин 145 г/л 130 - 160",
+    "Лейкоциты 8.23 *10^9/л 4.00 - 10.00",
+    "Скорость оседания",
+    "28 мм/ч 2 - 20",
+])
+
+MEDSI = "\n".join([
+    "(WBC) Лейкоциты 10*9/л 4.50-11.004.78",
+    "(PLT) Тромбоциты 10*9/л 150-400213",
+])
+
+
+def _fields(items):
+    return [(i.raw_name, i.name, i.value, i.unit, i.ref_text, i.status) for i in items]
+
+
+class TestExtractors:
+
+    def test_universal(self):
+        cands = universal_candidates(TEXT)
+        assert Candidate("Гемоглобин", 145.0, "130-160", "г/л") in cands
+        assert Candidate("Скорость оседания", 28.0, "2-20", "мм/ч") in cands
+        assert universal_extract(TEXT) == candidates_to_tsv(cands)
+
+    def test_medsi(self):
+        cands = medsi_candidates(MEDSI)
+        assert cands[0] == Candidate("Лейкоциты (WBC)", 4.78, "4.50-11.00", "10*9/л")
+        assert medsi_inline_to_candidates(MEDSI) == candidates_to_tsv(cands)
+
+    def test_helix_and_smart(self):
+        assert engine.helix_table_to_candidates(TEXT) == candidates_to_tsv(engine.helix_candidates(TEXT))
+        assert engine._smart_to_candidates(TEXT) == candidates_to_tsv(engine._smart_candidates(TEXT))
+
+    def test_value_not_rounded(self):
+        cands = universal_candidates("Показатель 1234567.8 ед/л 100 - 2000000")
+        assert cands[0].value == 1234567.8
+        assert "\t1234567.8\t" in candidates_to_tsv(cands)
+
+
+class TestTsv:
+
+    def test_format_value(self):
+        assert format_value(145.0) == "145"
+        assert format_value(8.23) == "8.23"
+        assert format_value(None) == ""
+
+    def test_round_trip(self):
+        cands = engine._smart_candidates(TEXT)
+        assert parse_tsv(candidates_to_tsv(cands)) == cands
+
+    def test_repairs(self):
+        assert parse_tsv("Лейкоциты (WBC) 8.23 *10^\t9\t4.00-10.00\t*10^9/л") == [
+            Candidate("Лейкоциты (WBC)", 8.23, "4.00-10.00", "*10^9/л")]
+        assert parse_tsv("Гемоглобин\t145 г/л\t130-160") == [Candidate("Гемоглобин", 145.0, "130-160", "г/л")]
+        assert parse_tsv("СОЭ\t28\t2 - 20 мм/ч") == [Candidate("СОЭ", 28.0, "2 - 20", "мм/ч")]
+        assert parse_tsv("без табуляций\n\n") == []
+
+    def test_dedup(self):
+        a = Candidate("Гемоглобин", 145.0, "130-160", "г/л")
+        b = Candidate("Гемоглобин  ", 145.0, "130-160", "г/л")
+        c = Candidate("СОЭ", 28.0, "2-20", "мм/ч")
+        assert dedup_candidates([a, c, b]) == [a, c]
+
+
+class TestItems:
+
+    def test_same_as_tsv(self):
+        cands = engine._smart_candidates(TEXT)
+        assert _fields(engine.items_from_candidates(cands)) == _fields(
+            engine.parse_items_from_candidates(candidates_to_tsv(cands)))
+        assert _fields(engine.parse_candidates_with_fallback(cands)) == _fields(
+            engine.parse_with_fallback(candidates_to_tsv(cands)))
+
+    def test_item_fields(self):
+        it = engine.candidate_to_item(Candidate("Гемоглобин", 170.0, "130-160", "г/л"))
+        assert (it.value, it.unit, it.ref_text, it.status) == (170.0, "г/л", "130-160", "ВЫШЕ")
@@ -0,0 +1,95 @@
+"""
+Тесты HTTP-клиента с пулами соединений (infra/http_client.py).
+
+Локальный HTTP/1.1-сервер с keep-alive вместо облачных эндпоинтов.
+
+Проверяем:
+  - серия запросов к одному хосту идёт по одному соединению
+  - у разных хостов — разные сессии и отдельные счётчики
+  - таймаут уходит в requests парой (connect, read)
+"""
+
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from infra.http_client import HttpClient
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b'{"done": false}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        self.do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    t = threading.Thread(target=srv.serve_forever, daemon=True)
+    t.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+class TestHttpClient:
+
+    def test_connection_reused_for_polling(self, server):
+        url = f"http://127.0.0.1:{server.server_address[1]}/operations/op1"
+        client = HttpClient(pool_maxsize=2)
+        try:
+            for _ in range(5):
+                r = client.get(url, timeout=5)
+                assert r.json() == {"done": False}
+            client.post(url, json={"jwt": "x"}, timeout=5)
+
+            st = client.stats()
+            assert st["requests"] == 6
+            assert st["new_connections"] == 1
+            assert st["reused"] == 5
+        finally:
+            client.close()
+
+    def test_separate_session_per_host(self, server):
+        port = server.server_address[1]
+        client = HttpClient()
+        try:
+            client.get(f"http://127.0.0.1:{port}/a", timeout=5)
+            client.get(f"http://localhost:{port}/b", timeout=5)
+            hosts = client.stats()["hosts"]
+            assert set(hosts) == {f"http://127.0.0.1:{port}", f"http://localhost:{port}"}
+            assert client.session(f"http://127.0.0.1:{port}/x") is client.session(f"http://127.0.0.1:{port}/y")
+        finally:
+            client.close()
+
+    def test_timeout_split_into_connect_and_read(self, monkeypatch):
+        client = HttpClient(connect_timeout=3)
+        seen = {}
+
+        def fake_request(self, method, url, **kwargs):
+            seen["timeout"] = kwargs["timeout"]
+            return None
+
+        monkeypatch.setattr("requests.Session.request", fake_request)
+        client.post("https://llm.api.cloud.yandex.net/x", timeout=120)
+        assert seen["timeout"] == (3.0, 120.0)
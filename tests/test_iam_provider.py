@@ -0,0 +1,152 @@
+"""
+Тесты IamTokenProvider (engine.py).
+
+Сеть не нужна: fetch подменяется фейком, возвращающим (token, expires_at_ts).
+
+Проверяем:
+  - годный токен берётся из кэша без обращения к IAM
+  - single-flight: параллельные get() на протухшем токене → один запрос к IAM
+  - фоновый поток обновляет токен заранее
+  - ошибка фонового обновления не ломает get(), пока старый токен годен
+  - TTL короче proactive_sec: фоновый поток обновляет не чаще раза в retry_sec
+  - распарсенный приватный ключ кэшируется
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import engine
+from engine import IamTokenProvider
+
+
+class _FakeFetch:
+    def __init__(self, ttl=3600.0, delay=0.0):
+        self.ttl = ttl
+        self.delay = delay
+        self.calls = 0
+        self.fail = False
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        if self.delay:
+            time.sleep(self.delay)
+        with self._lock:
+            if self.fail:
+                raise RuntimeError("IAM token error HTTP 503")
+            self.calls += 1
+            return f"t{self.calls}", time.time() + self.ttl
+
+
+class TestIamTokenProvider:
+
+    def test_cached_while_valid(self):
+        fetch = _FakeFetch()
+        iam = IamTokenProvider(fetch=fetch, background=False)
+        assert iam.get() == "t1"
+        assert iam.get() == "t1"
+        assert fetch.calls == 1
+
+    def test_single_flight_refresh(self):
+        fetch = _FakeFetch(delay=0.1)
+        iam = IamTokenProvider(fetch=fetch, background=False)
+        barrier = threading.Barrier(10)
+        tokens = []
+
+        def worker():
+            barrier.wait(5)
+            tokens.append(iam.get())
+
+        threads = [threading.Thread(target=worker) for _ in range(10)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert fetch.calls == 1
+        assert tokens == ["t1"] * 10
+
+    def test_background_refresh_before_expiry(self):
+        # токен живёт 1.5 с, фоновое обновление — когда осталось < 1 с
+        fetch = _FakeFetch(ttl=1.5)
+        iam = IamTokenProvider(fetch=fetch, refresh_margin_sec=0.2, proactive_sec=1.0, background=True)
+        try:
+            assert iam.get() == "t1"
+            deadline = time.time() + 3
+            while fetch.calls < 2 and time.time() < deadline:
+                time.sleep(0.02)
+            assert fetch.calls >= 2
+            assert iam.stats()["background_refreshes"] >= 1
+            assert iam.get() != "t1"
+        finally:
+            iam.stop()
+
+    def test_background_failure_keeps_old_token(self):
+        fetch = _FakeFetch(ttl=1.5)
+        iam = IamTokenProvider(
+            fetch=fetch, refresh_margin_sec=0.2, proactive_sec=1.0, background=True, retry_sec=0.05,
+        )
+        try:
+            assert iam.get() == "t1"
+            fetch.fail = True
+            time.sleep(0.7)     # фоновый поток уже пытался обновить
+            assert iam.get() == "t1"
+            assert iam.stats()["failures"] >= 1
+        finally:
+            iam.stop()
+
+    def test_short_ttl_no_tight_loop(self):
+        # TTL 1 с < proactive 2 с: каждый новый токен сразу «пора обновлять»
+        fetch = _FakeFetch(ttl=1.0)
+        iam = IamTokenProvider(
+            fetch=fetch, refresh_margin_sec=0.1, proactive_sec=2.0, background=True, retry_sec=0.2,
+        )
+        try:
+            assert iam.get() == "t1"
+            time.sleep(0.7)
+            assert 2 <= fetch.calls <= 5
+            assert iam.get().startswith("t")
+        finally:
+            iam.stop()
+
+    def test_token_and_expiry_one_attribute(self):
+        fetch = _FakeFetch(ttl=100.0)
+        iam = IamTokenProvider(fetch=fetch, background=False)
+        iam.get()
+        token, exp = iam._current
+        assert token == "t1" and exp > time.time() + 99
+        assert iam.stats()["expires_in_sec"] > 99
+
+    def test_sync_failure_propagates(self):
+        fetch = _FakeFetch()
+        fetch.fail = True
+        iam = IamTokenProvider(fetch=fetch, background=False)
+        with pytest.raises(RuntimeError, match="503"):
+            iam.get()
+
+
+class TestPrivateKeyCache:
+
+    def test_pem_parsed_once(self):
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        pem = key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        ).decode("utf-8")
+
+        engine._load_private_key.cache_clear()
+        engine._sign_ps256(pem, b"a.b")
+        engine._sign_ps256(pem, b"c.d")
+        info = engine._load_private_key.cache_info()
+        assert info.misses == 1
+        assert info.hits == 1
@@ -0,0 +1,151 @@
+"""
+Тесты подготовки фото перед OCR (ocr/preprocess.py + engine).
+
+Проверяем:
+  - крупное цветное фото уменьшается до max_side, становится серым JPEG и меньше по байтам
+  - EXIF Orientation применяется (поворот на 90°)
+  - прозрачный PNG ложится на белый фон
+  - мелкий файл, результат не меньше исходника и битые байты — отдаются как есть
+  - engine: в OCR уходит подготовленный JPEG, экономия пишется в артефакт и счётчики
+"""
+
+import io
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+Image = pytest.importorskip("PIL.Image")
+from PIL import ImageDraw  # noqa: E402
+
+import engine
+from infra.request_context import RequestContext, use_context
+from ocr.preprocess import PreprocessStats, max_side_for_dpi, preprocess_image
+
+pytestmark = pytest.mark.usefixtures("memory_context")
+
+
+def _photo(w: int, h: int, fmt: str = "JPEG", mode: str = "RGB", exif_orientation: int = 0) -> bytes:
+    """Похоже на фото с телефона: цветной шум поверх фона, JPEG высокого качества."""
+    noise = Image.effect_noise((w, h), 40).convert("RGB")
+    img = Image.blend(Image.new("RGB", (w, h), (200, 180, 150)), noise, 0.5).convert(mode)
+    if mode == "RGBA":
+        img.putalpha(0)
+    kwargs = {"quality": 95} if fmt == "JPEG" else {}
+    if exif_orientation:
+        exif = Image.Exif()
+        exif[0x0112] = exif_orientation
+        kwargs["exif"] = exif
+    buf = io.BytesIO()
+    img.save(buf, format=fmt, **kwargs)
+    return buf.getvalue()
+
+
+class TestPreprocessImage:
+
+    def test_downscale_grayscale_jpeg(self):
+        data = _photo(1600, 1200)
+        res = preprocess_image(data, "image/jpeg", max_side=800)
+        out = Image.open(io.BytesIO(res.content))
+        assert res.mime == "image/jpeg"
+        assert out.format == "JPEG" and out.mode == "L"
+        assert max(out.size) == 800
+        assert res.bytes_out < res.bytes_in
+        assert {"downscale", "grayscale", "autocontrast", "jpeg"} <= set(res.applied)
+
+    def test_exif_rotation(self):
+        data = _photo(300, 100, fmt="JPEG", exif_orientation=6)   # 6 — повернуть на 90° по часовой
+        res = preprocess_image(data, "image/jpeg", max_side=0)
+        assert "exif-rotate" in res.applied
+        assert Image.open(io.BytesIO(res.content)).size == (100, 300)
+
+    def test_transparent_png_on_white(self):
+        data = _photo(400, 400, fmt="PNG", mode="RGBA")
+        res = preprocess_image(data, "image/png", max_side=200, autocontrast=False)
+        out = Image.open(io.BytesIO(res.content))
+        assert out.getpixel((0, 0)) > 240     # фон белый, а не чёрный
+
+    def test_larger_output_unchanged(self):
+        # штриховой PNG и после уменьшения компактнее любого JPEG — шлём исходник
+        img = Image.new("1", (1600, 1200), 1)
+        draw = ImageDraw.Draw(img)
+        for y in range(50, 1200, 40):
+            draw.line((50, y, 1550, y), fill=0)
+        buf = io.BytesIO()
+        img.save(buf, format="PNG")
+        res = preprocess_image(buf.getvalue(), "image/png", max_side=1500)
+        assert res.content == buf.getvalue() and res.mime == "image/png"
+        assert res.applied == [] and res.skipped == "not-smaller"
+
+    def test_small_file_unchanged(self):
+        data = _photo(200, 100)
+        res = preprocess_image(data, "image/jpeg", min_bytes=len(data) + 1)
+        assert res.content == data and res.skipped == "small"
+
+    def test_broken_bytes_unchanged(self):
+        res = preprocess_image(b"not an image", "image/jpeg")
+        assert res.content == b"not an image"
+        assert res.skipped.startswith("decode-failed")
+
+    def test_max_side_for_dpi(self):
+        assert max_side_for_dpi(300) == 3507
+        assert max_side_for_dpi(150) == 1754
+
+    def test_stats(self):
+        stats = PreprocessStats()
+        stats.record(preprocess_image(_photo(1600, 1200), "image/jpeg", max_side=800), ocr_ms=120.0)
+        stats.record(preprocess_image(b"junk", "image/png"))
+        s = stats.stats()
+        assert s["images"] == 2 and s["processed"] == 1
+        assert s["saved_bytes"] > 0 and 0 < s["saved_pct"] < 100
+        assert s["ocr_ms"] == 120.0
+
+
+class TestEnginePreprocess:
+
+    @pytest.fixture
+    def sent(self, monkeypatch):
+        sent = []
+
+        def fake_ocr(iam_token, file_bytes, mime_type):
+            sent.append((file_bytes, mime_type))
+            return {"result": {"textAnnotation": {"fullText": "СОЭ 28 мм/ч 2-20"}}}
+
+        monkeypatch.setattr(engine, "OCR_CACHE_ENABLED", False)
+        monkeypatch.setattr(engine, "ocr_image_sync", fake_ocr)
+        monkeypatch.setattr(engine, "get_iam_token", lambda: "t")
+        monkeypatch.setattr(engine, "_PREPROCESS_STATS", PreprocessStats())
+        return sent
+
+    def test_ocr_gets_preprocessed_jpeg(self, sent, monkeypatch):
+        monkeypatch.setattr(engine, "OCR_IMAGE_TARGET_DPI", 60)
+        monkeypatch.setattr(engine, "OCR_IMAGE_PREPROCESS_MIN_KB", 0)
+        photo = _photo(1600, 1200)
+        ctx = RequestContext("t1")
+        with use_context(ctx):
+            out = engine.extract_text_from_upload(photo, "lab.jpg", "image/jpeg")
+
+        assert "СОЭ" in out
+        content, mime = sent[0]
+        assert mime == "image/jpeg" and len(content) < len(photo)
+        report = json.loads(ctx.get(engine.OCR_PREPROCESS_ARTIFACT))
+        assert report["bytes_in"] == len(photo) and report["saved_bytes"] > 0
+        assert "ocr_ms" in report
+        assert engine.get_preprocess_stats()["images"] == 1
+
+    def test_disabled_sends_original(self, sent, monkeypatch):
+        monkeypatch.setattr(engine, "OCR_IMAGE_PREPROCESS", False)
+        photo = _photo(400, 300)
+        engine.extract_text_from_upload(photo, "lab.jpg", "image/jpeg")
+        assert sent == [(photo, "image/jpeg")]
+
+    def test_cache_key_depends_on_settings(self, monkeypatch):
+        a = engine._preprocess_signature()
+        monkeypatch.setattr(engine, "OCR_IMAGE_TARGET_DPI", 200)
+        assert engine._preprocess_signature() != a
+        monkeypatch.setattr(engine, "OCR_IMAGE_PREPROCESS", False)
+        assert engine._preprocess_signature() == ""
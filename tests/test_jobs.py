@@ -0,0 +1,177 @@
+"""
+Тесты фоновой очереди задач (infra/jobs.py).
+
+Проверяем:
+  - submit сразу возвращает Job, результат появляется после выполнения
+  - прогресс по стадиям виден через get()
+  - ошибка задачи → status == "error" с текстом
+  - переполнение очереди → QueueFullError
+  - stats(): глубина очереди, счётчики, время ожидания
+  - on_change вызывается на каждое изменение задачи (версия растёт), его ошибка не роняет задачу
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from infra.jobs import JobQueue, QueueFullError
+
+
+def _wait_for(job_queue, job_id, statuses=("done", "error"), timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = job_queue.get(job_id)
+        if job is not None and job.status in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} не завершилась за {timeout} с")
+
+
+class TestJobQueue:
+
+    def test_submit_returns_immediately_and_completes(self):
+        q = JobQueue(workers=1)
+        release = threading.Event()
+
+        def work(x, progress):
+            release.wait(5)
+            return x * 2
+
+        try:
+            job = q.submit(work, 21)
+            assert job.status in ("queued", "running")
+            release.set()
+            done = _wait_for(q, job.id)
+            assert done.status == "done"
+            assert done.result == 42
+            assert done.progress == 100
+        finally:
+            q.shutdown()
+
+    def test_progress_stages_visible(self):
+        q = JobQueue(workers=1)
+        in_llm = threading.Event()
+        release = threading.Event()
+
+        def work(progress):
+            progress("ocr", 10)
+            progress("llm", 55)
+            in_llm.set()
+            release.wait(5)
+            return "ok"
+
+        try:
+            job = q.submit(work)
+            assert in_llm.wait(5)
+            snap = q.get(job.id)
+            assert snap.status == "running"
+            assert snap.stage == "llm"
+            assert snap.progress == 55
+            assert [s for s, _ in snap.stages] == ["ocr", "llm"]
+            release.set()
+            _wait_for(q, job.id)
+        finally:
+            q.shutdown()
+
+    def test_error_recorded(self):
+        q = JobQueue(workers=1)
+
+        def work(progress):
+            raise ValueError("Не удалось собрать показатели")
+
+        try:
+            job = q.submit(work)
+            done = _wait_for(q, job.id)
+            assert done.status == "error"
+            assert "показатели" in done.error
+            assert q.stats()["failed"] == 1
+        finally:
+            q.shutdown()
+
+    def test_queue_full_rejected(self):
+        q = JobQueue(workers=1, max_queue=2)
+        release = threading.Event()
+        started = threading.Event()
+
+        def work(progress):
+            started.set()
+            release.wait(5)
+
+        try:
+            q.submit(work)          # занимает единственный поток
+            assert started.wait(5)
+            q.submit(work)
+            q.submit(work)          # очередь заполнена (2)
+            with pytest.raises(QueueFullError):
+                q.submit(work)
+            assert q.stats()["queue_depth"] == 2
+        finally:
+            release.set()
+            q.shutdown()
+
+    def test_queue_position_and_stats(self):
+        q = JobQueue(workers=1)
+        release = threading.Event()
+        started = threading.Event()
+
+        def blocker(progress):
+            started.set()
+            release.wait(5)
+
+        def quick(progress):
+            return 1
+
+        try:
+            q.submit(blocker)
+            assert started.wait(5)
+            j2 = q.submit(quick)
+            j3 = q.submit(quick)
+            assert q.queue_position(j2.id) == 0
+            assert q.queue_position(j3.id) == 1
+            release.set()
+            _wait_for(q, j3.id)
+            st = q.stats()
+            assert st["done"] == 3
+            assert st["queue_depth"] == 0
+            assert st["wait_sec_max"] >= 0.0
+        finally:
+            q.shutdown()
+
+    def test_on_change_sees_every_transition(self):
+        seen = []
+        finished = threading.Event()
+
+        def on_change(job):
+            seen.append((job.id, job.status, job.stage, job.version))
+            if job.result == "ok":
+                finished.set()
+            raise OSError("диск недоступен")     # не должно ломать задачу
+
+        q = JobQueue(workers=1, on_change=on_change)
+        gate = threading.Event()
+
+        def blocker(progress):
+            gate.wait(5)            # единственный воркер занят, пока не придёт «queued» задачи
+            return "blocker"
+
+        def work(progress):
+            progress("ocr", 10)
+            return "ok"
+
+        try:
+            q.submit(blocker)
+            job = q.submit(work)
+            gate.set()
+            assert finished.wait(5)
+            assert q.get(job.id).result == "ok"
+            assert [s[1:] for s in seen if s[0] == job.id] == [
+                ("queued", "queued", 1), ("running", "started", 2),
+                ("running", "ocr", 3), ("done", "done", 4)]
+        finally:
+            q.shutdown()
@@ -0,0 +1,172 @@
+"""
+Тесты раскладки слов по рамкам Vision OCR (ocr/layout.py + engine).
+
+Страница собирается из слов с координатами: данные пациента, шапка таблицы,
+строки показателей в четырёх колонках. Блоки ответа нарочно идут по колонкам
+(как их часто отдаёт OCR) — склейка lines[].text перемешала бы строки.
+
+Проверяем:
+  - слова группируются в строки по перекрытию по y, в том числе при перекосе
+  - ячейки по широким разрывам, колонки по левым краям
+  - шапка найдена ниже данных пациента, кандидаты по ролям колонок
+  - ответ без рамок → пусто; несколько страниц
+  - engine: OCR_LAYOUT_MODE — кандидаты из раскладки без текстовых эвристик
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import engine
+from ocr.layout import Word, group_rows, layout_grid, layout_to_candidates, page_words, split_cells
+
+pytestmark = pytest.mark.usefixtures("memory_context")
+
+CHAR_W = 12
+LINE_H = 20
+COLUMNS_X = [100, 600, 800, 1000]
+HEADER = ["Исследование", "Результат", "Ед.", "Референс"]
+ROWS = [
+    ["Гемоглобин (HGB)", "145", "г/л", "130 - 160"],
+    ["Лейкоциты (WBC)", "6,1", "10*9/л", "4,0 - 9,0"],
+    ["Тромбоциты (PLT)", "250", "10^9/л", "150 - 400"],
+    ["СОЭ", "28", "мм/ч", "2 - 20"],
+]
+
+
+def _vertices(x0, y0, x1, y1):
+    # int64 в JSON ответа — строки
+    return {"vertices": [{"x": str(x), "y": str(y)} for x, y in ((x0, y0), (x0, y1), (x1, y1), (x1, y0))]}
+
+
+def _words(text, x, y, skew=0.0):
+    """Слова фразы с x; skew — сдвиг по y на пиксель по x (перекос скана)."""
+    out = []
+    for token in text.split():
+        w = len(token) * CHAR_W
+        dy = round(x * skew)
+        out.append({"text": token, "boundingBox": _vertices(x, y + dy, x + w, y + dy + LINE_H)})
+        x += w + CHAR_W // 2
+    return out
+
+
+def _page(skew=0.0, top=300):
+    # блок на колонку: OCR часто читает таблицу по столбцам
+    lines_by_col = [[] for _ in COLUMNS_X]
+    for r, row in enumerate([HEADER] + ROWS):
+        y = top + r * 40
+        for k, text in enumerate(row):
+            words = _words(text, COLUMNS_X[k], y, skew)
+            lines_by_col[k].append({"text": text, "words": words})
+    blocks = [{"lines": [{"text": "Пациент: Иванов И.И.", "words": _words("Пациент: Иванов И.И.", 100, 100)},
+                         {"text": "Дата: 01.02.2024", "words": _words("Дата: 01.02.2024", 800, 100)}]}]
+    blocks += [{"lines": lines} for lines in lines_by_col]
+    return {"textAnnotation": {"blocks": blocks, "fullText": ""}}
+
+
+def _response(*pages):
+    if len(pages) == 1:
+        return {"result": pages[0]}
+    return {"result": {"pages": [{"result": p} for p in pages]}}
+
+
+class TestRows:
+
+    def test_words_from_blocks(self):
+        words = page_words(_page()["textAnnotation"])
+        assert words[0].text == "Пациент:" and words[0].x0 == 100
+        assert isinstance(words[0].y1, int)
+
+    def test_rows_by_y_overlap(self):
+        rows = group_rows(page_words(_page()["textAnnotation"]))
+        assert len(rows) == 2 + len(ROWS)
+        assert " ".join(w.text for w in rows[2]) == "Гемоглобин (HGB) 145 г/л 130 - 160"
+
+    def test_skewed_page(self):
+        # к правому краю строка уходит вниз на 8 px: строки не рвутся и не склеиваются
+        rows = group_rows(page_words(_page(skew=0.008)["textAnnotation"]))
+        assert [w.text for w in rows[-1]][:1] == ["СОЭ"]
+        assert len(rows) == 2 + len(ROWS)
+
+    def test_separate_lines_not_merged(self):
+        a = Word("a", 0, 0, 10, 20)
+        b = Word("b", 0, 15, 10, 35)        # перекрытие 5 px из 20 — другая строка
+        assert len(group_rows([a, b])) == 2
+
+
+class TestCells:
+
+    def test_split_on_wide_gap(self):
+        words = [Word("Глюкоза", 0, 0, 84, 20), Word("5,1", 400, 0, 436, 20), Word("ммоль/л", 442, 0, 526, 20)]
+        assert [c.text for c in split_cells(words)] == ["Глюкоза", "5,1 ммоль/л"]
+
+    def test_grid_columns(self):
+        grid = layout_grid(group_rows(page_words(_page()["textAnnotation"])))
+        assert grid[1] == HEADER
+        assert grid[3] == ["Лейкоциты (WBC)", "6,1", "10*9/л", "4,0 - 9,0"]
+
+    def test_right_aligned_numbers_one_column(self):
+        rows = [
+            [Word("Гемоглобин", 0, 0, 120, 20), Word("145", 500, 0, 536, 20)],
+            [Word("СОЭ", 0, 40, 36, 60), Word("8", 524, 40, 536, 60)],
+        ]
+        assert layout_grid(rows) == [["Гемоглобин", "145"], ["СОЭ", "8"]]
+
+
+class TestCandidates:
+
+    def test_header_below_patient_data(self):
+        lines = layout_to_candidates(_response(_page())).splitlines()
+        assert lines[0] == "Гемоглобин (HGB)\t145\t130-160\tг/л"
+        assert len(lines) == len(ROWS)
+        assert not any("Пациент" in ln for ln in lines)
+
+    def test_without_boxes(self):
+        assert layout_to_candidates({"result": {"textAnnotation": {"fullText": "Гемоглобин 145 г/л"}}}) == ""
+
+    def test_multipage(self):
+        assert len(layout_to_candidates(_response(_page(), _page())).splitlines()) == 2 * len(ROWS)
+
+    def test_candidates_parse(self):
+        items = engine.parse_items_from_candidates(layout_to_candidates(_response(_page())))
+        by_name = {it.name: it for it in items}
+        assert by_name["WBC"].value == 6.1
+        assert by_name["ESR"].status == "ВЫШЕ"
+
+
+class TestEngineLayoutMode:
+
+    @pytest.fixture
+    def layout_mode(self, monkeypatch):
+        calls = []
+
+        def fake_ocr(iam_token, file_bytes, mime_type, model=None):
+            calls.append(model)
+            return _response(_page())
+
+        monkeypatch.setattr(engine, "OCR_LAYOUT_MODE", True)
+        monkeypatch.setattr(engine, "OCR_CACHE_ENABLED", False)
+        monkeypatch.setattr(engine, "OCR_IMAGE_PREPROCESS", False)
+        monkeypatch.setattr(engine, "OCR_TABLE_CROP", False)
+        monkeypatch.setattr(engine, "ocr_image_sync", fake_ocr)
+        monkeypatch.setattr(engine, "get_iam_token", lambda: "t")
+        return calls
+
+    def test_image_candidates_from_layout(self, layout_mode, monkeypatch):
+        def no_heuristics(text):
+            raise AssertionError("текстовые эвристики не должны вызываться")
+
+        monkeypatch.setattr(engine, "_smart_candidates", no_heuristics)
+        out = engine.extract_text_from_upload(b"img", "lab.jpg", "image/jpeg")
+        assert layout_mode == [None]                 # обычная модель, рамки есть в любом ответе
+        assert "СОЭ\t28\t2-20\tмм/ч" in out.splitlines()
+
+    def test_table_mode_without_tables_uses_layout(self, layout_mode, monkeypatch):
+        monkeypatch.setattr(engine, "OCR_TABLE_MODE", True)
+        out = engine.extract_text_from_upload(b"img", "lab.jpg", "image/jpeg")
+        assert layout_mode == [engine.OCR_TABLE_MODEL]
+        assert out.splitlines()[0] == "Гемоглобин (HGB)\t145\t130-160\tг/л"
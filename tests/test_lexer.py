@@ -0,0 +1,132 @@
+"""
+Тесты лексера строк (parsers/lexer.py).
+
+Проверяем:
+  - типы токенов: число, диапазон, сравнение, степень 10, единица, код, слово, флаг
+  - даты и слова с цифрами (HbA1c) не распадаются на числа и диапазоны
+  - разборщики поверх токенов: референс, значение + единица, однострочный ряд
+  - line_scorer и fallback_generic работают через те же токены
+  - единица — только слово из словаря единиц или *10^N ("норма", "x" — не единицы)
+  - "до N", ≤N, ≥N: признак референса для line_scorer, но fallback строк по ним не заводит
+"""
+
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from parsers import lexer as L
+import engine
+from parsers.fallback_generic import split_value_unit_ref
+from parsers.line_scorer import has_ref_pattern
+
+
+def _kinds(s):
+    return [(t.kind, t.norm) for t in L.tokenize(s)]
+
+
+class TestTokenize:
+
+    def test_row(self):
+        assert _kinds("Гемоглобин (HGB) 145 г/л 130 – 160 ↑") == [
+            (L.WORD, "Гемоглобин"), (L.CODE, "HGB"), (L.NUMBER, "145"),
+            (L.UNIT, "г/л"), (L.RANGE, "130-160"), (L.FLAG, "↑"),
+        ]
+
+    def test_power(self):
+        assert _kinds("8,23 *10^9/л") == [(L.NUMBER, "8.23"), (L.POWER, "*10^9/л")]
+        assert _kinds("199 10*9 /л")[1] == (L.POWER, "*10^9/л")
+        assert _kinds("4.5 х10¹²/л")[1] == (L.POWER, "*10^12/л")
+        assert _kinds("10 - 40") == [(L.RANGE, "10-40")]
+
+    def test_comparators(self):
+        assert _kinds("≤ 5") == [(L.COMPARATOR, "<=5")]
+        assert _kinds("до 20,5") == [(L.COMPARATOR, "<20.5")]
+        assert L.tokenize("> 1")[0].value == 1.0
+
+    def test_range_values(self):
+        tok = L.tokenize("3,9 - 6,1")[0]
+        assert (tok.value, tok.high) == (3.9, 6.1)
+
+    def test_codes_and_words(self):
+        assert _kinds("NE% P-LCR HbA1c ME/мл") == [
+            (L.CODE, "NE%"), (L.CODE, "P-LCR"), (L.WORD, "HbA1c"), (L.UNIT, "ME/мл"),
+        ]
+        assert _kinds("Гемоглобин145") == [(L.WORD, "Гемоглобин"), (L.NUMBER, "145")]
+
+    def test_dates_are_words(self):
+        assert [t.kind for t in L.tokenize("03.12.2025 12:30 2025-01-15")] == [L.WORD] * 3
+
+    def test_spans(self):
+        s = "СОЭ 28 мм/ч"
+        assert [s[t.start:t.end] for t in L.tokenize(s)] == ["СОЭ", "28", "мм/ч"]
+
+
+class TestParsers:
+
+    def test_extract_ref_text(self):
+        assert L.extract_ref_text("130 – 160 г/л") == "130-160"
+        assert L.extract_ref_text("3,9 - 6,1") == "3.9-6.1"
+        assert L.extract_ref_text("≤ 5") == "<=5"
+        assert L.extract_ref_text("до 20") == "<20"
+        assert L.extract_ref_text("не обнаружено") == ""
+
+    def test_parse_value_unit(self):
+        assert L.parse_value_unit("8.23 *10^9/л") == (8.23, "*10^9/л")
+        assert L.parse_value_unit("199 10*9 /л") == (199.0, "*10^9/л")
+        assert L.parse_value_unit("↑ 28 мм/ч 2 - 20") == (28.0, "мм/ч")
+        assert L.parse_value_unit("77,0 %") == (77.0, "%")
+        assert L.parse_value_unit("не обнаружено") == (None, "")
+
+    def test_value_unit_stops_at_ref(self):
+        assert L.parse_value_unit("8.23 *10^9/л 4.00 - 10.00") == (8.23, "*10^9/л")
+        assert L.parse_value_unit("145 130 - 160") == (145.0, "")
+        assert L.parse_value_unit("3.8-5.1") == (None, "")      # строка-референс, не значение
+
+    def test_has_ref(self):
+        assert L.has_ref(L.tokenize("Глюкоза 5,1 3,9-6,1"))
+        assert L.has_ref(L.tokenize("СРБ 2 до 5"))
+        assert not L.has_ref(L.tokenize("Глюкоза 5,1 ммоль/л"))
+        assert not L.has_ref(L.tokenize("Дата 2025-01-15"))
+
+    def test_split_row(self):
+        assert L.split_row("Скорость оседания 28 2-20 мм/ч") == ("Скорость оседания", 28.0, "2-20", "мм/ч")
+        assert L.split_row("Лейкоциты 6.5 *10^9 4-9 /л") == ("Лейкоциты", 6.5, "4-9", "*10^9/л")
+        assert L.split_row("RBC 4.00 3.80-5.10 *10^12/л") == ("RBC", 4.0, "3.80-5.10", "*10^12/л")
+        assert L.split_row("Витамин B12 350 пг/мл 187 - 883") == ("Витамин B12", 350.0, "187-883", "пг/мл")
+        assert L.split_row("Витамин D 25 до 30") == ("Витамин D", 25.0, "<30", "")
+        assert L.split_row("Витамин D 25 до 30", up_to=False) is None
+        assert L.split_row("28 2-20") is None
+
+    def test_split_row_words_not_units(self):
+        assert L.split_row("WBC 8.23, норма 4.00-10.00") == ("WBC", 8.23, "4.00-10.00", "")
+        assert L.split_row("Лейкоциты 8.23 x 4.00-10.00") == ("Лейкоциты", 8.23, "4.00-10.00", "")
+        assert L.split_row("СОЭ 28 (мм/ч) 2-20") == ("СОЭ", 28.0, "2-20", "мм/ч")
+
+    def test_fallback_split(self):
+        assert split_value_unit_ref("8.23 *10^9/л 4.00 - 10.00") == (8.23, "*10^9/л", "4.00-10.00")
+        assert split_value_unit_ref("5,1 ммоль/л 3,9 - 6,1") == (5.1, "ммоль/л", "3.9-6.1")
+        assert split_value_unit_ref("120 г/л") == (None, "", "")
+
+    def test_fallback_comparator_refs(self):
+        assert split_value_unit_ref("1 мг/л <5.2") == (1.0, "мг/л", "<5.2")
+        assert split_value_unit_ref("2 мЕд/л <=4.0") == (2.0, "мЕд/л", "<=4.0")
+        assert split_value_unit_ref("30 нг/мл >20") == (30.0, "нг/мл", ">20")
+        for rest in ("2 мг/л до 5", "5.1 ммоль/л ≤ 6.1", "1.2 нг/мл ≥ 0.5"):
+            assert split_value_unit_ref(rest) == (None, "", "")
+
+
+class TestUpToRefs:
+
+    LINES = ["СРБ 2 мг/л до 5", "Глюкоза 5.1 ммоль/л ≤ 6.1", "ПСА 1.2 нг/мл ≥ 0.5", "Витамин D 25 нг/мл до 30"]
+
+    def test_scorer_sees_ref(self):
+        assert has_ref_pattern("до 21")
+        assert all(has_ref_pattern(ln) for ln in self.LINES)
+
+    def test_fallback_no_items(self):
+        for ln in self.LINES:
+            assert engine.parse_with_fallback(ln) == []
+        (it,) = engine.parse_with_fallback("СРБ 1 мг/л <5.2")
+        assert (it.value, it.unit, it.ref_text) == (1.0, "мг/л", "<5.2")
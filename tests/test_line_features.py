@@ -0,0 +1,103 @@
+"""
+Тесты признаков строки и их кэша на документ (parsers/line_scorer.py: LineFeatures).
+
+Проверяем:
+  - признаки совпадают с функциями-предикатами line_scorer
+  - внутри document_scope одна строка — один объект (и для вложенных областей)
+  - document_features: по объекту на строку, одинаковые строки — один объект
+  - проходы экстракторов делят кэш, вне области кэш не копится
+  - split_row с готовыми токенами = split_row по строке
+"""
+
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import engine
+from parsers import lexer
+from parsers import line_scorer as LS
+from parsers.line_scorer import LineFeatures, document_features, document_scope, line_features
+from parsers.universal_extractor import universal_extract
+
+LINES = [
+    "Гемоглобин 145 г/л 130 - 160",
+    "ООО «Лаборатория», ИНН 7701234567",
+    "Лейкоциты",
+    "8.23 *10^9/л 4.00 - 10.00",
+    "Исследование\tРезультат",
+    "",
+]
+
+DOC = "\n".join([
+    "Гемоглобин 145 г/л 130 - 160",
+    "Скорость оседания",
+    "28 мм/ч 2 - 20",
+    "--- PAGE 2 ---",
+    "Гемоглобин 145 г/л 130 - 160",
+])
+
+
+class TestFeatures:
+
+    def test_same_as_predicates(self):
+        for ln in LINES:
+            f = LineFeatures(ln.strip())
+            assert f.has_ref == LS.has_ref_pattern(ln)
+            assert f.has_unit == LS.has_known_unit(ln)
+            assert f.has_biomarker == LS.has_known_biomarker(ln)
+            assert f.is_header_service == LS.is_header_service_line(ln)
+            assert f.is_noise == LS.is_noise(ln)
+            assert f.score == LS.score_line(ln)
+
+    def test_name_and_value(self):
+        assert LineFeatures("Лейкоциты").looks_like_name
+        assert not LineFeatures("↑ 28 мм/ч").looks_like_name
+        assert LineFeatures("↑ 28 мм/ч").starts_like_value
+        assert not LineFeatures("").looks_like_name
+
+    def test_tokens_once(self):
+        f = LineFeatures("Гемоглобин 145 г/л 130 - 160")
+        assert f.tokens is f.tokens
+        assert f.has_ref and f.has_unit
+
+
+class TestScope:
+
+    def test_no_scope_no_cache(self):
+        assert line_features("Лейкоциты") is not line_features("Лейкоциты")
+
+    def test_one_object_per_line(self):
+        with document_scope() as cache:
+            assert line_features("Лейкоциты") is line_features("  Лейкоциты ")
+            with document_scope() as inner:
+                assert inner is cache
+                assert line_features("Лейкоциты") is cache["Лейкоциты"]
+        assert line_features("Лейкоциты") is not cache["Лейкоциты"]
+
+    def test_document_features_batch(self):
+        with document_scope() as cache:
+            feats = document_features(LINES + LINES)
+            assert len(feats) == 2 * len(LINES)
+            assert all(a is b for a, b in zip(feats, feats[len(LINES):]))
+            assert len(cache) == len(LINES)
+            assert feats[0] is line_features(LINES[0])
+
+    def test_passes_share_cache(self):
+        with document_scope() as cache:
+            first = engine._smart_to_candidates(DOC)
+            seen = dict(cache)
+            assert engine._smart_to_candidates(DOC) == first
+            assert engine.helix_table_to_candidates(DOC)
+            assert all(cache[k] is v for k, v in seen.items())
+        assert "Гемоглобин 145 г/л 130 - 160" in seen
+        assert first == universal_extract(DOC)
+
+
+class TestSplitRowTokens:
+
+    def test_precomputed_tokens(self):
+        for ln in LINES:
+            s = ln.strip()
+            assert lexer.split_row(s, tokens=LineFeatures(s).tokens) == lexer.split_row(s)
@@ -0,0 +1,119 @@
+"""
+Тесты LLM-кэша по сигнатуре отклонений (engine.llm_cache_key / build_llm_prompt / call_yandexgpt_cached).
+
+Проверяем:
+  - ключ: код, статус, корзина отклонения, пол, возрастная группа, модель;
+    значения в одной корзине и возраст в одной группе — один ключ
+  - промпт строится из той же сигнатуры: точных значений, возраста и названий из бланка в нём нет,
+    у отчётов с одной сигнатурой он совпадает дословно
+  - ответ из кэша совпадает с тем, что модель ответила бы на промпт этого отчёта
+  - повторный вызов с той же сигнатурой не обращается к LLM и IAM
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import engine
+from engine import Item, Range, build_llm_prompt, llm_cache_key, llm_cache_signature
+from infra.disk_cache import DiskCache
+
+
+def _dev(value, status="ВЫШЕ", name="ESR", raw_name="СОЭ (по Вестергрену)", low=2, high=20, unit="мм/ч"):
+    return Item(
+        raw_name=raw_name, name=name, value=value, unit=unit,
+        ref_text=f"{low}-{high}", ref=Range(low, high),
+        ref_source="референс лаборатории", status=status, confidence=1.0,
+    )
+
+
+def _prompt(sex, age, high_low):
+    return build_llm_prompt(sex, age, high_low, "—", ["терапевт"])
+
+
+class TestLlmCacheKey:
+
+    def test_same_bucket_same_key(self):
+        # 21 и 21.5 при норме до 20 — оба «выше на 0–10%»; 52 и 55 лет — группа 50–59
+        base = llm_cache_key("ж", 52, [_dev(21)])
+        assert base == llm_cache_key("ж", 55, [_dev(21.5, raw_name="СОЭ")])
+        assert _prompt("ж", 52, [_dev(21)]) == _prompt("ж", 55, [_dev(21.5, raw_name="СОЭ")])
+
+    def test_key_parts(self):
+        base = llm_cache_key("ж", 52, [_dev(21)])
+        assert base != llm_cache_key("ж", 52, [_dev(28)])                 # другая корзина
+        assert base != llm_cache_key("ж", 52, [_dev(1, status="НИЖЕ")])
+        assert base != llm_cache_key("ж", 52, [_dev(21, name="CRP")])
+        assert base != llm_cache_key("м", 52, [_dev(21)])
+        assert base != llm_cache_key("ж", 62, [_dev(21)])
+        assert base != llm_cache_key("ж", 52, [_dev(21)], model_uri="gpt://x/yandexgpt-lite/latest")
+
+    def test_order_does_not_matter(self):
+        a, b = _dev(28), _dev(40, name="CRP", low=0, high=5, unit="мг/л")
+        assert llm_cache_key("ж", 52, [a, b]) == llm_cache_key("ж", 52, [b, a])
+        assert _prompt("ж", 52, [a, b]) == _prompt("ж", 52, [b, a])
+
+    def test_prompt_has_no_patient_values(self):
+        p = _prompt("ж", 52, [_dev(28.4)])
+        assert "28.4" not in p and "52" not in p
+        assert "Вестергрену" not in p
+        assert "ESR: ВЫШЕ | выше верхней границы нормы на 40–50%" in p
+        assert "50–59" in p
+
+    def test_signature_items(self):
+        assert llm_cache_signature("ж", 52, [_dev(28)])["items"] == [["ESR", "ВЫШЕ", "d4"]]
+
+    def test_no_bound_exact_value(self, monkeypatch):
+        monkeypatch.setattr(engine, "LLM_CACHE_VALUE_BUCKET_PCT", 0)
+        assert llm_cache_signature("ж", 52, [_dev(28)])["items"] == [["ESR", "ВЫШЕ", "v28"]]
+        assert llm_cache_key("ж", 52, [_dev(28)]) != llm_cache_key("ж", 52, [_dev(28.4)])
+
+
+class TestLlmCacheCall:
+
+    @pytest.fixture
+    def echo_llm(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(engine, "_LLM_CACHE", DiskCache(tmp_path, max_bytes=1_000_000, ttl_sec=60))
+        monkeypatch.setattr(engine, "LLM_CACHE_ENABLED", True)
+        calls = {"llm": 0, "iam": 0}
+
+        def fake_iam():
+            calls["iam"] += 1
+            return "t"
+
+        def fake_llm(iam_token, user_text):
+            # как настоящая модель: итог повторяет факты из промпта
+            calls["llm"] += 1
+            return "ДИСКЛЕЙМЕР\nКРАТКИЙ ИТОГ ПО ФАКТАМ\n" + _facts(user_text)
+
+        monkeypatch.setattr(engine, "get_iam_token", fake_iam)
+        monkeypatch.setattr(engine, "call_yandexgpt", fake_llm)
+        return calls
+
+    def _call(self, sex, age, high_low):
+        return engine.call_yandexgpt_cached(sex, age, high_low, _prompt(sex, age, high_low))
+
+    def test_reused_across_reports(self, echo_llm):
+        first = self._call("ж", 52, [_dev(28)])
+        assert self._call("ж", 55, [_dev(28.4, raw_name="СОЭ")]) == first
+        assert echo_llm == {"llm": 1, "iam": 1}
+
+    def test_hit_matches_own_prompt(self, echo_llm):
+        reports = [
+            ("ж", 52, [_dev(28)]),
+            ("ж", 55, [_dev(28.4)]),          # та же сигнатура — из кэша
+            ("ж", 52, [_dev(35)]),            # другая корзина
+            ("м", 52, [_dev(28)]),
+        ]
+        for sex, age, high_low in reports:
+            answer = self._call(sex, age, high_low)
+            assert _facts(answer) == _facts(_prompt(sex, age, high_low))
+        assert echo_llm["llm"] == 3
+
+
+def _facts(text):
+    return "\n".join(ln for ln in text.splitlines() if ln.startswith(("- ", "Пациент:")))
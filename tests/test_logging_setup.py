@@ -0,0 +1,91 @@
+"""
+Тесты логирования (infra/logging_setup.py).
+
+Проверяем:
+  - записи попадают в файл (в т.ч. через фоновый поток) с id запроса
+  - при выключенном DEBUG аргументы не форматируются
+  - параллельные запросы не путают id
+  - ротация по размеру
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from infra.logging_setup import configure_logging, request_scope, shutdown_logging
+
+TEST_LOGGER = "lab_ai_test"
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    yield tmp_path / "debug.txt"
+    shutdown_logging(TEST_LOGGER)
+
+
+class _Counting:
+    def __init__(self):
+        self.calls = 0
+
+    def __str__(self):
+        self.calls += 1
+        return "x"
+
+
+class TestLogging:
+
+    @pytest.mark.parametrize("background", [True, False])
+    def test_writes_with_request_id(self, log_path, background):
+        log = configure_logging(log_path, background=background, logger_name=TEST_LOGGER)
+        with request_scope("job42"):
+            log.debug("candidate: %s val=%s", "Гемоглобин", 145)
+        log.debug("outside")
+        shutdown_logging(TEST_LOGGER)
+
+        lines = log_path.read_text(encoding="utf-8").splitlines()
+        assert "[job42] candidate: Гемоглобин val=145" in lines[0]
+        assert "[-] outside" in lines[1]
+
+    def test_disabled_level_skips_formatting(self, log_path):
+        log = configure_logging(log_path, level="INFO", logger_name=TEST_LOGGER)
+        arg = _Counting()
+        log.debug("value=%s", arg)
+        shutdown_logging(TEST_LOGGER)
+        assert arg.calls == 0
+        assert not log_path.exists() or log_path.read_text(encoding="utf-8") == ""
+
+    def test_concurrent_request_ids_not_mixed(self, log_path):
+        log = configure_logging(log_path, logger_name=TEST_LOGGER)
+
+        def work(rid):
+            with request_scope(rid):
+                for i in range(50):
+                    log.debug("rid=%s i=%d", rid, i)
+
+        threads = [threading.Thread(target=work, args=(f"r{n}",)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        shutdown_logging(TEST_LOGGER)
+
+        lines = log_path.read_text(encoding="utf-8").splitlines()
+        assert len(lines) == 200
+        for ln in lines:
+            rid = ln.split("rid=")[1].split()[0]
+            assert f"[{rid}]" in ln
+
+    def test_rotation(self, log_path):
+        log = configure_logging(
+            log_path, max_bytes=2000, backup_count=2, background=False, logger_name=TEST_LOGGER,
+        )
+        for i in range(200):
+            log.debug("line %d %s", i, "y" * 40)
+        shutdown_logging(TEST_LOGGER)
+        assert log_path.stat().st_size <= 2000
+        assert (log_path.parent / "debug.txt.1").exists()
@@ -0,0 +1,133 @@
+"""
+Тесты OCR-кэша: DiskCache (infra/disk_cache.py) + интеграция в extract_text_from_upload.
+
+Проверяем:
+  - get/set, счётчики hit/miss
+  - TTL: просроченная запись → промах
+  - LRU-вытеснение при превышении max_bytes (недавно прочитанные остаются); max_bytes=0 — без него
+  - set() сообщает, что запись не легла; prune_expired() убирает просроченные
+  - повторная загрузка того же файла не вызывает OCR и IAM
+  - смена модели OCR → другой ключ (промах)
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import engine
+from infra.disk_cache import DiskCache
+
+pytestmark = pytest.mark.usefixtures("memory_context")
+
+
+class TestDiskCache:
+
+    def test_set_get_and_counters(self, tmp_path):
+        cache = DiskCache(tmp_path, max_bytes=10_000, ttl_sec=60)
+        assert cache.get("a" * 64) is None
+        cache.set("a" * 64, {"text": "Гемоглобин 145 г/л 130-160"})
+        assert cache.get("a" * 64) == {"text": "Гемоглобин 145 г/л 130-160"}
+        st = cache.stats()
+        assert st["hits"] == 1
+        assert st["misses"] == 1
+        assert st["entries"] == 1
+
+    def test_ttl_expired_is_miss(self, tmp_path):
+        cache = DiskCache(tmp_path, max_bytes=10_000, ttl_sec=0.05)
+        cache.set("b" * 64, "value")
+        time.sleep(0.1)
+        assert cache.get("b" * 64) is None
+        assert cache.stats()["entries"] == 0
+
+    def test_lru_eviction_keeps_recently_used(self, tmp_path):
+        cache = DiskCache(tmp_path, max_bytes=600, ttl_sec=60)
+        payload = "x" * 150
+        keys = [f"{i:02d}" + "k" * 62 for i in range(3)]
+        for i, k in enumerate(keys):
+            cache.set(k, payload)
+            # разносим mtime, чтобы порядок LRU был детерминированным
+            os.utime(cache._path(k), (1000 + i, 1000 + i))
+        cache._index = None
+        assert cache.get(keys[0]) == payload   # keys[0] стал самым свежим
+        cache.set("zz" + "k" * 62, payload)    # переполнение → вытесняем самый старый (keys[1])
+        assert cache.get(keys[1]) is None
+        assert cache.get(keys[0]) == payload
+        assert cache.stats()["evictions"] >= 1
+
+    def test_set_reports_failure(self, tmp_path):
+        (tmp_path / "file").write_text("")
+        assert not DiskCache(tmp_path / "file" / "cache").set("c" * 64, "value")   # mkdir → OSError
+        assert not DiskCache(tmp_path, max_bytes=10).set("c" * 64, "x" * 100)
+        assert DiskCache(tmp_path).set("c" * 64, "value")
+
+    def test_no_size_eviction(self, tmp_path):
+        cache = DiskCache(tmp_path, max_bytes=0, ttl_sec=60)
+        keys = [f"{i:02d}" + "k" * 62 for i in range(5)]
+        for k in keys:
+            assert cache.set(k, "x" * 10_000)
+        assert all(cache.get(k) is not None for k in keys)
+        assert cache.stats()["evictions"] == 0
+
+    def test_prune_expired(self, tmp_path):
+        cache = DiskCache(tmp_path, max_bytes=0, ttl_sec=60)
+        cache.set("d" * 64, "old")
+        cache.set("e" * 64, "new")
+        os.utime(cache._path("d" * 64), (1000, 1000))
+        assert cache.prune_expired() == 1
+        assert not cache._path("d" * 64).exists()
+        assert cache.get("e" * 64) == "new"
+
+
+class TestOcrCacheIntegration:
+
+    @pytest.fixture
+    def isolated_cache(self, tmp_path, monkeypatch):
+        cache = DiskCache(tmp_path / "ocr", max_bytes=1_000_000, ttl_sec=60)
+        monkeypatch.setattr(engine, "_OCR_CACHE", cache)
+        monkeypatch.setattr(engine, "OCR_CACHE_ENABLED", True)
+        return cache
+
+    def test_repeat_image_upload_skips_ocr(self, isolated_cache, monkeypatch):
+        calls = {"ocr": 0, "iam": 0}
+
+        def fake_iam():
+            calls["iam"] += 1
+            return "t"
+
+        def fake_ocr(iam_token, file_bytes, mime_type):
+            calls["ocr"] += 1
+            return {"result": {"textAnnotation": {"fullText": "СОЭ 28 мм/ч 2-20"}}}
+
+        monkeypatch.setattr(engine, "get_iam_token", fake_iam)
+        monkeypatch.setattr(engine, "ocr_image_sync", fake_ocr)
+
+        photo = b"\xff\xd8fake-jpeg-bytes"
+        first = engine.extract_text_from_upload(photo, "lab.jpg", "image/jpeg")
+        second = engine.extract_text_from_upload(photo, "lab.jpg", "image/jpeg")
+
+        assert first == second
+        assert calls == {"ocr": 1, "iam": 1}
+        assert isolated_cache.stats()["hits"] == 1
+
+    def test_model_change_is_cache_miss(self, isolated_cache, monkeypatch):
+        k1 = engine._ocr_cache_key("d" * 64, "image:image/png")
+        monkeypatch.setattr(engine, "OCR_MODEL", "table")
+        k2 = engine._ocr_cache_key("d" * 64, "image:image/png")
+        assert k1 != k2
+
+    def test_failed_ocr_not_cached(self, isolated_cache, monkeypatch):
+        monkeypatch.setattr(engine, "get_iam_token", lambda: "t")
+
+        def failing_ocr(iam_token, file_bytes, mime_type):
+            raise RuntimeError("OCR image error HTTP 500")
+
+        monkeypatch.setattr(engine, "ocr_image_sync", failing_ocr)
+        with pytest.raises(RuntimeError):
+            engine.extract_text_from_upload(b"png-bytes", "lab.png", "image/png")
+        assert isolated_cache.stats()["entries"] == 0
@@ -0,0 +1,119 @@
+"""
+Тесты постраничного параллельного OCR (ocr/pdf_pages.py + engine.ocr_pdf_pages).
+
+PDF собирается на лету из пустых страниц разной ширины: по ширине фейковый
+OCR понимает, какую страницу ему прислали.
+
+Проверяем:
+  - разбиение на страницы / группы, выбор отдельных страниц
+  - страницы распознаются параллельно, текст склеивается по порядку
+  - число одновременных запросов ограничено OCR_PDF_PAGE_WORKERS
+  - упавшая страница не роняет весь документ, но неполный результат не кэшируется
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+pypdf = pytest.importorskip("pypdf")
+
+import engine
+from infra.disk_cache import DiskCache
+from ocr.pdf_pages import count_pdf_pages, split_pdf_pages
+from pdf_helpers import make_pdf, page_id
+
+pytestmark = pytest.mark.usefixtures("memory_context")
+
+
+class TestSplitPdf:
+
+    def test_split_single_pages(self):
+        parts = split_pdf_pages(make_pdf(4))
+        assert [p.first_page for p in parts] == [0, 1, 2, 3]
+        assert all(count_pdf_pages(p.content) == 1 for p in parts)
+        assert [page_id(p.content) for p in parts] == [0, 1, 2, 3]
+
+    def test_split_groups_and_selection(self):
+        parts = split_pdf_pages(make_pdf(6), pages_per_part=2, page_numbers=[0, 1, 2, 4, 5, 9])
+        assert [(p.first_page, p.pages) for p in parts] == [(0, 2), (2, 1), (4, 2)]
+
+    def test_broken_pdf(self):
+        with pytest.raises(ValueError):
+            split_pdf_pages(b"not a pdf")
+
+
+class TestParallelOcr:
+
+    @pytest.fixture
+    def fake_ocr(self, monkeypatch):
+        state = {"active": 0, "max_active": 0, "fail": set(), "lock": threading.Lock()}
+
+        def fake(iam, part_bytes, mime):
+            assert mime == "application/pdf"
+            page = page_id(part_bytes)
+            with state["lock"]:
+                state["active"] += 1
+                state["max_active"] = max(state["max_active"], state["active"])
+            try:
+                time.sleep(0.15)
+                if page in state["fail"]:
+                    raise RuntimeError(f"OCR image error HTTP 500 (page {page})")
+                return {"result": {"textAnnotation": {"fullText": f"Показатель{page} {page}.0 г/л 1-9"}}}
+            finally:
+                with state["lock"]:
+                    state["active"] -= 1
+
+        monkeypatch.setattr(engine, "ocr_image_sync", fake)
+        monkeypatch.setattr(engine, "get_iam_token", lambda: "t")
+        monkeypatch.setattr(engine, "_OCR_PAGE_EXECUTOR", None)
+        return state
+
+    def test_pages_merged_in_order(self, fake_ocr, monkeypatch):
+        monkeypatch.setattr(engine, "OCR_PDF_PAGE_WORKERS", 6)
+        started = time.time()
+        text = engine._ocr_pdf_plain(make_pdf(6))
+        elapsed = time.time() - started
+
+        assert text.splitlines() == [f"Показатель{i} {i}.0 г/л 1-9" for i in range(6)]
+        assert elapsed < 0.6    # ≈ одна страница, а не 6 × 0.15 с
+
+    def test_concurrency_bounded(self, fake_ocr, monkeypatch):
+        monkeypatch.setattr(engine, "OCR_PDF_PAGE_WORKERS", 2)
+        texts, failed = engine.ocr_pdf_pages(make_pdf(5))
+        assert sorted(texts) == [0, 1, 2, 3, 4]
+        assert failed == []
+        assert fake_ocr["max_active"] <= 2
+
+    def test_failed_page_skipped(self, fake_ocr):
+        fake_ocr["fail"] = {1}
+        texts, failed = engine.ocr_pdf_pages(make_pdf(3))
+        assert sorted(texts) == [0, 2]
+        assert failed == [1]
+
+    def test_failed_page_not_cached(self, fake_ocr, tmp_path, monkeypatch):
+        cache = DiskCache(tmp_path / "ocr", max_bytes=1_000_000, ttl_sec=60)
+        monkeypatch.setattr(engine, "_OCR_CACHE", cache)
+        monkeypatch.setattr(engine, "OCR_CACHE_ENABLED", True)
+        monkeypatch.setattr(engine, "try_extract_pdf_page_texts", lambda b: ["", "", ""])
+        pdf = make_pdf(3)
+
+        fake_ocr["fail"] = {1}
+        out = engine.extract_text_from_upload(pdf, "lab.pdf", "application/pdf")
+        assert "Показатель0" in out and "Показатель1" not in out
+        assert cache.stats()["entries"] == 1     # только текстовый слой pypdf
+
+        fake_ocr["fail"] = set()
+        out = engine.extract_text_from_upload(pdf, "lab.pdf", "application/pdf")
+        assert "Показатель1" in out
+        assert cache.stats()["entries"] == 2
+
+    def test_all_pages_failed(self, fake_ocr):
+        fake_ocr["fail"] = {0, 1}
+        with pytest.raises(RuntimeError, match="HTTP 500"):
+            engine.ocr_pdf_pages(make_pdf(2))
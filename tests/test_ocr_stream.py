@@ -0,0 +1,125 @@
+"""
+Тесты потокового разбора getRecognition (ocr/stream_reader.py + engine).
+
+Проверяем:
+  - поток из нескольких JSON-объектов разбирается целиком при любом разбиении на чанки
+  - строки с кавычками/скобками/escape и многобайтный UTF-8 на границе чанка
+  - обрыв посреди объекта и мусор → JsonStreamError
+  - engine: все страницы ответа попадают в текст (раньше терялись все, кроме первой)
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import engine
+from ocr.stream_reader import JsonStreamError, iter_json_objects
+
+pytestmark = pytest.mark.usefixtures("memory_context")
+
+
+def _page(idx, lines):
+    return {"result": {"page": str(idx), "textAnnotation": {
+        "blocks": [{"lines": [{"text": t} for t in lines]}],
+    }}}
+
+
+def _chunked(data: bytes, n: int):
+    return [data[i:i + n] for i in range(0, len(data), n)]
+
+
+PAGES = [
+    _page(0, ["Гемоглобин 145 г/л 130-160", 'Комментарий: "{скобки}" \\ [x]']),
+    _page(1, ["СОЭ 28 мм/ч 2-20"]),
+    _page(2, ["Глюкоза 5.1 ммоль/л 3.9-6.1"]),
+]
+STREAM = "\n".join(json.dumps(p, ensure_ascii=False) for p in PAGES).encode("utf-8")
+
+
+class TestIterJsonObjects:
+
+    @pytest.mark.parametrize("chunk", [1, 2, 3, 5, 17, 4096])
+    def test_any_chunking(self, chunk):
+        assert list(iter_json_objects(_chunked(STREAM, chunk))) == PAGES
+
+    def test_pretty_printed_objects(self):
+        text = "".join(json.dumps(p, ensure_ascii=False, indent=2) for p in PAGES)
+        assert list(iter_json_objects([text])) == PAGES
+
+    def test_yields_before_stream_ends(self):
+        first = json.dumps(PAGES[0], ensure_ascii=False).encode("utf-8")
+
+        def chunks():
+            yield first + b"\n"
+            raise AssertionError("первая страница должна быть отдана до чтения следующего чанка")
+
+        it = iter_json_objects(chunks())
+        assert next(it) == PAGES[0]
+
+    def test_truncated_stream(self):
+        with pytest.raises(JsonStreamError):
+            list(iter_json_objects([STREAM[:-5]]))
+
+    def test_garbage(self):
+        with pytest.raises(JsonStreamError):
+            list(iter_json_objects([b"<html>502</html>"]))
+
+
+class _FakeResponse:
+    def __init__(self, body: bytes, status_code: int = 200):
+        self._body = body
+        self.status_code = status_code
+
+    @property
+    def text(self):
+        return self._body.decode("utf-8")
+
+    def iter_content(self, chunk_size=1):
+        return iter(_chunked(self._body, 7))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _FakeHttp:
+    def __init__(self, response):
+        self.response = response
+        self.kwargs = None
+
+    def get(self, url, **kwargs):
+        self.kwargs = kwargs
+        return self.response
+
+
+class TestEngineRecognition:
+
+    def test_stream_recognition_keeps_all_pages(self, monkeypatch):
+        # страницы пришли не по порядку — собираем по номеру
+        body = "\n".join(json.dumps(p, ensure_ascii=False) for p in (PAGES[1], PAGES[0], PAGES[2])).encode("utf-8")
+        http = _FakeHttp(_FakeResponse(body))
+        monkeypatch.setattr(engine, "_HTTP", http)
+
+        pages = engine.ocr_pdf_stream_recognition("t", "op1")
+        assert http.kwargs["stream"] is True
+        assert len(pages) == 3
+        assert pages[0].startswith("Гемоглобин")
+        assert "СОЭ 28" in pages[1]
+        assert "Глюкоза" in pages[2]
+
+    def test_stream_recognition_not_ready(self, monkeypatch):
+        monkeypatch.setattr(engine, "_HTTP", _FakeHttp(_FakeResponse(b"operation data is not ready", 404)))
+        assert engine.ocr_pdf_stream_recognition("t", "op1") is None
+
+    def test_get_recognition_merges_objects(self, monkeypatch):
+        monkeypatch.setattr(engine, "_HTTP", _FakeHttp(_FakeResponse(STREAM)))
+        res = engine.ocr_pdf_get_recognition("t", "op1")
+        text = engine.ocr_result_to_plaintext(res)
+        assert "Гемоглобин" in text and "СОЭ" in text and "Глюкоза" in text
@@ -0,0 +1,68 @@
+"""
+Тесты разбора OCR JSON в текст (engine._collect_text_annotations / ocr_result_to_plaintext).
+
+Проверяем:
+  - текст страницы — ровно один раз (fullText, а не fullText + lines[].text)
+  - без fullText — строки блоков; слова и таблицы внутри страницы не дублируют текст
+  - порядок страниц сохраняется; ответ одним объектом и {"result": {"pages": [...]}}
+  - глубокая вложенность не упирается в лимит рекурсии
+"""
+
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import engine
+
+LINES = ["Гемоглобин 145 г/л 130 - 160", "СОЭ 28 мм/ч 2 - 20"]
+
+
+def _annotation(lines, full_text=True):
+    ta = {"blocks": [{"lines": [
+        {"text": t, "words": [{"text": w} for w in t.split()]} for t in lines
+    ]}], "tables": [{"cells": [{"text": lines[0]}]}]}
+    if full_text:
+        ta["fullText"] = "\n".join(lines)
+    return ta
+
+
+def _collect(node):
+    out = []
+    engine._collect_text_annotations(node, out)
+    return out
+
+
+class TestCollectTextAnnotations:
+
+    def test_full_text_once(self):
+        assert _collect({"result": {"textAnnotation": _annotation(LINES)}}) == ["\n".join(LINES)]
+
+    def test_lines_without_full_text(self):
+        assert _collect({"textAnnotation": _annotation(LINES, full_text=False)}) == LINES
+
+    def test_pages_in_order(self):
+        pages = [{"textAnnotation": _annotation([f"Страница {i}"])} for i in range(5)]
+        assert _collect({"pages": pages}) == [f"Страница {i}" for i in range(5)]
+
+    def test_deep_nesting(self):
+        node = {"textAnnotation": _annotation(LINES)}
+        for _ in range(5000):
+            node = [node]
+        assert _collect(node) == ["\n".join(LINES)]
+
+
+class TestPlaintext:
+
+    def test_single_object(self):
+        text = engine.ocr_result_to_plaintext({"result": {"textAnnotation": _annotation(LINES)}})
+        assert text.splitlines() == LINES
+
+    def test_multipage(self):
+        res = {"result": {"pages": [{"textAnnotation": _annotation(LINES[:1])},
+                                    {"textAnnotation": _annotation(LINES[1:])}]}}
+        assert engine.ocr_result_to_plaintext(res).splitlines() == LINES
+
+    def test_empty(self):
+        assert engine.ocr_result_to_plaintext({"result": {}}) == ""
@@ -0,0 +1,195 @@
+"""
+Тесты досрочного завершения OCR по полноте панели (parsers.quality + engine).
+
+Проверяем:
+  - evaluate_completeness: полный ОАК — complete, без лейкоформулы — нет
+  - неуверенные показатели полноту не подтверждают, панель без групп — тоже
+  - текстовый слой уже содержит весь ОАК → OCR страниц со слабым текстовым слоем не вызывается,
+    а страницы без текстового слоя (скан с другими анализами) распознаются всё равно
+  - ocr_pdf_pages: stop_when → оставшиеся страницы не распознаются, кроме keep_pages
+  - досрочно остановленный OCR не попадает в кэш, полный — попадает
+"""
+
+import io
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import engine
+from infra.disk_cache import DiskCache
+from parsers.quality import evaluate_completeness, missing_expected_groups
+
+pytestmark = pytest.mark.usefixtures("memory_context")
+
+MAIN_LINES = [
+    "Лейкоциты (WBC) 6.1 10^9/л 4.0 - 9.0",
+    "Эритроциты (RBC) 4.8 10^12/л 4.0 - 5.5",
+    "Гемоглобин (HGB) 145 г/л 130 - 160",
+    "Гематокрит (HCT) 43 % 39 - 49",
+    "Тромбоциты (PLT) 250 10^9/л 150 - 400",
+]
+DIFF_LINES = [
+    "Нейтрофилы (NE%) 55 % 47 - 72",
+    "Лимфоциты (LY%) 35 % 19 - 37",
+    "Моноциты (MO%) 6 % 3 - 11",
+    "Эозинофилы (EO%) 3 % 0.5 - 5",
+    "Базофилы (BA%) 1 % 0 - 1",
+]
+MAIN_PAGE = "\n".join(MAIN_LINES)
+DIFF_PAGE = "\n".join(DIFF_LINES)
+FULL_CBC_PAGE = "\n".join(MAIN_LINES + DIFF_LINES)
+
+
+def _items(text: str):
+    items = engine.parse_with_fallback(engine._smart_to_candidates(text))
+    engine.assign_confidence(items)
+    return items
+
+
+class TestEvaluateCompleteness:
+
+    def test_full_cbc_complete(self):
+        items = _items(FULL_CBC_PAGE)
+        res = evaluate_completeness(items, engine.detect_panel({it.name for it in items}))
+        assert res["complete"] is True
+        assert res["panels"] == ["cbc"]
+        assert res["missing"] == {}
+
+    def test_missing_differential(self):
+        items = _items(MAIN_PAGE)
+        res = evaluate_completeness(items, engine.detect_panel({it.name for it in items}))
+        assert res["complete"] is False
+        assert res["missing"]["лейкоформула_проценты"] == ["BA%", "EO%", "LY%", "MO%", "NE%"]
+
+    def test_low_confidence_not_counted(self):
+        items = _items(FULL_CBC_PAGE)
+        for it in items:
+            if it.name == "HGB":
+                it.confidence = 0.3
+        res = evaluate_completeness(items, engine.detect_panel({it.name for it in items}))
+        assert res["complete"] is False
+        assert res["missing"] == {"основные_показатели": ["HGB"]}
+
+    def test_panel_without_groups(self):
+        assert missing_expected_groups(set(), {"cbc": 0, "biochem": 5}) == {}
+        assert evaluate_completeness([], {"cbc": 0, "biochem": 5})["complete"] is False
+
+
+class TestSkipOcrWhenComplete:
+
+    @pytest.fixture
+    def ocr_calls(self, monkeypatch):
+        calls = []
+
+        def fake_ocr(file_bytes, page_numbers=None, stop_when=None, pages_out=None, tables_out=None, failed_out=None,
+                     keep_pages=()):
+            calls.append(page_numbers)
+            return "СОЭ 28 мм/ч 2 - 20"
+
+        monkeypatch.setattr(engine, "OCR_CACHE_ENABLED", False)
+        monkeypatch.setattr(engine, "_ocr_pdf_plain", fake_ocr)
+        return calls
+
+    def test_complete_text_layer_skips_ocr(self, ocr_calls, monkeypatch):
+        monkeypatch.setattr(engine, "try_extract_pdf_page_texts", lambda b: [FULL_CBC_PAGE, "Стр. 2 из 2"])
+        out = engine.extract_text_from_upload(b"%PDF-cbc", "lab.pdf", "application/pdf")
+        assert ocr_calls == []
+        assert "Базофилы" in out
+
+    def test_image_page_ocred_despite_complete_panel(self, ocr_calls, monkeypatch):
+        monkeypatch.setattr(engine, "try_extract_pdf_page_texts",
+                            lambda b: [FULL_CBC_PAGE, "Стр. 2 из 3", ""])
+        out = engine.extract_text_from_upload(b"%PDF-mixed", "lab.pdf", "application/pdf")
+        assert ocr_calls == [[2]]
+        assert "Базофилы" in out
+        assert "СОЭ" in out
+
+    def test_incomplete_text_layer_runs_ocr(self, ocr_calls, monkeypatch):
+        monkeypatch.setattr(engine, "try_extract_pdf_page_texts", lambda b: [MAIN_PAGE, ""])
+        engine.extract_text_from_upload(b"%PDF-cbc", "lab.pdf", "application/pdf")
+        assert ocr_calls == [[1]]
+
+    def test_disabled(self, ocr_calls, monkeypatch):
+        monkeypatch.setattr(engine, "OCR_SKIP_WHEN_PANEL_COMPLETE", False)
+        monkeypatch.setattr(engine, "try_extract_pdf_page_texts", lambda b: [FULL_CBC_PAGE, ""])
+        engine.extract_text_from_upload(b"%PDF-cbc", "lab.pdf", "application/pdf")
+        assert ocr_calls == [[1]]
+
+
+class TestStopWhen:
+
+    def test_remaining_pages_not_recognized(self, monkeypatch):
+        pypdf = pytest.importorskip("pypdf")
+        writer = pypdf.PdfWriter()
+        for _ in range(6):
+            writer.add_blank_page(width=100, height=200)
+        buf = io.BytesIO()
+        writer.write(buf)
+
+        lock = threading.Lock()
+        calls = []
+
+        def fake(iam, part_bytes, mime):
+            with lock:
+                calls.append(1)
+            time.sleep(0.02)
+            return {"result": {"textAnnotation": {"fullText": "СОЭ 28 мм/ч 2-20"}}}
+
+        monkeypatch.setattr(engine, "ocr_image_sync", fake)
+        monkeypatch.setattr(engine, "get_iam_token", lambda: "t")
+        monkeypatch.setattr(engine, "_OCR_PAGE_EXECUTOR", None)
+        monkeypatch.setattr(engine, "OCR_PDF_PAGE_WORKERS", 1)
+
+        texts, failed = engine.ocr_pdf_pages(buf.getvalue(), stop_when=lambda done: len(done) >= 1)
+        assert len(texts) == 1
+        assert failed == []
+        assert len(calls) < 6
+
+        calls.clear()
+        texts, failed = engine.ocr_pdf_pages(buf.getvalue(), stop_when=lambda done: True, keep_pages={5})
+        assert 5 in texts
+        assert len(calls) < 6
+
+
+class TestEarlyStopNotCached:
+
+    @pytest.fixture
+    def cache(self, tmp_path, monkeypatch):
+        cache = DiskCache(tmp_path / "ocr", max_bytes=1_000_000, ttl_sec=60)
+        monkeypatch.setattr(engine, "_OCR_CACHE", cache)
+        monkeypatch.setattr(engine, "OCR_CACHE_ENABLED", True)
+        monkeypatch.setattr(engine, "try_extract_pdf_page_texts", lambda b: [MAIN_PAGE, "Стр. 2 из 3", "Стр. 3 из 3"])
+        return cache
+
+    def _fake_ocr(self, page_text, calls):
+        def fake(file_bytes, page_numbers=None, stop_when=None, pages_out=None, tables_out=None, failed_out=None,
+                 keep_pages=()):
+            calls.append(page_numbers)
+            # первая готовая страница; остальные «отменены», если stop_when согласился
+            if stop_when is not None and stop_when({page_numbers[0]: page_text}):
+                return page_text
+            return page_text + "\nСОЭ 28 мм/ч 2 - 20"
+        return fake
+
+    def test_stopped_result_not_cached(self, cache, monkeypatch):
+        calls = []
+        monkeypatch.setattr(engine, "_ocr_pdf_plain", self._fake_ocr(DIFF_PAGE, calls))
+        for _ in range(2):
+            out = engine.extract_text_from_upload(b"%PDF-stop", "lab.pdf", "application/pdf")
+            assert "Базофилы" in out
+        assert calls == [[1, 2], [1, 2]]
+        assert cache.stats()["entries"] == 1     # только текстовый слой pypdf
+
+    def test_full_result_cached(self, cache, monkeypatch):
+        calls = []
+        monkeypatch.setattr(engine, "_ocr_pdf_plain", self._fake_ocr("Глюкоза 5.1 ммоль/л 3.9 - 6.1", calls))
+        for _ in range(2):
+            engine.extract_text_from_upload(b"%PDF-full", "lab.pdf", "application/pdf")
+        assert calls == [[1, 2]]
+        assert cache.stats()["entries"] == 2     # текстовый слой + OCR
@@ -0,0 +1,43 @@
+"""
+Тесты общего модуля шаблонов (parsers/patterns.py).
+
+Проверяем:
+  - помощники: степени 10, числа
+  - engine и universal_extractor используют одни и те же помощники
+  - шаблон «ровно dp знаков» компилируется один раз на dp
+"""
+
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import engine
+from parsers import patterns as P
+from parsers import universal_extractor
+
+
+class TestHelpers:
+
+    def test_scientific_notation(self):
+        assert P.normalize_scientific_notation("10⁹/л") == "10^9/л"
+        assert P.normalize_scientific_notation("10 ~ 12") == "10^12"
+        assert P.normalize_scientific_notation("10 - 40") == "10 - 40"
+
+    def test_parse_float(self):
+        assert P.parse_float("6,1") == 6.1
+        assert P.parse_float("↑145") == 145.0
+        assert P.parse_float("—") is None
+
+
+class TestShared:
+
+    def test_one_implementation(self):
+        for name in ("_extract_ref_text", "_normalize_scientific_notation", "_parse_value_unit_from_line"):
+            assert getattr(engine, name) is getattr(universal_extractor, name)
+        assert engine.parse_float is P.parse_float
+
+    def test_decimal_places_cached(self):
+        assert P.decimal_places(2) is P.decimal_places(2)
+        assert P.decimal_places(2).match("11.004.78").groups() == ("11.00", "4.78")
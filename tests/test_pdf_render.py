@@ -0,0 +1,105 @@
+"""
+Тесты рендера отчёта в PDF в памяти (engine.render_pdf_bytes / generate_pdf_bytes).
+
+Проверяем:
+  - HTML уходит в Chromium через set_content, PDF возвращается байтами
+  - generate_pdf_bytes без persist не пишет файлов отчёта на диск
+  - generate_pdf_report пишет только html/pdf; папка запроса — по REQUEST_WORKSPACE_MODE / KEEP
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import engine
+
+TEXT = "Гемоглобин 145 г/л 130 - 160\nСОЭ 28 мм/ч 2 - 20"
+
+
+class FakePage:
+
+    def __init__(self):
+        self.content = None
+        self.pdf_kwargs = None
+
+    def set_content(self, html, wait_until=None):
+        self.content = html
+
+    def goto(self, *args, **kwargs):
+        raise AssertionError("отчёт не должен открываться из файла")
+
+    def pdf(self, **kwargs):
+        self.pdf_kwargs = kwargs
+        return b"%PDF-fake"
+
+
+class FakePool:
+
+    def __init__(self):
+        self.pages = []
+
+    def run(self, fn):
+        page = FakePage()
+        self.pages.append(page)
+        return fn(page)
+
+    def stats(self):
+        return {"wait_ms_last": 0, "wait_ms_avg": 0, "wait_ms_max": 0,
+                "render_ms_avg": 0, "queue_depth": 0, "launches": 0}
+
+
+@pytest.fixture
+def pool(monkeypatch, tmp_path):
+    fake = FakePool()
+    monkeypatch.setattr(engine, "_get_pdf_pool", lambda: fake)
+    monkeypatch.setattr(engine, "OUT_DIR", tmp_path)
+    monkeypatch.setattr(engine, "REQUEST_WORKSPACE_DIR", tmp_path / "requests")
+    return fake
+
+
+class TestRenderPdfBytes:
+
+    def test_set_content(self, pool):
+        pdf = engine.render_pdf_bytes("<html><body>отчёт</body></html>", "2026-01-01 10:00:00")
+        assert pdf == b"%PDF-fake"
+        page = pool.pages[0]
+        assert page.content == "<html><body>отчёт</body></html>"
+        assert "path" not in page.pdf_kwargs
+        assert "2026-01-01 10:00:00" in page.pdf_kwargs["footer_template"]
+
+
+class TestGeneratePdfBytes:
+
+    def test_no_files_written(self, pool, tmp_path):
+        pdf, name = engine.generate_pdf_bytes("М", 40, raw_text=TEXT)
+        assert pdf == b"%PDF-fake"
+        assert name.startswith("report_") and name.endswith(".pdf")
+        assert "Гемоглобин" in pool.pages[0].content
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestGeneratePdfReport:
+
+    @pytest.fixture
+    def with_artifact(self, monkeypatch):
+        def build(*args, **kwargs):
+            engine.current_context().put(engine.OCR_PLAIN_ARTIFACT, "Гемоглобин 145")
+            return "<html>отчёт</html>", "2026-01-01 10:00:00", "report_test"
+
+        monkeypatch.setattr(engine, "_build_report_html", build)
+
+    def test_no_request_workspace_left(self, pool, tmp_path, with_artifact):
+        pdf_path, name = engine.generate_pdf_report("М", 40, raw_text=TEXT)
+        assert pdf_path.read_bytes() == b"%PDF-fake"
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["report_test.html", "report_test.pdf"]
+
+    def test_workspace_kept_on_request(self, pool, tmp_path, with_artifact, monkeypatch):
+        monkeypatch.setattr(engine, "REQUEST_WORKSPACE_MODE", "disk")
+        monkeypatch.setattr(engine, "REQUEST_WORKSPACE_KEEP", True)
+        engine.generate_pdf_report("М", 40, raw_text=TEXT)
+        (workspace,) = (tmp_path / "requests").iterdir()
+        assert (workspace / engine.OCR_PLAIN_ARTIFACT).exists()
@@ -0,0 +1,108 @@
+"""
+Тесты постраничной маршрутизации PDF: текстовый слой pypdf vs OCR (engine).
+
+Проверяем:
+  - page_needs_ocr: страница с показателями / длинный текст — без OCR, пустая — OCR
+  - в OCR уходят только страницы без текстового слоя, результаты сливаются
+  - полностью текстовый PDF не вызывает OCR вовсе
+  - без текстового слоя OCR получает весь документ
+  - мало кандидатов в текстовом слое — OCR и для страниц, прошедших только по длине
+    текста (печатная шапка над сканом таблицы, битый CID-шрифт)
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import engine
+
+pytestmark = pytest.mark.usefixtures("memory_context")
+
+TEXT_PAGE = "\n".join([
+    "Гемоглобин 145 г/л 130 - 160",
+    "Эритроциты 4.8 10^12/л 4.0 - 5.5",
+    "Лейкоциты 6.1 10^9/л 4.0 - 9.0",
+    "Тромбоциты 250 10^9/л 150 - 400",
+    "Гематокрит 42 % 39 - 49",
+    "Глюкоза 5.1 ммоль/л 3.9 - 6.1",
+    "Креатинин 80 мкмоль/л 62 - 106",
+    "Мочевина 5.2 ммоль/л 2.8 - 7.2",
+    "Холестерин общий 4.9 ммоль/л 3.0 - 5.2",
+    "Билирубин общий 12 мкмоль/л 3.4 - 20.5",
+])
+SHORT_TEXT_PAGE = "\n".join(TEXT_PAGE.splitlines()[:3])
+COVER_PAGE = "Уважаемый пациент! " * 30
+# печатная шапка бланка над отсканированной таблицей результатов
+HEADER_PAGE = "\n".join([
+    "ООО «Медицинская лаборатория», лицензия ЛО-77-01-012345 от 01.02.2020",
+    "Адрес: г. Москва, ул. Примерная, д. 1, стр. 2; телефон +7 (495) 000-00-00",
+    "Пациент: Иванов Иван Иванович, дата рождения 01.01.1980, пол мужской",
+    "Дата взятия биоматериала: 12.03.2024 08:15, дата выполнения: 12.03.2024",
+    "Врач: Петров П. П., отделение: поликлиника, номер заказа 123456789",
+])
+
+
+class TestPageNeedsOcr:
+
+    def test_text_page(self):
+        assert engine.page_needs_ocr(TEXT_PAGE) is False
+
+    def test_long_text_without_analytes(self):
+        assert engine.page_needs_ocr(COVER_PAGE) is False
+
+    def test_empty_or_tiny_page(self):
+        assert engine.page_needs_ocr("") is True
+        assert engine.page_needs_ocr("Стр. 2 из 3") is True
+
+
+class TestPdfRouting:
+
+    @pytest.fixture
+    def routed(self, monkeypatch):
+        calls = []
+
+        def fake_ocr(file_bytes, page_numbers=None, stop_when=None, pages_out=None, tables_out=None, failed_out=None,
+                     keep_pages=()):
+            calls.append(page_numbers)
+            return "СОЭ 28 мм/ч 2 - 20\nГлюкоза 5.1 ммоль/л 3.9 - 6.1"
+
+        monkeypatch.setattr(engine, "OCR_CACHE_ENABLED", False)
+        monkeypatch.setattr(engine, "_ocr_pdf_plain", fake_ocr)
+        return calls
+
+    def test_only_image_pages_ocred(self, routed, monkeypatch):
+        monkeypatch.setattr(engine, "try_extract_pdf_page_texts", lambda b: [TEXT_PAGE, "", COVER_PAGE, ""])
+        out = engine.extract_text_from_upload(b"%PDF-mixed", "lab.pdf", "application/pdf")
+        assert routed == [[1, 3]]
+        assert "Гемоглобин" in out
+        assert "СОЭ" in out
+
+    def test_text_pdf_skips_ocr(self, routed, monkeypatch):
+        monkeypatch.setattr(engine, "try_extract_pdf_page_texts", lambda b: [TEXT_PAGE, COVER_PAGE])
+        out = engine.extract_text_from_upload(b"%PDF-text", "lab.pdf", "application/pdf")
+        assert routed == []
+        assert "Гемоглобин" in out
+
+    def test_header_only_page_ocred(self, routed, monkeypatch):
+        assert engine.page_needs_ocr(HEADER_PAGE) is False
+        monkeypatch.setattr(engine, "try_extract_pdf_page_texts", lambda b: [HEADER_PAGE])
+        out = engine.extract_text_from_upload(b"%PDF-header", "lab.pdf", "application/pdf")
+        assert routed == [[0]]
+        assert "СОЭ" in out
+
+    def test_few_candidates_ocr_text_only_pages(self, routed, monkeypatch):
+        garbled = "ÿþ\x03\x17\x05\x11 " * 60     # CID-шрифт без ToUnicode
+        monkeypatch.setattr(engine, "try_extract_pdf_page_texts",
+                            lambda b: [SHORT_TEXT_PAGE, HEADER_PAGE, garbled, ""])
+        engine.extract_text_from_upload(b"%PDF-few", "lab.pdf", "application/pdf")
+        assert routed == [[1, 2, 3]]
+
+    def test_scan_without_text_layer(self, routed, monkeypatch):
+        monkeypatch.setattr(engine, "try_extract_pdf_page_texts", lambda b: ["", ""])
+        out = engine.extract_text_from_upload(b"%PDF-scan", "lab.pdf", "application/pdf")
+        assert routed == [None]
+        assert "СОЭ" in out
@@ -0,0 +1,125 @@
+"""
+Тесты профилировщика регулярных выражений (parsers/regex_profiler.py).
+
+Проверяем:
+  - вызовы, совпадения и время считаются по шаблону и по вызывающей функции
+  - вызов через помощник parsers.patterns записывается как "функция → помощник"
+  - после выхода из профиля шаблоны — снова исходные re.Pattern
+  - у параллельных профилей (ContextVar) свои счётчики
+  - REGEX_PROFILE=True → артефакт с отчётом в контексте запроса
+"""
+
+import re
+import sys
+import threading
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import engine
+from infra.request_context import RequestContext
+from parsers import medsi_extractor
+from parsers import patterns as P
+from parsers.regex_profiler import RegexProfile, profile_regex
+
+FIXTURE = PROJECT_ROOT / "tests" / "fixtures" / "medsi_pypdf_text.txt"
+
+
+def _use_has_range(lines):
+    return [bool(P.HAS_RANGE_START.search(ln)) for ln in lines]
+
+
+class TestCounting:
+
+    def test_calls_and_hits(self):
+        with profile_regex() as prof:
+            _use_has_range(["Глюкоза 5.1 3.9-6.1", "Глюкоза 5,1 ммоль/л", "СРБ 2-5"])
+        st = prof.by_pattern()["HAS_RANGE_START"]
+        assert (st.calls, st.hits) == (3, 2)
+        assert st.total_ns > 0 and st.max_ns <= st.total_ns
+
+    def test_caller(self):
+        with profile_regex() as prof:
+            _use_has_range(["СРБ 2-5"])
+            P.collapse_spaces("a   b")
+        callers = prof.by_caller()
+        assert f"{__name__}._use_has_range" in callers
+        assert f"{__name__}.test_caller → collapse_spaces" in callers
+
+    def test_factory_and_module_tables(self):
+        with profile_regex() as prof:
+            assert P.decimal_places(2).match("11.004.78").groups() == ("11.00", "4.78")
+            medsi_extractor.medsi_inline_to_candidates(FIXTURE.read_text(encoding="utf-8"))
+        names = prof.by_pattern()
+        assert names["decimal_places(2)"].hits >= 1
+        assert any(n.startswith("medsi_extractor._UNIT_PATTERNS[") for n in names)
+
+    def test_report(self):
+        with profile_regex() as prof:
+            engine._smart_to_candidates(FIXTURE.read_text(encoding="utf-8"))
+        report = prof.report(top=5)
+        assert report.startswith("regex: ")
+        assert "pattern × caller" in report and "slowest single calls" in report
+        assert len(prof.as_dict(top=5)["top"]) == 5
+
+
+class TestInstall:
+
+    def test_originals_restored(self):
+        original = P.WS
+        with profile_regex():
+            with profile_regex():
+                assert not isinstance(P.WS, re.Pattern)
+            assert not isinstance(P.WS, re.Pattern)
+        assert P.WS is original
+        assert isinstance(medsi_extractor._UNIT_PATTERNS[0][1], re.Pattern)
+
+    def test_profiling_does_not_change_output(self):
+        text = FIXTURE.read_text(encoding="utf-8")
+        plain = engine._smart_to_candidates(text)
+        with profile_regex():
+            assert engine._smart_to_candidates(text) == plain
+
+    def test_separate_profiles(self):
+        results = {}
+        barrier = threading.Barrier(2)
+
+        def worker(n):
+            with profile_regex() as prof:
+                barrier.wait()
+                _use_has_range(["СРБ 2-5"] * n)
+                barrier.wait()
+            results[n] = prof.by_pattern()["HAS_RANGE_START"].calls
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in (3, 7)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert results == {3: 3, 7: 7}
+        assert isinstance(P.HAS_RANGE_START, re.Pattern)
+
+    def test_explicit_profile_accumulates(self):
+        prof = RegexProfile()
+        for _ in range(2):
+            with profile_regex(prof):
+                _use_has_range(["СРБ 2-5"])
+        assert prof.by_pattern()["HAS_RANGE_START"].calls == 2
+
+
+class TestEngineArtifact:
+
+    def test_report_artifact(self, monkeypatch):
+        monkeypatch.setattr(engine, "REGEX_PROFILE", True)
+        ctx = RequestContext(request_id="rx1")
+        with engine._report_context(ctx):
+            engine._smart_to_candidates(FIXTURE.read_text(encoding="utf-8"))
+        assert ctx.get(engine.REGEX_PROFILE_ARTIFACT).startswith("regex: ")
+        assert isinstance(P.WS, re.Pattern)
+
+    def test_off_by_default(self):
+        ctx = RequestContext(request_id="rx2")
+        with engine._report_context(ctx):
+            engine._smart_to_candidates("СОЭ 28 мм/ч 2-20")
+        assert ctx.get(engine.REGEX_PROFILE_ARTIFACT) is None
@@ -0,0 +1,153 @@
+"""
+Тесты повторного OCR слабых страниц (engine.reocr_weak_pages).
+
+PDF собирается из пустых страниц разной ширины: фейковый OCR по ширине понимает,
+какую страницу ему прислали, и отвечает по-разному для основной модели и OCR_REOCR_MODEL.
+
+Проверяем:
+  - extract_text_from_upload записывает источник и текст каждой страницы
+  - перераспознаётся только страница с подозрительным показателем, другой моделью
+  - результат хуже прежнего → None (оставляем как было)
+  - без источников страниц → None
+  - фото: повторно уходит исходник, а не обрезка
+  - _build_report_html подменяет кандидатов, если качество выросло
+"""
+
+import json
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+pypdf = pytest.importorskip("pypdf")
+
+import engine
+from infra.request_context import RequestContext, use_context
+from pdf_helpers import make_pdf, page_id
+
+PAGE_TEXT = {
+    0: "\n".join([
+        "Лейкоциты 6.1 10^9/л 4.0 - 9.0",
+        "Эритроциты 4.8 10^12/л 4.0 - 5.5",
+        "Гематокрит 43 % 39 - 49",
+        "Тромбоциты 250 10^9/л 150 - 400",
+    ]),
+    1: "Гемоглобин* 145 г/л 130 - 160\nСОЭ 28 мм/ч 2 - 20",
+    2: "Результаты исследований не являются диагнозом. " * 3,
+}
+REOCR_TEXT = {1: "Гемоглобин 145 г/л 130 - 160\nСОЭ 28 мм/ч 2 - 20"}
+
+
+@pytest.fixture
+def fake_ocr(monkeypatch):
+    state = {"calls": [], "reocr": dict(REOCR_TEXT), "lock": threading.Lock()}
+
+    def fake(iam, content, mime, model=None):
+        page = page_id(content) if mime == "application/pdf" else 0
+        with state["lock"]:
+            state["calls"].append((page, model))
+        text = state["reocr"].get(page, "") if model == engine.OCR_REOCR_MODEL else PAGE_TEXT[page]
+        return {"result": {"textAnnotation": {"fullText": text}}}
+
+    monkeypatch.setattr(engine, "ocr_image_sync", fake)
+    monkeypatch.setattr(engine, "get_iam_token", lambda: "t")
+    monkeypatch.setattr(engine, "try_extract_pdf_page_texts", lambda b: ["", "", ""])
+    monkeypatch.setattr(engine, "OCR_CACHE_ENABLED", False)
+    monkeypatch.setattr(engine, "_OCR_PAGE_EXECUTOR", None)
+    return state
+
+
+def _extract(pdf: bytes):
+    candidates, _text, sources = engine.extract_candidates_from_upload(pdf, "lab.pdf", "application/pdf")
+    items, quality = engine._score_items(engine.parse_candidates_with_fallback(candidates))
+    return items, quality, sources
+
+
+class TestReocrWeakPages:
+
+    def test_page_sources_recorded(self, fake_ocr):
+        ctx = RequestContext("r1")
+        with use_context(ctx):
+            _extract(make_pdf(3))
+        sources = json.loads(ctx.get(engine.OCR_PAGE_SOURCES_ARTIFACT))     # отладочная копия
+        assert sources["kind"] == "pdf"
+        assert [(e["page"], e["source"]) for e in sources["pages"]] == [(0, "ocr"), (1, "ocr"), (2, "ocr")]
+        assert sources["pages"][1]["text"].startswith("Гемоглобин*")
+
+    def test_only_weak_page_reocred(self, fake_ocr):
+        pdf = make_pdf(3)
+        with use_context(RequestContext("r2")):
+            items, quality, sources = _extract(pdf)
+            assert quality["suspicious_count"] > 0
+            assert [(p, src) for p, src, _t in sources.pages] == [(0, "ocr"), (1, "ocr"), (2, "ocr")]
+            fake_ocr["calls"].clear()
+            recovered = engine.reocr_weak_pages(pdf, sources, items, quality)
+
+        assert fake_ocr["calls"] == [(1, engine.OCR_REOCR_MODEL)]
+        assert "Гемоглобин\t145" in recovered
+        assert "Гемоглобин*" not in recovered
+        assert "Лейкоциты" in recovered
+
+    def test_worse_result_ignored(self, fake_ocr):
+        fake_ocr["reocr"] = {1: ""}
+        pdf = make_pdf(3)
+        with use_context(RequestContext("r3")):
+            items, quality, sources = _extract(pdf)
+            assert engine.reocr_weak_pages(pdf, sources, items, quality) is None
+
+    def test_no_sources(self, fake_ocr):
+        assert engine.reocr_weak_pages(b"%PDF", None, [], {"coverage_score": 0.0}) is None
+        text_only = engine.PageSources(kind="pdf", mime="application/pdf", pages=[(0, "pypdf", PAGE_TEXT[0])])
+        assert engine.reocr_weak_pages(b"%PDF", text_only, [], {"coverage_score": 0.0}) is None
+
+    def test_artifact_not_read(self, fake_ocr):
+        # источник — только явный аргумент: подменённый отладочный артефакт ни на что не влияет
+        pdf = make_pdf(3)
+        ctx = RequestContext("r8")
+        with use_context(ctx):
+            items, quality, sources = _extract(pdf)
+            ctx.put(engine.OCR_PAGE_SOURCES_ARTIFACT, "{}")
+            fake_ocr["calls"].clear()
+            assert "Гемоглобин\t145" in engine.reocr_weak_pages(pdf, sources, items, quality)
+
+    def test_image_reocr_sends_original(self, fake_ocr, monkeypatch):
+        sent = []
+        monkeypatch.setattr(engine, "OCR_IMAGE_PREPROCESS", False)
+        monkeypatch.setattr(engine, "OCR_TABLE_CROP", False)
+        monkeypatch.setattr(engine, "ocr_image_sync", lambda iam, content, mime, model=None: (
+            sent.append((content, model)),
+            {"result": {"textAnnotation": {"fullText": REOCR_TEXT[1] if model else PAGE_TEXT[1]}}},
+        )[1])
+        photo = b"\xff\xd8 photo bytes"
+        with use_context(RequestContext("r5")):
+            candidates, _text, sources = engine.extract_candidates_from_upload(photo, "lab.jpg", "image/jpeg")
+            items, quality = engine._score_items(engine.parse_candidates_with_fallback(candidates))
+            recovered = engine.reocr_weak_pages(photo, sources, items, quality)
+        assert sent[-1] == (photo, engine.OCR_REOCR_MODEL)
+        assert "Гемоглобин\t145" in recovered
+
+
+class TestBuildReportRecovery:
+
+    def test_recovered_candidates_used(self, fake_ocr, monkeypatch):
+        monkeypatch.setattr(engine, "call_yandexgpt_cached", lambda *a, **k: "Пояснение")
+        ctx = RequestContext("r6")
+        with use_context(ctx):
+            html, _, _ = engine._build_report_html("М", 40, file_bytes=make_pdf(3),
+                                                   filename="lab.pdf", mimetype="application/pdf",
+                                                   save_upload=False)
+        assert (1, engine.OCR_REOCR_MODEL) in fake_ocr["calls"]
+        assert "Гемоглобин*" not in ctx.get(engine.OCR_CANDIDATES_ARTIFACT)
+        assert "Гемоглобин" in html
+
+    def test_disabled(self, fake_ocr, monkeypatch):
+        monkeypatch.setattr(engine, "OCR_REOCR_ENABLED", False)
+        monkeypatch.setattr(engine, "call_yandexgpt_cached", lambda *a, **k: "Пояснение")
+        with use_context(RequestContext("r7")):
+            engine._build_report_html("М", 40, file_bytes=make_pdf(3), filename="lab.pdf",
+                                      mimetype="application/pdf", save_upload=False)
+        assert all(model is None for _, model in fake_ocr["calls"])
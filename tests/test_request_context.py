@@ -0,0 +1,84 @@
+"""
+Тесты контекста запроса (infra/request_context.py) и его использования в engine.
+
+Проверяем:
+  - артефакты параллельных запросов не смешиваются
+  - папка запроса (keep=False) удаляется в фоне, keep=True — остаётся
+  - extract_text_from_upload кладёт ocr_plain/ocr_candidates в переданный ctx
+  - вне request_context — контекст по умолчанию
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import engine
+from infra.logging_setup import get_request_id
+from infra.request_context import (
+    RequestContext, current_context, request_context, wait_for_cleanup,
+)
+
+
+class TestRequestContext:
+
+    def test_parallel_contexts_isolated(self):
+        results = {}
+        barrier = threading.Barrier(4)
+
+        def work(n):
+            with request_context() as ctx:
+                barrier.wait(5)
+                current_context().put("ocr_plain.txt", f"text-{n}")
+                barrier.wait(5)
+                results[n] = (current_context().get("ocr_plain.txt"), ctx.request_id == get_request_id())
+
+        threads = [threading.Thread(target=work, args=(n,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert results == {n: (f"text-{n}", True) for n in range(4)}
+
+    def test_disk_workspace_cleaned_async(self, tmp_path):
+        with request_context(root=tmp_path) as ctx:
+            ctx.put("ocr_raw.json", "{}")
+            workspace = ctx.workspace
+            assert (workspace / "ocr_raw.json").read_text(encoding="utf-8") == "{}"
+        assert wait_for_cleanup()
+        assert not workspace.exists()
+
+    def test_keep_workspace(self, tmp_path):
+        with request_context(root=tmp_path, keep=True, request_id="r1") as ctx:
+            ctx.put("ocr_plain.txt", "СОЭ 28")
+        wait_for_cleanup()
+        assert (tmp_path / "r1" / "ocr_plain.txt").exists()
+        assert ctx.location("ocr_plain.txt") == str(tmp_path / "r1" / "ocr_plain.txt")
+
+    def test_memory_location(self):
+        ctx = RequestContext(request_id="abc")
+        ctx.put("yc_raw_response.json", b"{}")
+        assert ctx.get("yc_raw_response.json") == b"{}"
+        assert ctx.location("yc_raw_response.json") == "memory://abc/yc_raw_response.json"
+
+
+class TestEngineArtifacts:
+
+    def test_extract_writes_into_given_context(self, monkeypatch):
+        monkeypatch.setattr(engine, "OCR_CACHE_ENABLED", False)
+        monkeypatch.setattr(engine, "get_iam_token", lambda: "t")
+        monkeypatch.setattr(
+            engine, "ocr_image_sync",
+            lambda iam, data, mime: {"result": {"textAnnotation": {"fullText": "СОЭ 28 мм/ч 2-20"}}},
+        )
+        ctx = RequestContext(request_id="img1")
+        engine.extract_text_from_upload(b"\xff\xd8jpeg", "lab.jpg", "image/jpeg", ctx=ctx)
+
+        assert "СОЭ" in ctx.get(engine.OCR_PLAIN_ARTIFACT)
+        assert ctx.get(engine.OCR_RAW_ARTIFACT) is not None
+        assert ctx.get(engine.OCR_CANDIDATES_ARTIFACT) is not None
+        # контекст по умолчанию не тронут
+        assert current_context() is not ctx
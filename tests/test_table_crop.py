@@ -0,0 +1,152 @@
+"""
+Тесты обрезки фото до области таблицы (ocr/table_crop.py + engine).
+
+Бланк рисуется на лету: логотип, данные пациента, таблица с линейками, подвал.
+Строки «текста» — ряды коротких штрихов (слова с пробелами).
+
+Проверяем:
+  - таблица найдена по линейкам, шапка и далёкий подвал отрезаны
+  - строки текста без линеек и толстый логотип за линейки не считаются
+  - без таблицы / при малой экономии — исходные байты
+  - engine: в OCR уходит обрезка; мало строк-показателей → OCR всего изображения
+"""
+
+import io
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+Image = pytest.importorskip("PIL.Image")
+from PIL import ImageDraw  # noqa: E402
+
+import engine
+from ocr.table_crop import crop_table_region, find_table_region
+
+pytestmark = pytest.mark.usefixtures("memory_context")
+
+TABLE_TOP = 600
+TABLE_ROWS = 16
+ROW_H = 40
+TABLE_BOTTOM = TABLE_TOP + TABLE_ROWS * ROW_H
+
+
+def _text_line(draw, x0, x1, y, h=12):
+    x = x0
+    while x < x1:
+        draw.rectangle((x, y, min(x1, x + 50), y + h), fill="black")
+        x += 70
+
+
+def _blank(table: bool = True, footer_gap: int = 200, rows: int = TABLE_ROWS):
+    img = Image.new("RGB", (1240, 1754), "white")
+    draw = ImageDraw.Draw(img)
+    draw.rectangle((60, 60, 1200, 200), fill="black")            # широкий логотип/плашка
+    for y in range(260, 420, 30):
+        _text_line(draw, 60, 1180, y)                           # данные пациента
+    for i in range(rows):
+        y = TABLE_TOP + i * ROW_H
+        if table:
+            draw.line((80, y, 1160, y), fill="black", width=2)
+        _text_line(draw, 100, 1100, y + 14)
+    bottom = TABLE_TOP + rows * ROW_H
+    if table:
+        draw.line((80, bottom, 1160, bottom), fill="black", width=2)
+    for y in range(bottom + footer_gap, bottom + footer_gap + 100, 25):
+        _text_line(draw, 60, 900, y)                            # подвал
+    return img
+
+
+def _jpeg(img) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+class TestFindTableRegion:
+
+    def test_table_found(self):
+        region = find_table_region(_blank())
+        left, top, right, bottom = region.box
+        assert region.rules == TABLE_ROWS + 1
+        assert 540 <= top <= TABLE_TOP                  # шапка (до y=420) отрезана
+        assert TABLE_BOTTOM <= bottom <= TABLE_BOTTOM + 60   # подвал отрезан
+        assert left < 100 and right > 1160
+        assert region.area_ratio < 0.5
+
+    def test_close_footer_kept(self):
+        # подвал вплотную к таблице — может быть её частью, не режем
+        region = find_table_region(_blank(footer_gap=30))
+        assert region.box[3] >= TABLE_BOTTOM + 30 + 75
+
+    def test_text_without_rules(self):
+        assert find_table_region(_blank(table=False)) is None
+
+    def test_too_short_table(self):
+        assert find_table_region(_blank(rows=2)) is None
+
+
+class TestCropTableRegion:
+
+    def test_cropped_jpeg(self):
+        data = _jpeg(_blank())
+        res = crop_table_region(data, "image/jpeg")
+        out = Image.open(io.BytesIO(res.content))
+        assert res.box is not None and res.mime == "image/jpeg"
+        assert out.size == (res.box[2] - res.box[0], res.box[3] - res.box[1])
+        assert res.bytes_out < res.bytes_in
+
+    def test_no_table_unchanged(self):
+        data = _jpeg(_blank(table=False))
+        res = crop_table_region(data, "image/jpeg")
+        assert res.content == data and res.box is None and res.skipped == "no-table"
+
+    def test_small_saving_unchanged(self):
+        data = _jpeg(_blank())
+        res = crop_table_region(data, "image/jpeg", min_saving=0.9)
+        assert res.content == data and res.skipped == "small-saving"
+
+    def test_broken_bytes(self):
+        assert crop_table_region(b"junk", "image/png").skipped.startswith("decode-failed")
+
+
+class TestEngineTableCrop:
+
+    @pytest.fixture
+    def sent(self, monkeypatch):
+        sent = []
+        state = {"text": "\n".join([
+            "Гемоглобин 145 г/л 130 - 160",
+            "Эритроциты 4.8 10^12/л 4.0 - 5.5",
+            "Лейкоциты 6.1 10^9/л 4.0 - 9.0",
+        ])}
+
+        def fake_ocr(iam_token, file_bytes, mime_type):
+            sent.append(Image.open(io.BytesIO(file_bytes)).size)
+            return {"result": {"textAnnotation": {"fullText": state["text"] if len(sent) == 1 else "СОЭ 28 мм/ч 2-20"}}}
+
+        monkeypatch.setattr(engine, "OCR_CACHE_ENABLED", False)
+        monkeypatch.setattr(engine, "OCR_IMAGE_PREPROCESS", False)
+        monkeypatch.setattr(engine, "ocr_image_sync", fake_ocr)
+        monkeypatch.setattr(engine, "get_iam_token", lambda: "t")
+        return {"sizes": sent, "state": state}
+
+    def test_only_table_sent(self, sent):
+        out = engine.extract_text_from_upload(_jpeg(_blank()), "lab.jpg", "image/jpeg")
+        assert len(sent["sizes"]) == 1
+        assert sent["sizes"][0][1] < 1754 / 2
+        assert "Гемоглобин" in out
+
+    def test_weak_crop_falls_back_to_full_image(self, sent):
+        sent["state"]["text"] = "Страница 1 из 1"
+        out = engine.extract_text_from_upload(_jpeg(_blank()), "lab.jpg", "image/jpeg")
+        assert [s[1] for s in sent["sizes"]] == [sent["sizes"][0][1], 1754]
+        assert "СОЭ" in out
+
+    def test_disabled(self, sent, monkeypatch):
+        monkeypatch.setattr(engine, "OCR_TABLE_CROP", False)
+        engine.extract_text_from_upload(_jpeg(_blank()), "lab.jpg", "image/jpeg")
+        assert sent["sizes"] == [(1240, 1754)]
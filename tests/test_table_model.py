@@ -0,0 +1,197 @@
+"""
+Тесты кандидатов из модели Vision OCR "table" (ocr/table_model.py + engine).
+
+Проверяем:
+  - сетка из cells (индексы строками, пропуски) → строки × колонки
+  - роли колонок по шапке и без шапки — по содержимому
+  - качественные результаты, служебные строки и шапка не попадают в кандидаты
+  - ответ из нескольких страниц
+  - engine: OCR_TABLE_MODE — запрос с model="table", кандидаты из сетки без
+    текстовых эвристик; мало строк — откат на текст того же ответа
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import engine
+from ocr.table_model import detect_columns, grid_to_candidates, table_grid, tables_to_candidates
+
+pytestmark = pytest.mark.usefixtures("memory_context")
+
+HEADER = ["Исследование", "Результат", "Ед. изм.", "Референсные значения"]
+ROWS = [
+    ["Гемоглобин (HGB)", "145", "г/л", "130 - 160"],
+    ["Лейкоциты (WBC)", "6,1", "10*9/л", "4,0 - 9,0"],
+    ["Тромбоциты (PLT)", "250", "10^9/л", "150 - 400"],
+    ["СОЭ", "28 ↑", "мм/ч", "2 - 20"],
+]
+
+
+def _table(grid, as_strings=True):
+    cells = []
+    for r, row in enumerate(grid):
+        for k, text in enumerate(row):
+            if text:
+                idx = (str(r), str(k)) if as_strings else (r, k)
+                cells.append({"rowIndex": idx[0], "columnIndex": idx[1], "text": text})
+    return {"rowCount": str(len(grid)), "columnCount": str(len(grid[0])), "cells": cells}
+
+
+def _response(*grids):
+    return {"result": {"textAnnotation": {
+        "fullText": "\n".join(" ".join(row) for g in grids for row in g),
+        "tables": [_table(g) for g in grids],
+    }}}
+
+
+class TestTableGrid:
+
+    def test_grid_from_cells(self):
+        grid = table_grid(_table([HEADER] + ROWS))
+        assert grid[0] == HEADER
+        assert grid[2][1] == "6,1"
+
+    def test_missing_cells_empty(self):
+        table = {"cells": [{"rowIndex": "1", "columnIndex": "2", "text": "г/л"}]}
+        assert table_grid(table) == [["", "", ""], ["", "", "г/л"]]
+
+
+class TestColumns:
+
+    def test_header_roles(self):
+        cols, skip = detect_columns([HEADER] + ROWS)
+        assert (cols.name, cols.value, cols.unit, cols.ref, skip) == (0, 1, 2, 3, 1)
+
+    def test_content_roles_without_header(self):
+        # колонки в другом порядке: ref, имя, значение, единица
+        grid = [[row[3], row[0], row[1], row[2]] for row in ROWS]
+        cols, skip = detect_columns(grid)
+        assert (cols.name, cols.value, cols.unit, cols.ref, skip) == (1, 2, 3, 0, 0)
+
+    def test_ref_header_before_value(self):
+        grid = [["Показатель", "Референсные значения", "Значение"], ["Глюкоза", "3,9 - 6,1", "5,1"]]
+        cols, _ = detect_columns(grid)
+        assert (cols.ref, cols.value) == (1, 2)
+
+    def test_no_numeric_column(self):
+        assert detect_columns([["Примечание", "Текст"], ["Кровь", "взята утром"]]) is None
+
+
+class TestCandidates:
+
+    def test_rows_to_tsv(self):
+        lines = grid_to_candidates([HEADER] + ROWS)
+        assert lines == [
+            "Гемоглобин (HGB)\t145\t130-160\tг/л",
+            "Лейкоциты (WBC)\t6.1\t4.0-9.0\t*10^9/л",
+            "Тромбоциты (PLT)\t250\t150-400\t*10^9/л",
+            "СОЭ\t28\t2-20\tмм/ч",
+        ]
+
+    def test_qualitative_and_service_rows_skipped(self):
+        grid = [HEADER] + ROWS[:1] + [
+            ["Белок в моче", "не обнаружено", "", ""],
+            ["Исследование выполнено", "", "", ""],
+        ]
+        assert [ln.split("\t")[0] for ln in grid_to_candidates(grid)] == ["Гемоглобин (HGB)"]
+
+    def test_multipage_response(self):
+        merged = {"result": {"pages": [_response([HEADER] + ROWS[:2]), _response([HEADER] + ROWS[2:])]}}
+        assert len(tables_to_candidates(merged).splitlines()) == 4
+
+    def test_candidates_parse(self):
+        items = engine.parse_items_from_candidates(tables_to_candidates(_response([HEADER] + ROWS)))
+        by_name = {it.name: it for it in items}
+        assert by_name["WBC"].value == 6.1
+        assert by_name["ESR"].status == "ВЫШЕ"
+
+
+class TestEngineTableMode:
+
+    @pytest.fixture
+    def table_mode(self, monkeypatch):
+        calls = []
+        state = {"response": _response([HEADER] + ROWS)}
+
+        def fake_ocr(iam_token, file_bytes, mime_type, model=None):
+            calls.append(model)
+            return state["response"]
+
+        monkeypatch.setattr(engine, "OCR_TABLE_MODE", True)
+        monkeypatch.setattr(engine, "OCR_CACHE_ENABLED", False)
+        monkeypatch.setattr(engine, "OCR_IMAGE_PREPROCESS", False)
+        monkeypatch.setattr(engine, "OCR_TABLE_CROP", False)
+        monkeypatch.setattr(engine, "ocr_image_sync", fake_ocr)
+        monkeypatch.setattr(engine, "get_iam_token", lambda: "t")
+        return {"calls": calls, "state": state}
+
+    def test_image_candidates_from_grid(self, table_mode, monkeypatch):
+        def no_heuristics(text):
+            raise AssertionError("текстовые эвристики не должны вызываться")
+
+        monkeypatch.setattr(engine, "_smart_to_candidates", no_heuristics)
+        out = engine.extract_text_from_upload(b"img", "lab.jpg", "image/jpeg")
+        assert table_mode["calls"] == ["table"]
+        assert out.splitlines()[0] == "Гемоглобин (HGB)\t145\t130-160\tг/л"
+
+    def test_few_rows_fall_back_to_text(self, table_mode):
+        table_mode["state"]["response"] = _response([HEADER] + ROWS[:1])
+        out = engine.extract_text_from_upload(b"img", "lab.jpg", "image/jpeg")
+        assert table_mode["calls"] == ["table"]       # второго запроса нет
+        assert "Гемоглобин" in out
+
+    def test_pdf_pages(self, table_mode, monkeypatch):
+        pypdf = pytest.importorskip("pypdf")
+        import io
+        writer = pypdf.PdfWriter()
+        for _ in range(2):
+            writer.add_blank_page(width=100, height=200)
+        buf = io.BytesIO()
+        writer.write(buf)
+        monkeypatch.setattr(engine, "try_extract_pdf_page_texts", lambda b: ["", ""])
+        monkeypatch.setattr(engine, "_OCR_PAGE_EXECUTOR", None)
+        monkeypatch.setattr(engine, "OCR_SKIP_WHEN_PANEL_COMPLETE", False)
+
+        out = engine.extract_text_from_upload(buf.getvalue(), "lab.pdf", "application/pdf")
+        assert table_mode["calls"] == ["table", "table"]
+        assert "СОЭ\t28\t2-20\tмм/ч" in out.splitlines()
+
+    def test_stop_early_tables_only_from_collected(self, monkeypatch):
+        pypdf = pytest.importorskip("pypdf")
+        import io
+        import threading
+        import time
+        writer = pypdf.PdfWriter()
+        for i in range(2):
+            writer.add_blank_page(width=100 + i, height=200)
+        buf = io.BytesIO()
+        writer.write(buf)
+        started, finished = threading.Event(), threading.Event()
+
+        def fake_ocr(iam_token, file_bytes, mime_type, model=None):
+            page = int(float(pypdf.PdfReader(io.BytesIO(file_bytes)).pages[0].mediabox.width)) - 100
+            if page == 0:
+                started.wait(5)     # вторая страница уже в работе — отменить её нельзя
+            else:
+                started.set()
+                time.sleep(0.2)     # ещё идёт, когда вызывающий уже перебирает tables
+                finished.set()
+            return _response([HEADER] + ROWS)
+
+        monkeypatch.setattr(engine, "OCR_TABLE_MODE", True)
+        monkeypatch.setattr(engine, "ocr_image_sync", fake_ocr)
+        monkeypatch.setattr(engine, "get_iam_token", lambda: "t")
+        monkeypatch.setattr(engine, "_OCR_PAGE_EXECUTOR", None)
+        monkeypatch.setattr(engine, "OCR_PDF_PAGE_WORKERS", 2)
+
+        tables = {}
+        texts, failed = engine.ocr_pdf_pages(buf.getvalue(), stop_when=lambda done: True, tables_out=tables)
+        assert finished.wait(5)
+        time.sleep(0.05)
+        assert sorted(texts) == [0]
+        assert sorted(tables) == [0]
@@ -0,0 +1,78 @@
+"""
+Тесты общего кэша токена (infra/token_cache.py).
+
+Отдельные экземпляры SharedTokenCache на один файл ведут себя как разные
+процессы: у каждого своя файловая блокировка.
+
+Проверяем:
+  - только один «процесс» ходит в IAM, остальные читают файл
+  - почти протухший токен из файла не берётся (min_ttl_sec)
+  - файл токена создаётся с правами 0600
+  - повреждённый файл — промах, а не ошибка
+"""
+
+import os
+import stat
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from infra.token_cache import SharedTokenCache
+
+
+class TestSharedTokenCache:
+
+    def test_single_refresher_across_instances(self, tmp_path):
+        path = tmp_path / "iam_token.json"
+        calls = []
+        lock = threading.Lock()
+
+        def fetch():
+            time.sleep(0.1)
+            with lock:
+                calls.append(1)
+            return "shared-token", time.time() + 3600
+
+        barrier = threading.Barrier(6)
+        results = []
+
+        def worker():
+            cache = SharedTokenCache(path)
+            barrier.wait(5)
+            results.append(cache.get_or_fetch(fetch, min_ttl_sec=60)[0])
+
+        threads = [threading.Thread(target=worker) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert len(calls) == 1
+        assert results == ["shared-token"] * 6
+
+    def test_near_expiry_token_refetched(self, tmp_path):
+        cache = SharedTokenCache(tmp_path / "iam_token.json")
+        cache.write("old", time.time() + 30)
+        token, _ = cache.get_or_fetch(lambda: ("new", time.time() + 3600), min_ttl_sec=60)
+        assert token == "new"
+        assert cache.read()[0] == "new"
+
+    @pytest.mark.skipif(os.name != "posix", reason="POSIX-права")
+    def test_file_permissions(self, tmp_path):
+        path = tmp_path / "sub" / "iam_token.json"
+        SharedTokenCache(path).write("secret", time.time() + 3600)
+        assert stat.S_IMODE(path.stat().st_mode) == 0o600
+
+    def test_corrupt_file_is_miss(self, tmp_path):
+        path = tmp_path / "iam_token.json"
+        path.write_text("{not json", encoding="utf-8")
+        cache = SharedTokenCache(path)
+        assert cache.read() is None
+        token, _ = cache.get_or_fetch(lambda: ("fresh", time.time() + 3600))
+        assert token == "fresh"